@@ -10,12 +10,17 @@ import argparse
 import json
 import logging
 import os
+import shlex
 import subprocess
 import sys
 import time
 from datetime import datetime
 from pathlib import Path
 
+# 守护进程控制接口客户端
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+from daily_word_control import ControlError, DaemonNotRunning, send_command
+
 # 服务配置
 SERVICE_CONFIG = {
     'name': 'daily-word',
@@ -23,9 +28,16 @@ SERVICE_CONFIG = {
     'install_dir': '/opt/daily-word-epaper',
     'user': 'pi',
     'python_path': '/opt/daily-word-epaper/venv/bin/python',
-    'main_script': '/opt/daily-word-epaper/src/daily_word_main.py'
+    'main_script': '/opt/daily-word-epaper/src/daily_word_main.py',
+    'control_socket': '/opt/daily-word-epaper/data/daily_word_control.sock'
 }
 
+# 一次systemctl show读取的单元属性
+UNIT_PROPERTIES = (
+    'LoadState', 'ActiveState', 'SubState', 'UnitFileState', 'MainPID',
+    'ExecMainStartTimestamp', 'NRestarts', 'Result', 'StatusText', 'WatchdogUSec',
+)
+
 class ServiceManager:
     """服务管理器"""
     
@@ -34,40 +46,72 @@ class ServiceManager:
         self.install_dir = Path(SERVICE_CONFIG['install_dir'])
         
     def run_command(self, command, check=True, capture_output=True):
-        """运行系统命令"""
+        """运行系统命令（参数列表，不经过shell）"""
         try:
             result = subprocess.run(
                 command,
-                shell=True,
                 check=check,
                 capture_output=capture_output,
                 text=True
             )
             return result
-        except subprocess.CalledProcessError as e:
-            print(f"命令执行失败: {command}")
+        except (subprocess.CalledProcessError, OSError) as e:
+            print(f"命令执行失败: {shlex.join(command)}")
             print(f"错误: {e}")
             return None
     
-    def is_service_exists(self):
+    def get_unit_properties(self):
+        """用一次systemctl show读取服务单元的全部状态属性"""
+        result = self.run_command(
+            ['systemctl', 'show', f'{self.service_name}.service',
+             '--property=' + ','.join(UNIT_PROPERTIES)],
+            check=False
+        )
+        if result is None or result.returncode != 0:
+            return {}
+        properties = {}
+        for line in result.stdout.splitlines():
+            key, sep, value = line.partition('=')
+            if sep:
+                properties[key] = value
+        return properties
+    
+    def daemon_command(self, command, **args):
+        """
+        通过控制套接字让正在运行的守护进程执行命令
+        
+        返回:
+        - (handled, result): 只有守护进程确实未运行（套接字不存在或拒绝连接）时handled为False，
+          由调用方退回到独立进程；其他错误（超时、权限不足、连接断开）照常报告，
+          不能再启动与守护进程争用SPI和屏幕的独立进程
+        """
+        try:
+            return True, send_command(SERVICE_CONFIG['control_socket'], command, **args)
+        except DaemonNotRunning:
+            return False, None
+        except ControlError as e:
+            print(f"守护进程执行失败: {e}")
+            return True, None
+    
+    def is_service_exists(self, properties=None):
         """检查服务是否存在"""
-        result = self.run_command(f"systemctl list-unit-files | grep {self.service_name}")
-        return result is not None and result.returncode == 0
+        properties = self.get_unit_properties() if properties is None else properties
+        return properties.get('LoadState', 'not-found') not in ('not-found', '')
     
-    def is_service_running(self):
+    def is_service_running(self, properties=None):
         """检查服务是否运行"""
-        result = self.run_command(f"systemctl is-active {self.service_name}")
-        return result is not None and result.stdout.strip() == "active"
+        properties = self.get_unit_properties() if properties is None else properties
+        return properties.get('ActiveState') == 'active'
     
-    def is_service_enabled(self):
+    def is_service_enabled(self, properties=None):
         """检查服务是否启用"""
-        result = self.run_command(f"systemctl is-enabled {self.service_name}")
-        return result is not None and result.stdout.strip() == "enabled"
+        properties = self.get_unit_properties() if properties is None else properties
+        return properties.get('UnitFileState') == 'enabled'
     
     def start_service(self):
         """启动服务"""
         print(f"启动服务 {self.service_name}...")
-        result = self.run_command(f"sudo systemctl start {self.service_name}")
+        result = self.run_command(['sudo', 'systemctl', 'start', self.service_name])
         
         if result and result.returncode == 0:
             print("✅ 服务启动成功")
@@ -79,7 +123,7 @@ class ServiceManager:
     def stop_service(self):
         """停止服务"""
         print(f"停止服务 {self.service_name}...")
-        result = self.run_command(f"sudo systemctl stop {self.service_name}")
+        result = self.run_command(['sudo', 'systemctl', 'stop', self.service_name])
         
         if result and result.returncode == 0:
             print("✅ 服务停止成功")
@@ -91,7 +135,7 @@ class ServiceManager:
     def restart_service(self):
         """重启服务"""
         print(f"重启服务 {self.service_name}...")
-        result = self.run_command(f"sudo systemctl restart {self.service_name}")
+        result = self.run_command(['sudo', 'systemctl', 'restart', self.service_name])
         
         if result and result.returncode == 0:
             print("✅ 服务重启成功")
@@ -103,7 +147,7 @@ class ServiceManager:
     def enable_service(self):
         """启用服务（开机自启）"""
         print(f"启用服务 {self.service_name}...")
-        result = self.run_command(f"sudo systemctl enable {self.service_name}")
+        result = self.run_command(['sudo', 'systemctl', 'enable', self.service_name])
         
         if result and result.returncode == 0:
             print("✅ 服务启用成功")
@@ -115,7 +159,7 @@ class ServiceManager:
     def disable_service(self):
         """禁用服务"""
         print(f"禁用服务 {self.service_name}...")
-        result = self.run_command(f"sudo systemctl disable {self.service_name}")
+        result = self.run_command(['sudo', 'systemctl', 'disable', self.service_name])
         
         if result and result.returncode == 0:
             print("✅ 服务禁用成功")
@@ -125,22 +169,21 @@ class ServiceManager:
             return False
     
     def get_service_status(self):
-        """获取服务状态"""
+        """获取服务状态（只调用一次systemctl show）"""
+        properties = self.get_unit_properties()
         status_info = {
-            'exists': self.is_service_exists(),
+            'exists': self.is_service_exists(properties),
             'running': False,
             'enabled': False,
             'details': None
         }
         
         if status_info['exists']:
-            status_info['running'] = self.is_service_running()
-            status_info['enabled'] = self.is_service_enabled()
-            
-            # 获取详细状态
-            result = self.run_command(f"systemctl status {self.service_name}")
-            if result:
-                status_info['details'] = result.stdout
+            status_info['running'] = self.is_service_running(properties)
+            status_info['enabled'] = self.is_service_enabled(properties)
+            status_info['details'] = '\n'.join(
+                f"{key}: {properties[key]}" for key in UNIT_PROPERTIES if properties.get(key)
+            )
         
         return status_info
     
@@ -163,6 +206,15 @@ class ServiceManager:
             print("\n详细信息:")
             print(status['details'])
         
+        handled, daemon_status = self.daemon_command('status')
+        if handled and daemon_status:
+            content = daemon_status.get('current_content') or {}
+            print("\n守护进程:")
+            print(f"  当前内容: {content.get('word')} ({content.get('date')})")
+            stages = (daemon_status.get('pipeline') or {}).get('stages', {})
+            for name, stage in stages.items():
+                print(f"  {name}: {stage.get('count')} 次, 平均 {stage.get('avg_ms')} ms")
+        
         return True
     
     def show_service_logs(self, lines=50, follow=False):
@@ -170,9 +222,9 @@ class ServiceManager:
         print(f"📋 服务日志: {self.service_name}")
         print("=" * 50)
         
-        cmd = f"sudo journalctl -u {self.service_name} -n {lines}"
+        cmd = ['sudo', 'journalctl', '-u', self.service_name, '-n', str(lines)]
         if follow:
-            cmd += " -f"
+            cmd.append('-f')
         
         # 直接运行，不捕获输出
         self.run_command(cmd, capture_output=False)
@@ -187,7 +239,7 @@ class ServiceManager:
             return False
         
         python_path = SERVICE_CONFIG['python_path']
-        result = self.run_command(f"{python_path} {test_script}")
+        result = self.run_command([python_path, str(test_script)])
         
         if result and result.returncode == 0:
             print("✅ 系统测试通过")
@@ -203,12 +255,24 @@ class ServiceManager:
         """更新显示"""
         print("🔄 更新显示内容...")
         
+        handled, result = self.daemon_command('force-update' if force else 'update')
+        if handled:
+            outcome = (result or {}).get('result')
+            if outcome == 'queued':
+                print(f"✅ 已提交给守护进程，重绘通道: {', '.join(result.get('lanes') or [])}")
+            elif outcome == 'unchanged':
+                print("ℹ️ 守护进程跳过了本次更新：没有通道过期，内容也没有变化")
+            else:
+                print("❌ 显示更新失败")
+            return outcome in ('queued', 'unchanged')
+        
+        # 守护进程未运行时启动独立进程更新一次
         python_path = SERVICE_CONFIG['python_path']
         main_script = SERVICE_CONFIG['main_script']
         
-        cmd = f"{python_path} {main_script}"
+        cmd = [python_path, main_script]
         if force:
-            cmd += " --force"
+            cmd.append('--force')
         
         result = self.run_command(cmd)
         
@@ -226,10 +290,16 @@ class ServiceManager:
         """清空显示"""
         print("🧹 清空显示...")
         
+        handled, result = self.daemon_command('clear')
+        if handled:
+            success = bool(result and result.get('cleared'))
+            print("✅ 显示清空成功" if success else "❌ 显示清空失败")
+            return success
+        
         python_path = SERVICE_CONFIG['python_path']
         main_script = SERVICE_CONFIG['main_script']
         
-        result = self.run_command(f"{python_path} {main_script} --clear")
+        result = self.run_command([python_path, main_script, '--clear'])
         
         if result and result.returncode == 0:
             print("✅ 显示清空成功")
@@ -241,6 +311,26 @@ class ServiceManager:
                 print(result.stderr)
             return False
     
+    def render_preview(self, path=None):
+        """让守护进程把当前画面渲染为图片（不写屏）"""
+        handled, result = self.daemon_command('render-preview', **({'path': path} if path else {}))
+        if not handled:
+            print("❌ 守护进程未运行")
+            return False
+        if result:
+            print(f"✅ 预览已生成: {result['path']}")
+        return bool(result)
+    
+    def show_metrics(self):
+        """显示守护进程的指标"""
+        handled, result = self.daemon_command('metrics')
+        if not handled:
+            print("❌ 守护进程未运行")
+            return False
+        if result:
+            print(result, end='')
+        return result is not None
+    
     def get_system_info(self):
         """获取系统信息"""
         info = {
@@ -250,20 +340,9 @@ class ServiceManager:
             'files': {}
         }
         
-        # 系统信息
-        try:
-            result = self.run_command("uname -a")
-            if result:
-                info['system']['uname'] = result.stdout.strip()
-        except:
-            pass
-        
-        try:
-            result = self.run_command("python3 --version")
-            if result:
-                info['system']['python'] = result.stdout.strip()
-        except:
-            pass
+        # 系统信息（直接从当前进程读取，不启动子进程）
+        info['system']['uname'] = ' '.join(os.uname())
+        info['system']['python'] = f"Python {sys.version.split()[0]}"
         
         # 文件信息
         important_files = [
@@ -320,6 +399,8 @@ def create_argument_parser():
   %(prog)s test           # 测试系统
   %(prog)s update         # 更新显示
   %(prog)s clear          # 清空显示
+  %(prog)s preview        # 生成当前画面的预览图
+  %(prog)s metrics        # 查看守护进程指标
         """
     )
     
@@ -346,6 +427,9 @@ def create_argument_parser():
     update_parser = subparsers.add_parser('update', help='更新显示内容')
     update_parser.add_argument('-f', '--force', action='store_true', help='强制获取新内容')
     subparsers.add_parser('clear', help='清空显示')
+    preview_parser = subparsers.add_parser('preview', help='生成当前画面的预览图（不写屏）')
+    preview_parser.add_argument('-o', '--output', help='预览图路径')
+    subparsers.add_parser('metrics', help='查看守护进程指标')
     
     return parser
 
@@ -385,6 +469,10 @@ def main():
             success = manager.update_display(force=args.force)
         elif args.command == 'clear':
             success = manager.clear_display()
+        elif args.command == 'preview':
+            success = manager.render_preview(args.output)
+        elif args.command == 'metrics':
+            success = manager.show_metrics()
         else:
             print(f"未知命令: {args.command}")
             success = False
@@ -199,7 +199,9 @@ After=network.target
 Wants=network.target
 
 [Service]
-Type=simple
+Type=notify
+NotifyAccess=main
+WatchdogSec=120
 User=${SUDO_USER}
 Group=${SUDO_USER}
 WorkingDirectory=${INSTALL_DIR}
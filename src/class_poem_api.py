@@ -57,9 +57,13 @@ class PoemAPI:
                 return token
         return None
 
-    def get_poem_detail(self):
+    def get_poem_detail(self, offline_fallback=True):
         """
         请求每日古诗词API获取诗歌详情，并更新类属性。
+        网络不可用时从本地诗词库取当日诗词。
+        
+        参数:
+        - offline_fallback: 请求失败时是否使用本地诗词库。
         
         返回:
         - bool: True表示成功获取并更新了详情，False表示获取详情失败。
@@ -79,8 +83,29 @@ class PoemAPI:
                 return True  # 返回True表示成功获取并更新了详情
         except requests.RequestException as e:
             logging.error(f"请求每日古诗词时出错: {e}")
+        if offline_fallback:
+            return self.load_offline_poem()
         return False  # 返回False表示获取详情失败
 
+    def load_offline_poem(self, db_path=None):
+        """
+        从本地诗词库（由process_poem_corpus导入）加载当日诗词，并更新类属性。
+        
+        返回:
+        - bool: True表示成功加载，False表示本地库为空或不可用。
+        """
+        try:
+            from class_poem_repository import DEFAULT_DB_PATH, get_repository
+            poem = get_repository(db_path or DEFAULT_DB_PATH).daily_poem()
+        except Exception as e:
+            logging.error(f"读取本地诗词库时出错: {e}")
+            return False
+        if not poem:
+            return False
+        _, self.title, self.dynasty, self.author, self.content, self.full_content = poem[:6]
+        logging.info(f"使用本地诗词库: {self.title}")
+        return True
+
     def update_token(self, new_token):
         """
         更新Token，并将新的Token写入文件。
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+诗词数据库仓库
+Poem Repository
+
+持有单个SQLite连接（WAL模式），提供预编译语句、批量写入、基于内容哈希的去重、
+全文索引和基于rowid的随机抽取，可在调度线程中安全使用
+"""
+
+import hashlib
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 项目根目录，相对数据库路径均基于此解析
+PROJECT_ROOT = Path(__file__).parent.parent
+
+DEFAULT_DB_PATH = 'data/poems.db'
+
+# 连接级调优参数（WAL下NORMAL同步在断电时只会丢失最后一个事务，不会损坏数据库）
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('temp_store', 'MEMORY'),
+    ('cache_size', -4096),      # 4MB页缓存
+    ('busy_timeout', 5000),     # 毫秒
+    ('foreign_keys', 'ON'),
+)
+
+POEM_COLUMNS = ('title', 'dynasty', 'author', 'content', 'full_content')
+
+SQL_CREATE_TABLE = '''
+    CREATE TABLE IF NOT EXISTS poems (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        dynasty TEXT,
+        author TEXT,
+        content TEXT NOT NULL,
+        full_content TEXT NOT NULL,
+        saved_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        content_hash TEXT
+    )
+'''
+SQL_INSERT = '''
+    INSERT OR IGNORE INTO poems (title, dynasty, author, content, full_content, content_hash)
+    VALUES (?, ?, ?, ?, ?, ?)
+'''
+SQL_INSERT_LEGACY = '''
+    INSERT INTO poems (title, dynasty, author, content, full_content)
+    VALUES (?, ?, ?, ?, ?)
+'''
+SQL_CREATE_HASH_INDEX = 'CREATE UNIQUE INDEX IF NOT EXISTS idx_poems_content_hash ON poems(content_hash)'
+SQL_SELECT_ID_BY_HASH = 'SELECT id FROM poems WHERE content_hash = ?'
+SQL_SELECT_BY_ID = 'SELECT * FROM poems WHERE id = ?'
+SQL_UPDATE_CONTENT = 'UPDATE poems SET content = ? WHERE id = ?'
+SQL_DELETE = 'DELETE FROM poems WHERE id = ?'
+SQL_FIND_BY_CONTENT = 'SELECT id FROM poems WHERE content LIKE ?'
+SQL_ID_RANGE = 'SELECT MIN(id), MAX(id) FROM poems'
+SQL_SELECT_FROM_ID = 'SELECT * FROM poems WHERE id >= ? ORDER BY id LIMIT 1'
+SQL_COUNT = 'SELECT COUNT(*) FROM poems'
+
+# 外部内容FTS5索引，由触发器与poems表同步；trigram分词支持中文子串检索（需SQLite 3.34+）
+SQL_CREATE_FTS = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS poems_fts USING fts5(
+        title, author, content, full_content,
+        content='poems', content_rowid='id', tokenize='trigram'
+    )
+'''
+SQL_CREATE_FTS_TRIGGERS = (
+    '''CREATE TRIGGER IF NOT EXISTS poems_fts_ai AFTER INSERT ON poems BEGIN
+        INSERT INTO poems_fts(rowid, title, author, content, full_content)
+        VALUES (new.id, new.title, new.author, new.content, new.full_content);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS poems_fts_ad AFTER DELETE ON poems BEGIN
+        INSERT INTO poems_fts(poems_fts, rowid, title, author, content, full_content)
+        VALUES ('delete', old.id, old.title, old.author, old.content, old.full_content);
+    END''',
+    '''CREATE TRIGGER IF NOT EXISTS poems_fts_au AFTER UPDATE ON poems BEGIN
+        INSERT INTO poems_fts(poems_fts, rowid, title, author, content, full_content)
+        VALUES ('delete', old.id, old.title, old.author, old.content, old.full_content);
+        INSERT INTO poems_fts(rowid, title, author, content, full_content)
+        VALUES (new.id, new.title, new.author, new.content, new.full_content);
+    END''',
+)
+SQL_FTS_REBUILD = "INSERT INTO poems_fts(poems_fts) VALUES ('rebuild')"
+SQL_FTS_SEARCH = 'SELECT rowid FROM poems_fts WHERE poems_fts MATCH ? ORDER BY rowid'
+# trigram分词的最短可检索长度
+FTS_MIN_QUERY_LENGTH = 3
+
+
+def resolve_db_path(db_path: str = DEFAULT_DB_PATH) -> str:
+    """将相对路径解析为基于项目根目录的绝对路径"""
+    if db_path == ':memory:' or os.path.isabs(db_path):
+        return db_path
+    return str(PROJECT_ROOT / db_path)
+
+
+def _normalize(text: Optional[str]) -> str:
+    """去除所有空白，用于内容哈希"""
+    return ''.join((text or '').split())
+
+
+def content_hash(poem_data: Dict) -> str:
+    """
+    计算诗词的内容哈希，用于去重。
+
+    以标题、作者和全文（缺失时用摘句）为准，忽略空白差异；同一首诗的不同摘句
+    会得到相同的哈希。
+    """
+    body = poem_data.get('full_content') or poem_data.get('content')
+    key = '\x1f'.join(_normalize(part) for part in (poem_data.get('title'), poem_data.get('author'), body))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def poem_to_row(poem_data: Dict) -> Tuple:
+    """将诗词字典转换为插入语句参数"""
+    return tuple(poem_data.get(column) for column in POEM_COLUMNS) + (content_hash(poem_data),)
+
+
+class PoemRepository:
+    """诗词数据库仓库（单连接、线程安全）"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        """
+        打开数据库连接并确保表结构存在。
+
+        参数:
+        - db_path: 数据库路径，相对路径基于项目根目录解析。
+        """
+        self.db_path = resolve_db_path(db_path)
+        if self.db_path != ':memory:':
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        # 连接在调度线程与主线程间共享，由锁串行化访问
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            isolation_level=None,      # 手动管理事务
+            cached_statements=64,      # 预编译语句缓存
+        )
+        self._apply_pragmas()
+        self.init_schema()
+        logger.debug(f"诗词数据库已打开: {self.db_path}")
+
+    def _apply_pragmas(self):
+        """应用连接级调优参数"""
+        for name, value in PRAGMAS:
+            self._conn.execute(f'PRAGMA {name}={value}')
+
+    def init_schema(self):
+        """创建poems表、内容哈希唯一索引和全文索引（如不存在），并迁移旧表"""
+        with self._lock:
+            self._conn.execute(SQL_CREATE_TABLE)
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(poems)')}
+            if 'content_hash' not in columns:
+                self._conn.execute('ALTER TABLE poems ADD COLUMN content_hash TEXT')
+            self._backfill_content_hash()
+            self._conn.execute(SQL_CREATE_HASH_INDEX)
+            self.fts_enabled = self._init_fts()
+
+    def _backfill_content_hash(self):
+        """为旧记录补齐内容哈希，并删除重复记录（保留id最小的一条）"""
+        rows = self._conn.execute(
+            'SELECT id, title, author, content, full_content FROM poems '
+            'WHERE content_hash IS NULL ORDER BY id'
+        ).fetchall()
+        if not rows:
+            return
+
+        seen = {row[0] for row in self._conn.execute(
+            'SELECT content_hash FROM poems WHERE content_hash IS NOT NULL')}
+        updates, duplicates = [], []
+        for poem_id, title, author, content, full_content in rows:
+            digest = content_hash({'title': title, 'author': author,
+                                   'content': content, 'full_content': full_content})
+            if digest in seen:
+                duplicates.append((poem_id,))
+            else:
+                seen.add(digest)
+                updates.append((digest, poem_id))
+
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._conn.executemany('UPDATE poems SET content_hash = ? WHERE id = ?', updates)
+            self._conn.executemany(SQL_DELETE, duplicates)
+            self._conn.execute('COMMIT')
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
+        logger.info(f"诗词内容哈希迁移完成: 补齐 {len(updates)} 条, 删除重复 {len(duplicates)} 条")
+
+    def _init_fts(self) -> bool:
+        """创建全文索引及同步触发器，SQLite不支持FTS5/trigram时返回False"""
+        try:
+            exists = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'poems_fts'").fetchone()
+            self._conn.execute(SQL_CREATE_FTS)
+            for sql in SQL_CREATE_FTS_TRIGGERS:
+                self._conn.execute(sql)
+            if not exists:
+                # 首次创建时为已有记录建立索引
+                self._conn.execute(SQL_FTS_REBUILD)
+            return True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"全文索引不可用，检索将退化为LIKE查询: {e}")
+            return False
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write(self, sql: str, params: Tuple = ()) -> sqlite3.Cursor:
+        """在单个事务中执行一条写语句"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                cursor = self._conn.execute(sql, params)
+                self._conn.execute('COMMIT')
+                return cursor
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def save_poem(self, poem_data: Dict) -> int:
+        """
+        保存一首诗词，内容重复时不会新增记录。
+
+        返回:
+        - int: 新记录或已存在记录的id。
+        """
+        row = poem_to_row(poem_data)
+        with self._lock:
+            cursor = self._write(SQL_INSERT, row)
+            if cursor.rowcount:
+                return cursor.lastrowid
+            return self._conn.execute(SQL_SELECT_ID_BY_HASH, (row[-1],)).fetchone()[0]
+
+    def save_poems(self, poems: Iterable[Dict], batch_size: int = 500) -> int:
+        """
+        批量保存诗词，每batch_size条提交一次事务，重复内容被忽略。
+        全文索引由触发器在同一事务内更新。
+
+        返回:
+        - int: 实际新增的记录数。
+        """
+        total = 0
+        batch = []
+        for poem_data in poems:
+            batch.append(poem_to_row(poem_data))
+            if len(batch) >= batch_size:
+                total += self._insert_batch(batch)
+                batch = []
+        if batch:
+            total += self._insert_batch(batch)
+        return total
+
+    def _insert_batch(self, rows: List[Tuple]) -> int:
+        """在单个事务中用executemany写入一批记录，返回实际新增数"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                # rowcount只统计poems表本身的新增行，不含触发器写入的FTS行
+                inserted = self._conn.executemany(SQL_INSERT, rows).rowcount
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return inserted
+
+    def get_poem(self, poem_id: int) -> Optional[Tuple]:
+        """按id读取诗词"""
+        with self._lock:
+            return self._conn.execute(SQL_SELECT_BY_ID, (poem_id,)).fetchone()
+
+    def update_content(self, poem_id: int, new_content: str):
+        """更新诗词的摘句内容"""
+        self._write(SQL_UPDATE_CONTENT, (new_content, poem_id))
+
+    def delete_poem(self, poem_id: int):
+        """删除诗词"""
+        self._write(SQL_DELETE, (poem_id,))
+
+    def find_ids_by_content(self, context: str) -> List[int]:
+        """查找摘句包含指定文本的诗词id"""
+        if self.fts_enabled and len(context) >= FTS_MIN_QUERY_LENGTH:
+            # 限定content列，语义与LIKE一致但走全文索引
+            query = 'content : "' + context.replace('"', '""') + '"'
+            with self._lock:
+                rows = self._conn.execute(SQL_FTS_SEARCH, (query,)).fetchall()
+        else:
+            with self._lock:
+                rows = self._conn.execute(SQL_FIND_BY_CONTENT, ('%' + context + '%',)).fetchall()
+        return [row[0] for row in rows]
+
+    def search(self, text: str, limit: int = 20) -> List[int]:
+        """在标题、作者、摘句和全文中检索，返回诗词id"""
+        if not self.fts_enabled or len(text) < FTS_MIN_QUERY_LENGTH:
+            pattern = '%' + text + '%'
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT id FROM poems WHERE title LIKE ? OR author LIKE ? '
+                    'OR full_content LIKE ? ORDER BY id LIMIT ?',
+                    (pattern, pattern, pattern, limit)).fetchall()
+        else:
+            query = '"' + text.replace('"', '""') + '"'
+            with self._lock:
+                rows = self._conn.execute(SQL_FTS_SEARCH + ' LIMIT ?', (query, limit)).fetchall()
+        return [row[0] for row in rows]
+
+    def count(self) -> int:
+        """诗词总数"""
+        with self._lock:
+            return self._conn.execute(SQL_COUNT).fetchone()[0]
+
+    def random_poem(self, rng: Optional[random.Random] = None) -> Optional[Tuple]:
+        """
+        随机抽取一首诗词。
+
+        在[MIN(id), MAX(id)]中随机取一个id，再沿主键索引取第一条id不小于它的记录，
+        只需两次索引查找，避免ORDER BY RANDOM()的全表扫描。删除造成的空洞会让
+        紧随其后的记录概率略高，对每日展示可以接受。
+        """
+        rng = rng or random
+        with self._lock:
+            low, high = self._conn.execute(SQL_ID_RANGE).fetchone()
+            if low is None:
+                return None
+            return self._conn.execute(SQL_SELECT_FROM_ID, (rng.randint(low, high),)).fetchone()
+
+    def daily_poem(self, day: Optional[str] = None) -> Optional[Tuple]:
+        """
+        按日期确定性地抽取当日诗词，完全离线可用。
+
+        参数:
+        - day: 日期字符串（YYYY-MM-DD），默认今天。
+        """
+        if day is None:
+            from datetime import date
+            day = date.today().isoformat()
+        return self.random_poem(random.Random(f'poem-{day}'))
+
+
+_repositories: Dict[str, PoemRepository] = {}
+_repositories_lock = threading.Lock()
+
+
+def get_repository(db_path: str = DEFAULT_DB_PATH) -> PoemRepository:
+    """获取指定路径的共享仓库实例（每个数据库文件一个连接）"""
+    resolved = resolve_db_path(db_path)
+    with _repositories_lock:
+        repository = _repositories.get(resolved)
+        if repository is None:
+            repository = PoemRepository(resolved)
+            _repositories[resolved] = repository
+        return repository
+
+
+def benchmark_bulk_import(count: int = 10000, batch_size: int = 500) -> Dict:
+    """
+    批量导入基准测试：对比逐条连接提交与单连接executemany批量写入。
+
+    返回:
+    - dict: 两种方式的耗时（秒）和每秒写入条数。
+    """
+    import tempfile
+
+    poems = [
+        {
+            'title': f'标题{i}',
+            'dynasty': '唐代',
+            'author': f'作者{i % 100}',
+            'content': f'第{i}句诗文内容',
+            'full_content': f'第{i}首诗的全文\n第二行',
+        }
+        for i in range(count)
+    ]
+    results = {'count': count, 'batch_size': batch_size}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 旧方式：每条记录一次connect/commit/close
+        legacy_path = os.path.join(tmp_dir, 'legacy.db')
+        conn = sqlite3.connect(legacy_path)
+        conn.execute(SQL_CREATE_TABLE)
+        conn.close()
+        started = time.perf_counter()
+        for poem_data in poems:
+            conn = sqlite3.connect(legacy_path)
+            conn.execute(SQL_INSERT_LEGACY, poem_to_row(poem_data)[:len(POEM_COLUMNS)])
+            conn.commit()
+            conn.close()
+        results['per_row_seconds'] = time.perf_counter() - started
+
+        # 新方式：单连接 + WAL + executemany
+        with PoemRepository(os.path.join(tmp_dir, 'batch.db')) as repository:
+            started = time.perf_counter()
+            repository.save_poems(poems, batch_size=batch_size)
+            results['batch_seconds'] = time.perf_counter() - started
+
+    for key in ('per_row', 'batch'):
+        seconds = results[f'{key}_seconds']
+        results[f'{key}_rows_per_second'] = count / seconds if seconds > 0 else float('inf')
+    results['speedup'] = results['per_row_seconds'] / results['batch_seconds'] if results['batch_seconds'] > 0 else float('inf')
+    return results
+
+
+def main():
+    """命令行入口：运行批量导入基准测试"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='诗词数据库批量导入基准测试')
+    parser.add_argument('-n', '--count', type=int, default=10000, help='导入记录数')
+    parser.add_argument('-b', '--batch-size', type=int, default=500, help='每个事务的记录数')
+    args = parser.parse_args()
+
+    results = benchmark_bulk_import(args.count, args.batch_size)
+    print(f"记录数: {results['count']}  批大小: {results['batch_size']}")
+    print(f"逐条提交: {results['per_row_seconds']:.3f}s ({results['per_row_rows_per_second']:.0f} 条/秒)")
+    print(f"批量写入: {results['batch_seconds']:.3f}s ({results['batch_rows_per_second']:.0f} 条/秒)")
+    print(f"加速比: {results['speedup']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -8,11 +8,13 @@ Daily Word E-Paper Display System - API Client
 
 import json
 import logging
+from contextlib import contextmanager
 import random
 import requests
 import time
 import urllib3
 import socket
+from urllib.parse import urlparse
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional, Union
@@ -24,6 +26,7 @@ from daily_word_config import (
     WORD_API_CONFIG, QUOTE_API_CONFIG, CACHE_CONFIG, 
     FALLBACK_WORDS, FALLBACK_QUOTES, DATA_DIR
 )
+from daily_word_metrics import metrics
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -40,20 +43,33 @@ class DailyWordAPIClient:
         # 确保缓存目录存在
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         
+        # 可选的持久化层（DailyWordFileManager），设置后缓存写入会并入其当前事务
+        self.persistence = None
+        # defer_cache_writes 之后暂存的缓存写入 {文件: 数据}，None表示立即写入
+        self._pending_cache_writes: Optional[Dict[Path, Dict]] = None
+        
         # 加载缓存
         self.word_cache = self._load_cache(self.word_cache_file)
         self.quote_cache = self._load_cache(self.quote_cache_file)
         
-        # 初始化词汇库管理器
-        try:
-            from daily_word_vocabulary_manager import VocabularyManager
-            self.vocab_manager = VocabularyManager()
-        except ImportError as e:
-            logger.warning(f"词汇库管理器导入失败: {e}")
-            self.vocab_manager = None
+        # 词汇库管理器初始化时会写入词汇库文件，推迟到第一次生成单词时再创建
+        self._vocab_manager = None
+        self._vocab_manager_loaded = False
         
         logger.info("每日单词API客户端初始化完成")
     
+    @property
+    def vocab_manager(self):
+        """词汇库管理器（首次访问时创建，导入失败时为None）"""
+        if not self._vocab_manager_loaded:
+            self._vocab_manager_loaded = True
+            try:
+                from daily_word_vocabulary_manager import VocabularyManager
+                self._vocab_manager = VocabularyManager()
+            except ImportError as e:
+                logger.warning(f"词汇库管理器导入失败: {e}")
+        return self._vocab_manager
+    
     def _load_cache(self, cache_file: Path) -> Dict:
         """加载缓存文件"""
         try:
@@ -69,6 +85,13 @@ class DailyWordAPIClient:
     
     def _save_cache(self, cache_file: Path, cache_data: Dict) -> bool:
         """保存缓存文件"""
+        if self._pending_cache_writes is not None:
+            self._pending_cache_writes[cache_file] = cache_data
+            return True
+        
+        if self.persistence is not None:
+            return self.persistence.write_json(cache_file, cache_data)
+        
         try:
             with open(cache_file, 'w', encoding='utf-8') as f:
                 json.dump(cache_data, f, ensure_ascii=False, indent=2)
@@ -78,6 +101,33 @@ class DailyWordAPIClient:
             logger.error(f"保存缓存文件失败 {cache_file}: {e}")
             return False
     
+    def defer_cache_writes(self):
+        """之后的缓存写入先暂存，直到 flush_cache_writes（网络请求期间不必持有持久化层的事务）"""
+        if self._pending_cache_writes is None:
+            self._pending_cache_writes = {}
+    
+    def flush_cache_writes(self) -> bool:
+        """写入暂存的缓存文件并恢复立即写入；在持久化层的事务中调用时并入该事务"""
+        pending, self._pending_cache_writes = self._pending_cache_writes, None
+        ok = True
+        for cache_file, cache_data in (pending or {}).items():
+            ok = self._save_cache(cache_file, cache_data) and ok
+        return ok
+    
+    @contextmanager
+    def _measure_request(self, url: str):
+        """记录单次请求的耗时和结果（按端点）"""
+        parsed = urlparse(url)
+        endpoint = f"{parsed.netloc}{parsed.path}"
+        start = time.perf_counter()
+        result = 'error'
+        try:
+            yield
+            result = 'ok'
+        finally:
+            metrics.observe('daily_word_api_request_seconds', time.perf_counter() - start, endpoint=endpoint)
+            metrics.inc('daily_word_api_requests_total', endpoint=endpoint, result=result)
+    
     def _make_request(self, url: str, timeout: int = 15, retry_count: int = 3) -> Optional[Dict]:
         """发起HTTP请求（禁用SSL验证）"""
         for attempt in range(retry_count):
@@ -90,13 +140,14 @@ class DailyWordAPIClient:
                 }
                 
                 # 禁用SSL验证，处理网络连接问题
-                response = requests.get(
-                    url, 
-                    headers=headers, 
-                    timeout=timeout,
-                    verify=False  # 禁用SSL验证
-                )
-                response.raise_for_status()
+                with self._measure_request(url):
+                    response = requests.get(
+                        url, 
+                        headers=headers, 
+                        timeout=timeout,
+                        verify=False  # 禁用SSL验证
+                    )
+                    response.raise_for_status()
                 
                 data = response.json()
                 logger.debug(f"请求成功: {url}")
@@ -133,13 +184,14 @@ class DailyWordAPIClient:
                     headers.update(custom_headers)
                 
                 # 禁用SSL验证，处理网络连接问题
-                response = requests.get(
-                    url, 
-                    headers=headers, 
-                    timeout=timeout,
-                    verify=False  # 禁用SSL验证
-                )
-                response.raise_for_status()
+                with self._measure_request(url):
+                    response = requests.get(
+                        url, 
+                        headers=headers, 
+                        timeout=timeout,
+                        verify=False  # 禁用SSL验证
+                    )
+                    response.raise_for_status()
                 
                 data = response.json()
                 logger.debug(f"请求成功: {url}")
@@ -171,8 +223,10 @@ class DailyWordAPIClient:
         
         # 检查缓存
         if not force_new and today in self.word_cache:
+            metrics.inc('daily_word_cache_requests_total', cache='word', result='hit')
             logger.info(f"使用缓存的每日单词: {today}")
             return self.word_cache[today]
+        metrics.inc('daily_word_cache_requests_total', cache='word', result='miss')
         
         # 尝试从主要API获取
         word_data = self._fetch_word_from_primary_api()
@@ -459,8 +513,10 @@ class DailyWordAPIClient:
         
         # 检查缓存
         if not force_new and today in self.quote_cache:
+            metrics.inc('daily_word_cache_requests_total', cache='quote', result='hit')
             logger.info(f"使用缓存的每日句子: {today}")
             return self.quote_cache[today]
+        metrics.inc('daily_word_cache_requests_total', cache='quote', result='miss')
         
         # 尝试从主要API获取
         quote_data = self._fetch_quote_from_primary_api()
@@ -9,6 +9,8 @@ Daily Word E-Paper Display System - Configuration
 import os
 from pathlib import Path
 
+from daily_word_drivers import DRIVER_REGISTRY
+
 # ==================== 基础配置 ====================
 
 # 项目信息
@@ -33,9 +35,9 @@ THEMES_DIR.mkdir(exist_ok=True)
 # 墨水屏配置
 EPAPER_CONFIG = {
     # 支持的墨水屏型号
-    'model': 'epd2in13_V4',  # 默认2.13英寸V4版本
-    'width': 250,
-    'height': 122,
+    'model': 'epd3in52',  # 默认3.52英寸（型号见 daily_word_drivers.DRIVER_REGISTRY）
+    'width': 360,         # 绘制画布尺寸，横向/纵向均可，驱动打包时自动旋转
+    'height': 240,
     
     # GPIO引脚配置 (BCM编号)
     'gpio_pins': {
@@ -58,18 +60,43 @@ EPAPER_CONFIG = {
         'flip_horizontal': False,
         'flip_vertical': False,
         'partial_update': True,   # 是否支持局部刷新
-        'full_update_interval': 10,  # 每N次局部刷新后进行一次全刷新
+        'fast_update': True,      # 是否使用快速刷新（型号支持时）
+        'full_update_interval': 10,  # 每N次局部刷新后进行一次全刷新（每个区域的残影预算）
+        'ghosting_cost': {'fast': 0.5, 'partial': 1.0},  # 每种刷新模式一次计入的残影量
+        'clean_time': '03:00',    # 每天该时刻之后的第一次写屏做完整刷新清除残影，None表示不清洁
+    },
+    
+    # 树莓派GPIO后端（见 GPIO_BACKENDS）：gpiozero，或 gpiod（libgpiod字符设备，按引脚号直接访问line，BUSY用边沿事件等待）
+    'gpio': {
+        'backend': 'gpiozero',
+        'chip': '/dev/gpiochip0',  # gpiod使用的GPIO芯片
+    },
+    
+    # 面板会话
+    'session': {
+        'keep_awake': False,      # 始终保持唤醒（不自动进入深度睡眠），下次写屏免去复位和初始化
+        'idle_sleep_seconds': 120,  # 最后一次写屏后空闲该秒数才深度睡眠并关闭模块，期间的更新直接写屏
+        'max_awake_seconds': 1800,  # 连续唤醒超过该秒数后刷新完即睡眠一次（限制面板上电时间），None表示不限制
+    },
+    
+    # 三色屏（黑/红、黑/黄）强调色
+    'color': {
+        'accent': 'red',          # 强调色: red / yellow
+        'tolerance': 64,          # 强调色容差(0-255)，抗锯齿边缘偏暗的像素不会被误判为强调色
+        'black_threshold': 128,   # 非强调色像素低于该亮度时画黑
+        'highlight_word': True,   # 每日单词用强调色显示
     }
 }
 
-# 支持的墨水屏型号配置
+# 支持的墨水屏型号配置（由驱动注册表生成，能力信息见 daily_word_drivers）
 SUPPORTED_EPAPER_MODELS = {
-    'epd2in13_V4': {'width': 250, 'height': 122, 'name': '2.13英寸 V4'},
-    'epd2in9_V2': {'width': 296, 'height': 128, 'name': '2.9英寸 V2'},
-    'epd4in2': {'width': 400, 'height': 300, 'name': '4.2英寸'},
-    'epd7in5_V2': {'width': 800, 'height': 480, 'name': '7.5英寸 V2'},
+    model: {'width': info['width'], 'height': info['height'], 'name': info['name']}
+    for model, info in DRIVER_REGISTRY.items()
 }
 
+# 树莓派GPIO后端（epdconfig在首次导入时按环境变量 EPD_GPIO_BACKEND 选择）
+GPIO_BACKENDS = ('gpiozero', 'gpiod')
+
 # ==================== API配置 ====================
 
 # 单词API配置
@@ -251,7 +278,18 @@ UPDATE_CONFIG = {
         'quote_update_frequency': 'daily',   # 句子更新频率: daily, hourly
         'force_new_content': False,          # 是否强制获取新内容
         'cache_duration': 86400,             # 缓存持续时间(秒)
-    }
+    },
+    
+    # 内容通道：每个通道独立过期和获取，只重绘变化的通道所在区域
+    # ttl: 秒数、'30m'/'2h' 形式，或 daily/hourly（对齐到日历）；word/quote 使用上面的更新频率
+    'lanes': {
+        'word':    {'enabled': True},
+        'quote':   {'enabled': True},
+        'poem':    {'enabled': False, 'ttl': 'daily'},
+        'weather': {'enabled': False, 'ttl': 1800},
+        'clock':   {'enabled': True, 'ttl': 'hourly', 'format': '%Y-%m-%d %H:%M'},
+        'ip':      {'enabled': True, 'ttl': 600},
+    },
 }
 
 # ==================== 缓存配置 ====================
@@ -274,6 +312,17 @@ CACHE_CONFIG = {
     }
 }
 
+# 天气服务配置
+WEATHER_CONFIG = {
+    'api_url': 'http://api.weatherapi.com/v1/current.json',
+    'ttl': 1800,                  # 每个城市的天气缓存有效期(秒)
+    'min_poll_interval': 600,     # 同一城市两次请求的最小间隔(秒)，失败后也遵守
+    'timeout': 10,                # 请求超时(秒)
+    'cache_file': DATA_DIR / 'weather_cache.json',
+    'icon_cache_dir': DATA_DIR / 'weather_icons',  # 已转换为1位并抖动的图标
+    'icon_size': (20, 20),        # 天气通道中的图标尺寸
+}
+
 # ==================== 日志配置 ====================
 
 # 日志配置
@@ -293,6 +342,10 @@ LOGGING_CONFIG = {
         'log_format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         'date_format': '%Y-%m-%d %H:%M:%S',
         'encoding': 'utf-8',
+        'structured': False,                 # 文件日志使用JSON行格式
+        'compress_backups': False,           # 轮转后的备份文件gzip压缩
+        'ring_buffer': False,                # 文件日志只保留在内存中，出现ERROR时才写盘
+        'ring_buffer_size': 1000,            # 环形缓冲保留的记录数
     }
 }
 
@@ -302,7 +355,14 @@ LOGGING_CONFIG = {
 MONITOR_CONFIG = {
     'enable_monitoring': True,
     'monitor_interval': 300,      # 监控间隔(秒)
-    'metrics_file': DATA_DIR / 'daily_word_metrics.json',
+    'metrics_file': DATA_DIR / 'daily_word_metrics.ring',  # 固定大小的环形文件
+    'metrics_ring_slots': 288,    # 环形文件槽位数(按监控间隔约保留1天)
+    'metrics_slot_size': 4096,    # 每个槽位字节数
+    'metrics_host': '127.0.0.1',  # 指标HTTP端点监听地址
+    'metrics_port': 9108,         # 指标HTTP端点端口(/metrics)，0表示不启用
+    'watchdog_stall_timeout': 600,  # 更新阶段卡住超过该秒数时停止systemd看门狗通知
+    'telemetry_interval': 60,     # 温度/内存/磁盘采样间隔(秒)，IP地址由netlink通知更新
+    'telemetry_history': 120,     # 内存中保留的遥测历史条数
     
     'monitored_metrics': {
         'cpu_usage': True,
@@ -330,6 +390,7 @@ SERVICE_CONFIG = {
     'working_directory': str(BASE_DIR),
     'restart_policy': 'always',
     'restart_delay': 10,
+    'control_socket': DATA_DIR / 'daily_word_control.sock',  # 守护进程本地控制接口
 }
 
 # ==================== 备用内容 ====================
@@ -474,6 +535,25 @@ def validate_config():
     except KeyError:
         errors.append("墨水屏配置缺少model字段")
     
+    clean_time = EPAPER_CONFIG.get('display_config', {}).get('clean_time')
+    if clean_time:
+        try:
+            hour, minute = map(int, clean_time.split(':'))
+            if not (0 <= hour <= 23 and 0 <= minute <= 59):
+                errors.append(f"无效的清洁时间: {clean_time}")
+        except (ValueError, AttributeError):
+            errors.append(f"无效的清洁时间: {clean_time}")
+
+    gpio_backend = EPAPER_CONFIG.get('gpio', {}).get('backend', 'gpiozero')
+    if gpio_backend not in GPIO_BACKENDS:
+        errors.append(f"不支持的GPIO后端: {gpio_backend}")
+
+    session_config = EPAPER_CONFIG.get('session', {})
+    for key in ('idle_sleep_seconds', 'max_awake_seconds'):
+        value = session_config.get(key)
+        if value is not None and (not isinstance(value, (int, float)) or value < 0):
+            errors.append(f"无效的面板空闲阈值 {key}: {value}")
+
     # 验证主题配置
     try:
         current_theme = THEME_CONFIG['current_theme']
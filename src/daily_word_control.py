@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+每日单词墨水屏显示系统 - 本地控制接口
+Daily Word E-Paper Display System - Local Control Socket
+
+守护进程在Unix套接字上提供控制命令，命令行工具作为轻量客户端连接，
+不再为每个命令启动新的Python进程、重新初始化SPI/GPIO；所有硬件访问都由守护进程串行完成。
+
+协议：每个请求和响应都是一行JSON
+  请求 {"command": "update", "args": {...}}
+  响应 {"ok": true, "result": ...} 或 {"ok": false, "error": "..."}
+
+命令：update、force-update、clear、status、metrics、render-preview
+update/force-update 的结果为 {"result": "queued"|"unchanged"|"failed", "lanes": [...]}，
+unchanged 表示没有通道过期或内容未变化，守护进程跳过了本次写屏
+
+客户端只在连接阶段套接字不存在或被拒绝时报告守护进程未运行（DaemonNotRunning）；
+连接之后的超时、断开都是 ControlError，调用方不能再启动独立进程访问屏幕
+"""
+
+import json
+import logging
+import os
+import socket
+from pathlib import Path
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+COMMANDS = ('update', 'force-update', 'clear', 'status', 'metrics', 'render-preview')
+
+# 单个请求行的最大长度
+MAX_REQUEST_SIZE = 64 * 1024
+
+# 客户端等待响应的默认秒数（命令提交后立即返回，只有wait时才等待写屏，三色屏整屏刷新约20秒）
+DEFAULT_TIMEOUT = 30
+
+
+class ControlError(Exception):
+    """守护进程返回的错误，或命令发出后没有得到有效响应"""
+
+
+class DaemonNotRunning(Exception):
+    """控制套接字不存在或拒绝连接：守护进程没有运行"""
+
+
+class ControlServer:
+    """运行在守护进程事件循环中的控制接口"""
+
+    def __init__(self, runtime, path):
+        """
+        初始化控制接口
+
+        参数:
+        - runtime: DailyWordRuntime实例
+        - path: Unix套接字路径
+        """
+        self.runtime = runtime
+        self.system = runtime.system
+        self.path = Path(path)
+        self._server = None
+        self.requests = 0
+
+    async def start(self):
+        import asyncio
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 上次异常退出留下的套接字文件
+        self.path.unlink(missing_ok=True)
+        self._server = await asyncio.start_unix_server(self._handle, path=str(self.path),
+                                                       limit=MAX_REQUEST_SIZE)
+        os.chmod(self.path, 0o660)
+        logger.info(f"控制接口已启动: {self.path}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self.path.unlink(missing_ok=True)
+
+    async def _handle(self, reader, writer):
+        try:
+            line = await reader.readline()
+            try:
+                request = json.loads(line)
+                response = {'ok': True, 'result': await self.dispatch(request.get('command'),
+                                                                      request.get('args') or {})}
+            except Exception as e:
+                logger.warning(f"控制命令失败: {e}")
+                response = {'ok': False, 'error': str(e)}
+            writer.write(json.dumps(response, ensure_ascii=False, default=str).encode('utf-8') + b'\n')
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def dispatch(self, command: str, args: Dict) -> Any:
+        """执行一条控制命令并返回结果"""
+        import asyncio
+
+        if command not in COMMANDS:
+            raise ValueError(f"未知命令: {command}")
+        self.requests += 1
+        logger.info(f"控制命令: {command}")
+        loop = asyncio.get_running_loop()
+
+        if command in ('update', 'force-update'):
+            force_lanes = []
+            if command == 'force-update' and self.system.lanes is not None:
+                force_lanes = list(self.system.lanes.lanes)
+            outcome = await self.runtime.submit_update(command == 'force-update', force_lanes)
+            if args.get('wait'):
+                await self.runtime.drain()
+            return outcome
+
+        if command == 'clear':
+            return {'cleared': await self.runtime.clear_display()}
+
+        if command == 'status':
+            return await loop.run_in_executor(None, self.system.get_system_status)
+
+        if command == 'metrics':
+            from daily_word_metrics import metrics
+            return metrics.expose()
+
+        path = args.get('path') or str(self.path.with_name('daily_word_preview.png'))
+        if not await self.runtime.render_preview(path):
+            raise RuntimeError("当前显示控制器不支持预览或尚未生成内容")
+        return {'path': path}
+
+
+def send_command(path, command: str, timeout: float = DEFAULT_TIMEOUT, **args) -> Any:
+    """
+    向守护进程发送控制命令（同步客户端）
+
+    参数:
+    - path: Unix套接字路径
+    - command: 命令名称
+    - timeout: 等待响应的秒数
+    - args: 命令参数
+
+    返回:
+    - 命令结果
+
+    异常:
+    - DaemonNotRunning: 守护进程未运行（套接字不存在或拒绝连接）
+    - ControlError: 无法连接（如权限不足）、等待响应超时、连接被关闭，或守护进程执行命令失败
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(str(path))
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise DaemonNotRunning(str(e)) from e
+        except OSError as e:
+            raise ControlError(f"无法连接控制接口 {path}: {e}") from e
+        try:
+            sock.sendall(json.dumps({'command': command, 'args': args}).encode('utf-8') + b'\n')
+            chunks = []
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                if chunk.endswith(b'\n'):
+                    break
+        except socket.timeout as e:
+            raise ControlError(f"守护进程在 {timeout:.0f} 秒内没有响应，命令可能仍在执行") from e
+        except OSError as e:
+            raise ControlError(f"与守护进程通信失败: {e}") from e
+    try:
+        response = json.loads(b''.join(chunks))
+    except ValueError as e:
+        raise ControlError("守护进程没有返回有效响应（连接被关闭）") from e
+    if not isinstance(response, dict):
+        raise ControlError(f"无效的响应: {response!r}")
+    if not response.get('ok'):
+        raise ControlError(response.get('error'))
+    return response.get('result')
+
+
+def daemon_available(path) -> bool:
+    """控制套接字是否存在（守护进程可能正在运行）"""
+    return Path(path).is_socket()
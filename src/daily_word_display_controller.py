@@ -9,7 +9,6 @@ Daily Word E-Paper Display System - Display Controller
 import logging
 import os
 import sys
-import time
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Optional, Tuple, Any
@@ -20,19 +19,13 @@ except ImportError:
     print("警告: PIL库未安装，请运行: pip install Pillow")
     sys.exit(1)
 
-# 尝试导入墨水屏驱动
-try:
-    import spidev
-    import RPi.GPIO as GPIO
-    HARDWARE_AVAILABLE = True
-except ImportError:
-    print("警告: 硬件库未安装，运行在模拟模式")
-    HARDWARE_AVAILABLE = False
-
 from daily_word_config import (
     EPAPER_CONFIG, FONT_CONFIG, LAYOUT_CONFIG, THEME_CONFIG,
-    SUPPORTED_EPAPER_MODELS, DEBUG_CONFIG
+    DEBUG_CONFIG
 )
+from daily_word_drivers import create_driver, get_driver_info
+from daily_word_metrics import instrument_driver
+from daily_word_panel import PanelSession
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -52,10 +45,13 @@ class DailyWordDisplayController:
         # 初始化字体
         self.fonts = self._load_fonts()
         
-        # 初始化硬件
-        if HARDWARE_AVAILABLE and not DEBUG_CONFIG['mock_hardware']:
+        # 驱动按型号从注册表加载，面板的初始化/睡眠状态由会话跟踪
+        self.driver_info = get_driver_info(self.model)
+        self.epd = None
+        self.session = None
+        if not DEBUG_CONFIG['mock_hardware']:
             self._init_hardware()
-        else:
+        if self.epd is None:
             logger.warning("运行在模拟模式，不会实际控制硬件")
         
         logger.info(f"显示控制器初始化完成 - 型号: {self.model}, 尺寸: {self.width}x{self.height}")
@@ -93,128 +89,15 @@ class DailyWordDisplayController:
             return {key: ImageFont.load_default() for key in font_sizes.keys()}
     
     def _init_hardware(self):
-        """初始化硬件"""
+        """加载配置型号的驱动（只导入该型号的驱动模块）"""
         try:
-            # 设置GPIO模式
-            GPIO.setmode(GPIO.BCM)
-            GPIO.setwarnings(False)
-            
-            # 获取GPIO引脚配置
-            gpio_pins = EPAPER_CONFIG['gpio_pins']
-            self.RST_PIN = gpio_pins['RST_PIN']
-            self.DC_PIN = gpio_pins['DC_PIN']
-            self.CS_PIN = gpio_pins['CS_PIN']
-            self.BUSY_PIN = gpio_pins['BUSY_PIN']
-            
-            # 设置GPIO引脚
-            GPIO.setup(self.RST_PIN, GPIO.OUT)
-            GPIO.setup(self.DC_PIN, GPIO.OUT)
-            GPIO.setup(self.CS_PIN, GPIO.OUT)
-            GPIO.setup(self.BUSY_PIN, GPIO.IN)
-            
-            # 初始化SPI
-            spi_config = EPAPER_CONFIG['spi_config']
-            self.spi = spidev.SpiDev()
-            self.spi.open(spi_config['bus'], spi_config['device'])
-            self.spi.max_speed_hz = spi_config['max_speed_hz']
-            self.spi.mode = 0b00
-            
+            self.epd = instrument_driver(create_driver(self.model, EPAPER_CONFIG.get('gpio')))
+            self.session = PanelSession(self.epd, self.model)
             logger.info("硬件初始化完成")
-            
         except Exception as e:
-            logger.error(f"硬件初始化失败: {e}")
-            raise
-    
-    def _wait_until_idle(self):
-        """等待墨水屏空闲"""
-        if not HARDWARE_AVAILABLE or DEBUG_CONFIG['mock_hardware']:
-            return
-        
-        logger.debug("等待墨水屏空闲...")
-        while GPIO.input(self.BUSY_PIN) == 1:
-            time.sleep(0.01)
-        logger.debug("墨水屏已空闲")
-    
-    def _reset(self):
-        """重置墨水屏"""
-        if not HARDWARE_AVAILABLE or DEBUG_CONFIG['mock_hardware']:
-            return
-        
-        GPIO.output(self.RST_PIN, 1)
-        time.sleep(0.2)
-        GPIO.output(self.RST_PIN, 0)
-        time.sleep(0.002)
-        GPIO.output(self.RST_PIN, 1)
-        time.sleep(0.2)
-    
-    def _send_command(self, command):
-        """发送命令"""
-        if not HARDWARE_AVAILABLE or DEBUG_CONFIG['mock_hardware']:
-            return
-        
-        GPIO.output(self.DC_PIN, 0)
-        GPIO.output(self.CS_PIN, 0)
-        self.spi.writebytes([command])
-        GPIO.output(self.CS_PIN, 1)
-    
-    def _send_data(self, data):
-        """发送数据"""
-        if not HARDWARE_AVAILABLE or DEBUG_CONFIG['mock_hardware']:
-            return
-        
-        GPIO.output(self.DC_PIN, 1)
-        GPIO.output(self.CS_PIN, 0)
-        self.spi.writebytes([data])
-        GPIO.output(self.CS_PIN, 1)
-    
-    def _init_display(self):
-        """初始化显示"""
-        if not HARDWARE_AVAILABLE or DEBUG_CONFIG['mock_hardware']:
-            return
-        
-        self._reset()
-        self._wait_until_idle()
-        
-        # 发送初始化命令序列（根据具体墨水屏型号调整）
-        if self.model == 'epd2in13_V4':
-            self._init_epd2in13_v4()
-        elif self.model == 'epd2in9_V2':
-            self._init_epd2in9_v2()
-        else:
-            logger.warning(f"未知的墨水屏型号: {self.model}，使用默认初始化")
-            self._init_default()
-    
-    def _init_epd2in13_v4(self):
-        """初始化2.13英寸V4墨水屏"""
-        # 这里是2.13英寸V4的具体初始化序列
-        # 实际使用时需要根据厂商提供的驱动代码调整
-        self._send_command(0x12)  # SWRESET
-        self._wait_until_idle()
-        
-        self._send_command(0x01)  # Driver output control
-        self._send_data(0xF9)
-        self._send_data(0x00)
-        self._send_data(0x00)
-        
-        self._send_command(0x11)  # Data entry mode
-        self._send_data(0x01)
-        
-        logger.debug("2.13英寸V4墨水屏初始化完成")
-    
-    def _init_epd2in9_v2(self):
-        """初始化2.9英寸V2墨水屏"""
-        # 2.9英寸V2的初始化序列
-        self._send_command(0x12)  # SWRESET
-        self._wait_until_idle()
-        
-        logger.debug("2.9英寸V2墨水屏初始化完成")
-    
-    def _init_default(self):
-        """默认初始化"""
-        self._send_command(0x12)  # SWRESET
-        self._wait_until_idle()
-        
-        logger.debug("默认墨水屏初始化完成")
+            logger.warning(f"墨水屏驱动 {self.model} 不可用: {e}")
+            self.epd = None
+            self.session = None
     
     def create_content_image(self, content: Dict) -> Image.Image:
         """创建内容图像"""
@@ -459,7 +342,7 @@ class DailyWordDisplayController:
                 logger.debug(f"预览图像已保存: {preview_path}")
             
             # 显示到墨水屏
-            if HARDWARE_AVAILABLE and not DEBUG_CONFIG['mock_hardware']:
+            if self.session is not None:
                 self._display_image(image)
             else:
                 logger.info("模拟模式：内容已准备好显示")
@@ -472,99 +355,20 @@ class DailyWordDisplayController:
     
     def _display_image(self, image: Image.Image):
         """将图像显示到墨水屏"""
-        # 初始化显示
-        self._init_display()
-        
-        # 转换图像数据
-        image_data = self._convert_image_data(image)
-        
-        # 发送图像数据到墨水屏
-        self._send_image_data(image_data)
-        
-        # 刷新显示
-        self._refresh_display()
-        
+        # 面板已就绪时不再复位/初始化；驱动按面板方向打包（横向图像自动旋转）
+        self.session.write_full(self.epd.getbuffer(image))
         logger.debug("图像已发送到墨水屏")
     
-    def _convert_image_data(self, image: Image.Image) -> bytes:
-        """转换图像数据格式"""
-        # 确保图像是1位模式
-        if image.mode != '1':
-            image = image.convert('1')
-        
-        # 根据墨水屏要求转换数据格式
-        image_data = []
-        pixels = list(image.getdata())
-        
-        # 按字节打包像素数据
-        for i in range(0, len(pixels), 8):
-            byte_data = 0
-            for j in range(8):
-                if i + j < len(pixels):
-                    if pixels[i + j] == 0:  # 黑色像素
-                        byte_data |= (1 << (7 - j))
-            image_data.append(byte_data)
-        
-        return bytes(image_data)
-    
-    def _send_image_data(self, image_data: bytes):
-        """发送图像数据"""
-        # 设置显示窗口
-        self._set_memory_area(0, 0, self.width - 1, self.height - 1)
-        self._set_memory_pointer(0, 0)
-        
-        # 发送图像数据
-        self._send_command(0x24)  # WRITE_RAM
-        for byte in image_data:
-            self._send_data(byte)
-    
-    def _set_memory_area(self, x_start: int, y_start: int, x_end: int, y_end: int):
-        """设置内存区域"""
-        self._send_command(0x44)  # SET_RAM_X_ADDRESS_START_END_POSITION
-        self._send_data((x_start >> 3) & 0xFF)
-        self._send_data((x_end >> 3) & 0xFF)
-        
-        self._send_command(0x45)  # SET_RAM_Y_ADDRESS_START_END_POSITION
-        self._send_data(y_start & 0xFF)
-        self._send_data((y_start >> 8) & 0xFF)
-        self._send_data(y_end & 0xFF)
-        self._send_data((y_end >> 8) & 0xFF)
-    
-    def _set_memory_pointer(self, x: int, y: int):
-        """设置内存指针"""
-        self._send_command(0x4E)  # SET_RAM_X_ADDRESS_COUNTER
-        self._send_data((x >> 3) & 0xFF)
-        
-        self._send_command(0x4F)  # SET_RAM_Y_ADDRESS_COUNTER
-        self._send_data(y & 0xFF)
-        self._send_data((y >> 8) & 0xFF)
-    
-    def _refresh_display(self):
-        """刷新显示"""
-        self._send_command(0x22)  # DISPLAY_UPDATE_CONTROL_2
-        self._send_data(0xC4)
-        self._send_command(0x20)  # MASTER_ACTIVATION
-        self._wait_until_idle()
-    
     def clear_display(self):
         """清空显示"""
         logger.info("清空墨水屏显示...")
         
-        if not HARDWARE_AVAILABLE or DEBUG_CONFIG['mock_hardware']:
+        if self.session is None:
             logger.info("模拟模式：显示已清空")
             return
         
         try:
-            self._init_display()
-            
-            # 创建白色图像
-            white_image = Image.new('1', (self.width, self.height), 255)
-            image_data = self._convert_image_data(white_image)
-            
-            # 发送白色数据
-            self._send_image_data(image_data)
-            self._refresh_display()
-            
+            self.session.clear()
             logger.info("墨水屏已清空")
             
         except Exception as e:
@@ -572,22 +376,19 @@ class DailyWordDisplayController:
             raise
     
     def sleep(self):
-        """进入睡眠模式"""
-        if not HARDWARE_AVAILABLE or DEBUG_CONFIG['mock_hardware']:
+        """进入睡眠模式（之后的写屏会重新复位和初始化）"""
+        if self.session is None:
             return
         
-        self._send_command(0x10)  # DEEP_SLEEP_MODE
-        self._send_data(0x01)
+        self.session.sleep()
         logger.info("墨水屏已进入睡眠模式")
     
     def cleanup(self):
         """清理资源"""
-        if HARDWARE_AVAILABLE and not DEBUG_CONFIG['mock_hardware']:
+        if self.session is not None:
             try:
+                # 驱动的sleep会关闭SPI并释放GPIO
                 self.sleep()
-                if hasattr(self, 'spi'):
-                    self.spi.close()
-                GPIO.cleanup()
                 logger.info("硬件资源已清理")
             except Exception as e:
                 logger.error(f"清理硬件资源失败: {e}")
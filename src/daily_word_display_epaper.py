@@ -6,7 +6,6 @@ Daily Word E-Paper Display System - Display Controller based on example code
 
 import os
 import sys
-import time
 import logging
 from datetime import datetime
 from PIL import Image, ImageDraw, ImageFont
@@ -15,16 +14,19 @@ from PIL import Image, ImageDraw, ImageFont
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(current_dir)
 
-# 导入我们创建的驱动模块
+# 墨水屏驱动按配置的型号从注册表加载
 try:
-    from waveshare_epd import epd3in52
+    from daily_word_config import EPAPER_CONFIG
+    from daily_word_drivers import load_driver
+    driver = load_driver(EPAPER_CONFIG['model'], EPAPER_CONFIG.get('gpio'))
     import text_wrap
-    import get_ipaddress
     EPAPER_AVAILABLE = True
-except ImportError as e:
+except (ImportError, RuntimeError) as e:
     print(f"警告: 墨水屏驱动导入失败: {e}")
     EPAPER_AVAILABLE = False
 
+from daily_word_telemetry import get_ip_address
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
@@ -41,7 +43,7 @@ class DailyWordEPaperDisplay:
         
         if EPAPER_AVAILABLE:
             try:
-                self.epd = epd3in52.EPD()
+                self.epd = driver.EPD()
                 self.epd.init()
                 logger.info(f"墨水屏初始化完成 - 尺寸: {self.width}x{self.height}")
             except Exception as e:
@@ -182,9 +184,11 @@ class DailyWordEPaperDisplay:
             if self.epd:
                 self.epd.Clear()
                 self.epd.display(self.epd.getbuffer(image))
-                self.epd.lut_GC()
-                self.epd.refresh()
-                time.sleep(2)
+                if hasattr(self.epd, 'lut_GC'):
+                    self.epd.lut_GC()
+                if hasattr(self.epd, 'refresh'):
+                    # refresh在BUSY释放后才返回，不需要再额外等待
+                    self.epd.refresh()
                 logger.info("内容已显示到墨水屏")
             else:
                 logger.info("模拟模式：内容已准备好显示")
@@ -233,7 +237,7 @@ class DailyWordEPaperDisplay:
         
         # IP地址
         try:
-            ip_address = get_ipaddress.get_ip_address()
+            ip_address = get_ip_address()
             if ip_address:
                 ip_text = f"IP: {ip_address}"
                 # 居中显示
@@ -271,7 +275,7 @@ class DailyWordEPaperDisplay:
         try:
             self.sleep()
             if EPAPER_AVAILABLE:
-                epd3in52.epdconfig.module_exit(cleanup=True)
+                driver.epdconfig.module_exit(cleanup=True)
             logger.info("显示器资源已清理")
         except Exception as e:
             logger.error(f"清理资源失败: {e}")
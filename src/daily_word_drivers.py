@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+每日单词墨水屏显示系统 - 墨水屏驱动注册表
+Daily Word E-Paper Display System - E-Paper Driver Registry
+
+型号名称 -> waveshare_epd 驱动模块，附带能力信息：
+- 分辨率（驱动的 EPD_WIDTH x EPD_HEIGHT，即面板方向）
+- 颜色：bw 黑白、bwr 黑白红、bwy 黑白黄、4color、7color；planes 为 display() 需要的缓冲区个数
+- 刷新模式 full / fast / partial / gray4 及典型刷新时间（秒，厂商标称值，只用于比较快慢）
+- 非标准的初始化/显示方法名（各驱动命名不统一）；局部刷新前写入基准画面的方法；
+  按模式加载的波形LUT（epd3in52的GC/DU）及其能否在已加载时跳过
+
+只有 load_driver() 才导入驱动模块，且只导入选中的型号；
+查询能力、选择刷新模式不需要导入驱动，也不需要SPI/GPIO库。
+GPIO后端（gpiozero / gpiod）在导入驱动前按配置选择，导入之后不能再切换。
+"""
+
+import importlib
+import logging
+import os
+import sys
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DRIVER_PACKAGE = 'waveshare_epd'
+
+# 刷新模式
+FULL = 'full'          # 整屏刷新（完整波形，无残影）
+FAST = 'fast'          # 快速整屏刷新（缩短的波形）
+PARTIAL = 'partial'    # 局部刷新（不闪屏，会累积残影）
+GRAY4 = 'gray4'        # 4级灰度
+REFRESH_MODES = (FULL, FAST, PARTIAL, GRAY4)
+
+# 局部刷新方法的参数形式
+PARTIAL_IMAGE = 'image'            # display_partial(buffer)，整屏缓冲区
+PARTIAL_WINDOW = 'window'          # display_partial(buffer, x0, y0, x1, y1)
+PARTIAL_WINDOW_FIRST = 'window_first'  # display_partial(x0, y0, x1, y1, buffer)
+PARTIAL_PREVIOUS = 'previous'      # display_partial(old_buffer, new_buffer)
+
+
+def _model(name, width, height, colors='bw', full=3.0, fast=None, partial=None, gray4=None,
+           methods=None, partial_args=PARTIAL_IMAGE, base=None, luts=None, lut_cacheable=False):
+    """
+    构造一条注册表项
+
+    参数:
+    - name: 显示名称
+    - width, height: 面板分辨率
+    - colors: 颜色类型
+    - full/fast/partial/gray4: 各刷新模式的典型耗时(秒)，None表示不支持
+    - methods: {模式: (初始化, 显示)}，与默认的 ('init', 'display') 不同时给出；
+      初始化为方法名或 (方法名, 参数)
+    - partial_args: 局部刷新方法的参数形式
+    - base: 整屏写入基准画面的方法（同时写入新/旧两块RAM），之后的局部刷新以它为参照
+    - luts: {模式: 波形加载方法}，显示后、刷新前调用（驱动提供refresh时）
+    - lut_cacheable: 波形加载方法没有内部状态，已加载同一波形时可以跳过；
+      默认每次刷新都调用（如epd3in52每次调用在EVEN/ODD两套波形之间交替）
+    """
+    modes = {mode: seconds for mode, seconds in
+             ((FULL, full), (FAST, fast), (PARTIAL, partial), (GRAY4, gray4)) if seconds is not None}
+    return {
+        'name': name,
+        'width': width,
+        'height': height,
+        'colors': colors,
+        'planes': 2 if colors in ('bwr', 'bwy') else 1,
+        'modes': modes,
+        'methods': methods or {},
+        'partial_args': partial_args if PARTIAL in modes else None,
+        'base': base if PARTIAL in modes else None,
+        'luts': luts or {},
+        'lut_cacheable': lut_cacheable,
+    }
+
+
+DRIVER_REGISTRY: Dict[str, Dict] = {
+    # 黑白
+    'epd1in02': _model('1.02英寸', 80, 128, full=2.0, partial=0.5,
+                       methods={FULL: ('Init', 'display'), PARTIAL: ('Partial_Init', 'DisplayPartial')},
+                       partial_args=PARTIAL_PREVIOUS),
+    'epd1in54': _model('1.54英寸', 200, 200, full=2.0),
+    'epd1in54_V2': _model('1.54英寸 V2', 200, 200, full=2.0, partial=0.3,
+                          methods={FULL: (('init', 0), 'display'), PARTIAL: (('init', 1), 'displayPart')},
+                          base='displayPartBaseImage'),
+    'epd2in13': _model('2.13英寸', 122, 250, full=2.0),
+    'epd2in13_V2': _model('2.13英寸 V2', 122, 250, full=2.0, partial=0.3,
+                          methods={FULL: (('init', 0), 'display'), PARTIAL: (('init', 1), 'displayPartial')},
+                          base='displayPartBaseImage'),
+    'epd2in13_V3': _model('2.13英寸 V3', 122, 250, full=2.0, partial=0.3,
+                          methods={PARTIAL: (None, 'displayPartial')}, base='displayPartBaseImage'),
+    'epd2in13_V4': _model('2.13英寸 V4', 122, 250, full=2.0, fast=1.5, partial=0.3,
+                          methods={FAST: ('init_fast', 'display_fast'), PARTIAL: (None, 'displayPartial')},
+                          base='displayPartBaseImage'),
+    'epd2in13d': _model('2.13英寸 D', 104, 212, full=2.0, partial=0.3,
+                        methods={PARTIAL: (None, 'DisplayPartial')}),
+    'epd2in66': _model('2.66英寸', 152, 296, full=3.0),
+    'epd2in7': _model('2.7英寸', 176, 264, full=6.0, gray4=6.0,
+                      methods={GRAY4: ('Init_4Gray', 'display_4Gray')}),
+    'epd2in7_V2': _model('2.7英寸 V2', 176, 264, full=3.0, fast=1.5, partial=0.3, gray4=3.0,
+                         methods={FAST: ('init_Fast', 'display_Fast'), PARTIAL: (None, 'display_Partial'),
+                                  GRAY4: ('Init_4Gray', 'display_4Gray')},
+                         partial_args=PARTIAL_WINDOW, base='display_Base'),
+    'epd2in9': _model('2.9英寸', 128, 296, full=2.0),
+    'epd2in9_V2': _model('2.9英寸 V2', 128, 296, full=3.0, fast=1.5, partial=0.3, gray4=3.0,
+                         methods={FAST: ('init_Fast', 'display'), PARTIAL: (None, 'display_Partial'),
+                                  GRAY4: ('Init_4Gray', 'display_4Gray')},
+                         base='display_Base'),
+    'epd2in9d': _model('2.9英寸 D', 128, 296, full=2.0, partial=0.3,
+                       methods={PARTIAL: (None, 'DisplayPartial')}),
+    'epd3in52': _model('3.52英寸', 240, 360, full=1.0, fast=0.3, luts={FULL: 'lut_GC', FAST: 'lut_DU'}),
+    'epd3in7': _model('3.7英寸', 280, 480, full=3.0, gray4=3.0,
+                      methods={FULL: (('init', 1), 'display_1Gray'), GRAY4: (('init', 0), 'display_4Gray')}),
+    'epd4in2': _model('4.2英寸', 400, 300, full=4.0, partial=0.3, gray4=4.0,
+                      methods={PARTIAL: ('init_Partial', 'EPD_4IN2_PartialDisplay'),
+                               GRAY4: ('Init_4Gray', 'display_4Gray')},
+                      partial_args=PARTIAL_WINDOW_FIRST),
+    'epd4in2_V2': _model('4.2英寸 V2', 400, 300, full=3.5, fast=1.5, partial=0.4, gray4=3.5,
+                         methods={FAST: (('init_fast', 0), 'display_Fast'), PARTIAL: (None, 'display_Partial'),
+                                  GRAY4: ('Init_4Gray', 'display_4Gray')}),
+    'epd4in26': _model('4.26英寸', 800, 480, full=3.5, fast=1.5, partial=0.4, gray4=3.5,
+                       methods={FAST: ('init_Fast', 'display_Fast'), PARTIAL: (None, 'display_Partial'),
+                                GRAY4: ('init_4GRAY', 'display_4Gray')},
+                       base='display_Base'),
+    'epd5in83': _model('5.83英寸', 600, 448, full=4.0),
+    'epd5in83_V2': _model('5.83英寸 V2', 648, 480, full=4.0),
+    'epd7in5': _model('7.5英寸', 640, 384, full=5.0),
+    'epd7in5_HD': _model('7.5英寸 HD', 880, 528, full=5.0),
+    'epd7in5_V2': _model('7.5英寸 V2', 800, 480, full=5.0, fast=1.5, partial=0.4,
+                         methods={FAST: ('init_fast', 'display'), PARTIAL: ('init_part', 'display_Partial')},
+                         partial_args=PARTIAL_WINDOW),
+    'epd7in5_V2_old': _model('7.5英寸 V2 (旧版)', 800, 480, full=5.0, fast=1.5, partial=0.4,
+                             methods={FAST: ('init_fast', 'display'), PARTIAL: ('init_part', 'display_Partial')},
+                             partial_args=PARTIAL_WINDOW),
+    'epd13in3k': _model('13.3英寸 K', 960, 680, full=3.5),
+
+    # 三色（黑/白/红、黑/白/黄）
+    'epd1in54b': _model('1.54英寸 B', 200, 200, 'bwr', full=15.0),
+    'epd1in54b_V2': _model('1.54英寸 B V2', 200, 200, 'bwr', full=15.0),
+    'epd1in54c': _model('1.54英寸 C', 152, 152, 'bwy', full=15.0),
+    'epd2in13b_V3': _model('2.13英寸 B V3', 104, 212, 'bwr', full=15.0),
+    'epd2in13b_V4': _model('2.13英寸 B V4', 122, 250, 'bwr', full=15.0),
+    'epd2in13bc': _model('2.13英寸 B/C', 104, 212, 'bwr', full=15.0),
+    'epd2in66b': _model('2.66英寸 B', 152, 296, 'bwr', full=15.0),
+    'epd2in7b': _model('2.7英寸 B', 176, 264, 'bwr', full=15.0),
+    'epd2in7b_V2': _model('2.7英寸 B V2', 176, 264, 'bwr', full=15.0),
+    'epd2in9b_V3': _model('2.9英寸 B V3', 128, 296, 'bwr', full=15.0),
+    'epd2in9b_V4': _model('2.9英寸 B V4', 128, 296, 'bwr', full=15.0, fast=8.0, partial=0.5,
+                          methods={FAST: ('init_Fast', 'display_Fast'), PARTIAL: (None, 'display_Partial')},
+                          partial_args=PARTIAL_WINDOW, base='display_Base'),
+    'epd2in9bc': _model('2.9英寸 B/C', 128, 296, 'bwr', full=15.0),
+    'epd4in2b_V2': _model('4.2英寸 B V2', 400, 300, 'bwr', full=15.0),
+    'epd4in2bc': _model('4.2英寸 B/C', 400, 300, 'bwr', full=15.0),
+    'epd5in83b_V2': _model('5.83英寸 B V2', 648, 480, 'bwr', full=16.0),
+    'epd5in83bc': _model('5.83英寸 B/C', 600, 448, 'bwr', full=16.0),
+    'epd7in5b_HD': _model('7.5英寸 B HD', 880, 528, 'bwr', full=22.0),
+    'epd7in5b_V2': _model('7.5英寸 B V2', 800, 480, 'bwr', full=16.0),
+    'epd7in5bc': _model('7.5英寸 B/C', 640, 384, 'bwr', full=16.0),
+
+    # 四色（黑/白/黄/红）
+    'epd1in64g': _model('1.64英寸 G', 168, 168, '4color', full=16.0),
+    'epd2in13g': _model('2.13英寸 G', 122, 250, '4color', full=16.0),
+    'epd2in36g': _model('2.36英寸 G', 168, 296, '4color', full=16.0),
+    'epd2in66g': _model('2.66英寸 G', 184, 360, '4color', full=16.0),
+    'epd3in0g': _model('3.0英寸 G', 168, 400, '4color', full=16.0),
+    'epd4in37g': _model('4.37英寸 G', 512, 368, '4color', full=20.0),
+    'epd7in3g': _model('7.3英寸 G', 800, 480, '4color', full=20.0),
+
+    # 七色
+    'epd4in01f': _model('4.01英寸 F', 640, 400, '7color', full=30.0),
+    'epd5in65f': _model('5.65英寸 F', 600, 448, '7color', full=30.0),
+    'epd7in3f': _model('7.3英寸 F', 800, 480, '7color', full=35.0),
+}
+
+
+def list_models() -> Tuple[str, ...]:
+    """全部已注册的型号名称"""
+    return tuple(DRIVER_REGISTRY)
+
+
+def get_driver_info(model: str) -> Dict:
+    """
+    获取型号的能力信息
+
+    参数:
+    - model: 型号名称，如 'epd3in52'
+
+    返回:
+    - dict: 注册表项
+
+    异常:
+    - KeyError: 未注册的型号
+    """
+    try:
+        return DRIVER_REGISTRY[model]
+    except KeyError:
+        raise KeyError(f"不支持的墨水屏型号: {model}") from None
+
+
+def supports(model: str, mode: str) -> bool:
+    """型号是否支持指定的刷新模式"""
+    info = DRIVER_REGISTRY.get(model)
+    return info is not None and mode in info['modes']
+
+
+def refresh_seconds(model: str, mode: str) -> Optional[float]:
+    """指定刷新模式的典型耗时(秒)，不支持时返回None"""
+    return get_driver_info(model)['modes'].get(mode)
+
+
+def pick_refresh_mode(model: str, allowed: Iterable[str] = (FULL, FAST, PARTIAL)) -> str:
+    """
+    在允许的刷新模式中选择该型号支持的最快模式
+
+    参数:
+    - model: 型号名称
+    - allowed: 本次更新可以接受的模式（如需要消除残影时只允许full）
+
+    返回:
+    - str: 刷新模式；没有可用模式时返回full
+    """
+    modes = get_driver_info(model)['modes']
+    candidates = [mode for mode in allowed if mode in modes]
+    if not candidates:
+        return FULL
+    return min(candidates, key=modes.get)
+
+
+def configure_gpio(config: Optional[Dict] = None):
+    """
+    选择epdconfig使用的GPIO后端，必须在首次导入驱动之前调用
+
+    epdconfig只在导入时读取环境变量；已经导入且选用的后端与本次不同时记录警告（需要重启进程才能切换）
+
+    参数:
+    - config: EPAPER_CONFIG['gpio']，backend 为 gpiozero 或 gpiod（由 validate_config 校验），
+      chip 为gpiod使用的字符设备；已设置的环境变量 EPD_GPIO_BACKEND / EPD_GPIO_CHIP 优先
+    """
+    config = config or {}
+    os.environ.setdefault('EPD_GPIO_BACKEND', config.get('backend', 'gpiozero'))
+    if config.get('chip'):
+        os.environ.setdefault('EPD_GPIO_CHIP', config['chip'])
+
+    epdconfig = sys.modules.get(f'{DRIVER_PACKAGE}.epdconfig')
+    loaded = getattr(epdconfig, 'gpio_backend', None)
+    backend = os.environ['EPD_GPIO_BACKEND']
+    if loaded is not None and loaded != backend:
+        logger.warning(f"epdconfig 已使用 {loaded} 后端导入，{backend} 后端需要重启进程才能生效")
+
+
+def load_driver(model: str, gpio: Optional[Dict] = None):
+    """
+    按需导入型号对应的驱动模块（只导入这一个型号）
+
+    参数:
+    - model: 型号名称
+    - gpio: EPAPER_CONFIG['gpio']，见 configure_gpio
+
+    异常:
+    - KeyError: 未注册的型号
+    - ImportError/RuntimeError: 驱动或其SPI/GPIO依赖不可用
+    """
+    get_driver_info(model)
+    configure_gpio(gpio)
+    module = importlib.import_module(f'{DRIVER_PACKAGE}.{model}')
+    logger.debug(f"已加载墨水屏驱动: {model}")
+    return module
+
+
+def create_driver(model: str, gpio: Optional[Dict] = None):
+    """创建型号对应的驱动实例（EPD对象）"""
+    return load_driver(model, gpio).EPD()
+
+
+def mode_spec(model: str, mode: str = FULL) -> Tuple:
+    """
+    刷新模式的初始化和显示方法说明（未绑定到驱动实例）
+
+    返回:
+    - (init, display): init为方法名、(方法名, 参数)或None（该模式无需单独初始化）
+
+    异常:
+    - ValueError: 型号不支持该模式
+    """
+    info = get_driver_info(model)
+    if mode not in info['modes']:
+        raise ValueError(f"{model} 不支持 {mode} 刷新")
+    return info['methods'].get(mode, ('init', 'display'))
+
+
+def bind_init(epd, init_spec) -> Optional[Callable]:
+    """将初始化方法说明绑定为驱动实例上的无参可调用对象"""
+    if init_spec is None:
+        return None
+    if isinstance(init_spec, tuple):
+        init_name, arg = init_spec
+        method = getattr(epd, init_name)
+        return lambda: method(arg)
+    return getattr(epd, init_spec)
+
+
+def mode_methods(epd, model: str, mode: str = FULL) -> Tuple[Optional[Callable], Callable]:
+    """
+    绑定驱动实例上某个刷新模式的初始化和显示方法
+
+    参数:
+    - epd: 驱动实例
+    - model: 型号名称
+    - mode: 刷新模式
+
+    返回:
+    - (init, display): init为无参可调用对象（该模式无需单独初始化时为None）
+
+    异常:
+    - ValueError: 型号不支持该模式
+    """
+    init_spec, display_name = mode_spec(model, mode)
+    return bind_init(epd, init_spec), getattr(epd, display_name)
@@ -5,12 +5,21 @@ Daily Word E-Paper Display Controller - Based on Working User Code
 """
 
 import os
+import re
 import sys
 import time
 import logging
 from PIL import Image, ImageDraw, ImageFont
 from datetime import datetime
 
+from daily_word_config import EPAPER_CONFIG
+from daily_word_drivers import create_driver, get_driver_info
+from daily_word_metrics import instrument_driver, metrics
+from daily_word_panel import PanelSession
+from daily_word_power import PowerManager
+from daily_word_refresh import RefreshPolicy
+from daily_word_telemetry import get_ip_address
+
 # 添加当前目录到Python路径
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, current_dir)
@@ -18,14 +27,16 @@ sys.path.insert(0, current_dir)
 # 设置图片和字体路径
 picdir = os.path.join(os.path.dirname(current_dir), 'pic')
 
-try:
-    from waveshare_epd import epd3in52
-    import text_wrap
-    import get_ipaddress
-    EPD_AVAILABLE = True
-except ImportError as e:
-    logging.warning(f"墨水屏模块导入失败: {e}")
-    EPD_AVAILABLE = False
+
+# 布局：顶部标题、定高通道依次排列，句子/诗词平分剩余空间，IP固定在底部
+HEADER_HEIGHT = 30
+FOOTER_HEIGHT = 30
+FIXED_LANE_HEIGHTS = [('clock', 22), ('weather', 22), ('word', 130)]
+FLEXIBLE_LANES = ['quote', 'poem']
+
+# 三色屏画布使用调色板模式：沿用 fill=0(黑)/255(白)，强调色为索引1
+ACCENT_INK = 1
+ACCENT_COLORS = {'red': (255, 0, 0), 'yellow': (255, 255, 0)}
 
 
 class DailyWordEPaperController:
@@ -34,147 +45,312 @@ class DailyWordEPaperController:
     def __init__(self):
         """初始化墨水屏控制器"""
         self.logger = logging.getLogger(__name__)
+        self.model = EPAPER_CONFIG['model']
+        self.driver_info = get_driver_info(self.model)
         self.epd = None
+        self.session = None
+        self.policy = None
+        self.power = None
+        self.color_config = EPAPER_CONFIG.get('color', {})
+        self.accent = False
         self.font_path = os.path.join(picdir, 'Font.ttc')
+        self._fonts = None
+        
+        # 按通道局部重绘时复用的整屏画布
+        self._canvas = None
+        self._canvas_layout = None
         
-        if not EPD_AVAILABLE:
-            self.logger.warning("墨水屏驱动不可用，将使用模拟模式")
+        try:
+            self.epd = instrument_driver(create_driver(self.model, EPAPER_CONFIG.get('gpio')))
+        except Exception as e:
+            self.logger.warning(f"墨水屏驱动 {self.model} 不可用，将使用模拟模式: {e}")
             return
             
         try:
-            self.epd = epd3in52.EPD()
+            self.session = PanelSession(self.epd, self.model)
+            self.policy = RefreshPolicy(self.model, EPAPER_CONFIG.get('display_config'))
+            self.power = PowerManager(self.session, EPAPER_CONFIG.get('session'))
+            self.accent = bool(getattr(self.epd, 'ACCENT_PLANE', False) and self.color_config.get('highlight_word'))
             self.logger.info("墨水屏控制器初始化成功")
         except Exception as e:
             self.logger.error(f"墨水屏初始化失败: {e}")
             self.epd = None
     
     def _get_fonts(self):
-        """获取字体对象"""
-        try:
-            font24 = ImageFont.truetype(self.font_path, 24)
-            font18 = ImageFont.truetype(self.font_path, 18)
-            font12 = ImageFont.truetype(self.font_path, 12)
-            return font24, font18, font12
-        except Exception as e:
-            self.logger.warning(f"字体加载失败，使用默认字体: {e}")
-            return ImageFont.load_default(), ImageFont.load_default(), ImageFont.load_default()
+        """获取字体对象（首次加载后缓存）"""
+        if self._fonts is None:
+            try:
+                self._fonts = (ImageFont.truetype(self.font_path, 24),
+                               ImageFont.truetype(self.font_path, 18),
+                               ImageFont.truetype(self.font_path, 12))
+            except Exception as e:
+                self.logger.warning(f"字体加载失败，使用默认字体: {e}")
+                self._fonts = (ImageFont.load_default(), ImageFont.load_default(), ImageFont.load_default())
+        return self._fonts
     
     def display_daily_content(self, content):
         """显示每日内容到墨水屏"""
         if not self.epd:
             self.logger.warning("墨水屏不可用，跳过显示")
             return False
-            
+        
+        rendered = self.render_daily_content(content)
+        if rendered is None:
+            return False
+        return self.write_image(*rendered)
+    
+    def render_daily_content(self, content):
+        """将每日内容绘制为图像（纯CPU，不访问硬件，可在工作线程中执行）"""
+        # 获取IP地址（遥测采样器内存中的值）
         try:
-            # 初始化墨水屏
-            self.epd.init()
-            self.epd.Clear()
-            
-            # 创建图像
-            image = Image.new('1', (self.epd.width, self.epd.height), 255)
-            draw = ImageDraw.Draw(image)
-            
-            # 获取字体
-            font24, font18, font12 = self._get_fonts()
-            
-            # 获取IP地址
-            try:
-                ipaddress = get_ipaddress.get_ip_address()
-            except:
-                ipaddress = "N/A"
-            
-            # 绘制标题
-            draw.text((10, 10), "Daily Word & Sentence", font=font18, fill=0)
-            
-            # 绘制时间
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M")
-            draw.text((10, 35), f"Time: {current_time}", font=font12, fill=0)
-            
-            y_pos = 70
+            ipaddress = get_ip_address()
+        except Exception:
+            ipaddress = "N/A"
+        
+        values = {
+            'clock': datetime.now().strftime("%Y-%m-%d %H:%M"),
+            'word': content.get('word'),
+            'quote': content.get('quote') or content.get('sentence'),
+            'ip': ipaddress,
+        }
+        return self.render_lanes(values, list(values))
+    
+    def layout_regions(self, lanes):
+        """按启用的通道计算各自的屏幕区域 (x0, y0, x1, y1)"""
+        width, height = self.epd.width, self.epd.height
+        regions = {}
+        y_pos = HEADER_HEIGHT
+        for name, region_height in FIXED_LANE_HEIGHTS:
+            if name in lanes:
+                regions[name] = (0, y_pos, width, y_pos + region_height)
+                y_pos += region_height
+        
+        bottom = height - FOOTER_HEIGHT if 'ip' in lanes else height
+        flexible = [name for name in FLEXIBLE_LANES if name in lanes]
+        if flexible:
+            region_height = (bottom - y_pos) // len(flexible)
+            for name in flexible:
+                regions[name] = (0, y_pos, width, y_pos + region_height)
+                y_pos += region_height
+        
+        if 'ip' in lanes:
+            regions['ip'] = (0, height - FOOTER_HEIGHT, width, height)
+        return regions
+    
+    def render_lanes(self, values, dirty):
+        """
+        按通道绘制图像，只重绘dirty中通道所在的区域。
+        
+        参数:
+        - values: 通道名称到内容的映射
+        - dirty: 需要重绘的通道
+        
+        返回:
+        - (image, regions): 完整画面的副本，以及本次重绘的区域
+        """
+        if not self.epd:
+            return None
             
-            # 绘制每日单词
-            if 'word' in content:
-                word_data = content['word']
-                draw.text((10, y_pos), "Daily Word:", font=font18, fill=0)
-                y_pos += 25
-                
-                # 单词
-                word_text = f"Word: {word_data.get('word', 'N/A')}"
-                draw.text((10, y_pos), word_text, font=font24, fill=0)
-                y_pos += 30
-                
-                # 音标
-                if 'phonetic' in word_data:
-                    phonetic_text = f"Phonetic: {word_data['phonetic']}"
-                    draw.text((10, y_pos), phonetic_text, font=font12, fill=0)
-                    y_pos += 20
-                
-                # 释义
-                if 'meaning' in word_data:
-                    meaning_text = f"Meaning: {word_data['meaning']}"
-                    # 使用文本换行
-                    try:
-                        wrapped_meaning = text_wrap.format_poem_for_display(meaning_text, 350)
-                        draw.text((10, y_pos), wrapped_meaning, font=font12, fill=0)
-                    except:
-                        draw.text((10, y_pos), meaning_text[:50] + "...", font=font12, fill=0)
-                    y_pos += 40
+        try:
+            render_start = time.perf_counter()
+            regions = self.layout_regions(values)
+            if self._canvas is None or self._canvas_layout != regions:
+                # 首次绘制或布局变化时重绘整屏
+                self._canvas = self._new_canvas()
+                self._canvas_layout = regions
+                draw = ImageDraw.Draw(self._canvas)
+                font24, font18, font12 = self._get_fonts()
+                draw.text((10, 8), "Daily Word & Sentence", font=font18, fill=0)
+                dirty = list(regions)
+            else:
+                draw = ImageDraw.Draw(self._canvas)
             
-            # 绘制每日句子
-            if 'sentence' in content:
-                sentence_data = content['sentence']
-                draw.text((10, y_pos), "Daily Sentence:", font=font18, fill=0)
-                y_pos += 25
-                
-                sentence_text = sentence_data.get('sentence', 'N/A')
-                try:
-                    wrapped_sentence = text_wrap.format_poem_for_display(sentence_text, 350)
-                    draw.text((10, y_pos), wrapped_sentence, font=font18, fill=0)
-                except:
-                    # 简单换行处理
-                    words = sentence_text.split()
-                    lines = []
-                    current_line = ""
-                    for word in words:
-                        if len(current_line + word) < 40:
-                            current_line += word + " "
-                        else:
-                            lines.append(current_line.strip())
-                            current_line = word + " "
-                    if current_line:
-                        lines.append(current_line.strip())
-                    
-                    for line in lines[:3]:  # 最多显示3行
-                        draw.text((10, y_pos), line, font=font18, fill=0)
-                        y_pos += 22
-                
-                y_pos += 20
+            redrawn = []
+            for name in dirty:
+                region = regions.get(name)
+                drawer = getattr(self, f'_draw_{name}', None)
+                if region is None or drawer is None:
+                    continue
+                draw.rectangle(region, fill=255)
+                if values.get(name):
+                    drawer(draw, region, values[name])
+                redrawn.append(region)
             
-            # 显示IP地址
-            draw.text((10, self.epd.height - 30), f"IP: {ipaddress}", font=font12, fill=0)
+            image = self._canvas.copy()
+            metrics.observe('daily_word_render_seconds', time.perf_counter() - render_start)
+            return image, redrawn
             
-            # 显示到墨水屏
-            self.epd.display(self.epd.getbuffer(image))
-            self.epd.refresh()
-            time.sleep(2)
-            self.epd.sleep()
+        except Exception as e:
+            self.logger.error(f"墨水屏内容绘制失败: {e}")
+            return None
+    
+    def _new_canvas(self):
+        """黑白屏使用1位画布；三色屏使用调色板画布，写屏时一次拆分为黑色和强调色两个平面"""
+        size = (self.epd.width, self.epd.height)
+        if not self.accent:
+            return Image.new('1', size, 255)
+        canvas = Image.new('P', size, 255)
+        palette = [0, 0, 0] * 256
+        palette[ACCENT_INK * 3:ACCENT_INK * 3 + 3] = ACCENT_COLORS.get(self.color_config.get('accent'), (255, 0, 0))
+        palette[255 * 3:] = [255, 255, 255]
+        canvas.putpalette(palette)
+        return canvas
+    
+    def _wrap_text(self, draw, text, font, max_width, max_lines):
+        """按像素宽度换行，英文按单词、中文按字符断行"""
+        if max_lines <= 0:
+            return []
+        lines = []
+        for paragraph in str(text).split('\n'):
+            current = ""
+            for token in re.findall(r'[A-Za-z0-9\'\-.,;:!?"()]+\s*|\s+|.', paragraph):
+                candidate = current + token
+                if current and draw.textlength(candidate.rstrip(), font=font) > max_width:
+                    lines.append(current.rstrip())
+                    current = token.lstrip()
+                else:
+                    current = candidate
+            if current.strip():
+                lines.append(current.rstrip())
+        if len(lines) > max_lines:
+            lines = lines[:max_lines]
+            lines[-1] = lines[-1][:-1] + "…"
+        return lines
+    
+    def _draw_lines(self, draw, region, y_pos, text, font, line_height):
+        """在区域内从y_pos开始绘制换行文本，超出区域的部分省略"""
+        x0, _, x1, y1 = region
+        max_lines = max(0, (y1 - y_pos) // line_height)
+        for line in self._wrap_text(draw, text, font, x1 - x0 - 20, max_lines):
+            draw.text((x0 + 10, y_pos), line, font=font, fill=0)
+            y_pos += line_height
+        return y_pos
+    
+    def _draw_clock(self, draw, region, value):
+        font24, font18, font12 = self._get_fonts()
+        draw.text((region[0] + 10, region[1] + 4), f"Time: {value}", font=font12, fill=0)
+    
+    def _draw_weather(self, draw, region, value):
+        font24, font18, font12 = self._get_fonts()
+        x_pos = region[0] + 10
+        if value.get('icon'):
+            # 图标已按尺寸转换为1位并缓存，命中时不做网络和图像处理
+            from daily_word_config import WEATHER_CONFIG
+            from daily_word_weather import get_weather_service
+            icon = get_weather_service().get_icon(value['icon'], WEATHER_CONFIG['icon_size'])
+            if icon is not None:
+                position = (x_pos, region[1] + (region[3] - region[1] - icon.height) // 2)
+                if self._canvas.mode == '1':
+                    self._canvas.paste(icon, position)
+                else:
+                    # 调色板画布：以图标的黑色像素为遮罩填充黑色
+                    from PIL import ImageOps
+                    self._canvas.paste(0, position + (position[0] + icon.width, position[1] + icon.height),
+                                       ImageOps.invert(icon.convert('L')))
+                x_pos += icon.width + 4
+        text = f"{value.get('city', '')} {value.get('condition', '')} {value.get('temp_c', '')}°C"
+        draw.text((x_pos, region[1] + 4), text.strip(), font=font12, fill=0)
+    
+    def _draw_word(self, draw, region, word_data):
+        font24, font18, font12 = self._get_fonts()
+        x_pos, y_pos = region[0] + 10, region[1] + 4
+        draw.text((x_pos, y_pos), "Daily Word:", font=font18, fill=0)
+        y_pos += 25
+        
+        # 单词
+        draw.text((x_pos, y_pos), f"Word: {word_data.get('word', 'N/A')}", font=font24,
+                  fill=ACCENT_INK if self.accent else 0)
+        y_pos += 30
+        
+        # 音标
+        if word_data.get('phonetic'):
+            draw.text((x_pos, y_pos), f"Phonetic: {word_data['phonetic']}", font=font12, fill=0)
+            y_pos += 20
+        
+        # 释义
+        meaning = word_data.get('meaning') or word_data.get('definition')
+        if meaning:
+            self._draw_lines(draw, region, y_pos, f"Meaning: {meaning}", font12, 16)
+    
+    def _draw_quote(self, draw, region, quote_data):
+        font24, font18, font12 = self._get_fonts()
+        draw.text((region[0] + 10, region[1] + 4), "Daily Sentence:", font=font18, fill=0)
+        text = quote_data.get('text') or quote_data.get('sentence') or 'N/A'
+        if quote_data.get('author'):
+            text = f"{text}\n—— {quote_data['author']}"
+        self._draw_lines(draw, region, region[1] + 29, text, font18, 22)
+    
+    def _draw_poem(self, draw, region, poem):
+        font24, font18, font12 = self._get_fonts()
+        title = f"{poem.get('title', '')}  {poem.get('dynasty') or ''} {poem.get('author') or ''}"
+        draw.text((region[0] + 10, region[1] + 4), title.strip(), font=font18, fill=0)
+        text = poem.get('full_content') or poem.get('content') or ''
+        self._draw_lines(draw, region, region[1] + 29, text, font12, 16)
+    
+    def _draw_ip(self, draw, region, value):
+        font24, font18, font12 = self._get_fonts()
+        draw.text((region[0] + 10, region[1]), f"IP: {value}", font=font12, fill=0)
+    
+    def write_image(self, image, regions=None):
+        """
+        将绘制好的图像写入墨水屏（访问SPI/GPIO，应只在单一线程中调用）
+        
+        参数:
+        - image: 完整画面
+        - regions: 本次重绘的区域（render_lanes的返回值），None表示整屏；用于选择刷新模式
+        """
+        if not self.epd:
+            return False
             
-            self.logger.info("内容已成功显示到墨水屏")
+        try:
+            # 面板已就绪时不再复位/初始化；整屏写入直接覆盖旧画面，不先Clear
+            if self.accent:
+                # 一次分类得到黑色和强调色两个平面
+                buffers = self.epd.getbuffer_color(
+                    image,
+                    accent=self.color_config.get('accent', 'red'),
+                    tolerance=self.color_config.get('tolerance', 64),
+                    threshold=self.color_config.get('black_threshold', 128),
+                )
+            else:
+                buffers = (self.epd.getbuffer(image),)
+            # 空闲窗口内的更新取消已排定的深度睡眠
+            self.power.cancel()
+            # 上一帧的刷新结束后再选择模式（残影累计值在刷新完成时更新）
+            self.session.wait()
+            # 在残影预算内选择最快的刷新模式
+            mode, reason = self.policy.choose(regions, self.session.partial_ready)
+            # SPI传输完成即返回，刷新波形在等待线程中完成
+            refresh = self.session.commit(mode, *buffers)
+            refresh.add_done_callback(lambda done: self._refresh_done(done, mode, reason, regions))
+            # 空闲超过阈值后再进入深度睡眠
+            self.power.touch()
             return True
             
         except Exception as e:
             self.logger.error(f"墨水屏显示失败: {e}")
             return False
     
+    def _refresh_done(self, done, mode, reason, regions):
+        """刷新结束（BUSY释放）时记录刷新模式和耗时"""
+        try:
+            elapsed = done.result()
+        except Exception as e:
+            self.logger.error(f"墨水屏刷新失败: {e}")
+            return
+        self.policy.record(mode, regions, elapsed)
+        self.logger.info(f"内容已成功显示到墨水屏 - 刷新模式: {mode} ({reason})，耗时 {elapsed:.1f} 秒")
+    
     def clear_display(self):
         """清空墨水屏显示"""
         if not self.epd:
             return False
             
         try:
-            self.epd.init()
-            self.epd.Clear()
-            self.epd.sleep()
+            self.power.cancel()
+            self.session.clear()
+            self.policy.cleared()
+            self.power.touch()
             self.logger.info("墨水屏已清空")
             return True
         except Exception as e:
@@ -207,8 +383,8 @@ class DailyWordEPaperController:
     def cleanup(self):
         """清理资源"""
         try:
-            if self.epd:
-                self.epd.sleep()
+            if self.power:
+                self.power.sleep_now()
             self.logger.info("墨水屏资源已清理")
         except Exception as e:
             self.logger.warning(f"清理墨水屏资源时出错: {e}")
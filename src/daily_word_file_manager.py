@@ -9,6 +9,9 @@ Daily Word File Manager
 import json
 import logging
 import os
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional, Any
@@ -16,8 +19,66 @@ import fcntl
 import tempfile
 import shutil
 
+from daily_word_history_store import JournalStore, fsync_path, keep_newest_records, keep_recent_keys
+from daily_word_metrics import metrics
+
 logger = logging.getLogger(__name__)
 
+# 历史记录保留天数与更新日志保留条数
+HISTORY_RETENTION_DAYS = 30
+UPDATE_LOG_LIMIT = 100
+
+# 每提交多少个事务做一次检查点（同步数据文件并清空提交日志）
+CHECKPOINT_INTERVAL = 20
+
+# 日志记录中的 [事务id, 事务内序号] 字段，只用于恢复时去重，读取时去掉
+TXN_FIELD = "_txn"
+
+
+def strip_txn(record: Optional[Dict]) -> Optional[Dict]:
+    """去掉记录中的事务id（返回副本，不修改日志缓存中的记录）"""
+    if not record or TXN_FIELD not in record:
+        return record
+    return {k: v for k, v in record.items() if k != TXN_FIELD}
+
+
+def record_key(value) -> Optional[tuple]:
+    """日志记录的去重键 (事务id, 事务内序号)；旧版记录只有事务id，序号为None"""
+    if isinstance(value, list):
+        return tuple(value)
+    if value is None:
+        return None
+    return (value, None)
+
+
+class DailyWordTransaction:
+    """一次更新中的全部状态变更，提交时合并为一条fsync的提交日志记录"""
+    
+    _last_txn_id = 0
+    
+    def __init__(self):
+        # 事务id只需唯一：墙上时钟回拨时仍递增，恢复时按每条记录的键去重而不依赖id顺序
+        self.txn_id = max(time.time_ns(), DailyWordTransaction._last_txn_id + 1)
+        DailyWordTransaction._last_txn_id = self.txn_id
+        self.json_writes: Dict[str, Any] = {}
+        self.appends: List[Dict] = []
+        self.committed = False
+    
+    def write_json(self, file_path: Path, data: Any):
+        """整文件写入JSON（同一文件多次写入只保留最后一次）"""
+        self.json_writes[str(file_path)] = data
+    
+    def append(self, store_name: str, record: Dict):
+        """向分段日志追加记录，记录带上 [事务id, 序号] 以便恢复时逐条去重"""
+        key = [self.txn_id, len(self.appends)]
+        self.appends.append({"store": store_name, "record": {**record, TXN_FIELD: key}})
+    
+    def is_empty(self) -> bool:
+        return not self.json_writes and not self.appends
+    
+    def to_record(self) -> Dict:
+        return {"txn": self.txn_id, "json_writes": self.json_writes, "appends": self.appends}
+
 class DailyWordFileManager:
     """每日单词文件管理器"""
     
@@ -32,8 +93,64 @@ class DailyWordFileManager:
         self.system_status_file = self.data_dir / "system_status.json"
         self.update_log_file = self.data_dir / "update_log.json"
         
+        # 历史记录和更新日志使用追加写入的分段日志
+        self.journal_dir = self.data_dir / "journal"
+        self.history_store = JournalStore(self.journal_dir, "content_history",
+                                          key_field="date", segment_max_bytes=64 * 1024)
+        self.history_store.compaction_policy = keep_recent_keys(
+            self.history_store, lambda: self._cutoff_date(HISTORY_RETENTION_DAYS))
+        self.update_log_store = JournalStore(self.journal_dir, "update_log",
+                                             segment_max_bytes=16 * 1024)
+        self.update_log_store.compaction_policy = keep_newest_records(
+            self.update_log_store, UPDATE_LOG_LIMIT)
+        self._stores = {
+            "content_history": self.history_store,
+            "update_log": self.update_log_store,
+        }
+        self._migrate_legacy_journals()
+        
+        # 当前内容的内存快照，以文件的(inode, mtime, size)校验是否仍然有效
+        self._content_snapshot: Optional[Dict] = None
+        self._content_snapshot_key: Optional[tuple] = None
+        
+        # 提交日志：每个事务一条fsync的记录，检查点后清空
+        self.commit_log_file = self.journal_dir / "commit.wal"
+        self._transaction: Optional[DailyWordTransaction] = None
+        self._transaction_lock = threading.RLock()
+        self._commits_since_checkpoint = 0
+        # 检查点之前需要fsync的数据文件（提交后的应用不单独fsync）
+        self._unsynced_files: set = set()
+        self._recover()
+        
         logger.info("文件管理器初始化完成")
     
+    @staticmethod
+    def _cutoff_date(days: int) -> str:
+        """N天前的日期字符串"""
+        return (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+    
+    def _migrate_legacy_journals(self):
+        """将旧版整文件JSON历史和更新日志导入分段日志（仅执行一次）"""
+        try:
+            if self.content_history_file.exists() and self.history_store.is_empty():
+                history = self._safe_read_json(self.content_history_file) or {}
+                for date_key in sorted(history):
+                    self.history_store.append_encoded(
+                        self.history_store.encode(history[date_key]), history[date_key], durable=False)
+                self.history_store.compact()
+                self.content_history_file.rename(self.content_history_file.with_suffix('.json.migrated'))
+                logger.info(f"已迁移 {len(history)} 条历史记录到分段日志")
+            
+            if self.update_log_file.exists() and self.update_log_store.is_empty():
+                logs = (self._safe_read_json(self.update_log_file) or {}).get("updates", [])
+                for entry in logs[-UPDATE_LOG_LIMIT:]:
+                    self.update_log_store.append_encoded(
+                        self.update_log_store.encode(entry), entry, durable=False)
+                self.update_log_file.rename(self.update_log_file.with_suffix('.json.migrated'))
+                logger.info(f"已迁移 {len(logs)} 条更新日志到分段日志")
+        except Exception as e:
+            logger.error(f"迁移旧版历史文件失败: {e}")
+    
     def _safe_write_json(self, file_path: Path, data: Dict) -> bool:
         """安全写入JSON文件（原子操作）"""
         try:
@@ -49,6 +166,7 @@ class DailyWordFileManager:
             
             # 原子替换
             shutil.move(str(temp_file), str(file_path))
+            self._after_write(file_path, data)
             return True
             
         except Exception as e:
@@ -58,6 +176,215 @@ class DailyWordFileManager:
                 temp_file.unlink()
             return False
     
+    @contextmanager
+    def transaction(self):
+        """
+        开启一个工作单元，期间的current/history/log及缓存写入合并为一次持久化提交。
+        嵌套调用会加入外层事务；代码块抛出异常时丢弃全部变更。
+        """
+        with self._transaction_lock:
+            if self._transaction is not None:
+                yield self._transaction
+                return
+            
+            txn = DailyWordTransaction()
+            self._transaction = txn
+            try:
+                yield txn
+            finally:
+                self._transaction = None
+            
+            self._commit(txn)
+    
+    def write_json(self, file_path: Path, data: Any) -> bool:
+        """写入JSON文件：事务中延迟到提交，否则立即原子写入"""
+        with self._transaction_lock:
+            if self._transaction is not None:
+                self._transaction.write_json(file_path, data)
+                return True
+        return self._safe_write_json(file_path, data)
+    
+    def _append_record(self, store_name: str, record: Dict) -> bool:
+        """追加日志记录：事务中延迟到提交，否则立即写入"""
+        with self._transaction_lock:
+            if self._transaction is not None:
+                self._transaction.append(store_name, record)
+                return True
+        return self._stores[store_name].append(record)
+    
+    def _commit(self, txn: DailyWordTransaction) -> bool:
+        """写入一条fsync的提交记录，再不带fsync地应用到各数据文件"""
+        if txn.is_empty():
+            txn.committed = True
+            return True
+        
+        try:
+            line = json.dumps(txn.to_record(), ensure_ascii=False, separators=(',', ':')) + '\n'
+            with open(self.commit_log_file, 'ab') as f:
+                f.write(line.encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            logger.error(f"提交事务失败: {e}")
+            return False
+        
+        # 提交记录落盘后事务即视为持久化，应用失败会在下次启动时重放
+        self._apply(txn.to_record())
+        txn.committed = True
+        
+        self._commits_since_checkpoint += 1
+        if self._commits_since_checkpoint >= CHECKPOINT_INTERVAL:
+            self.checkpoint()
+        return True
+    
+    def _apply(self, record: Dict, applied: Optional[Dict[str, set]] = None):
+        """
+        将提交记录应用到数据文件（不fsync，由检查点统一同步）
+        
+        参数:
+        - applied: 重放时各日志存储中已存在的记录键，已存在的记录不再追加
+        """
+        for path, data in record.get("json_writes", {}).items():
+            self._write_json_nosync(Path(path), data)
+        
+        for item in record.get("appends", []):
+            store = self._stores.get(item.get("store"))
+            if store is None:
+                logger.warning(f"未知的日志存储: {item.get('store')}")
+                continue
+            entry = item["record"]
+            if applied is not None and record_key(entry.get(TXN_FIELD)) in applied.get(item["store"], ()):
+                continue
+            store.append_encoded(store.encode(entry), entry, durable=False)
+    
+    def _applied_keys(self, txn_ids: set) -> Dict[str, set]:
+        """
+        收集各日志存储尾部已应用的记录键。
+        
+        检查点之后追加的记录都在尾部：从末尾向前扫描，遇到事务不在提交日志中的记录
+        （检查点之前的事务）即停止，不依赖事务id的大小顺序。
+        """
+        applied = {}
+        for name, store in self._stores.items():
+            keys = set()
+            for entry in store.iter_reverse():
+                key = record_key(entry.get(TXN_FIELD))
+                if key is None:
+                    continue
+                if key[0] not in txn_ids:
+                    break
+                keys.add(key)
+            applied[name] = keys
+        return applied
+    
+    def _write_json_nosync(self, file_path: Path, data: Any) -> bool:
+        """原子替换JSON文件，不单独fsync"""
+        temp_file = file_path.with_suffix('.tmp')
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, file_path)
+            self._unsynced_files.add(Path(file_path))
+            self._after_write(file_path, data)
+            return True
+        except Exception as e:
+            logger.error(f"写入文件失败 {file_path}: {e}")
+            if temp_file.exists():
+                temp_file.unlink()
+            return False
+    
+    def _after_write(self, file_path: Path, data: Any):
+        """写入当前内容文件后直接刷新内存快照，省去下一次读取时的解析"""
+        if Path(file_path) == self.current_content_file:
+            self._content_snapshot = data if self._validate_content(data) else None
+            self._content_snapshot_key = self._stat_key(self.current_content_file)
+    
+    @staticmethod
+    def _stat_key(file_path: Path) -> Optional[tuple]:
+        """文件身份标识：(inode, mtime_ns, size)，文件不存在时为None"""
+        try:
+            stat = file_path.stat()
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    
+    @staticmethod
+    def _validate_content(content: Any) -> bool:
+        """检查当前内容结构是否完整"""
+        return (isinstance(content, dict)
+                and isinstance(content.get('date'), str)
+                and isinstance(content.get('word', {}), dict)
+                and isinstance(content.get('quote', {}), dict))
+    
+    def get_content_snapshot(self) -> Optional[Dict]:
+        """
+        获取当前内容的内存快照。
+        
+        文件未变化时只需一次stat()；文件被替换或修改后才重新解析并校验。
+        返回的字典为共享快照，调用方不应修改。
+        """
+        key = self._stat_key(self.current_content_file)
+        if key is None:
+            self._content_snapshot, self._content_snapshot_key = None, None
+            return None
+        if key == self._content_snapshot_key:
+            metrics.inc('daily_word_cache_requests_total', cache='current_content', result='hit')
+            return self._content_snapshot
+        metrics.inc('daily_word_cache_requests_total', cache='current_content', result='miss')
+        
+        content = self._safe_read_json(self.current_content_file)
+        if not self._validate_content(content):
+            logger.warning(f"当前内容文件格式无效: {self.current_content_file}")
+            content = None
+        self._content_snapshot, self._content_snapshot_key = content, key
+        logger.debug("当前内容快照已刷新: %s", content.get('date') if content else None)
+        return content
+    
+    def checkpoint(self):
+        """同步已应用但未fsync的数据文件及其目录，然后清空提交日志"""
+        with self._transaction_lock:
+            try:
+                # 只同步本管理器写入的文件，不用os.sync()刷写整个系统的脏页
+                directories = set()
+                for path in sorted(self._unsynced_files):
+                    if path.exists():
+                        fsync_path(path)
+                    directories.add(path.parent)
+                for directory in sorted(directories):
+                    fsync_path(directory)
+                self._unsynced_files.clear()
+                for store in self._stores.values():
+                    store.sync()
+                with open(self.commit_log_file, 'wb') as f:
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._commits_since_checkpoint = 0
+                logger.debug("提交日志检查点完成")
+            except Exception as e:
+                logger.error(f"提交日志检查点失败: {e}")
+    
+    def _recover(self):
+        """启动时重放提交日志中检查点之后的事务（末尾不完整的记录视为未提交）"""
+        if not self.commit_log_file.exists() or self.commit_log_file.stat().st_size == 0:
+            return
+        
+        records = []
+        with open(self.commit_log_file, 'rb') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except (ValueError, UnicodeDecodeError):
+                    logger.warning("提交日志末尾存在不完整的事务，已丢弃")
+                    break
+        
+        applied = self._applied_keys({record.get("txn") for record in records})
+        for record in records:
+            self._apply(record, applied)
+        replayed = len(records)
+        
+        logger.info(f"从提交日志恢复了 {replayed} 个事务")
+        self.checkpoint()
+    
     def _safe_read_json(self, file_path: Path) -> Optional[Dict]:
         """安全读取JSON文件"""
         try:
@@ -74,7 +401,7 @@ class DailyWordFileManager:
             return None
     
     def save_current_content(self, word_data: Dict, quote_data: Dict) -> bool:
-        """保存当前内容到文件"""
+        """保存当前内容到文件（当前内容、历史记录和更新日志在同一事务中提交）"""
         try:
             current_time = datetime.now()
             content = {
@@ -85,16 +412,19 @@ class DailyWordFileManager:
                 "timestamp": current_time.timestamp()
             }
             
-            success = self._safe_write_json(self.current_content_file, content)
-            if success:
-                logger.info(f"当前内容已保存到文件: {self.current_content_file}")
+            with self.transaction() as txn:
+                txn.write_json(self.current_content_file, content)
                 
                 # 同时保存到历史记录
                 self._save_to_history(content)
                 
                 # 记录更新日志
                 self._log_update(content)
-                
+            
+            # 加入外层事务时由外层负责提交
+            success = txn.committed or self._transaction is txn
+            if success:
+                logger.debug("当前内容已保存到文件: %s", self.current_content_file)
             return success
             
         except Exception as e:
@@ -102,11 +432,11 @@ class DailyWordFileManager:
             return False
     
     def load_current_content(self) -> Optional[Dict]:
-        """从文件加载当前内容"""
+        """从文件加载当前内容（文件未变化时直接返回内存快照）"""
         try:
-            content = self._safe_read_json(self.current_content_file)
+            content = self.get_content_snapshot()
             if content:
-                logger.info(f"从文件加载当前内容: {content.get('date', 'Unknown')}")
+                logger.debug("从文件加载当前内容: %s", content.get('date', 'Unknown'))
                 return content
             else:
                 logger.warning("当前内容文件不存在或为空")
@@ -119,7 +449,7 @@ class DailyWordFileManager:
     def is_content_current(self) -> bool:
         """检查当前内容是否是今天的"""
         try:
-            content = self.load_current_content()
+            content = self.get_content_snapshot()
             if not content:
                 return False
                 
@@ -127,7 +457,7 @@ class DailyWordFileManager:
             today = datetime.now().strftime('%Y-%m-%d')
             
             is_current = content_date == today
-            logger.info(f"内容日期检查: {content_date} vs {today} = {'当前' if is_current else '过期'}")
+            logger.debug("内容日期检查: %s vs %s = %s", content_date, today, '当前' if is_current else '过期')
             return is_current
             
         except Exception as e:
@@ -135,25 +465,11 @@ class DailyWordFileManager:
             return False
     
     def _save_to_history(self, content: Dict) -> bool:
-        """保存内容到历史记录"""
+        """保存内容到历史记录（追加写入，同一天以最新记录为准）"""
         try:
-            history = self._safe_read_json(self.content_history_file) or {}
-            
-            date_key = content['date']
-            history[date_key] = content
-            
-            # 只保留最近30天的历史记录
-            cutoff_date = datetime.now() - timedelta(days=30)
-            cutoff_str = cutoff_date.strftime('%Y-%m-%d')
-            
-            # 清理旧记录
-            keys_to_remove = [k for k in history.keys() if k < cutoff_str]
-            for key in keys_to_remove:
-                del history[key]
-            
-            success = self._safe_write_json(self.content_history_file, history)
+            success = self._append_record("content_history", content)
             if success:
-                logger.info(f"内容已保存到历史记录: {date_key}")
+                logger.debug("内容已保存到历史记录: %s", content['date'])
             
             return success
             
@@ -173,19 +489,9 @@ class DailyWordFileManager:
                 "quote_source": content['quote'].get('source', 'Unknown')
             }
             
-            # 读取现有日志
-            logs = self._safe_read_json(self.update_log_file) or {"updates": []}
-            
-            # 添加新日志条目
-            logs["updates"].append(log_entry)
-            
-            # 只保留最近100条记录
-            if len(logs["updates"]) > 100:
-                logs["updates"] = logs["updates"][-100:]
-            
-            success = self._safe_write_json(self.update_log_file, logs)
+            success = self._append_record("update_log", log_entry)
             if success:
-                logger.info(f"更新日志已记录: {log_entry['word']} ({log_entry['word_source']})")
+                logger.debug("更新日志已记录: %s (%s)", log_entry['word'], log_entry['word_source'])
             
             return success
             
@@ -221,18 +527,18 @@ class DailyWordFileManager:
             return None
     
     def get_content_history(self, days: int = 7) -> List[Dict]:
-        """获取内容历史记录"""
+        """获取内容历史记录（从日志尾部倒序读取，整个分段都早于截止日期时停止）"""
         try:
-            history = self._safe_read_json(self.content_history_file) or {}
-            
-            # 获取最近N天的记录
-            cutoff_date = datetime.now() - timedelta(days=days)
-            cutoff_str = cutoff_date.strftime('%Y-%m-%d')
+            cutoff_str = self._cutoff_date(days)
             
             recent_history = []
-            for date_key, content in history.items():
-                if date_key >= cutoff_str:
-                    recent_history.append(content)
+            seen_dates = set()
+            for content in self.history_store.iter_since(cutoff_str):
+                date_key = content.get('date', '')
+                if date_key in seen_dates:
+                    continue
+                seen_dates.add(date_key)
+                recent_history.append(strip_txn(content))
             
             # 按日期排序
             recent_history.sort(key=lambda x: x.get('date', ''), reverse=True)
@@ -243,36 +549,32 @@ class DailyWordFileManager:
             logger.error(f"获取内容历史失败: {e}")
             return []
     
+    def get_history_for_date(self, date_key: str) -> Optional[Dict]:
+        """通过日期索引读取某一天的内容"""
+        try:
+            return strip_txn(self.history_store.get(date_key))
+        except Exception as e:
+            logger.error(f"读取历史记录失败 {date_key}: {e}")
+            return None
+    
     def get_update_logs(self, limit: int = 20) -> List[Dict]:
-        """获取更新日志"""
+        """获取更新日志（只读取日志尾部）"""
         try:
-            logs = self._safe_read_json(self.update_log_file) or {"updates": []}
-            
-            # 返回最近的N条记录
-            updates = logs.get("updates", [])
-            return updates[-limit:] if len(updates) > limit else updates
+            return [strip_txn(entry) for entry in self.update_log_store.tail(limit)]
             
         except Exception as e:
             logger.error(f"获取更新日志失败: {e}")
             return []
     
     def cleanup_old_files(self, days: int = 30) -> bool:
-        """清理旧文件"""
+        """清理旧文件（压缩日志，删除过期分段）"""
         try:
-            cleaned_count = 0
-            
-            # 清理历史记录
-            history = self._safe_read_json(self.content_history_file) or {}
-            cutoff_date = datetime.now() - timedelta(days=days)
-            cutoff_str = cutoff_date.strftime('%Y-%m-%d')
-            
-            original_count = len(history)
-            history = {k: v for k, v in history.items() if k >= cutoff_str}
-            cleaned_count += original_count - len(history)
+            cleaned_count = self.history_store.compact(
+                keep_recent_keys(self.history_store, lambda: self._cutoff_date(days)))
+            cleaned_count += self.update_log_store.compact()
             
             if cleaned_count > 0:
-                self._safe_write_json(self.content_history_file, history)
-                logger.info(f"清理了 {cleaned_count} 条旧历史记录")
+                logger.info(f"清理了 {cleaned_count} 个旧日志分段")
             
             return True
             
@@ -287,9 +589,7 @@ class DailyWordFileManager:
             
             files_to_check = [
                 ("current_content", self.current_content_file),
-                ("content_history", self.content_history_file),
                 ("system_status", self.system_status_file),
-                ("update_log", self.update_log_file)
             ]
             
             for name, file_path in files_to_check:
@@ -303,6 +603,23 @@ class DailyWordFileManager:
                 else:
                     stats[name] = {"exists": False}
             
+            snapshot = self.get_content_snapshot()
+            if snapshot:
+                stats["current_content"]["date"] = snapshot.get('date')
+            
+            for name, store in [("content_history", self.history_store),
+                                ("update_log", self.update_log_store)]:
+                paths = [p for p in store.segment_paths() if p.exists()]
+                if paths:
+                    stats[name] = {
+                        "exists": True,
+                        "size": store.total_size(),
+                        "segments": len(paths),
+                        "modified": datetime.fromtimestamp(paths[-1].stat().st_mtime).isoformat()
+                    }
+                else:
+                    stats[name] = {"exists": False}
+            
             return stats
             
         except Exception as e:
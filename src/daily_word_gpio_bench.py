@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+每日单词墨水屏显示系统 - GPIO后端基准测试
+Daily Word E-Paper Display System - GPIO Backend Benchmark
+
+在普通Linux上比较 epdconfig 的两个树莓派GPIO后端，不需要树莓派和墨水屏：
+- gpiod：在 gpio-sim 模拟芯片上申请line（需要root和gpio-sim内核模块，脚本通过configfs创建/删除芯片）
+- gpiozero：使用gpiozero自带的MockFactory（只计入gpiozero的Python调用开销，真实硬件上还要加一次系统调用）
+
+测量项：
+- send_data：每字节的 DC=1、CS=0、CS=1 引脚操作（SPI传输不计入）
+- send_command+data：命令和数据交替，每次都切换DC
+- read_busy：读取BUSY
+- busy_release：BUSY释放到 wait_busy 返回的延迟（驱动典型的10ms轮询间隔）
+
+用法: sudo python3 daily_word_gpio_bench.py [-n 次数] [--rounds 轮数]
+依赖: gpiod>=2.0、gpiozero、spidev（只创建对象，不打开SPI设备）
+"""
+
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 添加当前目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+GPIO_SIM_ROOT = Path('/sys/kernel/config/gpio-sim')
+GPIO_SIM_NAME = 'daily-word-bench'
+# 覆盖BCM 0-27
+GPIO_SIM_LINES = 32
+
+# 驱动忙等待循环的典型轮询间隔(ms)
+POLL_MS = 10
+
+
+class GpioSim:
+    """通过configfs创建的gpio-sim模拟芯片，BUSY电平用sysfs的pull属性驱动"""
+
+    def __init__(self, name: str = GPIO_SIM_NAME, num_lines: int = GPIO_SIM_LINES):
+        self.device = GPIO_SIM_ROOT / name
+        self.bank = self.device / 'gpio-bank0'
+        self.num_lines = num_lines
+        self.chip_path = None
+        self.sysfs = None
+
+    def __enter__(self):
+        if not GPIO_SIM_ROOT.exists():
+            raise RuntimeError("gpio-sim不可用：需要root权限并加载模块 (modprobe gpio-sim)")
+        self.bank.mkdir(parents=True)
+        (self.bank / 'num_lines').write_text(str(self.num_lines))
+        (self.device / 'live').write_text('1')
+        chip_name = (self.bank / 'chip_name').read_text().strip()
+        dev_name = (self.device / 'dev_name').read_text().strip()
+        self.chip_path = f'/dev/{chip_name}'
+        self.sysfs = Path('/sys/devices/platform') / dev_name / chip_name
+        return self
+
+    def __exit__(self, *exc):
+        (self.device / 'live').write_text('0')
+        self.bank.rmdir()
+        self.device.rmdir()
+
+    def drive(self, offset: int, value: int):
+        """模拟外部设备把输入线拉高/拉低"""
+        (self.sysfs / f'sim_gpio{offset}' / 'pull').write_text('pull-up' if value else 'pull-down')
+
+
+def time_per_call(func, count: int, rounds: int) -> float:
+    """多轮计时取中位数，返回每次调用的微秒数"""
+    results = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(count)
+        results.append((time.perf_counter() - start) / count * 1e6)
+    return statistics.median(results)
+
+
+def pin_workloads(backend):
+    """与驱动发送路径相同的引脚操作序列"""
+    write, read = backend.digital_write, backend.digital_read
+    dc, cs, busy = backend.DC_PIN, backend.CS_PIN, backend.BUSY_PIN
+
+    def send_data(count):
+        for _ in range(count):
+            write(dc, 1)
+            write(cs, 0)
+            write(cs, 1)
+
+    def send_command_data(count):
+        for _ in range(count):
+            write(dc, 0)
+            write(cs, 0)
+            write(cs, 1)
+            write(dc, 1)
+            write(cs, 0)
+            write(cs, 1)
+
+    def read_busy(count):
+        for _ in range(count):
+            read(busy)
+
+    return {'send_data': send_data, 'send_command+data': send_command_data, 'read_busy': read_busy}
+
+
+def busy_release_latency(backend, release, rounds: int) -> float:
+    """BUSY释放到 wait_busy（0: 空闲）返回的平均延迟(ms)"""
+    latencies = []
+    for i in range(rounds):
+        release(1)
+        released_at = []
+        delay = 0.02 + (i % 7) * 0.003
+
+        def fire():
+            released_at.append(time.perf_counter())
+            release(0)
+
+        timer = threading.Timer(delay, fire)
+        timer.start()
+        backend.wait_busy(1, poll_ms=POLL_MS)
+        done = time.perf_counter()
+        timer.join()
+        latencies.append((done - released_at[0]) * 1000)
+    return statistics.mean(latencies)
+
+
+def run_gpiod(sim: GpioSim, count: int, rounds: int):
+    os.environ['EPD_GPIO_BACKEND'] = 'gpiod'
+    os.environ['EPD_GPIO_CHIP'] = sim.chip_path
+    from waveshare_epd import epdconfig
+
+    backend = epdconfig.implementation
+    if not isinstance(backend, epdconfig.RaspberryPiGpiod):
+        raise RuntimeError("epdconfig没有使用gpiod后端")
+    results = {name: time_per_call(func, count, rounds) for name, func in pin_workloads(backend).items()}
+    results['busy_release'] = busy_release_latency(backend, lambda v: sim.drive(backend.BUSY_PIN, v), rounds)
+    backend.module_exit(cleanup=True)
+    return epdconfig, results
+
+
+def run_gpiozero(epdconfig, count: int, rounds: int):
+    from gpiozero import Device
+    from gpiozero.pins.mock import MockFactory
+
+    Device.pin_factory = MockFactory()
+    backend = epdconfig.RaspberryPi()
+    busy_pin = Device.pin_factory.pin(backend.BUSY_PIN)
+    results = {name: time_per_call(func, count, rounds) for name, func in pin_workloads(backend).items()}
+    results['busy_release'] = busy_release_latency(
+        backend, lambda v: busy_pin.drive_high() if v else busy_pin.drive_low(), rounds)
+    return results
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='epdconfig GPIO后端基准测试（gpio-sim）')
+    parser.add_argument('-n', '--count', type=int, default=20000, help='每轮的操作次数')
+    parser.add_argument('--rounds', type=int, default=5, help='计时轮数（取中位数）')
+    args = parser.parse_args()
+
+    try:
+        with GpioSim() as sim:
+            epdconfig, gpiod_results = run_gpiod(sim, args.count, args.rounds)
+    except Exception as e:
+        print(f"❌ gpiod后端测试失败: {e}")
+        return 1
+    gpiozero_results = run_gpiozero(epdconfig, args.count, args.rounds)
+
+    print(f"{'操作':<20}{'gpiozero(mock)':>16}{'gpiod(gpio-sim)':>18}{'加速':>8}")
+    for name in gpiod_results:
+        unit = 'ms' if name == 'busy_release' else 'us'
+        old, new = gpiozero_results[name], gpiod_results[name]
+        print(f"{name:<20}{old:>13.2f} {unit}{new:>15.2f} {unit}{old / new if new else 0:>7.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
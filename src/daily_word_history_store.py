@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+每日单词日志式存储
+Daily Word Journal Store
+
+追加写入的JSONL分段日志，用于内容历史和更新日志：追加为O(1)，按时间倒序从文件尾部
+读取，按键（日期）建立索引，并在分段滚动时周期性压缩
+"""
+
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 反向读取文件时的块大小
+REVERSE_READ_BLOCK = 8192
+
+
+def _iter_lines_reverse(file_path: Path, end: Optional[int] = None) -> Iterator[Tuple[int, bytes]]:
+    """从文件尾部按块反向读取，产出(行起始偏移, 行内容)，不解析整个文件"""
+    with open(file_path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END) if end is None else end
+        remainder = b''
+        while position > 0:
+            read_size = min(REVERSE_READ_BLOCK, position)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size) + remainder
+            lines = block.split(b'\n')
+            # 第一段可能是不完整的行，留到下一块拼接
+            remainder = lines.pop(0)
+            offset = position + len(remainder) + 1
+            line_offsets = []
+            for line in lines:
+                line_offsets.append((offset, line))
+                offset += len(line) + 1
+            for line_offset, line in reversed(line_offsets):
+                if line.strip():
+                    yield line_offset, line
+        if remainder.strip():
+            yield 0, remainder
+
+
+def fsync_path(path: Path):
+    """fsync一个文件或目录（目录的fsync使其中的新建、替换和删除落盘）"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class JournalStore:
+    """追加写入的分段JSONL日志"""
+
+    def __init__(self, directory: Path, name: str, key_field: Optional[str] = None,
+                 segment_max_bytes: int = 256 * 1024, durable: bool = True):
+        """
+        初始化日志存储
+
+        参数:
+        - directory: 分段文件所在目录
+        - name: 日志名称，分段文件为 {name}.{序号}.jsonl
+        - key_field: 建立索引的字段（如date），同一键以最新记录为准
+        - segment_max_bytes: 活动分段超过该大小后滚动到新分段并触发压缩
+        - durable: 每次追加后是否fsync
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.name = name
+        self.key_field = key_field
+        self.segment_max_bytes = segment_max_bytes
+        self.durable = durable
+        # 未fsync的追加写入所在分段，由sync()统一同步
+        self._unsynced: set = set()
+        self.index_file = self.directory / f"{name}.index.json"
+        self._segment_pattern = re.compile(re.escape(name) + r'\.(\d{6})\.jsonl$')
+
+        # 压缩策略，由使用方设置：接收分段序号列表（旧到新），返回可删除的序号
+        self.compaction_policy: Optional[Callable[[List[int]], List[int]]] = None
+
+        self._segments = self._list_segments()
+        if not self._segments:
+            self._segments = [1]
+        self._repair_tail()
+        self._index: Dict[str, Tuple[int, int]] = {}
+        if self.key_field:
+            self._load_index()
+
+    # ---------- 分段管理 ----------
+
+    def _segment_path(self, seq: int) -> Path:
+        return self.directory / f"{self.name}.{seq:06d}.jsonl"
+
+    def _list_segments(self) -> List[int]:
+        segments = []
+        for path in self.directory.glob(f"{self.name}.*.jsonl"):
+            match = self._segment_pattern.match(path.name)
+            if match:
+                segments.append(int(match.group(1)))
+        return sorted(segments)
+
+    @property
+    def active_segment(self) -> int:
+        return self._segments[-1]
+
+    def segment_paths(self) -> List[Path]:
+        """所有分段文件路径（旧到新）"""
+        return [self._segment_path(seq) for seq in self._segments]
+
+    def _repair_tail(self):
+        """截断活动分段末尾断电遗留的不完整行，避免下一次追加与其拼接"""
+        path = self._segment_path(self.active_segment)
+        if not path.exists():
+            return
+        size = path.stat().st_size
+        if size == 0:
+            return
+        with open(path, 'rb+') as f:
+            f.seek(size - 1)
+            if f.read(1) == b'\n':
+                return
+            valid_end = 0
+            for offset, line in _iter_lines_reverse(path):
+                if self._decode(line) is not None:
+                    valid_end = offset + len(line) + 1
+                    break
+            if valid_end > size:
+                # 最后一条记录完整，只是缺少换行符
+                f.seek(size)
+                f.write(b'\n')
+                return
+            f.truncate(valid_end)
+        logger.warning(f"日志 {self.name} 末尾存在不完整记录，已截断 {size - valid_end} 字节")
+
+    def is_empty(self) -> bool:
+        return all(not path.exists() or path.stat().st_size == 0 for path in self.segment_paths())
+
+    # ---------- 写入 ----------
+
+    def encode(self, record: Dict) -> bytes:
+        """将记录编码为一行JSON"""
+        return (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+
+    def append(self, record: Dict) -> bool:
+        """追加一条记录（O(1)）"""
+        return self.append_encoded(self.encode(record), record)
+
+    def append_encoded(self, line: bytes, record: Dict, durable: Optional[bool] = None) -> bool:
+        """追加一条已编码的记录"""
+        try:
+            path = self._segment_path(self.active_segment)
+            with open(path, 'ab') as f:
+                offset = f.tell()
+                f.write(line)
+                f.flush()
+                if self.durable if durable is None else durable:
+                    os.fsync(f.fileno())
+                else:
+                    self._unsynced.add(path)
+                size = offset + len(line)
+
+            if self.key_field and record.get(self.key_field) is not None:
+                self._index[str(record[self.key_field])] = (self.active_segment, offset)
+
+            if size >= self.segment_max_bytes:
+                self.roll()
+            return True
+
+        except Exception as e:
+            logger.error(f"追加日志记录失败 {self.name}: {e}")
+            return False
+
+    def sync(self):
+        """同步未fsync的追加写入，以及分段目录（新建或删除的分段）"""
+        for path in sorted(self._unsynced):
+            if path.exists():
+                fsync_path(path)
+        self._unsynced.clear()
+        fsync_path(self.directory)
+
+    def roll(self):
+        """滚动到新分段，并执行压缩"""
+        self._segments.append(self.active_segment + 1)
+        logger.debug(f"日志 {self.name} 滚动到分段 {self.active_segment}")
+        self.compact()
+
+    def compact(self, policy: Optional[Callable[[List[int]], List[int]]] = None) -> int:
+        """按压缩策略删除过期分段，返回删除的分段数"""
+        removed = 0
+        policy = policy or self.compaction_policy
+        if policy:
+            closed = self._segments[:-1]
+            for seq in policy(closed):
+                if seq == self.active_segment:
+                    continue
+                try:
+                    self._segment_path(seq).unlink()
+                except FileNotFoundError:
+                    pass
+                self._segments.remove(seq)
+                removed += 1
+            if removed and self.key_field:
+                live = set(self._segments)
+                self._index = {k: v for k, v in self._index.items() if v[0] in live}
+        if self.key_field:
+            self._save_index()
+        if removed:
+            logger.info(f"日志 {self.name} 压缩完成，删除 {removed} 个旧分段")
+        return removed
+
+    # ---------- 索引 ----------
+
+    def _load_index(self):
+        """加载持久化索引，并扫描索引之后追加的记录"""
+        covered_seq, covered_offset = 0, 0
+        try:
+            if self.index_file.exists():
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                covered_seq, covered_offset = data.get('covered', [0, 0])
+                live = set(self._segments)
+                self._index = {k: tuple(v) for k, v in data.get('keys', {}).items() if v[0] in live}
+        except Exception as e:
+            logger.warning(f"加载日志索引失败 {self.index_file}: {e}，将重建")
+            covered_seq, covered_offset, self._index = 0, 0, {}
+
+        for seq in self._segments:
+            if seq < covered_seq:
+                continue
+            path = self._segment_path(seq)
+            if not path.exists():
+                continue
+            start = covered_offset if seq == covered_seq else 0
+            if start > path.stat().st_size:
+                start = 0
+            with open(path, 'rb') as f:
+                f.seek(start)
+                offset = start
+                for line in f:
+                    record = self._decode(line)
+                    if record and record.get(self.key_field) is not None:
+                        self._index[str(record[self.key_field])] = (seq, offset)
+                    offset += len(line)
+
+    def _save_index(self):
+        """持久化索引（仅在滚动/压缩时写入）"""
+        try:
+            path = self._segment_path(self.active_segment)
+            covered = [self.active_segment, path.stat().st_size if path.exists() else 0]
+            temp_file = self.index_file.with_suffix('.tmp')
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'covered': covered, 'keys': self._index}, f, ensure_ascii=False)
+            os.replace(temp_file, self.index_file)
+        except Exception as e:
+            logger.warning(f"保存日志索引失败 {self.index_file}: {e}")
+
+    def keys(self) -> List[str]:
+        """已索引的键（升序）"""
+        return sorted(self._index)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """按键读取最新记录（一次seek）"""
+        location = self._index.get(str(key))
+        if not location:
+            return None
+        seq, offset = location
+        try:
+            with open(self._segment_path(seq), 'rb') as f:
+                f.seek(offset)
+                return self._decode(f.readline())
+        except FileNotFoundError:
+            return None
+
+    # ---------- 读取 ----------
+
+    @staticmethod
+    def _decode(line: bytes) -> Optional[Dict]:
+        try:
+            return json.loads(line)
+        except (ValueError, UnicodeDecodeError):
+            # 断电导致的半行记录直接跳过
+            return None
+
+    def iter_reverse(self) -> Iterator[Dict]:
+        """从最新到最旧遍历记录，只读取实际需要的文件尾部"""
+        for seq in reversed(self._segments):
+            path = self._segment_path(seq)
+            if not path.exists():
+                continue
+            for _, line in _iter_lines_reverse(path):
+                record = self._decode(line)
+                if record is not None:
+                    yield record
+
+    def iter_since(self, min_key: str) -> Iterator[Dict]:
+        """
+        从最新到最旧遍历键不早于min_key的记录
+
+        同一分段内的记录不要求按键有序（补写、时钟回拨），每个分段都完整扫描；
+        只有整个分段的键都早于min_key时才停止，不再读取更旧的分段
+        """
+        for seq in reversed(self._segments):
+            path = self._segment_path(seq)
+            if not path.exists():
+                continue
+            newest_key = None
+            for _, line in _iter_lines_reverse(path):
+                record = self._decode(line)
+                if record is None:
+                    continue
+                key = str(record.get(self.key_field, ''))
+                if newest_key is None or key > newest_key:
+                    newest_key = key
+                if key >= min_key:
+                    yield record
+            if newest_key is not None and newest_key < min_key:
+                break
+
+    def tail(self, limit: int) -> List[Dict]:
+        """最近的limit条记录（按时间正序）"""
+        records = []
+        if limit <= 0:
+            return records
+        for record in self.iter_reverse():
+            records.append(record)
+            if len(records) >= limit:
+                break
+        records.reverse()
+        return records
+
+    def count_records(self, seq: int) -> int:
+        """统计分段中的记录数（压缩时使用）"""
+        path = self._segment_path(seq)
+        if not path.exists():
+            return 0
+        with open(path, 'rb') as f:
+            return sum(1 for line in f if line.strip())
+
+    def key_range(self, seq: int) -> Optional[Tuple[str, str]]:
+        """分段中记录键的 (最早, 最晚)；分段为空时返回None（压缩时使用）"""
+        path = self._segment_path(seq)
+        if not path.exists():
+            return None
+        keys = []
+        with open(path, 'rb') as f:
+            for line in f:
+                record = self._decode(line)
+                if record is not None:
+                    keys.append(str(record.get(self.key_field, '')))
+        return (min(keys), max(keys)) if keys else None
+
+    def total_size(self) -> int:
+        """所有分段的总字节数"""
+        return sum(path.stat().st_size for path in self.segment_paths() if path.exists())
+
+
+def keep_newest_records(store: JournalStore, limit: int) -> Callable[[List[int]], List[int]]:
+    """压缩策略：较新分段已包含至少limit条记录时，删除更旧的分段"""
+    def policy(closed_segments: List[int]) -> List[int]:
+        kept = store.count_records(store.active_segment)
+        removable = []
+        for seq in reversed(closed_segments):
+            if kept >= limit:
+                removable.append(seq)
+            else:
+                kept += store.count_records(seq)
+        return removable
+    return policy
+
+
+def keep_recent_keys(store: JournalStore, cutoff: Callable[[], str]) -> Callable[[List[int]], List[int]]:
+    """压缩策略：删除全部记录的键都早于cutoff()的分段"""
+    def policy(closed_segments: List[int]) -> List[int]:
+        cutoff_key = cutoff()
+        removable = []
+        for seq in closed_segments:
+            key_range = store.key_range(seq)
+            if key_range is None or key_range[1] < cutoff_key:
+                removable.append(seq)
+            else:
+                break
+        return removable
+    return policy
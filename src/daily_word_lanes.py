@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+每日单词墨水屏显示系统 - 内容通道
+Daily Word E-Paper Display System - Content Lanes
+
+单词、句子、诗词、天气、时钟和IP各自作为一个通道，拥有独立的有效期和获取函数；
+每次检查只刷新已过期的通道，并只把值真正发生变化的通道标记为需要重绘
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta, tzinfo
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from daily_word_scheduler import parse_interval
+
+logger = logging.getLogger(__name__)
+
+# 获取失败后的重试间隔(秒)，不超过通道本身的有效期
+RETRY_DELAY = 300
+
+
+def next_expiry(now: datetime, ttl) -> datetime:
+    """根据有效期计算过期时刻：daily/hourly对齐到下一个日历边界，其余按秒数"""
+    if ttl == 'daily':
+        return (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    if ttl == 'hourly':
+        return (now + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
+    seconds = parse_interval(ttl)
+    if not seconds:
+        raise ValueError(f"无效的有效期: {ttl}")
+    return now + timedelta(seconds=seconds)
+
+
+class ContentLane:
+    """一个独立过期的内容通道"""
+
+    def __init__(self, name: str, fetcher: Callable[[], Any], ttl,
+                 key: Optional[Callable[[Any], Any]] = None, scheduled: bool = False,
+                 refetch: Optional[Callable[[], Any]] = None):
+        """
+        初始化通道
+
+        参数:
+        - name: 通道名称
+        - fetcher: 获取通道最新值的函数，失败时返回None
+        - ttl: 有效期（秒数、'30m'形式或daily/hourly）
+        - key: 比较内容是否变化时使用的键函数（忽略时间戳等易变字段）
+        - scheduled: 定期刷新由调度器的频率任务（带随机延迟）强制触发，通道不按有效期自行过期；
+          首次获取和失败重试不受影响
+        - refetch: 强制获取新内容（忽略当天缓存）时使用的获取函数，默认与fetcher相同
+        """
+        self.name = name
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self.key = key or (lambda value: value)
+        self.scheduled = scheduled
+        self.refetch = refetch or fetcher
+        self._refetch_pending = False
+        next_expiry(datetime.now(), ttl)  # 校验配置
+        self.value: Any = None
+        self.fetched_at: Optional[datetime] = None
+        self.expires_at: Optional[datetime] = None
+        self.stale = True  # 尚未获取或被强制过期
+        self.fetch_count = 0
+        self.change_count = 0
+        self.error_count = 0
+        self.last_fetch_ms: Optional[float] = None
+
+    def seed(self, value: Any, fetched_at: datetime):
+        """用已持久化的值初始化通道（重启后不必立即重新获取）"""
+        self.value = value
+        self.fetched_at = fetched_at
+        self.expires_at = self._next_expiry(fetched_at)
+        self.stale = False
+
+    def _next_expiry(self, now: datetime) -> Optional[datetime]:
+        """成功获取后的过期时刻；由调度器驱动的通道没有自己的过期时刻"""
+        return None if self.scheduled else next_expiry(now, self.ttl)
+
+    def is_expired(self, now: datetime) -> bool:
+        return self.stale or (self.expires_at is not None and now >= self.expires_at)
+
+    def expire(self, refetch: bool = False):
+        """强制通道在下一次检查时刷新；refetch为True时忽略缓存获取新内容"""
+        self.stale = True
+        self._refetch_pending = self._refetch_pending or refetch
+
+    def refresh(self, now: datetime) -> bool:
+        """获取最新值，返回值是否发生变化；获取失败时保留旧值并稍后重试"""
+        fetcher = self.refetch if self._refetch_pending else self.fetcher
+        self._refetch_pending = False
+        start = time.perf_counter()
+        try:
+            value = fetcher()
+        except Exception as e:
+            logger.error(f"通道 {self.name} 获取失败: {e}")
+            value = None
+        self.last_fetch_ms = (time.perf_counter() - start) * 1000
+        self.fetch_count += 1
+        self.stale = False
+
+        if value is None:
+            self.error_count += 1
+            retry_at = now + timedelta(seconds=RETRY_DELAY)
+            self.expires_at = min(retry_at, next_expiry(now, self.ttl))
+            return False
+
+        self.fetched_at = now
+        self.expires_at = self._next_expiry(now)
+        if self.value is not None and self.key(value) == self.key(self.value):
+            logger.debug("通道 %s 已刷新，内容未变化", self.name)
+            return False
+        self.value = value
+        self.change_count += 1
+        logger.info(f"通道 {self.name} 内容已更新")
+        return True
+
+    def get_stats(self) -> Dict:
+        return {
+            'fetched_at': self.fetched_at.isoformat() if self.fetched_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+            'scheduled': self.scheduled,
+            'fetches': self.fetch_count,
+            'changes': self.change_count,
+            'errors': self.error_count,
+            'last_fetch_ms': round(self.last_fetch_ms, 1) if self.last_fetch_ms is not None else None,
+        }
+
+
+class LaneManager:
+    """管理全部内容通道"""
+
+    def __init__(self, tz: Optional[tzinfo] = None):
+        self.tz = tz
+        self.lanes: Dict[str, ContentLane] = {}
+
+    def _now(self) -> datetime:
+        # 通道时刻统一使用不带时区的本地墙上时间，便于与持久化的时间戳比较
+        return datetime.now(self.tz).replace(tzinfo=None)
+
+    def add(self, lane: ContentLane) -> ContentLane:
+        self.lanes[lane.name] = lane
+        return lane
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.lanes
+
+    def expire(self, names: Iterable[str], refetch: bool = False):
+        """强制指定通道过期（refetch为True时忽略缓存获取新内容）"""
+        for name in names:
+            if name in self.lanes:
+                self.lanes[name].expire(refetch)
+
+    def expired(self, now: Optional[datetime] = None) -> List[str]:
+        now = now or self._now()
+        return [name for name, lane in self.lanes.items() if lane.is_expired(now)]
+
+    def refresh_expired(self, now: Optional[datetime] = None) -> List[str]:
+        """刷新所有已过期的通道，返回内容发生变化的通道"""
+        now = now or self._now()
+        changed = []
+        for name in self.expired(now):
+            if self.lanes[name].refresh(now):
+                changed.append(name)
+        return changed
+
+    def values(self) -> Dict[str, Any]:
+        return {name: lane.value for name, lane in self.lanes.items()}
+
+    def seconds_until_next_expiry(self) -> float:
+        """距离最早一个通道过期的秒数（由调度器驱动的通道只计入待获取和失败重试）"""
+        now = self._now()
+        if any(lane.stale for lane in self.lanes.values()):
+            return 0.0
+        deadlines = [lane.expires_at for lane in self.lanes.values() if lane.expires_at]
+        return max(0.0, (min(deadlines) - now).total_seconds()) if deadlines else float('inf')
+
+    def get_stats(self) -> Dict:
+        return {name: lane.get_stats() for name, lane in self.lanes.items()}
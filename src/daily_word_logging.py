@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+每日单词墨水屏显示系统 - 日志管道
+Daily Word E-Paper Display System - Logging Pipeline
+
+所有日志记录先进入内存队列，由后台QueueListener线程写入控制台和按大小轮转的日志文件，
+更新流程中的日志调用不再等待SD卡写入。可选：
+- JSON行格式（structured），便于jq/日志采集工具解析
+- 轮转后的备份文件gzip压缩（compress_backups）
+- 环形缓冲模式（ring_buffer）：文件日志只保留在内存中，出现ERROR时连同之前的上下文一起写盘
+"""
+
+import atexit
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+from datetime import datetime
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+# 写入各模块专用日志文件的记录器
+API_LOGGERS = ('daily_word_api_client',)
+DISPLAY_LOGGERS = ('daily_word_display_controller', 'daily_word_epaper_controller')
+
+# 环形缓冲模式下每个文件默认在内存中保留的记录数
+DEFAULT_RING_BUFFER_SIZE = 1000
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录输出为一行JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class NameFilter(logging.Filter):
+    """只放行指定记录器（及其子记录器）的记录"""
+
+    def __init__(self, names: Iterable[str]):
+        super().__init__()
+        self.filters = [logging.Filter(name) for name in names]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return any(f.filter(record) for f in self.filters)
+
+
+class RingBufferHandler(MemoryHandler):
+    """
+    环形缓冲：在内存中保留最近capacity条记录，缓冲满时丢弃最旧的记录而不是写盘，
+    只有收到flushLevel及以上级别的记录时才把整个缓冲写入目标处理器
+    """
+
+    def __init__(self, capacity: int, target: logging.Handler, flush_level: int = logging.ERROR):
+        super().__init__(capacity, flushLevel=flush_level, target=target, flushOnClose=False)
+
+    def shouldFlush(self, record: logging.LogRecord) -> bool:
+        if len(self.buffer) > self.capacity:
+            del self.buffer[0]
+        return record.levelno >= self.flushLevel
+
+    def close(self):
+        try:
+            if self.target is not None:
+                self.target.close()
+        finally:
+            super().close()
+
+
+def _gzip_rotator(source: str, dest: str):
+    """轮转时将旧日志压缩为.gz备份"""
+    with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+def _file_handler(path: Path, settings: Dict, formatter: logging.Formatter,
+                  level: int = logging.NOTSET) -> RotatingFileHandler:
+    """按大小轮转的文件处理器，使用LOGGING_CONFIG中的max_file_size/backup_count"""
+    handler = RotatingFileHandler(
+        path,
+        maxBytes=settings.get('max_file_size', 0),
+        backupCount=settings.get('backup_count', 0),
+        encoding=settings.get('encoding', 'utf-8'),
+        delay=True,
+    )
+    if settings.get('compress_backups'):
+        handler.namer = lambda name: name + '.gz'
+        handler.rotator = _gzip_rotator
+    handler.setLevel(level)
+    handler.setFormatter(formatter)
+    return handler
+
+
+def setup_logging(config: Dict, logs_dir: Path) -> QueueListener:
+    """
+    配置根日志记录器：只挂一个QueueHandler，实际输出由后台线程完成。
+
+    参数:
+    - config: LOGGING_CONFIG
+    - logs_dir: 日志目录
+
+    返回:
+    - QueueListener: 已启动的后台写入线程（进程退出时自动停止并写完剩余记录）
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    logs_dir = Path(logs_dir)
+    logs_dir.mkdir(parents=True, exist_ok=True)
+    settings = config['log_settings']
+    log_files = config['log_files']
+
+    if settings.get('structured'):
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(settings['log_format'], settings['date_format'])
+
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter(settings['log_format'], settings['date_format']))
+
+    main_handler = _file_handler(logs_dir / log_files['main'], settings, formatter)
+    api_handler = _file_handler(logs_dir / log_files['api'], settings, formatter)
+    api_handler.addFilter(NameFilter(API_LOGGERS))
+    display_handler = _file_handler(logs_dir / log_files['display'], settings, formatter)
+    display_handler.addFilter(NameFilter(DISPLAY_LOGGERS))
+    error_handler = _file_handler(logs_dir / log_files['error'], settings, formatter, logging.ERROR)
+
+    file_handlers = [main_handler, api_handler, display_handler]
+    if settings.get('ring_buffer'):
+        capacity = settings.get('ring_buffer_size', DEFAULT_RING_BUFFER_SIZE)
+        rings = []
+        for handler in file_handlers:
+            ring = RingBufferHandler(capacity, handler)
+            # 过滤器放在环形缓冲上，避免其他模块的记录占用缓冲
+            for record_filter in handler.filters:
+                ring.addFilter(record_filter)
+            rings.append(ring)
+        file_handlers = rings
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, config['log_level'].upper()))
+    root.addHandler(QueueHandler(log_queue))
+
+    _listener = QueueListener(log_queue, console, *file_handlers, error_handler,
+                              respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def stop_logging():
+    """停止后台写入线程，写完队列中剩余的记录并关闭文件"""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    for handler in list(logging.getLogger().handlers):
+        if isinstance(handler, QueueHandler):
+            logging.getLogger().removeHandler(handler)
@@ -7,9 +7,11 @@ Daily Word E-Paper Display System - Main Program
 """
 
 import argparse
+import json
 import logging
 import signal
 import sys
+import threading
 import time
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -19,23 +21,36 @@ from typing import Dict, Optional
 sys.path.insert(0, str(Path(__file__).parent))
 
 from daily_word_config import (
-    PROJECT_NAME, PROJECT_VERSION, LOGGING_CONFIG, UPDATE_CONFIG,
-    FEATURE_FLAGS, DEBUG_CONFIG, DATA_DIR, LOGS_DIR
+    PROJECT_NAME, PROJECT_VERSION, LOGGING_CONFIG, UPDATE_CONFIG, CACHE_CONFIG,
+    FEATURE_FLAGS, DEBUG_CONFIG, MONITOR_CONFIG, SERVICE_CONFIG, DATA_DIR, LOGS_DIR,
+    EPAPER_CONFIG
 )
-from daily_word_api_client import DailyWordAPIClient
-from daily_word_file_manager import DailyWordFileManager
+from daily_word_drivers import get_driver_info
+
+# API客户端(requests)、显示控制器(PIL/spidev/gpiozero)、异步运行时等较重的模块
+# 只在第一次用到时导入，--status/--clear等一次性命令和定时器触发的启动不承担其开销
+
+_display_controller_class = None
+DISPLAY_TYPE = None
+
+
+def load_display_controller():
+    """导入显示控制器类：优先新的墨水屏控制器，失败时依次回退到旧的实现"""
+    global _display_controller_class, DISPLAY_TYPE
+    if _display_controller_class is None:
+        try:
+            from daily_word_epaper_controller import DailyWordEPaperController as DisplayController
+            DISPLAY_TYPE = "epaper"
+        except ImportError:
+            try:
+                from daily_word_display_epaper import DailyWordEPaperDisplay as DisplayController
+                DISPLAY_TYPE = "epaper_old"
+            except ImportError:
+                from daily_word_display_controller import DailyWordDisplayController as DisplayController
+                DISPLAY_TYPE = "original"
+        _display_controller_class = DisplayController
+    return _display_controller_class
 
-# 尝试导入新的显示控制器，如果失败则使用原来的
-try:
-    from daily_word_epaper_controller import DailyWordEPaperController as DisplayController
-    DISPLAY_TYPE = "epaper"
-except ImportError:
-    try:
-        from daily_word_display_epaper import DailyWordEPaperDisplay as DisplayController
-        DISPLAY_TYPE = "epaper_old"
-    except ImportError:
-        from daily_word_display_controller import DailyWordDisplayController as DisplayController
-        DISPLAY_TYPE = "original"
 
 class DailyWordSystem:
     """每日单词系统主类"""
@@ -47,128 +62,265 @@ class DailyWordSystem:
         
         self.logger.info(f"初始化 {PROJECT_NAME} v{PROJECT_VERSION}")
         
-        # 初始化组件
-        self.api_client = None
-        self.file_manager = None
-        self.display_controller = None
+        # 组件在第一次访问时创建（见下方属性）
+        self._api_client = None
+        self._file_manager = None
+        self._display_controller = None
+        self._profiler = None
+        self.runtime = None
+        self.lanes = None
         self.running = False
+        self._stop_event = threading.Event()
         
         # 设置信号处理
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
         
-        try:
-            self.file_manager = DailyWordFileManager()
-            self.api_client = DailyWordAPIClient()
-            self.display_controller = DisplayController()
-            self.logger.info(f"系统组件初始化完成 (显示类型: {DISPLAY_TYPE})")
-        except Exception as e:
-            self.logger.error(f"系统初始化失败: {e}")
-            raise
+        if DEBUG_CONFIG.get('performance_profiling'):
+            self.profiler.enable()
+    
+    @property
+    def file_manager(self):
+        """文件管理器"""
+        if self._file_manager is None:
+            from daily_word_file_manager import DailyWordFileManager
+            self._file_manager = DailyWordFileManager()
+        return self._file_manager
+    
+    @property
+    def api_client(self):
+        """API客户端（缓存写入并入文件管理器的事务，一次更新只做一次持久化提交）"""
+        if self._api_client is None:
+            from daily_word_api_client import DailyWordAPIClient
+            api_client = DailyWordAPIClient()
+            api_client.persistence = self.file_manager
+            self._api_client = api_client
+        return self._api_client
+    
+    @property
+    def display_controller(self):
+        """显示控制器（启用性能分析时同时为其加上分段计时）"""
+        if self._display_controller is None:
+            try:
+                self._display_controller = load_display_controller()()
+            except Exception as e:
+                self.logger.error(f"显示控制器初始化失败: {e}")
+                raise
+            self.logger.info(f"显示控制器初始化完成 (显示类型: {DISPLAY_TYPE})")
+            if self.profiler.enabled:
+                self.profiler.instrument_controller(self._display_controller)
+        return self._display_controller
+    
+    @property
+    def profiler(self):
+        """性能分析器"""
+        if self._profiler is None:
+            from daily_word_profiler import Profiler
+            self._profiler = Profiler(LOGS_DIR / 'profile')
+        return self._profiler
     
     def setup_logging(self):
-        """设置日志系统"""
-        # 确保日志目录存在
-        LOGS_DIR.mkdir(parents=True, exist_ok=True)
-        
-        # 配置日志格式
-        log_format = LOGGING_CONFIG['log_settings']['log_format']
-        date_format = LOGGING_CONFIG['log_settings']['date_format']
-        log_level = getattr(logging, LOGGING_CONFIG['log_level'].upper())
-        
-        # 配置根日志记录器
-        logging.basicConfig(
-            level=log_level,
-            format=log_format,
-            datefmt=date_format,
-            handlers=[
-                logging.StreamHandler(sys.stdout),
-                logging.FileHandler(
-                    LOGS_DIR / LOGGING_CONFIG['log_files']['main'],
-                    encoding=LOGGING_CONFIG['log_settings']['encoding']
-                )
-            ]
-        )
-        
-        # 配置特定模块的日志
-        api_logger = logging.getLogger('daily_word_api_client')
-        api_handler = logging.FileHandler(
-            LOGS_DIR / LOGGING_CONFIG['log_files']['api'],
-            encoding=LOGGING_CONFIG['log_settings']['encoding']
-        )
-        api_handler.setFormatter(logging.Formatter(log_format, date_format))
-        api_logger.addHandler(api_handler)
-        
-        display_logger = logging.getLogger('daily_word_display_controller')
-        display_handler = logging.FileHandler(
-            LOGS_DIR / LOGGING_CONFIG['log_files']['display'],
-            encoding=LOGGING_CONFIG['log_settings']['encoding']
-        )
-        display_handler.setFormatter(logging.Formatter(log_format, date_format))
-        display_logger.addHandler(display_handler)
-        
-        # 错误日志
-        error_handler = logging.FileHandler(
-            LOGS_DIR / LOGGING_CONFIG['log_files']['error'],
-            encoding=LOGGING_CONFIG['log_settings']['encoding']
-        )
-        error_handler.setLevel(logging.ERROR)
-        error_handler.setFormatter(logging.Formatter(log_format, date_format))
-        logging.getLogger().addHandler(error_handler)
+        """设置日志系统：日志经队列由后台线程写入按大小轮转的文件，不阻塞更新流程"""
+        from daily_word_logging import setup_logging
+        setup_logging(LOGGING_CONFIG, LOGS_DIR)
     
     def _signal_handler(self, signum, frame):
         """信号处理器"""
         self.logger.info(f"接收到信号 {signum}，准备退出...")
         self.running = False
+        # 唤醒正在等待下一次触发的调度器
+        self._stop_event.set()
+    
+    def fetch_content(self, force_new: bool = False) -> Optional[Dict]:
+        """获取要显示的内容：当前内容有效时直接复用，否则从API获取并保存"""
+        # 检查是否需要强制更新或内容已过期（内存快照，文件未变化时只需一次stat）
+        if not force_new and self.file_manager.is_content_current():
+            content = self.file_manager.get_content_snapshot()
+            if content:
+                self.logger.info("使用当前有效的文件内容")
+                return content
+        
+        # 获取新内容：网络请求期间缓存写入先暂存，请求结束后缓存、当前内容、历史和日志在同一事务中提交
+        self.logger.info("获取新的每日内容...")
+        content = None
+        self.api_client.defer_cache_writes()
+        try:
+            content = self.api_client.get_daily_content(force_new=True)
+        finally:
+            with self.file_manager.transaction() as txn:
+                self.api_client.flush_cache_writes()
+                if content and (content.get('word') or content.get('quote')):
+                    # 保存新内容到文件
+                    word_data = content.get('word', {})
+                    quote_data = content.get('quote', {})
+                    self.file_manager.save_current_content(word_data, quote_data)
+        
+        if not content or (not content.get('word') and not content.get('quote')):
+            self.logger.warning("未获取到有效内容，尝试使用文件缓存")
+            # 尝试使用文件中的内容
+            cached_content = self.file_manager.load_current_content()
+            if cached_content:
+                self.logger.info("使用文件缓存内容")
+                return cached_content
+            self.logger.error("无法获取任何有效内容")
+            return None
+        
+        if txn.committed:
+            self.logger.info("新内容已保存到文件")
+        else:
+            self.logger.warning("保存内容到文件失败")
+        return content
+    
+    def _create_lanes(self):
+        """按配置创建内容通道，单词和句子使用content_strategy中的更新频率"""
+        from daily_word_lanes import ContentLane, LaneManager
+        from daily_word_scheduler import load_timezone
+        
+        lane_config = UPDATE_CONFIG.get('lanes', {})
+        strategy = UPDATE_CONFIG.get('content_strategy', {})
+        lanes = LaneManager(load_timezone(UPDATE_CONFIG['scheduled'].get('timezone')))
+        
+        def without_timestamp(data):
+            # 获取时间戳每次都会变化，不参与内容比较
+            return {k: v for k, v in data.items() if k != 'fetched_at'} if isinstance(data, dict) else data
+        
+        scheduled = self._scheduled_content()
+        word_frequency = strategy.get('word_update_frequency', 'daily')
+        quote_frequency = strategy.get('quote_update_frequency', 'daily')
+        refetchers = {
+            'word': lambda: self.api_client.get_word_of_day(force_new=True),
+            'quote': lambda: self.api_client.get_daily_quote(force_new=True),
+        }
+        fetchers = {
+            # 每日频率时复用当天缓存，过期（跨天）后自然获取新内容
+            'word': (lambda: self.api_client.get_word_of_day(force_new=word_frequency != 'daily'),
+                     word_frequency),
+            'quote': (lambda: self.api_client.get_daily_quote(force_new=quote_frequency != 'daily'),
+                      quote_frequency),
+            'poem': (self._fetch_poem_lane, None),
+            'weather': (self._fetch_weather_lane, None),
+            'clock': (lambda: datetime.now().strftime(lane_config.get('clock', {}).get('format', '%Y-%m-%d %H:%M')),
+                      None),
+            'ip': (self._fetch_ip_lane, None),
+        }
+        
+        for name, (fetcher, frequency) in fetchers.items():
+            config = lane_config.get(name, {})
+            if not config.get('enabled', name in ('word', 'quote')):
+                continue
+            lane = ContentLane(name, fetcher, config.get('ttl') or frequency or 'daily',
+                               key=without_timestamp, scheduled=name in scheduled,
+                               refetch=refetchers.get(name))
+            lanes.add(lane)
+        
+        # 当前内容仍有效时直接作为单词/句子通道的初始值，重启后不重新请求API
+        snapshot = self.file_manager.get_content_snapshot()
+        if snapshot and self.file_manager.is_content_current():
+            fetched_at = datetime.fromtimestamp(snapshot.get('timestamp', time.time()))
+            for name in ('word', 'quote'):
+                if name in lanes and snapshot.get(name):
+                    lanes.lanes[name].seed(snapshot[name], fetched_at)
+        
+        self.logger.info(f"内容通道: {', '.join(lanes.lanes)}")
+        return lanes
+    
+    def _fetch_poem_lane(self) -> Optional[Dict]:
+        """诗词通道：从本地诗词库读取当日诗词"""
+        from class_poem_repository import DEFAULT_DB_PATH, get_repository
+        poem = get_repository(DEFAULT_DB_PATH).daily_poem()
+        if not poem:
+            return None
+        return dict(zip(('title', 'dynasty', 'author', 'content', 'full_content'), poem[1:6]))
+    
+    def _fetch_weather_lane(self) -> Optional[Dict]:
+        """天气通道（天气服务按城市缓存，未过期时不发请求）"""
+        from get_config import get_config_value
+        from daily_word_weather import get_weather_service
+        data = get_weather_service().get_current(get_config_value('CITY_API_KEY'))
+        if not data or 'current' not in data:
+            return None
+        condition = data['current'].get('condition', {})
+        return {
+            'city': data.get('location', {}).get('name'),
+            'condition': condition.get('text'),
+            'icon': condition.get('icon'),
+            'temp_c': data['current'].get('temp_c'),
+        }
+    
+    def _fetch_ip_lane(self) -> Optional[str]:
+        """IP通道（遥测采样器通过netlink跟踪地址变化，这里只读内存）"""
+        from daily_word_telemetry import get_ip_address
+        return get_ip_address()
+    
+    def refresh_lanes(self, force_lanes=(), force_new: bool = False) -> Dict:
+        """
+        刷新已过期的通道（单词/句子变化时在同一事务中保存当前内容）。
+        
+        参数:
+        - force_lanes: 强制刷新的通道
+        - force_new: 强制刷新的单词/句子通道忽略当天缓存，重新请求API
+        
+        返回:
+        - dict: values为全部通道当前值，changed为内容发生变化的通道。
+        """
+        if self.lanes is None:
+            self.lanes = self._create_lanes()
+        self.lanes.expire(force_lanes, refetch=force_new)
+        
+        # 通道获取（网络请求）在事务之外进行，事务只包住缓存和当前内容的写入
+        changed = []
+        self.api_client.defer_cache_writes()
+        try:
+            changed = self.lanes.refresh_expired()
+        finally:
+            with self.file_manager.transaction():
+                self.api_client.flush_cache_writes()
+                values = self.lanes.values()
+                if 'word' in changed or 'quote' in changed:
+                    self.file_manager.save_current_content(values.get('word') or {}, values.get('quote') or {})
+        
+        return {'values': values, 'changed': changed}
+    
+    @staticmethod
+    def lanes_to_content(values: Dict) -> Dict:
+        """将通道值组装为显示控制器使用的内容格式"""
+        return {
+            'word': values.get('word') or {},
+            'quote': values.get('quote') or {},
+            'date': datetime.now().strftime('%Y-%m-%d'),
+        }
+    
+    def show_content(self, content: Dict):
+        """将内容交给当前类型的显示控制器"""
+        controller = self.display_controller
+        if DISPLAY_TYPE in ["epaper", "epaper_old"]:
+            controller.display_daily_content(content)
+        else:
+            controller.display_content(content)
+    
+    def enable_profiling(self):
+        """启用性能分析：更新会话、驱动分段计时和绘制内存快照"""
+        self.profiler.enable()
+        if self._display_controller is not None:
+            self.profiler.instrument_controller(self._display_controller)
+        self.logger.info(f"性能分析已启用，结果输出到 {self.profiler.output_dir}")
     
     def update_display(self, force_new: bool = False) -> bool:
         """更新显示内容"""
+        with self.profiler.session('update_display'):
+            return self._update_display(force_new)
+    
+    def _update_display(self, force_new: bool = False) -> bool:
+        """更新显示内容（获取、显示并记录）"""
         try:
             self.logger.info("开始更新显示内容...")
             
-            # 检查是否需要强制更新或内容已过期
-            if not force_new and self.file_manager.is_content_current():
-                self.logger.info("使用当前有效的文件内容")
-                content = self.file_manager.load_current_content()
-                if content:
-                    # 显示内容
-                    if DISPLAY_TYPE in ["epaper", "epaper_old"]:
-                        self.display_controller.display_daily_content(content)
-                    else:
-                        self.display_controller.display_content(content)
-                    
-                    self._log_update_info(content)
-                    self.logger.info("显示内容更新完成（使用文件缓存）")
-                    return True
-            
-            # 获取新内容
-            self.logger.info("获取新的每日内容...")
-            content = self.api_client.get_daily_content(force_new=True)
-            
-            if not content or (not content.get('word') and not content.get('quote')):
-                self.logger.warning("未获取到有效内容，尝试使用文件缓存")
-                # 尝试使用文件中的内容
-                cached_content = self.file_manager.load_current_content()
-                if cached_content:
-                    content = cached_content
-                    self.logger.info("使用文件缓存内容")
-                else:
-                    self.logger.error("无法获取任何有效内容")
-                    return False
-            else:
-                # 保存新内容到文件
-                word_data = content.get('word', {})
-                quote_data = content.get('quote', {})
-                if self.file_manager.save_current_content(word_data, quote_data):
-                    self.logger.info("新内容已保存到文件")
-                else:
-                    self.logger.warning("保存内容到文件失败")
+            content = self.fetch_content(force_new)
+            if not content:
+                return False
             
             # 显示内容
-            if DISPLAY_TYPE in ["epaper", "epaper_old"]:
-                self.display_controller.display_daily_content(content)
-            else:
-                self.display_controller.display_content(content)
+            self.show_content(content)
             
             # 记录更新信息
             self._log_update_info(content)
@@ -209,10 +361,7 @@ class DailyWordSystem:
                 return False
             
             # 显示内容
-            if DISPLAY_TYPE in ["epaper", "epaper_old"]:
-                self.display_controller.display_daily_content(content)
-            else:
-                self.display_controller.display_content(content)
+            self.show_content(content)
             
             # 记录显示信息
             self._log_update_info(content)
@@ -252,10 +401,7 @@ class DailyWordSystem:
             
             # 测试显示控制器
             self.logger.info("测试显示控制器...")
-            if DISPLAY_TYPE in ["epaper", "epaper_old"]:
-                self.display_controller.display_daily_content(test_content)
-            else:
-                self.display_controller.display_content(test_content)
+            self.show_content(test_content)
             self.logger.info("显示控制器测试通过")
             
             self.logger.info("系统测试完成")
@@ -265,67 +411,97 @@ class DailyWordSystem:
             self.logger.error(f"系统测试失败: {e}")
             return False
     
+    @staticmethod
+    def _scheduled_content() -> Dict[str, str]:
+        """由调度器频率任务驱动的内容通道及其更新频率"""
+        from daily_word_scheduler import FREQUENCY_TIMES, parse_interval
+        
+        strategy = UPDATE_CONFIG.get('content_strategy', {})
+        scheduled = {}
+        for name in ('word', 'quote'):
+            frequency = strategy.get(f'{name}_update_frequency')
+            if frequency in FREQUENCY_TIMES or (frequency and parse_interval(frequency)):
+                scheduled[name] = frequency
+        return scheduled
+    
+    def _create_scheduler(self):
+        """创建调度器，并注册内容更新频率任务"""
+        from daily_word_scheduler import UpdateScheduler
+        
+        scheduled_config = UPDATE_CONFIG['scheduled']
+        scheduler = UpdateScheduler(
+            timezone=scheduled_config.get('timezone'),
+            jitter=scheduled_config.get('random_delay', 0),
+            stop_event=self._stop_event,
+        )
+        
+        # 单词/句子只由带随机延迟的频率任务刷新，不随通道在零点过期而提前或重复获取
+        for name, frequency in self._scheduled_content().items():
+            scheduler.add_frequency(f'content:{name}', frequency)
+        
+        # 其余通道按自己的有效期过期（如时钟每小时、IP每10分钟），最早的过期时刻也唤醒调度器
+        scheduler.add_deadline(
+            'lanes', lambda: self.lanes.seconds_until_next_expiry() if self.lanes is not None else float('inf'))
+        return scheduler
+    
+    def _run_scheduler(self, scheduler, mode_name: str):
+        """在异步运行时上执行调度循环：获取、绘制与写屏分阶段并行，收到退出信号立即返回"""
+        import asyncio
+        from daily_word_metrics import MetricsService
+        from daily_word_runtime import DailyWordRuntime
+        from daily_word_systemd import SystemdNotifier
+        from daily_word_telemetry import get_sampler
+        
+        self.running = True
+        self._stop_event.clear()
+        
+        # 守护进程启动后台遥测采样（状态查询和绘制都读取其内存值）
+        get_sampler()
+        
+        self.runtime = DailyWordRuntime(
+            self, notifier=SystemdNotifier(),
+            stall_timeout=MONITOR_CONFIG.get('watchdog_stall_timeout', 600),
+        )
+        metrics_service = None
+        if MONITOR_CONFIG.get('enable_monitoring'):
+            metrics_service = MetricsService(MONITOR_CONFIG)
+            metrics_service.start()
+        try:
+            asyncio.run(self.runtime.run(scheduler, mode_name,
+                                         control_socket=SERVICE_CONFIG.get('control_socket')))
+        except Exception as e:
+            self.logger.error(f"{mode_name}运行错误: {e}")
+        finally:
+            self.running = False
+            if metrics_service:
+                metrics_service.stop()
+    
     def run_scheduled_mode(self):
         """运行定时模式"""
         self.logger.info("启动定时更新模式...")
-        self.running = True
         
         # 获取更新时间配置
         update_times = UPDATE_CONFIG['scheduled']['update_times']
-        self.logger.info(f"定时更新时间: {', '.join(update_times)}")
-        
-        # 立即执行一次更新
-        self.update_display()
-        
-        while self.running:
-            try:
-                current_time = datetime.now().strftime('%H:%M')
-                
-                # 检查是否到了更新时间
-                if current_time in update_times:
-                    self.logger.info(f"定时更新触发: {current_time}")
-                    self.update_display()
-                    
-                    # 等待一分钟，避免重复触发
-                    time.sleep(60)
-                
-                # 每分钟检查一次
-                time.sleep(60)
-                
-            except Exception as e:
-                self.logger.error(f"定时模式运行错误: {e}")
-                time.sleep(60)
+        self.logger.info(f"定时更新时间: {', '.join(update_times)} "
+                         f"(时区: {UPDATE_CONFIG['scheduled'].get('timezone', '本地')}, "
+                         f"随机延迟: {UPDATE_CONFIG['scheduled'].get('random_delay', 0)}秒)")
         
-        self.logger.info("定时更新模式已停止")
+        scheduler = self._create_scheduler()
+        scheduler.add_times('scheduled', update_times)
+        self._run_scheduler(scheduler, "定时更新模式")
     
     def run_interval_mode(self):
         """运行间隔模式"""
-        interval = UPDATE_CONFIG['interval']['update_interval']
+        interval_config = UPDATE_CONFIG['interval']
+        interval = interval_config['update_interval']
+        # 限制在配置的最小/最大间隔之间
+        interval = max(interval_config.get('min_interval', interval),
+                       min(interval, interval_config.get('max_interval', interval)))
         self.logger.info(f"启动间隔更新模式，间隔: {interval}秒")
-        self.running = True
-        
-        # 立即执行一次更新
-        self.update_display()
-        
-        while self.running:
-            try:
-                self.logger.debug(f"等待 {interval} 秒后进行下次更新...")
-                
-                # 分段等待，以便响应退出信号
-                wait_time = 0
-                while wait_time < interval and self.running:
-                    time.sleep(min(60, interval - wait_time))
-                    wait_time += 60
-                
-                if self.running:
-                    self.logger.info("间隔更新触发")
-                    self.update_display()
-                
-            except Exception as e:
-                self.logger.error(f"间隔模式运行错误: {e}")
-                time.sleep(60)
         
-        self.logger.info("间隔更新模式已停止")
+        scheduler = self._create_scheduler()
+        scheduler.add_interval('interval', interval)
+        self._run_scheduler(scheduler, "间隔更新模式")
     
     def run_daemon_mode(self):
         """运行守护进程模式"""
@@ -347,19 +523,29 @@ class DailyWordSystem:
     def get_system_status(self) -> Dict:
         """获取系统状态"""
         try:
-            # 获取缓存统计
-            cache_stats = self.api_client.get_cache_stats() if self.api_client else {}
+            from daily_word_metrics import metrics
+            
+            # 获取缓存统计（API客户端尚未创建时直接读取缓存文件，不为查询状态导入requests）
+            cache_stats = self._api_client.get_cache_stats() if self._api_client else self._read_cache_stats()
             
             # 获取文件管理器统计
-            file_stats = self.file_manager.get_file_stats() if self.file_manager else {}
+            file_stats = self.file_manager.get_file_stats()
             
-            # 获取系统信息（包括IP地址）
+            # 当前内容（复用文件管理器的内存快照）
+            snapshot = self.file_manager.get_content_snapshot()
+            
+            # 获取系统信息（包括IP地址）：守护进程读取后台采样器的内存读数，
+            # 一次性查询（--status）只同步读取一次，不为此启动采样线程和netlink监听
             try:
-                from word_config_rpi import get_system_info
-                sys_info = get_system_info()
+                from daily_word_telemetry import peek_sampler, read_once
+                sampler = peek_sampler()
+                if sampler is not None:
+                    sys_info, telemetry_stats = sampler.latest(), sampler.get_stats()
+                else:
+                    sys_info, telemetry_stats = read_once(), None
             except Exception as e:
                 self.logger.warning(f"获取系统信息失败: {e}")
-                sys_info = {}
+                sys_info, telemetry_stats = {}, None
             
             # 系统状态
             status = {
@@ -370,12 +556,31 @@ class DailyWordSystem:
                     'timestamp': datetime.now().isoformat(),
                     'ip_address': sys_info.get('ip_address'),
                     'cpu_temperature': sys_info.get('cpu_temperature'),
+                    'memory_available': sys_info.get('memory_available'),
+                    'disk_free': sys_info.get('disk_free'),
                 },
                 'components': {
-                    'api_client': self.api_client is not None,
-                    'display_controller': self.display_controller is not None,
-                    'file_manager': self.file_manager is not None,
+                    'api_client': self._api_client is not None,
+                    'display_controller': self._display_controller is not None,
+                    'file_manager': self._file_manager is not None,
+                },
+                'current_content': {
+                    'date': snapshot.get('date'),
+                    'generated_at': snapshot.get('generated_at'),
+                    'word': (snapshot.get('word') or {}).get('word'),
+                    'quote_author': (snapshot.get('quote') or {}).get('author'),
+                } if snapshot else None,
+                'pipeline': self.runtime.get_stats() if self.runtime else None,
+                'lanes': self.lanes.get_stats() if self.lanes else None,
+                'telemetry': telemetry_stats,
+                'panel': session.get_stats() if (session := getattr(self._display_controller, 'session', None)) else None,
+                'refresh': policy.get_stats() if (policy := getattr(self._display_controller, 'policy', None)) else None,
+                'power': power.get_stats() if (power := getattr(self._display_controller, 'power', None)) else None,
+                'driver': {
+                    'model': EPAPER_CONFIG['model'],
+                    'modes': get_driver_info(EPAPER_CONFIG['model'])['modes'],
                 },
+                'metrics': metrics.snapshot(),
                 'cache': cache_stats,
                 'files': file_stats,
                 'config': {
@@ -391,17 +596,35 @@ class DailyWordSystem:
             self.logger.error(f"获取系统状态失败: {e}")
             return {'error': str(e)}
     
+    def _read_cache_stats(self) -> Dict:
+        """不创建API客户端，直接从缓存文件读取统计信息"""
+        stats = {}
+        for name, key in (('word', 'word_cache'), ('quote', 'quote_cache')):
+            cache_file = DATA_DIR / CACHE_CONFIG['cache_files'][key]
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    cache = json.load(f)
+                size = cache_file.stat().st_size
+            except (OSError, ValueError):
+                cache, size = {}, 0
+            stats[f'{name}_cache_size'] = len(cache)
+            stats[f'{name}_cache_file_size'] = size
+            stats[f'last_{name}_date'] = max(cache.keys()) if cache else None
+        return stats
+    
     def cleanup(self):
-        """清理资源"""
+        """清理资源（只清理已经创建的组件）"""
         self.logger.info("清理系统资源...")
         
         try:
-            if self.display_controller:
-                self.display_controller.cleanup()
+            if self._display_controller:
+                self._display_controller.cleanup()
             
-            if self.api_client:
+            if self._api_client:
                 # API客户端清理旧缓存
-                self.api_client.cleanup_old_cache()
+                with self.file_manager.transaction():
+                    self._api_client.cleanup_old_cache()
+                self.file_manager.checkpoint()
             
             self.logger.info("系统资源清理完成")
             
@@ -421,6 +644,7 @@ def create_argument_parser():
   %(prog)s --test             # 测试系统功能
   %(prog)s --status           # 显示系统状态
   %(prog)s --force            # 强制获取新内容
+  %(prog)s --profile          # 分析单次更新的性能
         """
     )
     
@@ -454,6 +678,12 @@ def create_argument_parser():
         help='强制获取新内容'
     )
     
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='对单次更新做完整的性能分析（结果写入logs/profile）'
+    )
+    
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
@@ -497,11 +727,21 @@ def main():
             print(f"  版本: {status['system']['version']}")
             print(f"  运行状态: {'运行中' if status['system']['running'] else '已停止'}")
             print(f"  时间戳: {status['system']['timestamp']}")
-            print(f"  API客户端: {'正常' if status['components']['api_client'] else '异常'}")
-            print(f"  显示控制器: {'正常' if status['components']['display_controller'] else '异常'}")
+            print(f"  API客户端: {'已加载' if status['components']['api_client'] else '按需加载'}")
+            print(f"  显示控制器: {'已加载' if status['components']['display_controller'] else '按需加载'}")
             print(f"  缓存统计: 单词 {status['cache'].get('word_cache_size', 0)} 条, 句子 {status['cache'].get('quote_cache_size', 0)} 条")
+            if status.get('current_content'):
+                print(f"  当前内容: {status['current_content']['word']} ({status['current_content']['date']})")
             sys.exit(0)
         
+        elif args.profile:
+            system.enable_profiling()
+            success = system.update_display(force_new=args.force)
+            print("性能分析结果:")
+            for path in system.profiler.outputs:
+                print(f"  {path}")
+            sys.exit(0 if success else 1)
+        
         elif args.daemon:
             system.run_daemon_mode()
         
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+每日单词墨水屏显示系统 - 运行指标
+Daily Word E-Paper Display System - Metrics
+
+进程内的计数器、直方图和仪表：API延迟、缓存命中、绘制/打包耗时、SPI吞吐、BUSY等待、
+刷新次数以及CPU温度和内存。通过本地HTTP /metrics 端点以Prometheus文本格式导出，
+并周期性写入固定大小的环形文件，避免在SD卡上无限增长。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 默认直方图分桶(秒)：覆盖毫秒级绘制到数十秒的整屏刷新
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (f'{k}="{v}"'.replace('\n', ' ') for k, v in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """单调递增计数器"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def expose(self) -> List[str]:
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in self.values.items()]
+
+    def snapshot(self) -> Dict:
+        return {_format_labels(key) or '_': value for key, value in self.values.items()}
+
+
+class Gauge(Counter):
+    """可任意设置的仪表"""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        self.values[_label_key(labels)] = value
+
+
+class Histogram:
+    """固定分桶的直方图"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        # 每组标签: [各桶计数..., 总和, 总数]
+        self.values: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        data = self.values.get(key)
+        if data is None:
+            data = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                data[index] += 1
+                break
+        data[-2] += value
+        data[-1] += 1
+
+    def expose(self) -> List[str]:
+        lines = []
+        for key, data in self.values.items():
+            cumulative = 0
+            for index, bound in enumerate(self.buckets):
+                cumulative += data[index]
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {data[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {data[-2]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {data[-1]}")
+        return lines
+
+    def snapshot(self) -> Dict:
+        return {_format_labels(key) or '_': {'sum': round(data[-2], 6), 'count': data[-1]}
+                for key, data in self.values.items()}
+
+
+class MetricsRegistry:
+    """指标注册表（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, object] = {}
+        self.started_at = time.time()
+
+    def _get(self, cls, name: str, help_text: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name: str, help_text: str = '') -> Counter:
+        return self._get(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str = '') -> Gauge:
+        return self._get(Gauge, name, help_text)
+
+    def histogram(self, name: str, help_text: str = '', buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    def inc(self, name: str, amount: float = 1, **labels):
+        metric = self.counter(name)
+        with self._lock:
+            metric.inc(amount, **labels)
+
+    def set(self, name: str, value: float, **labels):
+        metric = self.gauge(name)
+        with self._lock:
+            metric.set(value, **labels)
+
+    def observe(self, name: str, value: float, **labels):
+        metric = self.histogram(name)
+        with self._lock:
+            metric.observe(value, **labels)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """记录代码块耗时(秒)到直方图"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def expose(self) -> str:
+        """Prometheus文本格式"""
+        lines = []
+        with self._lock:
+            for name, metric in sorted(self._metrics.items()):
+                if metric.help:
+                    lines.append(f"# HELP {name} {metric.help}")
+                lines.append(f"# TYPE {name} {metric.kind}")
+                lines.extend(metric.expose())
+        lines.append(f"daily_word_uptime_seconds {time.time() - self.started_at:.0f}")
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> Dict:
+        """紧凑快照（直方图只保留总和与次数），用于环形文件和系统状态"""
+        with self._lock:
+            return {name: metric.snapshot() for name, metric in sorted(self._metrics.items())}
+
+
+# 全局注册表，各模块直接使用
+metrics = MetricsRegistry()
+
+metrics.histogram('daily_word_api_request_seconds', 'API请求耗时(按端点)')
+metrics.counter('daily_word_api_requests_total', 'API请求次数(按端点和结果)')
+metrics.counter('daily_word_cache_requests_total', '缓存查询次数(按缓存和命中结果)')
+metrics.histogram('daily_word_render_seconds', '画面绘制耗时')
+metrics.histogram('daily_word_pack_seconds', '图像打包为显示缓冲区的耗时')
+metrics.counter('daily_word_spi_bytes_total', '通过SPI发送的字节数')
+metrics.counter('daily_word_spi_seconds_total', 'SPI传输累计耗时')
+metrics.gauge('daily_word_spi_bytes_per_second', '最近一次帧传输的SPI吞吐')
+metrics.histogram('daily_word_epd_busy_seconds', '等待墨水屏BUSY的耗时')
+metrics.counter('daily_word_epd_refresh_total', '墨水屏刷新次数(按模式)')
+metrics.gauge('daily_word_cpu_temperature_celsius', 'CPU温度')
+metrics.gauge('daily_word_memory_bytes', '内存(按类型)')
+
+
+def instrument_driver(epd, registry: MetricsRegistry = metrics):
+    """
+    为墨水屏驱动实例包装计时：getbuffer计入打包耗时，display计入SPI字节数和吞吐，
+    ReadBusy计入BUSY等待。只替换实例属性，不修改驱动代码。
+    """
+    if getattr(epd, '_metrics_instrumented', False):
+        return epd
+
+    def wrap(method_name: str, after: Callable[[float, tuple], None]):
+        method = getattr(epd, method_name, None)
+        if method is None:
+            return
+
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                after(time.perf_counter() - start, args)
+
+        setattr(epd, method_name, wrapper)
+
+    def after_display(elapsed: float, args: tuple):
+        size = sum(len(arg) for arg in args if hasattr(arg, '__len__'))
+        registry.inc('daily_word_spi_bytes_total', size)
+        registry.inc('daily_word_spi_seconds_total', elapsed)
+        if elapsed > 0:
+            registry.set('daily_word_spi_bytes_per_second', size / elapsed)
+
+    wrap('getbuffer', lambda elapsed, args: registry.observe('daily_word_pack_seconds', elapsed))
+    wrap('display', after_display)
+    wrap('ReadBusy', lambda elapsed, args: registry.observe('daily_word_epd_busy_seconds', elapsed))
+    epd._metrics_instrumented = True
+    return epd
+
+
+def sample_system(registry: MetricsRegistry = metrics):
+    """将遥测采样器的CPU温度和内存读数写入指标，并采样本进程RSS"""
+    from daily_word_telemetry import get_sampler
+    latest = get_sampler().latest()
+    if latest.get('cpu_temperature') is not None:
+        registry.set('daily_word_cpu_temperature_celsius', latest['cpu_temperature'])
+    for field in ('memory_total', 'memory_available'):
+        if latest.get(field) is not None:
+            registry.set('daily_word_memory_bytes', latest[field], type=field.split('_')[1])
+
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+            registry.set('daily_word_memory_bytes', resident_pages * os.sysconf('SC_PAGE_SIZE'),
+                         type='process_rss')
+    except (OSError, ValueError, IndexError):
+        pass
+
+
+class RingFile:
+    """
+    固定大小的环形记录文件：slots个槽位，每槽slot_size字节，循环覆盖。
+    每条记录是一行JSON并以空格补齐，带序号seq以便找到最新记录。
+    """
+
+    def __init__(self, path: Path, slots: int = 288, slot_size: int = 4096):
+        self.path = Path(path)
+        self.slots = slots
+        self.slot_size = slot_size
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        records = self.read_all()
+        self.seq = records[-1]['seq'] if records else 0
+
+    def _encode(self, record: Dict) -> Optional[bytes]:
+        data = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if len(data) > self.slot_size - 1:
+            return None
+        return data.ljust(self.slot_size - 1, b' ') + b'\n'
+
+    def _envelope(self, record: Dict) -> Dict:
+        return {'seq': self.seq + 1, 'ts': round(time.time()), **record}
+
+    def fits(self, record: Dict) -> bool:
+        """记录加上序号和时间戳后能否放入一个槽位"""
+        return self._encode(self._envelope(record)) is not None
+
+    def append(self, record: Dict) -> bool:
+        """写入下一个槽位（文件大小始终为 slots * slot_size）；超过槽位大小的记录不写入"""
+        record = self._envelope(record)
+        data = self._encode(record)
+        if data is None:
+            logger.warning(f"指标记录超过槽位大小 {self.slot_size} 字节，已跳过")
+            return False
+        try:
+            mode = 'r+b' if self.path.exists() else 'w+b'
+            with open(self.path, mode) as f:
+                if f.seek(0, os.SEEK_END) < self.slots * self.slot_size:
+                    f.truncate(self.slots * self.slot_size)
+                f.seek(((record['seq'] - 1) % self.slots) * self.slot_size)
+                f.write(data)
+            self.seq = record['seq']
+            return True
+        except OSError as e:
+            logger.error(f"写入指标环形文件失败 {self.path}: {e}")
+            return False
+
+    def read_all(self) -> List[Dict]:
+        """读取全部有效记录（按序号升序）"""
+        records = []
+        try:
+            with open(self.path, 'rb') as f:
+                while True:
+                    chunk = f.read(self.slot_size)
+                    if not chunk:
+                        break
+                    try:
+                        record = json.loads(chunk)
+                    except ValueError:
+                        continue
+                    if isinstance(record, dict) and 'seq' in record:
+                        records.append(record)
+        except FileNotFoundError:
+            pass
+        return sorted(records, key=lambda record: record['seq'])
+
+
+def _make_handler(registry: MetricsRegistry):
+    """创建/metrics请求处理类（http.server只在启动端点时导入，一次性命令不承担其导入开销）"""
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = registry.expose().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(f"metrics: {format % args}")
+
+    return MetricsHandler
+
+
+class MetricsService:
+    """后台指标服务：HTTP导出端点，以及按monitor_interval采样并写入环形文件"""
+
+    def __init__(self, config: Dict, registry: MetricsRegistry = metrics):
+        self.config = config
+        self.registry = registry
+        self.interval = config.get('monitor_interval', 300)
+        self.ring = RingFile(config['metrics_file'], config.get('metrics_ring_slots', 288),
+                             config.get('metrics_slot_size', 4096))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._server = None
+
+    def start(self):
+        port = self.config.get('metrics_port')
+        if port:
+            from http.server import ThreadingHTTPServer
+            try:
+                self._server = ThreadingHTTPServer((self.config.get('metrics_host', '127.0.0.1'), port),
+                                                   _make_handler(self.registry))
+                self._server.daemon_threads = True
+                threading.Thread(target=self._server.serve_forever, name='daily-word-metrics-http',
+                                 daemon=True).start()
+                logger.info(f"指标端点: http://{self._server.server_address[0]}:{self._server.server_address[1]}/metrics")
+            except OSError as e:
+                logger.warning(f"指标HTTP端点启动失败: {e}")
+                self._server = None
+
+        self._thread = threading.Thread(target=self._run, name='daily-word-metrics', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.flush()
+            self._stop.wait(self.interval)
+
+    def flush(self):
+        """采样系统指标并写入一条环形记录"""
+        sample_system(self.registry)
+        self.ring.append(self._ring_record(self.registry.snapshot()))
+
+    def _ring_record(self, snapshot: Dict) -> Dict:
+        """
+        组装环形记录；快照超过槽位大小时依次去掉占用最大的指标，
+        去掉的指标名记录在truncated中，而不是整条记录都不写入
+        """
+        record = {'metrics': dict(snapshot)}
+        sizes = {name: len(json.dumps(value, ensure_ascii=False, separators=(',', ':')))
+                 for name, value in snapshot.items()}
+        truncated = []
+        while not self.ring.fits(record) and record['metrics']:
+            name = max(record['metrics'], key=sizes.get)
+            del record['metrics'][name]
+            truncated.append(name)
+            record['truncated'] = truncated
+        if truncated:
+            logger.warning(f"指标快照超过槽位大小 {self.ring.slot_size} 字节，"
+                           f"已去掉 {len(truncated)} 个指标: {', '.join(truncated)}")
+        return record
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        self.flush()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+每日单词墨水屏显示系统 - 面板会话
+Daily Word E-Paper Display System - Panel Session
+
+跟踪墨水屏的供电和初始化状态，避免每次写屏都执行复位+初始化+Clear：
+- 只有在深度睡眠（或从未初始化）之后才复位并重新初始化
+- 整屏写入前不再Clear（Clear本身就是一次完整的黑白刷新）
+- 波形LUT按模式在每次刷新前下载；只有注册表标记为 lut_cacheable 的驱动在已加载时跳过
+  （epd3in52的lut_GC/lut_DU每次调用都在EVEN/ODD两套波形间交替，不能跳过）
+- 省下的时间按步骤计入 daily_word_epd_saved_seconds_total
+- 按刷新模式（full/fast/partial/gray4）调用驱动注册表中对应的初始化和显示方法，
+  只在初始化方法不同时重新初始化
+- commit() 在SPI传输完成后立即返回future，刷新波形结束（BUSY释放）时由等待线程完成，
+  排队的深度睡眠随后在等待线程中执行；调用方在面板刷新期间可以准备下一帧
+- sleep_async() 把深度睡眠（含驱动末尾的等待和module_exit）排到等待线程中，
+  由电源管理（daily_word_power）在空闲超时后调用
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+from daily_word_drivers import FULL, PARTIAL, bind_init, get_driver_info, mode_spec
+from daily_word_metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 面板状态
+POWER_OFF = 'off'        # 深度睡眠/模块已关闭，下次写屏前需要复位和初始化
+READY = 'ready'          # 已初始化，可以直接写屏
+
+metrics.counter('daily_word_epd_saved_seconds_total', '面板会话省去的初始化/清屏耗时(按步骤)')
+metrics.counter('daily_word_epd_session_total', '面板会话操作次数(按操作)')
+
+
+class PanelSession:
+    """
+    墨水屏驱动的会话状态管理（应只在写屏线程中使用）
+
+    刷新期间的BUSY等待在内部的等待线程中进行；会话的每个操作开始前都先等待上一次刷新结束，
+    因此调用方不需要自己同步
+    （电源管理的定时器线程只调用sleep_async，并通过lock与写屏线程互斥）
+    """
+
+    def __init__(self, epd, model: Optional[str] = None):
+        """
+        初始化面板会话
+
+        参数:
+        - epd: waveshare驱动实例（提供init/display/sleep，可选refresh/lut_GC/Clear）
+        - model: 驱动注册表中的型号名称；不指定时按 init/display 和 lut_GC 的通用约定操作
+        """
+        self.epd = epd
+        self.info = get_driver_info(model) if model else None
+        self.model = model
+        self.state = POWER_OFF
+        self.init_spec = None
+        self.lut: Optional[str] = None
+        # 面板RAM中保存着上一帧（局部刷新的参照画面），深度睡眠或清屏后失效
+        self.partial_ready = False
+        self.init_seconds: Optional[float] = None
+        self.clear_seconds: Optional[float] = None
+        self.saved_seconds = 0.0
+        self.init_count = 0
+        self.ready_since: Optional[float] = None
+        # 写屏线程和电源管理定时器之间的互斥：持有期间不会有其他操作插入硬件序列
+        self.lock = threading.RLock()
+        # 非阻塞提交：刷新期间驱动的最后一次ReadBusy推迟到等待线程
+        self._deferring = False
+        self._busy_pending = False
+        self._pending: Optional[Future] = None
+        self._waiter: Optional[ThreadPoolExecutor] = None
+        self._read_busy = self._install_busy_hooks()
+
+    @property
+    def awake(self) -> bool:
+        return self.state == READY
+
+    @property
+    def busy(self) -> bool:
+        """面板仍在刷新（或正在进入深度睡眠）"""
+        return self._pending is not None and not self._pending.done()
+
+    def _install_busy_hooks(self):
+        """
+        替换驱动实例的ReadBusy和发送方法（只替换实例属性，不修改驱动代码）：
+        提交期间ReadBusy只做标记；之后如果还有命令或数据要发送，先同步等待BUSY释放，
+        只有刷新命令之后的最后一次等待留给等待线程
+        """
+        read_busy = getattr(self.epd, 'ReadBusy', None)
+        if read_busy is None:
+            return None
+
+        def deferred_read_busy():
+            if self._deferring:
+                self._busy_pending = True
+            else:
+                read_busy()
+
+        def guard(method):
+            def guarded(*args):
+                if self._busy_pending:
+                    self._busy_pending = False
+                    read_busy()
+                return method(*args)
+            return guarded
+
+        self.epd.ReadBusy = deferred_read_busy
+        for name in ('send_command', 'send_data', 'send_data2'):
+            method = getattr(self.epd, name, None)
+            if method is not None:
+                setattr(self.epd, name, guard(method))
+        return read_busy
+
+    def wait(self, timeout: Optional[float] = None):
+        """等待进行中的刷新和排队的深度睡眠完成"""
+        pending = self._pending
+        if pending is not None:
+            pending.result(timeout)
+            self._pending = None
+
+    def _save(self, step: str, seconds: Optional[float]):
+        """记录因跳过某一步而省下的时间（按最近一次实测耗时估算）"""
+        metrics.inc('daily_word_epd_session_total', action=f'skip_{step}')
+        if seconds:
+            self.saved_seconds += seconds
+            metrics.inc('daily_word_epd_saved_seconds_total', seconds, step=step)
+
+    def _spec(self, mode: str):
+        if self.info is None:
+            return ('init', 'display')
+        return mode_spec(self.model, mode)
+
+    def ensure_ready(self, mode: str = FULL):
+        """
+        面板未初始化时复位并初始化，已就绪时什么都不做
+
+        已就绪但当前刷新模式需要不同的初始化（如快速刷新的init_fast）时重新初始化；
+        不需要单独初始化的模式（多数局部刷新）沿用当前状态
+        """
+        init_spec = self._spec(mode)[0]
+        if self.state == READY and (init_spec is None or init_spec == self.init_spec):
+            self._save('init', self.init_seconds)
+            return
+        if init_spec is None:
+            init_spec = self._spec(FULL)[0]
+        start = time.perf_counter()
+        if bind_init(self.epd, init_spec)() == -1:
+            raise RuntimeError("墨水屏初始化失败")
+        self.init_seconds = time.perf_counter() - start
+        self.init_count += 1
+        if self.state != READY:
+            self.ready_since = time.monotonic()
+        self.state = READY
+        self.init_spec = init_spec
+        self.lut = None
+        self.partial_ready = False
+        metrics.inc('daily_word_epd_session_total', action='init')
+        logger.debug("墨水屏已初始化(%s)，耗时 %.0f ms", mode, self.init_seconds * 1000)
+
+    def _lut_for(self, mode: str) -> Optional[str]:
+        if self.info is None:
+            return 'lut_GC' if mode == FULL and hasattr(self.epd, 'lut_GC') else None
+        return self.info['luts'].get(mode)
+
+    def _load_lut(self, mode: str):
+        """加载该模式的刷新波形（驱动提供时）；波形下载无状态的驱动已加载时跳过"""
+        lut = self._lut_for(mode)
+        if not lut:
+            return
+        cacheable = self.info is not None and self.info['lut_cacheable']
+        if cacheable and self.lut == lut:
+            return
+        getattr(self.epd, lut)()
+        self.lut = lut
+
+    def _refresh(self):
+        if hasattr(self.epd, 'refresh'):
+            self.epd.refresh()
+
+    def commit(self, mode: str, *buffers, sleep_after: bool = False) -> Future:
+        """
+        按指定刷新模式整屏写入并启动刷新，不等待刷新波形结束：直接覆盖旧画面，不先Clear
+
+        参数:
+        - mode: 刷新模式 full/fast/partial/gray4
+        - buffers: getbuffer的输出（三色屏为黑色和强调色两个平面）
+        - sleep_after: 刷新结束后在等待线程中进入深度睡眠
+
+        返回:
+        - Future: SPI传输完成后返回；BUSY释放时完成，结果为写入和刷新的耗时(秒)，不含初始化
+        """
+        with self.lock:
+            return self._commit(mode, buffers, sleep_after)
+
+    def _commit(self, mode: str, buffers, sleep_after: bool) -> Future:
+        self.wait()
+        display_name = self._spec(mode)[1]
+        base = self.info['base'] if self.info else None
+        if mode == FULL and base:
+            # 同时写入新/旧两块RAM，之后的局部刷新以这一帧为参照
+            display_name = base
+        self._deferring = self._read_busy is not None
+        try:
+            self.ensure_ready(mode)
+            start = time.perf_counter()
+            getattr(self.epd, display_name)(*buffers)
+            self._load_lut(mode)
+            self._refresh()
+        except Exception:
+            self._busy_pending = False
+            raise
+        finally:
+            self._deferring = False
+        busy_pending, self._busy_pending = self._busy_pending, False
+        self.partial_ready = mode == PARTIAL or base is None or display_name == base
+        metrics.inc('daily_word_epd_refresh_total', mode=mode)
+
+        future = Future()
+
+        def finish():
+            try:
+                if busy_pending:
+                    self._read_busy()
+                elapsed = time.perf_counter() - start
+                # Clear与一次整屏写入的代价相当，以本次写入耗时估算省下的时间
+                if mode == FULL:
+                    self.clear_seconds = elapsed
+                self._save('clear', self.clear_seconds)
+                future.set_result(elapsed)
+            except Exception as e:
+                future.set_exception(e)
+            if sleep_after:
+                try:
+                    self._sleep_now()
+                except Exception as e:
+                    logger.error(f"墨水屏进入深度睡眠失败: {e}")
+
+        if busy_pending or sleep_after:
+            self._submit(finish)
+        else:
+            finish()
+        return future
+
+    def _submit(self, func) -> Future:
+        """在等待线程中排队执行（按提交顺序，排在进行中的刷新之后）"""
+        if self._waiter is None:
+            self._waiter = ThreadPoolExecutor(max_workers=1, thread_name_prefix='daily-word-busy')
+        self._pending = self._waiter.submit(func)
+        return self._pending
+
+    def write(self, mode: str, *buffers) -> float:
+        """按指定刷新模式整屏写入并等待刷新完成，返回写入和刷新耗时(秒)"""
+        return self.commit(mode, *buffers).result()
+
+    def write_full(self, *buffers) -> float:
+        """整屏写入并刷新（完整波形）"""
+        return self.write(FULL, *buffers)
+
+    def clear(self):
+        """清空面板"""
+        with self.lock:
+            self.wait()
+            self.ensure_ready()
+            self.epd.Clear()
+            # Clear内部加载了整屏刷新波形；RAM中的参照画面与之后要写的内容无关
+            self.lut = self._lut_for(FULL)
+            self.partial_ready = False
+            metrics.inc('daily_word_epd_refresh_total', mode='clear')
+
+    def sleep(self):
+        """进入深度睡眠并关闭模块；之后的写屏会重新复位和初始化"""
+        with self.lock:
+            self.wait()
+            self._sleep_now()
+
+    def sleep_async(self) -> Future:
+        """
+        在等待线程中进入深度睡眠并关闭模块，不阻塞调用方
+        （驱动sleep()末尾的等待和module_exit都在等待线程中完成）
+        """
+        with self.lock:
+            return self._submit(self._sleep_now)
+
+    def _sleep_now(self):
+        if self.state != READY:
+            return
+        try:
+            self.epd.sleep()
+        finally:
+            self.state = POWER_OFF
+            self.ready_since = None
+            self.init_spec = None
+            self.lut = None
+            self.partial_ready = False
+            metrics.inc('daily_word_epd_session_total', action='sleep')
+
+    def get_stats(self):
+        return {
+            'state': self.state,
+            'init_count': self.init_count,
+            'partial_ready': self.partial_ready,
+            'busy': self.busy,
+            'init_ms': round(self.init_seconds * 1000, 1) if self.init_seconds else None,
+            'saved_seconds': round(self.saved_seconds, 2),
+        }
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+每日单词墨水屏显示系统 - 面板电源管理
+Daily Word E-Paper Display System - Panel Power Manager
+
+写屏后不再立即进入深度睡眠，而是按空闲时间排定：
+- 每次提交后重新开始空闲计时，空闲超过 idle_sleep_seconds 时在后台让面板深度睡眠并关闭模块
+  （驱动sleep()末尾的2秒等待和module_exit都在等待线程中完成，不阻塞写屏线程）
+- 空闲窗口内的下一次写屏取消已排定的睡眠，面板保持初始化状态，可以直接局部刷新
+- 连续唤醒超过 max_awake_seconds 后，即使一直有更新，也在下一次刷新结束后睡眠一次，
+  避免面板长时间处于高压状态；之后的写屏重新复位和初始化
+- 阈值越大响应越快（免去复位+初始化，保留局部刷新的参照画面），越小面板处于上电状态的时间越短
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Optional
+
+from daily_word_metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 默认阈值(秒)
+DEFAULT_IDLE_SECONDS = 120
+DEFAULT_MAX_AWAKE_SECONDS = 1800
+
+metrics.counter('daily_word_power_total', '面板电源管理操作次数(按操作)')
+
+
+class PowerManager:
+    """按空闲时间排定面板的深度睡眠和断电（定时器在独立线程中触发）"""
+
+    def __init__(self, session, config: Optional[Dict] = None):
+        """
+        初始化电源管理
+
+        参数:
+        - session: PanelSession
+        - config: EPAPER_CONFIG['session']，使用其中的
+          keep_awake（从不自动睡眠）、idle_sleep_seconds、max_awake_seconds（None表示不限制）
+        """
+        config = config or {}
+        self.session = session
+        self.keep_awake = config.get('keep_awake', False)
+        self.idle_seconds = float(config.get('idle_sleep_seconds', DEFAULT_IDLE_SECONDS))
+        max_awake = config.get('max_awake_seconds', DEFAULT_MAX_AWAKE_SECONDS)
+        self.max_awake_seconds = float(max_awake) if max_awake else None
+
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        # 每次取消或重新计时都递增；已触发但还没拿到会话锁的定时器据此判断自己是否过期
+        self._generation = 0
+        self.deadline: Optional[float] = None
+        self.counts = {'scheduled': 0, 'cancelled': 0, 'sleep': 0}
+
+    def _count(self, action: str):
+        self.counts[action] += 1
+        metrics.inc('daily_word_power_total', action=action)
+
+    def _drop_timer(self) -> bool:
+        """作废当前定时器（调用方持有 self._lock），返回是否有排定的睡眠"""
+        self._generation += 1
+        timer, self._timer = self._timer, None
+        self.deadline = None
+        if timer is not None:
+            timer.cancel()
+        return timer is not None
+
+    def cancel(self):
+        """取消排定的深度睡眠（每次写屏开始前调用）"""
+        with self._lock:
+            if self._drop_timer():
+                self._count('cancelled')
+
+    def touch(self):
+        """一次写屏提交后重新开始空闲计时"""
+        if self.keep_awake:
+            return
+        delay = self.idle_seconds
+        ready_since = self.session.ready_since
+        if self.max_awake_seconds is not None and ready_since is not None:
+            # 已唤醒太久：本次刷新结束后就睡眠
+            remaining = ready_since + self.max_awake_seconds - time.monotonic()
+            delay = max(0.0, min(delay, remaining))
+        with self._lock:
+            self._drop_timer()
+            timer = threading.Timer(delay, self._expire, args=(self._generation,))
+            timer.daemon = True
+            timer.name = 'daily-word-power'
+            self._timer = timer
+            self.deadline = time.monotonic() + delay
+            self._count('scheduled')
+        timer.start()
+        logger.debug("面板将在空闲 %.0f 秒后进入深度睡眠", delay)
+
+    def _expire(self, generation: int):
+        """定时器到期：没有新的写屏时让面板在等待线程中睡眠"""
+        # 先取得会话锁，保证不会插入到正在进行的提交中间
+        with self.session.lock:
+            with self._lock:
+                if generation != self._generation:
+                    return
+                self._timer = None
+                self.deadline = None
+            if not self.session.awake:
+                return
+            self._count('sleep')
+            self.session.sleep_async().add_done_callback(self._slept)
+
+    def _slept(self, done):
+        try:
+            done.result()
+        except Exception as e:
+            logger.error(f"墨水屏进入深度睡眠失败: {e}")
+            return
+        logger.debug("面板空闲，已进入深度睡眠并关闭模块")
+
+    def sleep_now(self):
+        """取消计时并立即睡眠（清理资源时使用，等待睡眠完成）"""
+        self.cancel()
+        self.session.sleep()
+
+    def get_stats(self) -> Dict:
+        ready_since = self.session.ready_since
+        deadline = self.deadline
+        now = time.monotonic()
+        return {
+            'keep_awake': self.keep_awake,
+            'idle_seconds': self.idle_seconds,
+            'max_awake_seconds': self.max_awake_seconds,
+            'awake_seconds': round(now - ready_since, 1) if ready_since is not None else None,
+            'sleep_in': round(max(0.0, deadline - now), 1) if deadline is not None else None,
+            'counts': dict(self.counts),
+        }
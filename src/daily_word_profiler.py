@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+每日单词墨水屏显示系统 - 性能分析
+Daily Word E-Paper Display System - Profiler
+
+由 DEBUG_CONFIG['performance_profiling'] 或命令行 --profile 启用：
+- 会话：cProfile（当前线程）+ 全线程采样，输出 .pstats 和折叠栈 .folded（可直接生成火焰图）
+- 分段：驱动 init/getbuffer/display/ReadBusy 等调用的耗时汇总
+- 内存：绘制前后的 tracemalloc 快照差异
+"""
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter as StackCounter
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 采样间隔(秒)
+SAMPLE_INTERVAL = 0.005
+
+# 每个会话日志中列出的热点函数/内存分配条数
+TOP_ENTRIES = 15
+
+# 输出目录中最多保留的分析文件数（守护进程长期开启分析时避免占满SD卡）
+MAX_OUTPUT_FILES = 200
+
+# 驱动中需要分段计时的方法
+DRIVER_METHODS = ('init', 'getbuffer', 'display', 'ReadBusy')
+
+
+class StackSampler:
+    """定时采样所有线程的调用栈，聚合为折叠栈格式（thread;outer;...;inner count）"""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: StackCounter = StackCounter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, str(thread_id)))
+            self.stacks[';'.join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='daily-word-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def collapsed(self) -> str:
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class Profiler:
+    """性能分析入口，未启用时所有方法都是空操作"""
+
+    def __init__(self, output_dir: Path, enabled: bool = False):
+        self.output_dir = Path(output_dir)
+        self.enabled = enabled
+        self.sections: Dict[str, List[float]] = {}
+        self.outputs: List[Path] = []
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def _output_path(self, name: str, suffix: str) -> Path:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        path = self.output_dir / f"profile-{stamp}-{name}{suffix}"
+        self.outputs.append(path)
+        existing = sorted(self.output_dir.glob('profile-*'))
+        for old in existing[:max(0, len(existing) - MAX_OUTPUT_FILES + 1)]:
+            old.unlink(missing_ok=True)
+        return path
+
+    @contextmanager
+    def session(self, name: str) -> Iterator[None]:
+        """对代码块做cProfile和全线程采样，结束后写出 .pstats/.folded 并记录热点"""
+        if not self.enabled:
+            yield
+            return
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ 同一时间只允许一个cProfile，此时只做采样
+            profile = None
+        sampler = StackSampler()
+        sampler.start()
+        with self._lock:
+            sections_before = {key: len(values) for key, values in self.sections.items()}
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profile is not None:
+                profile.disable()
+            sampler.stop()
+            self._write_session(name, elapsed, profile, sampler, sections_before)
+
+    def _write_session(self, name: str, elapsed: float, profile: Optional[cProfile.Profile],
+                       sampler: StackSampler, sections_before: Dict[str, int]):
+        try:
+            folded = self._output_path(name, '.folded')
+            folded.write_text(sampler.collapsed(), encoding='utf-8')
+
+            summary = [f"性能分析 {name}: 耗时 {elapsed * 1000:.1f} ms, 采样 {sampler.samples} 次"]
+            with self._lock:
+                for section, values in sorted(self.sections.items()):
+                    recent = values[sections_before.get(section, 0):]
+                    if recent:
+                        summary.append(f"  {section}: {len(recent)} 次, 共 {sum(recent) * 1000:.1f} ms")
+
+            if profile is not None:
+                stats_path = self._output_path(name, '.pstats')
+                profile.dump_stats(str(stats_path))
+                buffer = io.StringIO()
+                pstats.Stats(profile, stream=buffer).sort_stats('cumulative').print_stats(TOP_ENTRIES)
+                summary.append(buffer.getvalue())
+
+            logger.info('\n'.join(summary))
+            logger.info(f"折叠栈已写入 {folded}（可用 flamegraph.pl 生成火焰图）")
+        except Exception as e:
+            logger.error(f"写入性能分析结果失败: {e}")
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        """记录一段代码的耗时，在会话结束时汇总"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.sections.setdefault(name, []).append(elapsed)
+            logger.debug(f"{name} 耗时 {elapsed * 1000:.1f} ms")
+
+    @contextmanager
+    def trace_memory(self, name: str) -> Iterator[None]:
+        """对代码块前后做tracemalloc快照，写出分配差异最大的位置和峰值"""
+        if not self.enabled:
+            yield
+            return
+        started_here = not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start(10)
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        try:
+            yield
+        finally:
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if started_here:
+                tracemalloc.stop()
+            try:
+                lines = [f"{name}: 峰值 {peak / 1024:.1f} KiB"]
+                for stat in after.compare_to(before, 'lineno')[:TOP_ENTRIES]:
+                    lines.append(str(stat))
+                path = self._output_path(name, '.tracemalloc.txt')
+                path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+                logger.info(f"{name} 内存峰值 {peak / 1024:.1f} KiB，分配差异已写入 {path}")
+            except Exception as e:
+                logger.error(f"写入内存分析结果失败: {e}")
+
+    def wrap(self, obj, method_name: str, wrapper_name: str, label: str):
+        """用section/trace_memory等上下文包装实例方法（只替换实例属性）"""
+        method = getattr(obj, method_name, None)
+        if method is None:
+            return
+        context = getattr(self, wrapper_name)
+
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            with context(label):
+                return method(*args, **kwargs)
+
+        setattr(obj, method_name, wrapper)
+
+    def instrument_controller(self, controller):
+        """为显示控制器及其驱动加上分段计时和绘制内存快照"""
+        if getattr(controller, '_profiling_instrumented', False):
+            return
+        # render_daily_content内部调用render_lanes，只包装最内层的绘制入口
+        for method_name in ('render_lanes', 'render_daily_content', 'display_content'):
+            if hasattr(controller, method_name):
+                self.wrap(controller, method_name, 'trace_memory', f"render.{method_name}")
+                break
+        epd = getattr(controller, 'epd', None)
+        if epd is not None:
+            for method_name in DRIVER_METHODS:
+                self.wrap(epd, method_name, 'section', f"epd.{method_name}")
+        controller._profiling_instrumented = True
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+每日单词墨水屏显示系统 - 刷新模式策略
+Daily Word E-Paper Display System - Refresh Policy
+
+每次写屏在型号支持的刷新模式中选择仍能保证画质的最快模式：
+- 快速刷新和局部刷新会在改变过的区域留下残影，按区域累计"残影预算"，
+  某个重绘区域的预算用完时改用完整刷新（完整刷新清空全部区域的累计值）
+- 局部刷新以面板RAM中的上一帧为参照，只在面板自上次写入后未深度睡眠、未清屏时使用
+- 每天到达清洁时间后的第一次写屏强制完整刷新，清除累计残影
+- 每次非完整刷新相对完整刷新省下的时间按模式计入 daily_word_refresh_saved_seconds_total
+"""
+
+import logging
+from datetime import datetime, time as dt_time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from daily_word_drivers import FAST, FULL, GRAY4, PARTIAL, PARTIAL_IMAGE, REFRESH_MODES, get_driver_info
+from daily_word_metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# 默认参数：每个区域最多累计的残影量，以及每种模式一次刷新产生的残影量
+DEFAULT_GHOSTING_BUDGET = 10
+DEFAULT_GHOSTING_COST = {FAST: 0.5, PARTIAL: 1.0}
+DEFAULT_CLEAN_TIME = '03:00'
+
+# 未指定重绘区域时（整屏重绘）使用的键
+WHOLE_FRAME = None
+
+metrics.counter('daily_word_refresh_saved_seconds_total', '非完整刷新相对完整刷新省下的耗时(按模式)')
+metrics.counter('daily_word_refresh_decisions_total', '刷新模式选择次数(按模式和原因)')
+
+
+def parse_clock(value: str) -> dt_time:
+    """解析 HH:MM 形式的时刻"""
+    hour, minute = map(int, value.split(':'))
+    return dt_time(hour, minute)
+
+
+class RefreshPolicy:
+    """按残影预算和清洁计划选择刷新模式（应只在写屏线程中使用）"""
+
+    def __init__(self, model: str, config: Optional[Dict] = None):
+        """
+        初始化刷新策略
+
+        参数:
+        - model: 驱动注册表中的型号名称
+        - config: EPAPER_CONFIG['display_config']，使用其中的
+          partial_update、fast_update、full_update_interval（残影预算）、ghosting_cost、clean_time
+        """
+        config = config or {}
+        info = get_driver_info(model)
+        self.model = model
+        self.modes: Dict[str, float] = info['modes']
+        # 策略只使用以整屏缓冲区为参数的局部刷新；需要窗口坐标或旧画面的驱动按不支持处理
+        self.partial_capable = PARTIAL in self.modes and info['partial_args'] == PARTIAL_IMAGE
+        self.allowed = {FULL, GRAY4}
+        if config.get('fast_update', True):
+            self.allowed.add(FAST)
+        if config.get('partial_update', True):
+            self.allowed.add(PARTIAL)
+        self.budget = float(config.get('full_update_interval', DEFAULT_GHOSTING_BUDGET))
+        self.cost = dict(DEFAULT_GHOSTING_COST, **config.get('ghosting_cost', {}))
+        clean_time = config.get('clean_time', DEFAULT_CLEAN_TIME)
+        self.clean_time = parse_clock(clean_time) if clean_time else None
+
+        self._ghosting: Dict[Optional[Tuple[int, int, int, int]], float] = {}
+        self.last_full: Optional[datetime] = None
+        self.full_seconds: Optional[float] = None
+        self.counts = {mode: 0 for mode in REFRESH_MODES}
+        self.saved_seconds = {mode: 0.0 for mode in REFRESH_MODES}
+        self.last_decision: Optional[Tuple[str, str]] = None
+
+    def clean_due(self, now: datetime) -> bool:
+        """今天的清洁时间已过，且此后还没有做过完整刷新"""
+        if self.clean_time is None or self.last_full is None:
+            return False
+        clean_at = datetime.combine(now.date(), self.clean_time)
+        return now >= clean_at and self.last_full < clean_at
+
+    def ghosting(self, regions: Optional[Iterable] = None) -> float:
+        """区域当前累计的残影量；不指定区域时为所有区域的最大值"""
+        keys = self._keys(regions) if regions is not None else list(self._ghosting)
+        return max((self._ghosting.get(key, 0.0) for key in keys), default=0.0)
+
+    @staticmethod
+    def _keys(regions: Optional[Iterable]) -> List:
+        if regions is None:
+            return [WHOLE_FRAME]
+        return [tuple(region) for region in regions]
+
+    def _within_budget(self, mode: str, regions: Optional[Iterable]) -> bool:
+        keys = self._keys(regions)
+        if regions is None:
+            # 整屏重绘：所有区域都会再增加一次残影
+            keys = keys + list(self._ghosting)
+        cost = self.cost.get(mode, 1.0)
+        return all(self._ghosting.get(key, 0.0) + cost <= self.budget for key in keys)
+
+    def choose(self, regions: Optional[Iterable] = None, partial_ready: bool = False,
+               grayscale: bool = False, now: Optional[datetime] = None) -> Tuple[str, str]:
+        """
+        选择本次写屏的刷新模式
+
+        参数:
+        - regions: 本次重绘的区域 (x0, y0, x1, y1)，None表示整屏
+        - partial_ready: 面板RAM中是否保存着上一帧（PanelSession.partial_ready）
+        - grayscale: 画面含灰度像素（型号支持时使用4级灰度刷新）
+        - now: 当前时间（测试用）
+
+        返回:
+        - (mode, reason)
+        """
+        now = now or datetime.now()
+        if grayscale and GRAY4 in self.modes:
+            decision = (GRAY4, 'grayscale')
+        elif self.last_full is None:
+            decision = (FULL, 'first')
+        elif self.clean_due(now):
+            decision = (FULL, 'clean')
+        else:
+            candidates = [mode for mode in (FAST, PARTIAL) if mode in self.modes and mode in self.allowed]
+            if PARTIAL in candidates and not (self.partial_capable and partial_ready):
+                candidates.remove(PARTIAL)
+            within = [mode for mode in candidates if self._within_budget(mode, regions)]
+            if within:
+                decision = (min(within, key=self.modes.get), 'budget')
+            else:
+                decision = (FULL, 'ghosting' if candidates else 'only')
+        self.last_decision = decision
+        metrics.inc('daily_word_refresh_decisions_total', mode=decision[0], reason=decision[1])
+        return decision
+
+    def record(self, mode: str, regions: Optional[Iterable], seconds: float,
+               now: Optional[datetime] = None):
+        """
+        记录一次已完成的刷新：更新残影累计值和省下的时间
+
+        参数:
+        - mode: 实际使用的刷新模式
+        - regions: 本次重绘的区域，None表示整屏
+        - seconds: 写入和刷新的实测耗时
+        """
+        self.counts[mode] += 1
+        if mode in (FULL, GRAY4):
+            # 完整波形驱动所有像素，清除累计残影
+            self._ghosting.clear()
+            self.last_full = now or datetime.now()
+            if mode == FULL:
+                self.full_seconds = seconds
+            return
+
+        for key in self._keys(regions):
+            self._ghosting[key] = self._ghosting.get(key, 0.0) + self.cost.get(mode, 1.0)
+        if regions is None:
+            for key in list(self._ghosting):
+                if key is not WHOLE_FRAME:
+                    self._ghosting[key] += self.cost.get(mode, 1.0)
+        baseline = self.full_seconds or self.modes[FULL]
+        saved = max(0.0, baseline - seconds)
+        self.saved_seconds[mode] += saved
+        metrics.inc('daily_word_refresh_saved_seconds_total', saved, mode=mode)
+
+    def cleared(self, now: Optional[datetime] = None):
+        """清屏（完整波形）后清除累计残影"""
+        self._ghosting.clear()
+        self.last_full = now or datetime.now()
+
+    def get_stats(self) -> Dict:
+        return {
+            'model': self.model,
+            'modes': {mode: self.modes[mode] for mode in REFRESH_MODES
+                      if mode in self.modes and mode in self.allowed},
+            'last_decision': self.last_decision,
+            'counts': {mode: count for mode, count in self.counts.items() if count},
+            'saved_seconds': {mode: round(saved, 2) for mode, saved in self.saved_seconds.items() if saved},
+            'max_ghosting': self.ghosting(),
+            'budget': self.budget,
+            'last_full': self.last_full.isoformat(timespec='seconds') if self.last_full else None,
+        }
@@ -226,8 +226,7 @@ class DailyWordRPi:
         success = self.update_display()
         
         if self.display and SYSTEM_CONFIG.get('sleep_between_updates', True):
-            # 更新后让墨水屏进入睡眠模式以节省电力
-            time.sleep(2)  # 等待显示完成
+            # 更新后让墨水屏进入睡眠模式以节省电力（display返回时刷新已经完成）
             self.display.sleep()
         
         return success
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+每日单词墨水屏显示系统 - 异步运行时
+Daily Word E-Paper Display System - Async Runtime
+
+将一次更新拆分为获取、绘制、写屏三个阶段：获取在线程池中执行，不阻塞事件循环；
+绘制在专用工作线程中执行；写屏由唯一的写入任务通过有界队列串行完成。
+较慢的网络请求不会推迟写屏，较长的刷新也不会阻塞下一次内容获取。
+在systemd下运行时由事件循环发送看门狗通知，事件循环或某个阶段卡住时停止通知。
+
+获取阶段仍是同步的requests调用，只是放到默认线程池中执行，并没有改为异步HTTP；
+单次运行的命令行更新（--update）不经过本运行时，仍按原流程同步获取并写屏。
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from daily_word_metrics import metrics
+from daily_word_systemd import format_status
+
+logger = logging.getLogger(__name__)
+
+# 写屏队列容量：队列满时丢弃最旧的帧，只保留最新内容
+WRITE_QUEUE_SIZE = 2
+
+# 每个阶段保留的最近耗时样本数
+STAGE_SAMPLE_SIZE = 50
+
+# 单个阶段执行超过该时长(秒)视为卡住，停止发送看门狗通知
+STALL_TIMEOUT = 600
+
+# 一次更新请求的结果
+UPDATE_QUEUED = 'queued'          # 已绘制并放入写屏队列
+UPDATE_UNCHANGED = 'unchanged'    # 没有通道过期或内容未变化，跳过写屏
+UPDATE_FAILED = 'failed'
+
+
+class StageStats:
+    """单个阶段的耗时统计（毫秒）"""
+
+    def __init__(self, name: str, sample_size: int = STAGE_SAMPLE_SIZE):
+        self.name = name
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms: Optional[float] = None
+        self.samples = deque(maxlen=sample_size)
+
+    def record(self, elapsed_ms: float, ok: bool = True):
+        self.count += 1
+        if not ok:
+            self.errors += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.last_ms = elapsed_ms
+        self.samples.append(elapsed_ms)
+
+    def to_dict(self) -> Dict:
+        recent = sorted(self.samples)
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'last_ms': round(self.last_ms, 1) if self.last_ms is not None else None,
+            'avg_ms': round(self.total_ms / self.count, 1) if self.count else None,
+            'p50_ms': round(recent[len(recent) // 2], 1) if recent else None,
+            'max_ms': round(self.max_ms, 1),
+        }
+
+
+class DailyWordRuntime:
+    """基于asyncio的更新流水线"""
+
+    STAGES = ('fetch', 'render', 'queue', 'write')
+
+    def __init__(self, system, queue_size: int = WRITE_QUEUE_SIZE, notifier=None,
+                 stall_timeout: float = STALL_TIMEOUT):
+        """
+        初始化运行时
+
+        参数:
+        - system: DailyWordSystem实例，提供refresh_lanes/show_content和显示控制器
+        - queue_size: 写屏队列容量
+        - notifier: SystemdNotifier，用于READY/STATUS/WATCHDOG通知（可选）
+        - stall_timeout: 阶段卡住判定时长(秒)
+        """
+        self.system = system
+        self.queue_size = queue_size
+        self.notifier = notifier
+        self.stall_timeout = stall_timeout
+        self._inflight: Dict[int, tuple] = {}
+        self._watchdog_task: Optional[asyncio.Task] = None
+        self._update_lock: Optional[asyncio.Lock] = None
+        self.stats: Dict[str, StageStats] = {name: StageStats(name) for name in self.STAGES}
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._render_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='daily-word-render')
+        # 所有硬件访问固定在同一个线程中
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='daily-word-epd')
+        self.dropped_frames = 0
+        self.skipped_updates = 0
+        self._frames_rendered = 0
+
+    # ---------- 阶段 ----------
+
+    async def _timed(self, stage: str, executor: Optional[ThreadPoolExecutor], func: Callable, *args) -> Any:
+        """在线程中执行一个阶段并记录耗时"""
+        loop = asyncio.get_running_loop()
+        profiler = getattr(self.system, 'profiler', None)
+        if profiler is not None and profiler.enabled:
+            # 在执行阶段的线程内开启分析会话（cProfile只作用于当前线程）
+            func = self._profiled(profiler, stage, func)
+        start = time.perf_counter()
+        token = object()
+        self._inflight[id(token)] = (stage, start)
+        ok = False
+        try:
+            result = await loop.run_in_executor(executor, func, *args)
+            ok = result is not None and result is not False
+            return result
+        finally:
+            del self._inflight[id(token)]
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.stats[stage].record(elapsed_ms, ok)
+            metrics.observe('daily_word_pipeline_stage_seconds', elapsed_ms / 1000, stage=stage)
+            logger.debug("阶段 %s 耗时 %.1f ms", stage, elapsed_ms)
+
+    @staticmethod
+    def _profiled(profiler, stage: str, func: Callable) -> Callable:
+        def run(*args):
+            with profiler.session(stage):
+                return func(*args)
+        return run
+    
+    def _render_lanes(self, values: Dict, dirty: List[str]):
+        """按通道绘制：只重绘变化通道所在的区域"""
+        controller = self.system.display_controller
+        content = self.system.lanes_to_content(values)
+        if hasattr(controller, 'render_lanes') and hasattr(controller, 'write_image'):
+            rendered = controller.render_lanes(values, dirty)
+            if rendered is not None:
+                image, regions = rendered
+                logger.debug("重绘通道 %s，共 %d 个区域", ', '.join(dirty), len(regions))
+                return ('image', (image, regions), content, list(dirty))
+        return ('content', content, content, list(dirty))
+
+    @staticmethod
+    def _merge_frames(dropped, frame):
+        """
+        被丢弃的帧并入替代它的新帧：合并重绘区域和变化通道
+
+        新帧的画面在同一块画布上绘制，已经包含被丢弃帧的内容，只需要把被丢弃帧的区域
+        一起重绘（刷新策略也据此累计这些区域的残影）
+        """
+        kind, payload, content, lanes = frame
+        lanes = list(dict.fromkeys(dropped[3] + lanes))
+        if kind == 'image' and dropped[0] == 'image':
+            image, regions = payload
+            dropped_regions = dropped[1][1]
+            if regions is None or dropped_regions is None:
+                # 任一帧为整屏重绘
+                regions = None
+            else:
+                regions = list(dict.fromkeys(list(dropped_regions) + list(regions)))
+            payload = (image, regions)
+        return (kind, payload, content, lanes)
+
+    def _write(self, frame) -> bool:
+        """写屏阶段：只在写入线程中调用"""
+        kind, payload, content, lanes = frame
+        logger.debug("写屏: 通道 %s", ', '.join(lanes))
+        if kind == 'image':
+            # payload为 (完整画面, 重绘区域)，控制器据此选择刷新模式
+            success = self.system.display_controller.write_image(*payload)
+        else:
+            self.system.show_content(payload)
+            success = True
+        self.system._log_update_info(content)
+        return success
+
+    async def _writer(self):
+        """唯一的写屏任务：按顺序消费队列中的帧"""
+        while True:
+            item = await self._queue.get()
+            try:
+                if item is None:
+                    return
+                enqueued_at, frame = item
+                self.stats['queue'].record((time.perf_counter() - enqueued_at) * 1000)
+                success = await self._timed('write', self._write_executor, self._write, frame)
+                self.log_latency()
+                if self.notifier is not None:
+                    self.notifier.status(format_status(bool(success)))
+            except Exception as e:
+                logger.error(f"写屏失败: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _enqueue(self, frame):
+        """将帧放入写屏队列，队列已满时丢弃最旧的待写帧，其重绘区域和变化通道并入新帧"""
+        while self._queue.full():
+            try:
+                dropped = self._queue.get_nowait()
+                self._queue.task_done()
+                if dropped is not None:
+                    self.dropped_frames += 1
+                    frame = self._merge_frames(dropped[1], frame)
+                    logger.info("写屏队列已满，丢弃较旧的待写内容（重绘区域并入新帧）")
+            except asyncio.QueueEmpty:
+                break
+        self._queue.put_nowait((time.perf_counter(), frame))
+
+    def stalled_stage(self) -> Optional[str]:
+        """返回执行时间超过stall_timeout的阶段名称，没有则返回None"""
+        now = time.perf_counter()
+        for stage, started in list(self._inflight.values()):
+            if now - started > self.stall_timeout:
+                return stage
+        return None
+
+    async def _watchdog(self, interval: float):
+        """定期发送WATCHDOG=1；事件循环被阻塞或阶段卡住时不再发送，由systemd重启服务"""
+        reported = False
+        while True:
+            stage = self.stalled_stage()
+            if stage is None:
+                self.notifier.watchdog()
+                reported = False
+            elif not reported:
+                logger.error(f"阶段 {stage} 超过 {self.stall_timeout:.0f} 秒未完成，停止看门狗通知")
+                reported = True
+            await asyncio.sleep(interval)
+
+    # ---------- 对外接口 ----------
+
+    async def start(self):
+        """启动写屏任务"""
+        if self._writer_task is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._update_lock = asyncio.Lock()
+            self._writer_task = asyncio.create_task(self._writer())
+
+    async def submit_update(self, force_new: bool = False, force_lanes: Optional[List[str]] = None) -> Dict:
+        """
+        获取并绘制内容，放入写屏队列后立即返回（不等待刷新完成）
+
+        参数:
+        - force_new: 强制刷新的单词/句子通道忽略当天缓存重新获取，并重绘全部通道
+        - force_lanes: 强制刷新的通道（调度器的内容频率任务到期时传入）
+
+        返回:
+        - {'result': UPDATE_QUEUED/UPDATE_UNCHANGED/UPDATE_FAILED, 'lanes': 重绘的通道}
+        """
+        await self.start()
+        # 调度触发和控制接口的请求可能同时到达，获取/绘制逐个进行
+        async with self._update_lock:
+            return await self._submit_update(force_new, force_lanes)
+
+    async def _submit_update(self, force_new: bool, force_lanes: Optional[List[str]]) -> Dict:
+        try:
+            # 只刷新过期通道，内容没有变化时不绘制也不写屏
+            result = await self._timed('fetch', None, self.system.refresh_lanes,
+                                       force_lanes or [], force_new)
+            changed = result['changed']
+            if self._frames_rendered == 0 or force_new:
+                changed = list(result['values'])
+            if not changed:
+                self.skipped_updates += 1
+                logger.info("内容通道均未变化，跳过重绘")
+                return {'result': UPDATE_UNCHANGED, 'lanes': []}
+            frame = await self._timed('render', self._render_executor, self._render_lanes,
+                                      result['values'], changed)
+            self._frames_rendered += 1
+            self._enqueue(frame)
+            return {'result': UPDATE_QUEUED, 'lanes': list(changed)}
+        except Exception as e:
+            logger.error(f"更新流水线失败: {e}")
+            return {'result': UPDATE_FAILED, 'lanes': []}
+
+    async def run_on_writer(self, func: Callable, *args) -> Any:
+        """等待已排队的帧写完后，在写屏线程中执行func（清屏等直接访问硬件的操作）"""
+        await self.start()
+        await self.drain()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._write_executor, func, *args)
+
+    async def clear_display(self) -> bool:
+        """清屏：和写屏一样在写屏线程中执行（显示控制器按需创建，也在该线程中初始化硬件）"""
+        def clear():
+            return bool(self.system.display_controller.clear_display())
+        return await self.run_on_writer(clear)
+
+    async def render_preview(self, path) -> bool:
+        """将当前通道内容绘制为图像文件，不写屏"""
+        if self.system.lanes is None:
+            return False
+
+        def render():
+            controller = self.system.display_controller
+            if not hasattr(controller, 'render_lanes'):
+                return False
+            rendered = controller.render_lanes(self.system.lanes.values(), [])
+            if rendered is None:
+                return False
+            rendered[0].save(path)
+            return True
+
+        async with self._update_lock:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._render_executor, render)
+
+    async def drain(self):
+        """等待队列中的帧全部写入"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def stop(self):
+        """写完剩余的帧后停止写屏任务"""
+        if self._writer_task is not None:
+            await self.drain()
+            self._queue.put_nowait(None)
+            await self._writer_task
+            self._writer_task = None
+        self._render_executor.shutdown(wait=True)
+        self._write_executor.shutdown(wait=True)
+
+    async def run(self, scheduler, mode_name: str = "守护进程模式", control_socket=None):
+        """
+        按调度器触发更新，直到调度器停止。
+
+        调度器的阻塞等待在线程池中执行，退出信号设置停止事件后立即返回。
+        指定control_socket时同时在该路径提供本地控制接口。
+        """
+        loop = asyncio.get_running_loop()
+        await self.start()
+        control = None
+        if control_socket:
+            from daily_word_control import ControlServer
+            control = ControlServer(self, control_socket)
+            await control.start()
+        if self.notifier is not None:
+            self.notifier.ready(f"{mode_name}已启动")
+            interval = self.notifier.watchdog_interval()
+            if interval:
+                self._watchdog_task = asyncio.create_task(self._watchdog(interval))
+        try:
+            await self.submit_update()
+            while not scheduler.stopped:
+                due: List[str] = await loop.run_in_executor(None, scheduler.wait)
+                if not due:
+                    break
+                # 内容频率到期时强制对应通道刷新
+                force_lanes = [name.split(':', 1)[1] for name in due if name.startswith('content:')]
+                logger.info(f"{mode_name}触发: {', '.join(due)}")
+                await self.submit_update(False, force_lanes)
+        finally:
+            if self.notifier is not None:
+                self.notifier.stopping()
+            if control is not None:
+                await control.stop()
+            await self.stop()
+            if self._watchdog_task is not None:
+                self._watchdog_task.cancel()
+                self._watchdog_task = None
+        logger.info(f"{mode_name}已停止")
+
+    def log_latency(self):
+        """输出各阶段最近一次的耗时"""
+        parts = [f"{name} {stats.last_ms:.0f}ms" for name, stats in self.stats.items()
+                 if stats.last_ms is not None]
+        if parts:
+            logger.info(f"更新流水线耗时: {', '.join(parts)}")
+
+    def get_stats(self) -> Dict:
+        """各阶段耗时统计，供系统状态使用"""
+        return {
+            'stages': {name: stats.to_dict() for name, stats in self.stats.items()},
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'dropped_frames': self.dropped_frames,
+            'skipped_updates': self.skipped_updates,
+        }
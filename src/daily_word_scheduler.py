@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+每日单词墨水屏显示系统 - 更新调度器
+Daily Word E-Paper Display System - Update Scheduler
+
+根据定时时间点、固定间隔和内容更新频率计算下一次精确的触发时刻，在Event上
+睡眠直到截止时间，收到退出信号时立即返回；支持随机延迟、时区和挂起后的补执行。
+外部截止时间（如内容通道最早的过期时刻）也参与计算下一次唤醒
+"""
+
+import logging
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, tzinfo
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 单次睡眠的上限(秒)：Event.wait基于单调时钟，系统挂起期间不计时，
+# 定期醒来对照墙上时钟即可发现挂起并补执行错过的时间点
+MAX_SLEEP = 300
+
+# 内容更新频率对应的日历时间点（*表示每小时）
+FREQUENCY_TIMES = {
+    'daily': ['00:00'],
+    'hourly': ['*:00'],
+}
+
+# 外部截止时间任务两次触发的最小间隔(秒)，截止时间没有推后时避免忙循环
+MIN_DEADLINE_GAP = 1.0
+
+_TIME_PATTERN = re.compile(r'^(\*|\d{1,2}):(\d{2})$')
+
+
+def _clock() -> float:
+    """包含挂起时间的单调时钟（Linux上为CLOCK_BOOTTIME）"""
+    if hasattr(time, 'CLOCK_BOOTTIME'):
+        return time.clock_gettime(time.CLOCK_BOOTTIME)
+    return time.monotonic()
+
+
+def load_timezone(name: Optional[str]) -> Optional[tzinfo]:
+    """加载时区，不可用时退回系统本地时区"""
+    if not name:
+        return None
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(name)
+    except Exception as e:
+        logger.warning(f"无法加载时区 {name}，使用系统本地时区: {e}")
+        return None
+
+
+def parse_interval(value) -> Optional[int]:
+    """解析间隔：整数秒或 '30s'/'10m'/'2h'/'1d' 形式"""
+    if isinstance(value, (int, float)):
+        return int(value) if value > 0 else None
+    match = re.match(r'^\s*(\d+)\s*([smhd]?)\s*$', str(value))
+    if not match:
+        return None
+    seconds = int(match.group(1)) * {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}[match.group(2)]
+    return seconds or None
+
+
+class _CalendarJob:
+    """按墙上时钟触发的任务（'HH:MM' 或每小时的 '*:MM'）"""
+
+    def __init__(self, name: str, times: List[str], jitter: float, tz: Optional[tzinfo],
+                 rng: random.Random):
+        self.name = name
+        self.slots: List[Tuple[Optional[int], int]] = []
+        for value in times:
+            match = _TIME_PATTERN.match(value.strip())
+            if not match:
+                raise ValueError(f"无效的时间格式: {value}")
+            hour = None if match.group(1) == '*' else int(match.group(1))
+            minute = int(match.group(2))
+            if (hour is not None and hour > 23) or minute > 59:
+                raise ValueError(f"无效的时间: {value}")
+            self.slots.append((hour, minute))
+        self.jitter = jitter
+        self.tz = tz
+        self.rng = rng
+        self.next_slot = self._slot_after(self._now())
+        self.next_fire = self._with_jitter(self.next_slot)
+
+    def _now(self) -> datetime:
+        return datetime.now(self.tz)
+
+    def _slot_after(self, moment: datetime) -> datetime:
+        """严格晚于moment的下一个时间点"""
+        base = moment.replace(second=0, microsecond=0)
+        candidates = []
+        for hour, minute in self.slots:
+            if hour is None:
+                candidate = base.replace(minute=minute)
+                if candidate <= moment:
+                    candidate += timedelta(hours=1)
+            else:
+                candidate = base.replace(hour=hour, minute=minute)
+                if candidate <= moment:
+                    candidate += timedelta(days=1)
+            candidates.append(candidate)
+        return min(candidates)
+
+    def _with_jitter(self, slot: datetime) -> datetime:
+        if self.jitter > 0:
+            return slot + timedelta(seconds=self.rng.uniform(0, self.jitter))
+        return slot
+
+    def seconds_until(self) -> float:
+        # 同一时区的两个时刻相减只按墙上时间计算，跨夏令时切换会差一小时，改用绝对时间戳
+        return self.next_fire.timestamp() - self._now().timestamp()
+
+    def advance(self) -> int:
+        """触发后计算下一个时间点，返回期间错过的时间点数（挂起或更新耗时过长）"""
+        now = self._now()
+        missed = 0
+        slot = self._slot_after(self.next_slot)
+        while slot <= now:
+            missed += 1
+            slot = self._slot_after(slot)
+        self.next_slot = slot
+        self.next_fire = self._with_jitter(slot)
+        return missed
+
+
+class _IntervalJob:
+    """按固定间隔触发的任务，截止时间基于单调时钟累加，不随更新耗时漂移"""
+
+    def __init__(self, name: str, interval: float):
+        self.name = name
+        self.interval = interval
+        self.deadline = _clock() + interval
+
+    def seconds_until(self) -> float:
+        return self.deadline - _clock()
+
+    def advance(self) -> int:
+        now = _clock()
+        missed = 0
+        self.deadline += self.interval
+        while self.deadline <= now:
+            missed += 1
+            self.deadline += self.interval
+        return missed
+
+
+class _DeadlineJob:
+    """截止时间由外部提供的任务（触发后由调用方推后截止时间，如刷新通道后更新其过期时刻）"""
+
+    def __init__(self, name: str, seconds_until: Callable[[], float], min_gap: float = MIN_DEADLINE_GAP):
+        self.name = name
+        self.source = seconds_until
+        self.min_gap = min_gap
+        self.last_fire: Optional[float] = None
+
+    def seconds_until(self) -> float:
+        remaining = self.source()
+        if self.last_fire is not None:
+            remaining = max(remaining, self.last_fire + self.min_gap - _clock())
+        return remaining
+
+    def advance(self) -> int:
+        self.last_fire = _clock()
+        return 0
+
+
+class UpdateScheduler:
+    """基于截止时间的更新调度器"""
+
+    def __init__(self, timezone: Optional[str] = None, jitter: float = 0,
+                 stop_event: Optional[threading.Event] = None, max_sleep: float = MAX_SLEEP,
+                 rng: Optional[random.Random] = None):
+        """
+        初始化调度器
+
+        参数:
+        - timezone: 定时时间点使用的时区名称，如 'Asia/Shanghai'
+        - jitter: 定时时间点的随机延迟上限(秒)
+        - stop_event: 退出事件，设置后wait()立即返回
+        - max_sleep: 单次睡眠上限(秒)，用于发现系统挂起
+        """
+        self.tz = load_timezone(timezone)
+        self.jitter = jitter
+        self.stop_event = stop_event or threading.Event()
+        self.max_sleep = max_sleep
+        self.rng = rng or random.Random()
+        self._jobs: Dict[str, object] = {}
+
+    def add_times(self, name: str, times: List[str], jitter: Optional[float] = None):
+        """添加按时间点触发的任务（'HH:MM'，或 '*:MM' 表示每小时）"""
+        self._jobs[name] = _CalendarJob(name, times, self.jitter if jitter is None else jitter,
+                                        self.tz, self.rng)
+
+    def add_interval(self, name: str, seconds: float):
+        """添加固定间隔任务"""
+        if seconds <= 0:
+            raise ValueError(f"无效的间隔: {seconds}")
+        self._jobs[name] = _IntervalJob(name, seconds)
+
+    def add_deadline(self, name: str, seconds_until: Callable[[], float]):
+        """
+        添加截止时间由外部提供的任务
+
+        参数:
+        - seconds_until: 返回距离截止时间秒数的函数，没有截止时间时返回 float('inf')
+        """
+        self._jobs[name] = _DeadlineJob(name, seconds_until)
+
+    def add_frequency(self, name: str, frequency) -> bool:
+        """添加内容更新频率任务：daily/hourly 对齐到日历，其余按间隔解析"""
+        if frequency in FREQUENCY_TIMES:
+            self.add_times(name, FREQUENCY_TIMES[frequency])
+            return True
+        seconds = parse_interval(frequency)
+        if seconds:
+            self.add_interval(name, seconds)
+            return True
+        logger.warning(f"无法识别的更新频率 {name}: {frequency}")
+        return False
+
+    @property
+    def jobs(self) -> List[str]:
+        return list(self._jobs)
+
+    def stop(self):
+        """停止调度，唤醒正在等待的线程"""
+        self.stop_event.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self.stop_event.is_set()
+
+    def next_deadline(self) -> Tuple[float, List[str]]:
+        """距离下一次触发的秒数，以及届时到期的任务"""
+        if not self._jobs:
+            return float('inf'), []
+        remaining = {name: job.seconds_until() for name, job in self._jobs.items()}
+        soonest = min(remaining.values())
+        return soonest, [name for name, value in remaining.items() if value <= soonest + 1]
+
+    def due_jobs(self) -> List[str]:
+        """当前已到期的任务，并推进它们的下一次截止时间"""
+        due = []
+        for name, job in self._jobs.items():
+            if job.seconds_until() <= 0:
+                missed = job.advance()
+                if missed:
+                    logger.warning(f"任务 {name} 错过了 {missed} 次触发（系统挂起或更新耗时过长），合并补执行一次")
+                due.append(name)
+        return due
+
+    def wait(self) -> List[str]:
+        """
+        睡眠到下一个截止时间并返回到期的任务。
+
+        返回:
+        - list: 到期任务名称；调度器已停止时返回空列表。
+        """
+        while not self.stopped:
+            due = self.due_jobs()
+            if due:
+                return due
+
+            remaining, upcoming = self.next_deadline()
+            if remaining == float('inf'):
+                self.stop_event.wait()
+                break
+            logger.debug(f"下一次触发: {', '.join(upcoming)}，{remaining:.1f} 秒后")
+            self.stop_event.wait(min(max(remaining, 0), self.max_sleep))
+        return []
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+每日单词墨水屏显示系统 - systemd集成
+Daily Word E-Paper Display System - systemd Integration
+
+不依赖libsystemd，直接向NOTIFY_SOCKET发送sd_notify消息：
+- READY=1：守护进程完成启动（服务单元使用Type=notify）
+- WATCHDOG=1：由异步运行时定期发送；某个阶段卡住超过stall_timeout时停止发送，
+  由systemd在WatchdogSec到期后重启服务
+- STATUS=...：systemctl status中显示最近一次更新的结果
+"""
+
+import logging
+import os
+import socket
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SystemdNotifier:
+    """sd_notify客户端；不在systemd下运行（没有NOTIFY_SOCKET）时所有方法都是空操作"""
+
+    def __init__(self):
+        self.address = os.environ.get('NOTIFY_SOCKET')
+        self._socket: Optional[socket.socket] = None
+        if self.address and self.address.startswith('@'):
+            # 抽象命名空间套接字
+            self.address = '\0' + self.address[1:]
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.address)
+
+    def notify(self, state: str) -> bool:
+        """发送一条通知，失败时只记录日志"""
+        if not self.address:
+            return False
+        try:
+            if self._socket is None:
+                self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM | socket.SOCK_CLOEXEC)
+                # 从事件循环中调用，接收端积压时不能阻塞
+                self._socket.setblocking(False)
+            self._socket.sendto(state.encode('utf-8'), self.address)
+            return True
+        except OSError as e:
+            logger.warning(f"sd_notify发送失败: {e}")
+            return False
+
+    def ready(self, status: Optional[str] = None) -> bool:
+        return self.notify('READY=1' + (f'\nSTATUS={status}' if status else ''))
+
+    def status(self, text: str) -> bool:
+        return self.notify(f'STATUS={text}')
+
+    def stopping(self) -> bool:
+        return self.notify('STOPPING=1')
+
+    def watchdog(self) -> bool:
+        return self.notify('WATCHDOG=1')
+
+    def watchdog_interval(self) -> Optional[float]:
+        """
+        看门狗喂狗间隔（秒）：取WatchdogSec的一半；未配置看门狗时返回None
+
+        参考sd_watchdog_enabled：WATCHDOG_PID存在时必须与当前进程一致
+        """
+        usec = os.environ.get('WATCHDOG_USEC')
+        pid = os.environ.get('WATCHDOG_PID')
+        if not self.address or not usec:
+            return None
+        if pid and pid.isdigit() and int(pid) != os.getpid():
+            return None
+        try:
+            return int(usec) / 1e6 / 2
+        except ValueError:
+            return None
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+def format_status(success: bool, now: Optional[float] = None) -> str:
+    """STATUS文本：最近一次更新的时间和结果"""
+    stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))
+    return f"上次更新 {stamp} {'成功' if success else '失败'}"
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+每日单词墨水屏显示系统 - 系统遥测
+Daily Word E-Paper Display System - System Telemetry
+
+后台线程按固定间隔读取CPU温度、内存和磁盘空间，最近的读数和一段紧凑的历史保存在内存中；
+IP地址通过netlink路由/地址变化通知更新，不再每次绘制都创建UDP套接字。
+绘制和状态查询直接读取内存中的值。
+"""
+
+import logging
+import os
+import socket
+import struct
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 默认采样间隔(秒)和历史条数
+DEFAULT_INTERVAL = 60
+DEFAULT_HISTORY = 120
+
+THERMAL_PATH = '/sys/class/thermal/thermal_zone0/temp'
+MEMINFO_PATH = '/proc/meminfo'
+
+# netlink路由通知组：IPv4地址、IPv4路由、网卡状态
+NETLINK_ROUTE = 0
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+
+# 地址变化后可能连续收到多条通知，合并在该时间窗口内只解析一次
+NETLINK_DEBOUNCE = 0.5
+
+
+def read_ip_address() -> str:
+    """通过UDP套接字的路由选择获得本机出口IP（不发送数据）"""
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.connect(('10.255.255.255', 1))
+        return s.getsockname()[0]
+    except OSError:
+        return '127.0.0.1'
+    finally:
+        s.close()
+
+
+class _SourceFile:
+    """保持打开的/proc、/sys文件，每次用pread从头读取，不再反复open"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def read(self) -> Optional[bytes]:
+        try:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDONLY | os.O_CLOEXEC)
+            return os.pread(self._fd, 4096, 0)
+        except OSError:
+            self.close()
+            return None
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class TelemetryRing:
+    """
+    定长历史环：每条记录打包为14字节
+    (时间戳秒, 温度×100, 可用内存KiB, 磁盘剩余MiB)，缺失值记为-1
+    """
+
+    RECORD = struct.Struct('<IhiI')
+
+    def __init__(self, slots: int = DEFAULT_HISTORY):
+        self.slots = slots
+        self._buffer = bytearray(self.RECORD.size * slots)
+        self._count = 0
+
+    def append(self, sample: Dict):
+        temperature = sample.get('cpu_temperature')
+        memory = sample.get('memory_available')
+        disk = sample.get('disk_free')
+        offset = (self._count % self.slots) * self.RECORD.size
+        self.RECORD.pack_into(
+            self._buffer, offset,
+            int(sample['timestamp']),
+            int(temperature * 100) if temperature is not None else -1,
+            memory // 1024 if memory is not None else -1,
+            disk // (1024 * 1024) if disk is not None else 0xFFFFFFFF,
+        )
+        self._count += 1
+
+    def __len__(self) -> int:
+        return min(self._count, self.slots)
+
+    def records(self) -> List[Dict]:
+        """按时间顺序返回历史记录"""
+        result = []
+        start = self._count - len(self)
+        for index in range(start, self._count):
+            timestamp, temperature, memory, disk = self.RECORD.unpack_from(
+                self._buffer, (index % self.slots) * self.RECORD.size)
+            result.append({
+                'timestamp': timestamp,
+                'cpu_temperature': temperature / 100 if temperature != -1 else None,
+                'memory_available': memory * 1024 if memory != -1 else None,
+                'disk_free': disk * 1024 * 1024 if disk != 0xFFFFFFFF else None,
+            })
+        return result
+
+
+class TelemetrySampler:
+    """后台遥测采样器"""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, history: int = DEFAULT_HISTORY,
+                 disk_path: str = '/'):
+        """
+        初始化采样器
+
+        参数:
+        - interval: 温度/内存/磁盘的采样间隔(秒)
+        - history: 历史环保留的记录数
+        - disk_path: 统计剩余空间的挂载点
+        """
+        self.interval = interval
+        self.disk_path = disk_path
+        self.history = TelemetryRing(history)
+        self._thermal = _SourceFile(THERMAL_PATH)
+        self._meminfo = _SourceFile(MEMINFO_PATH)
+        self._latest: Dict = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._netlink: Optional[socket.socket] = None
+        self.ip_changes = 0
+
+    # ---------- 读取 ----------
+
+    def _read_temperature(self) -> Optional[float]:
+        data = self._thermal.read()
+        try:
+            return int(data) / 1000.0 if data else None
+        except ValueError:
+            return None
+
+    def _read_memory(self) -> Dict[str, Optional[int]]:
+        memory = {'memory_total': None, 'memory_available': None}
+        data = self._meminfo.read()
+        if not data:
+            return memory
+        for line in data.split(b'\n'):
+            field, _, rest = line.partition(b':')
+            if field == b'MemTotal':
+                memory['memory_total'] = int(rest.split()[0]) * 1024
+            elif field == b'MemAvailable':
+                memory['memory_available'] = int(rest.split()[0]) * 1024
+                break
+        return memory
+
+    def _read_disk_free(self) -> Optional[int]:
+        try:
+            stat = os.statvfs(self.disk_path)
+            return stat.f_bavail * stat.f_frsize
+        except OSError:
+            return None
+
+    def sample(self) -> Dict:
+        """读取一次温度/内存/磁盘并写入历史"""
+        sample = {
+            'timestamp': time.time(),
+            'cpu_temperature': self._read_temperature(),
+            'disk_free': self._read_disk_free(),
+        }
+        sample.update(self._read_memory())
+        with self._lock:
+            self._latest.update(sample)
+            self.history.append(sample)
+        return sample
+
+    def refresh_ip(self) -> str:
+        """重新解析IP地址，变化时记录日志"""
+        ip_address = read_ip_address()
+        with self._lock:
+            previous = self._latest.get('ip_address')
+            self._latest['ip_address'] = ip_address
+        if previous is not None and previous != ip_address:
+            self.ip_changes += 1
+            logger.info(f"IP地址变化: {previous} -> {ip_address}")
+        return ip_address
+
+    # ---------- 后台线程 ----------
+
+    def _open_netlink(self) -> Optional[socket.socket]:
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+            sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE))
+            return sock
+        except (AttributeError, OSError) as e:
+            logger.info(f"netlink不可用，IP地址改为随采样间隔轮询: {e}")
+            return None
+
+    def _run_sampler(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+                if self._netlink is None:
+                    self.refresh_ip()
+            except Exception as e:
+                logger.error(f"遥测采样失败: {e}")
+
+    def _run_netlink(self):
+        sock = self._netlink
+        while not self._stop.is_set():
+            try:
+                if not sock.recv(65536):
+                    # 套接字已被关闭（shutdown后recv不再阻塞）
+                    raise OSError("netlink套接字已关闭")
+                # 合并短时间内的连续通知
+                sock.settimeout(NETLINK_DEBOUNCE)
+                try:
+                    while sock.recv(65536):
+                        pass
+                except socket.timeout:
+                    pass
+                finally:
+                    sock.settimeout(None)
+                self.refresh_ip()
+            except OSError:
+                if self._stop.is_set():
+                    return
+                logger.warning("netlink监听中断，IP地址改为随采样间隔轮询")
+                self._netlink = None
+                return
+
+    def start(self) -> 'TelemetrySampler':
+        """同步采样一次后启动后台线程，保证第一次读取就有数据"""
+        if self._threads:
+            return self
+        self.sample()
+        self.refresh_ip()
+        self._netlink = self._open_netlink()
+        targets = [('daily-word-telemetry', self._run_sampler)]
+        if self._netlink is not None:
+            targets.append(('daily-word-netlink', self._run_netlink))
+        for name, target in targets:
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._netlink is not None:
+            # shutdown使阻塞的recv返回
+            try:
+                self._netlink.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._netlink.close()
+        for thread in self._threads:
+            thread.join(timeout=1)
+        self._threads = []
+        self._thermal.close()
+        self._meminfo.close()
+
+    # ---------- 查询 ----------
+
+    def latest(self) -> Dict:
+        """最近一次的全部读数"""
+        with self._lock:
+            return dict(self._latest)
+
+    def get_stats(self) -> Dict:
+        return {
+            'interval': self.interval,
+            'history': len(self.history),
+            'ip_changes': self.ip_changes,
+            'ip_watch': 'netlink' if self._netlink is not None else 'polling',
+        }
+
+
+_sampler: Optional[TelemetrySampler] = None
+_sampler_lock = threading.Lock()
+
+
+def get_sampler() -> TelemetrySampler:
+    """进程内共享的采样器，首次调用时按MONITOR_CONFIG创建并启动"""
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            try:
+                from daily_word_config import MONITOR_CONFIG
+            except ImportError:
+                MONITOR_CONFIG = {}
+            _sampler = TelemetrySampler(
+                interval=MONITOR_CONFIG.get('telemetry_interval', DEFAULT_INTERVAL),
+                history=MONITOR_CONFIG.get('telemetry_history', DEFAULT_HISTORY),
+            ).start()
+        return _sampler
+
+
+def peek_sampler() -> Optional[TelemetrySampler]:
+    """已启动的共享采样器，尚未启动时返回None（不创建、不启动后台线程）"""
+    with _sampler_lock:
+        return _sampler
+
+
+def read_once() -> Dict:
+    """
+    不启动后台线程和netlink监听，同步读取一次全部读数。
+
+    供 --status 等一次性命令使用；守护进程中应读取共享采样器的内存值。
+    """
+    sampler = TelemetrySampler()
+    try:
+        sampler.sample()
+        sampler.refresh_ip()
+        return sampler.latest()
+    finally:
+        sampler.stop()
+
+
+def get_ip_address() -> str:
+    """当前IP地址（内存读数）"""
+    return get_sampler().latest().get('ip_address') or '127.0.0.1'
@@ -4,12 +4,83 @@
 Daily Word System Test Script
 """
 
+import hashlib
+import importlib
 import sys
+import types
+from contextlib import contextmanager
 from pathlib import Path
 
 # 添加src目录到Python路径
 sys.path.insert(0, str(Path(__file__).parent))
 
+
+class SpiRecorder(types.ModuleType):
+    """代替epdconfig记录 (命令/数据, 字节) 流，连续的数据传输合并为一段"""
+    RST_PIN, DC_PIN, CS_PIN, BUSY_PIN, PWR_PIN = 17, 25, 8, 24, 18
+    
+    def __init__(self):
+        super().__init__('waveshare_epd.epdconfig')
+        self.idle = 1
+        self.clear()
+    
+    def clear(self):
+        self.dc = 0
+        self.stream = []
+        self.writes = 0
+    
+    def digital_write(self, pin, value):
+        if pin == self.DC_PIN:
+            self.dc = value
+    
+    def digital_read(self, pin):
+        return self.idle
+    
+    def delay_ms(self, delaytime):
+        pass
+    
+    def wait_busy(self, level, timeout=None, poll_ms=10):
+        return self.idle != level
+    
+    def spi_writebyte(self, data):
+        self.writes += 1
+        kind = b'D' if self.dc else b'C'
+        if kind == b'D' and self.stream and self.stream[-1][0] == b'D':
+            self.stream[-1][1].extend(data)
+        else:
+            self.stream.append((kind, bytearray(data)))
+    
+    spi_writebyte2 = spi_writebyte
+    
+    def module_init(self):
+        return 0
+    
+    def module_exit(self, cleanup=False):
+        pass
+    
+    def digest(self):
+        h = hashlib.sha256()
+        for kind, data in self.stream:
+            h.update(kind + len(data).to_bytes(4, 'little') + bytes(data))
+        return h.hexdigest()[:16]
+
+
+@contextmanager
+def recorded_drivers(recorder):
+    """在上下文中用recorder代替epdconfig导入waveshare_epd驱动，退出时恢复原模块"""
+    saved_modules = {name: module for name, module in sys.modules.items() if name.startswith('waveshare_epd')}
+    for name in saved_modules:
+        del sys.modules[name]
+    sys.modules['waveshare_epd.epdconfig'] = recorder
+    try:
+        import waveshare_epd
+        waveshare_epd.epdconfig = recorder
+        yield
+    finally:
+        for name in [name for name in sys.modules if name.startswith('waveshare_epd')]:
+            del sys.modules[name]
+        sys.modules.update(saved_modules)
+
 def test_imports():
     """测试模块导入"""
     print("🔍 测试模块导入...")
@@ -133,6 +204,2223 @@ def test_system_integration():
         print(f"❌ 系统集成测试失败: {e}")
         return False
 
+def test_persistence_recovery():
+    """测试事务提交日志的崩溃恢复"""
+    print("\n💾 测试持久化崩溃恢复...")
+    
+    import json
+    import os
+    import tempfile
+    
+    try:
+        from daily_word_file_manager import DailyWordFileManager, DailyWordTransaction
+        
+        word = {'word': 'resilience', 'source': 'test'}
+        quote = {'text': 'Stay hungry, stay foolish.', 'author': 'Steve Jobs', 'source': 'test'}
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # 1. 提交记录已落盘但尚未应用到数据文件（提交后崩溃）
+            manager = DailyWordFileManager(temp_dir)
+            manager._apply = lambda record, applied=None: None
+            if not manager.save_current_content(word, quote):
+                print("❌ 事务提交失败")
+                return False
+            if manager.current_content_file.exists():
+                print("❌ 模拟崩溃时数据文件不应已写入")
+                return False
+            
+            # 2. 提交日志末尾追加一条不完整的事务（写入过程中断电）
+            with open(manager.commit_log_file, 'ab') as f:
+                f.write(b'{"txn":1,"json_writes":{"')
+            
+            manager = DailyWordFileManager(temp_dir)
+            content = manager.load_current_content()
+            if not content or content['word']['word'] != 'resilience':
+                print("❌ 重启后未能重放已提交的事务")
+                return False
+            if manager.commit_log_file.stat().st_size != 0:
+                print("❌ 恢复后提交日志未被检查点清空")
+                return False
+            print("✅ 已提交事务重放成功，不完整事务已丢弃")
+            
+            # 3. 已应用的事务再次重放不应产生重复的历史和日志记录
+            with manager.transaction() as txn:
+                manager.save_current_content(word, quote)
+            record = json.dumps(txn.to_record(), ensure_ascii=False) + '\n'
+            with open(manager.commit_log_file, 'a', encoding='utf-8') as f:
+                f.write(record)
+            
+            manager = DailyWordFileManager(temp_dir)
+            logs = manager.get_update_logs(limit=10)
+            if len(logs) != 2:
+                print(f"❌ 重放不幂等，更新日志记录数为 {len(logs)}")
+                return False
+            history = manager.get_content_history(days=1)
+            if any('_txn' in entry for entry in logs + history):
+                print("❌ 读取的记录中不应包含事务id")
+                return False
+            print("✅ 重复重放保持幂等")
+            
+            # 3b. 同一事务向同一日志追加两条记录，崩溃时只应用了第一条：重放补上第二条
+            with manager.transaction() as txn:
+                manager._append_record('update_log', {'note': 'first'})
+                manager._append_record('update_log', {'note': 'second'})
+            first = txn.to_record()['appends'][0]['record']
+            manager.checkpoint()
+            store = manager.update_log_store
+            # 模拟：提交日志只剩这个事务，数据文件中只有第一条
+            lines = [line for line in store._segment_path(store.active_segment).read_bytes().splitlines(True)
+                     if b'"second"' not in line]
+            store._segment_path(store.active_segment).write_bytes(b''.join(lines))
+            with open(manager.commit_log_file, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(txn.to_record(), ensure_ascii=False) + '\n')
+            manager = DailyWordFileManager(temp_dir)
+            notes = [entry.get('note') for entry in manager.get_update_logs(limit=20) if entry.get('note')]
+            if sorted(notes) != ['first', 'second']:
+                print(f"❌ 部分应用的事务重放错误: {notes}")
+                return False
+            
+            # 3c. 事务id不单调（墙上时钟回拨）：两个事务都已应用后崩溃，重放不产生重复记录
+            manager.checkpoint()
+            with open(manager.commit_log_file, 'w', encoding='utf-8') as f:
+                for txn_id, note in ((200, 'later id'), (100, 'earlier id')):
+                    txn = DailyWordTransaction()
+                    txn.txn_id = txn_id
+                    txn.append('update_log', {'note': note})
+                    manager._apply(txn.to_record())
+                    f.write(json.dumps(txn.to_record(), ensure_ascii=False) + '\n')
+            manager = DailyWordFileManager(temp_dir)
+            notes = [entry.get('note') for entry in manager.get_update_logs(limit=20) if entry.get('note')]
+            if notes.count('later id') != 1 or notes.count('earlier id') != 1:
+                print(f"❌ 事务id回拨时重放产生重复记录: {notes}")
+                return False
+            print("✅ 同一事务的多条记录逐条去重")
+            
+            # 3d. 检查点只fsync本管理器写入的文件和目录，不调用os.sync()
+            synced = []
+            real_fsync, real_sync = os.fsync, os.sync
+            
+            def recording_fsync(fd):
+                synced.append(os.readlink(f'/proc/self/fd/{fd}'))
+                real_fsync(fd)
+            
+            def forbidden_sync():
+                raise AssertionError("检查点不应调用os.sync()")
+            
+            os.fsync, os.sync = recording_fsync, forbidden_sync
+            try:
+                manager.save_current_content(word, quote)
+                synced.clear()
+                manager.checkpoint()
+            finally:
+                os.fsync, os.sync = real_fsync, real_sync
+            expected = {str(path.resolve()) for path in (
+                manager.current_content_file, manager.data_dir, manager.journal_dir,
+                manager.update_log_store.segment_paths()[-1], manager.commit_log_file)}
+            if not expected <= set(synced):
+                print(f"❌ 检查点没有同步: {sorted(expected - set(synced))}")
+                return False
+            print(f"✅ 检查点fsync了 {len(synced)} 个文件/目录")
+            
+            # 4. 事务中抛出异常时丢弃全部变更
+            try:
+                with manager.transaction():
+                    manager.save_current_content({'word': 'discarded'}, quote)
+                    raise RuntimeError("模拟更新失败")
+            except RuntimeError:
+                pass
+            if manager.load_current_content()['word']['word'] != 'resilience':
+                print("❌ 失败的事务不应写入数据")
+                return False
+            print("✅ 失败事务已回滚")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ 持久化恢复测试失败: {e}")
+        return False
+
+def test_history_store():
+    """测试分段日志存储：尾部读取、日期索引、滚动压缩、乱序记录和断电残行修复"""
+    print("\n📚 测试日志存储...")
+    
+    import tempfile
+    
+    try:
+        from daily_word_history_store import JournalStore, keep_newest_records, keep_recent_keys
+        
+        def record(day, **extra):
+            return dict({'date': f'2024-01-{day:02d}', 'word': f'w{day}'}, **extra)
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # 1. 小分段强制滚动，尾部读取跨分段
+            store = JournalStore(temp_dir, 'history', key_field='date', segment_max_bytes=120, durable=False)
+            for day in range(1, 21):
+                store.append(record(day))
+            if len(store.segment_paths()) < 3:
+                print(f"❌ 分段没有滚动: {len(store.segment_paths())} 个分段")
+                return False
+            tail = [r['word'] for r in store.tail(5)]
+            if tail != ['w16', 'w17', 'w18', 'w19', 'w20']:
+                print(f"❌ 尾部读取顺序错误: {tail}")
+                return False
+            if [r['word'] for r in store.iter_reverse()] != [f'w{day}' for day in range(20, 0, -1)]:
+                print("❌ 倒序遍历跨分段时顺序错误")
+                return False
+            print(f"✅ {len(store.segment_paths())} 个分段，尾部读取正确")
+            
+            # 2. 日期索引：同一天以最新记录为准，重新打开后（含索引保存之后追加的记录）仍可查到
+            store.append(record(3, word='w3-new'))
+            reopened = JournalStore(temp_dir, 'history', key_field='date', segment_max_bytes=120, durable=False)
+            if reopened.get('2024-01-03')['word'] != 'w3-new' or reopened.get('2024-01-20')['word'] != 'w20':
+                print("❌ 日期索引没有返回最新记录")
+                return False
+            if reopened.keys() != [f'2024-01-{day:02d}' for day in range(1, 21)]:
+                print("❌ 重新打开后日期索引不完整")
+                return False
+            print("✅ 日期索引正确")
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # 3. 乱序记录：补写的旧日期后面还有更新的记录，按截止日期读取不能提前停止
+            store = JournalStore(temp_dir, 'history', key_field='date', durable=False)
+            for day in (10, 11, 5, 12, 6):
+                store.append(record(day))
+            found = sorted(r['date'] for r in store.iter_since('2024-01-08'))
+            if found != ['2024-01-10', '2024-01-11', '2024-01-12']:
+                print(f"❌ 遇到较早的记录后提前停止: {found}")
+                return False
+            print("✅ 分段内乱序记录全部读取")
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # 4. 压缩：从最旧的分段起删除整段早于截止日期的分段，遇到段内有较新记录的分段即停止
+            store = JournalStore(temp_dir, 'history', key_field='date', segment_max_bytes=1 << 20, durable=False)
+            for days in ((1, 2), (3, 9, 4), (5, 6), (7, 8)):
+                for day in days:
+                    store.append(record(day))
+                store.roll()
+            removed = store.compact(keep_recent_keys(store, lambda: '2024-01-07'))
+            remaining = [r['date'] for r in store.iter_reverse()]
+            if removed != 1 or '2024-01-09' not in remaining or '2024-01-02' in remaining:
+                print(f"❌ 按日期压缩结果错误: 删除 {removed} 个分段，剩余 {remaining}")
+                return False
+            if store.get('2024-01-01') is not None or store.get('2024-01-09')['word'] != 'w9':
+                print("❌ 压缩后日期索引没有同步")
+                return False
+            
+            log = JournalStore(Path(temp_dir) / 'log', 'log', segment_max_bytes=1 << 20, durable=False)
+            for day in range(1, 13):
+                log.append(record(day))
+                if day % 3 == 0:
+                    log.roll()
+            log.compact(keep_newest_records(log, 5))
+            kept = len(list(log.iter_reverse()))
+            if not 5 <= kept < 9 or log.tail(5) != [record(day) for day in range(8, 13)]:
+                print(f"❌ 按条数压缩结果错误: 保留 {kept} 条")
+                return False
+            print("✅ 压缩策略正确")
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # 5. 活动分段末尾的半行记录在打开时截断，缺少换行的完整记录补上换行
+            store = JournalStore(temp_dir, 'history', key_field='date', durable=False)
+            store.append(record(1))
+            path = store.segment_paths()[-1]
+            size = path.stat().st_size
+            with open(path, 'ab') as f:
+                f.write(b'{"date":"2024-01-02","wo')
+            store = JournalStore(temp_dir, 'history', key_field='date', durable=False)
+            if path.stat().st_size != size:
+                print("❌ 不完整记录没有被截断")
+                return False
+            store.append(record(3))
+            with open(path, 'rb+') as f:
+                f.truncate(path.stat().st_size - 1)
+            store = JournalStore(temp_dir, 'history', key_field='date', durable=False)
+            store.append(record(4))
+            if [r['word'] for r in store.iter_reverse()] != ['w4', 'w3', 'w1']:
+                print("❌ 修复末尾后追加的记录不完整")
+                return False
+            print("✅ 末尾残行修复正确")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ 日志存储测试失败: {e}")
+        return False
+
+def test_content_lanes():
+    """测试内容通道：内容变化检测、失败重试时间，以及通道过期唤醒调度器"""
+    print("\n🔍 测试内容通道...")
+    
+    from datetime import datetime, timedelta
+    
+    try:
+        from daily_word_lanes import RETRY_DELAY, ContentLane, LaneManager
+        from daily_word_scheduler import UpdateScheduler
+        
+        now = datetime(2026, 1, 2, 12, 0)
+        results = [{'ip': '10.0.0.1', 'fetched_at': 1}, {'ip': '10.0.0.1', 'fetched_at': 2},
+                   {'ip': '10.0.0.2', 'fetched_at': 3}, None]
+        lane = ContentLane('ip', lambda: results.pop(0), 60,
+                           key=lambda value: {k: v for k, v in value.items() if k != 'fetched_at'})
+        
+        changes = [lane.refresh(now) for _ in range(3)]
+        if changes != [True, False, True]:
+            print(f"❌ 内容变化检测错误: {changes}")
+            return False
+        if lane.expires_at != now + timedelta(seconds=60):
+            print("❌ 刷新后的过期时刻应为有效期之后")
+            return False
+        
+        # 获取失败：保留旧值，在 min(RETRY_DELAY, ttl) 后重试
+        if lane.refresh(now) or lane.value['ip'] != '10.0.0.2' or lane.error_count != 1:
+            print("❌ 获取失败时应保留旧值")
+            return False
+        if lane.expires_at != now + timedelta(seconds=min(RETRY_DELAY, 60)):
+            print("❌ 失败重试时间不应超过通道有效期")
+            return False
+        slow = ContentLane('word', lambda: None, 'daily')
+        slow.refresh(now)
+        if slow.expires_at != now + timedelta(seconds=RETRY_DELAY):
+            print("❌ 失败后应在重试间隔后重试")
+            return False
+        print(f"   变化检测: {changes}，失败后 {min(RETRY_DELAY, 60)} 秒重试")
+        
+        # 通道最早的过期时刻唤醒调度器
+        lanes = LaneManager()
+        clock = lanes.add(ContentLane('clock', lambda: 'tick', 'hourly'))
+        clock.seed('tick', datetime.now())
+        clock.expires_at = datetime.now() + timedelta(seconds=0.2)
+        scheduler = UpdateScheduler(max_sleep=5)
+        scheduler.add_interval('interval', 3600)
+        scheduler.add_deadline('lanes', lanes.seconds_until_next_expiry)
+        due = scheduler.wait()
+        if due != ['lanes']:
+            print(f"❌ 通道过期时调度器未被唤醒: {due}")
+            return False
+        
+        # 由频率任务驱动的单词通道：零点不自行过期，只在频率任务强制时刷新一次
+        fetched = []
+        lanes = LaneManager()
+        word = lanes.add(ContentLane('word', lambda: fetched.append(1) or f'w{len(fetched)}', 'daily',
+                                     scheduled=True))
+        clock = lanes.add(ContentLane('clock', lambda: 'tick', 'hourly'))
+        evening = datetime(2026, 1, 2, 23, 30)
+        lanes.refresh_expired(evening)
+        midnight = datetime(2026, 1, 3, 0, 0, 1)
+        if lanes.expired(midnight) != ['clock'] or word.expires_at is not None:
+            print(f"❌ 调度器驱动的通道不应按有效期过期: {lanes.expired(midnight)}")
+            return False
+        lanes.refresh_expired(midnight)
+        lanes.expire(['word'])
+        if lanes.refresh_expired(midnight + timedelta(minutes=3)) != ['word'] or len(fetched) != 2:
+            print(f"❌ 频率任务应强制刷新单词通道恰好一次: {len(fetched)}")
+            return False
+        failing = ContentLane('quote', lambda: None, 'daily', scheduled=True)
+        failing.refresh(evening)
+        if not failing.is_expired(evening + timedelta(seconds=RETRY_DELAY)):
+            print("❌ 调度器驱动的通道获取失败后仍应按重试间隔重试")
+            return False
+        print(f"   单词通道零点后获取 {len(fetched) - 1} 次（仅频率任务）")
+        
+        # 强制获取新内容时使用refetch，之后恢复普通获取函数
+        calls = []
+        cached = ContentLane('word', lambda: calls.append('cache') or 'a', 'daily',
+                             refetch=lambda: calls.append('api') or 'b')
+        cached.refresh(evening)
+        cached.expire(refetch=True)
+        cached.refresh(evening)
+        cached.expire()
+        cached.refresh(evening)
+        if calls != ['cache', 'api', 'cache']:
+            print(f"❌ 强制获取新内容时应使用refetch: {calls}")
+            return False
+        
+        print("✅ 内容通道正常")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 内容通道测试失败: {e}")
+        return False
+
+def test_update_scheduler():
+    """测试更新调度器：日历时间点、随机延迟范围、时区与夏令时、挂起后的补执行和截止时间任务的最小间隔"""
+    print("\n🔍 测试更新调度器...")
+    
+    import random
+    import time
+    from datetime import datetime, timedelta
+    
+    try:
+        from zoneinfo import ZoneInfo
+        from daily_word_scheduler import (MIN_DEADLINE_GAP, UpdateScheduler, _CalendarJob,
+                                          _DeadlineJob, parse_interval)
+        
+        clock = [datetime(2026, 1, 2, 7, 0)]
+        
+        class FakeCalendarJob(_CalendarJob):
+            def _now(self):
+                return clock[0]
+        
+        # 日历时间点：严格晚于当前时刻的最近一个时间点，每小时任务对齐到整点
+        job = FakeCalendarJob('scheduled', ['20:00', '08:00'], 0, None, random.Random(1))
+        if job.next_slot != datetime(2026, 1, 2, 8, 0):
+            print(f"❌ 下一个时间点错误: {job.next_slot}")
+            return False
+        if job._slot_after(datetime(2026, 1, 2, 8, 0)) != datetime(2026, 1, 2, 20, 0):
+            print("❌ 恰好处于时间点时应取下一个时间点")
+            return False
+        if job._slot_after(datetime(2026, 1, 2, 21, 0)) != datetime(2026, 1, 3, 8, 0):
+            print("❌ 当天时间点已过时应取次日")
+            return False
+        hourly = FakeCalendarJob('hourly', ['*:15'], 0, None, random.Random(1))
+        if hourly.next_slot != datetime(2026, 1, 2, 7, 15) or \
+                hourly._slot_after(datetime(2026, 1, 2, 7, 15)) != datetime(2026, 1, 2, 8, 15):
+            print(f"❌ 每小时时间点错误: {hourly.next_slot}")
+            return False
+        for value in ('25:00', '08:60', '8'):
+            try:
+                FakeCalendarJob('bad', [value], 0, None, random.Random(1))
+                print(f"❌ 无效时间 {value} 应被拒绝")
+                return False
+            except ValueError:
+                pass
+        
+        # 挂起后的补执行：错过的时间点合并为一次触发，下一次对齐到未来的时间点
+        clock[0] = datetime(2026, 1, 4, 9, 0)
+        if job.seconds_until() > 0:
+            print("❌ 错过的时间点应立即到期")
+            return False
+        missed = job.advance()
+        if missed != 4 or job.next_slot != datetime(2026, 1, 4, 20, 0):
+            print(f"❌ 补执行计算错误: 错过 {missed} 次，下一次 {job.next_slot}")
+            return False
+        
+        # 随机延迟：触发时刻落在 [时间点, 时间点 + jitter] 内，且不是固定值
+        clock[0] = datetime(2026, 1, 2, 7, 0)
+        jittered = FakeCalendarJob('jitter', ['08:00'], 300, None, random.Random(7))
+        delays = []
+        for _ in range(50):
+            delays.append((jittered.next_fire - jittered.next_slot).total_seconds())
+            jittered.advance()
+        if not all(0 <= delay <= 300 for delay in delays) or len(set(delays)) < 2:
+            print(f"❌ 随机延迟超出范围: {min(delays)}..{max(delays)}")
+            return False
+        scheduler = UpdateScheduler(jitter=120, rng=random.Random(3))
+        scheduler.add_frequency('content:word', 'daily')
+        content = scheduler._jobs['content:word']
+        if content.jitter != 120 or not 0 <= (content.next_fire - content.next_slot).total_seconds() <= 120:
+            print("❌ 内容频率任务应使用调度器的随机延迟")
+            return False
+        print(f"   随机延迟 {min(delays):.0f}..{max(delays):.0f} 秒，挂起后错过 {missed} 次合并执行")
+        
+        # 时区与夏令时：剩余秒数按真实时间计算，切换当天的时间点只触发一次
+        tz = ZoneInfo('America/New_York')
+        clock[0] = datetime(2026, 3, 8, 1, 59, tzinfo=tz)  # 02:00 EST 跳到 03:00 EDT
+        spring = FakeCalendarJob('spring', ['03:00'], 0, tz, random.Random(1))
+        if abs(spring.seconds_until() - 60) > 1e-6:
+            print(f"❌ 夏令时开始时剩余秒数错误: {spring.seconds_until()}")
+            return False
+        clock[0] = datetime(2026, 11, 1, 1, 30, tzinfo=tz)  # 01:00-02:00 重复一次
+        autumn = FakeCalendarJob('autumn', ['01:45'], 0, tz, random.Random(1))
+        if abs(autumn.seconds_until() - 900) > 1e-6:
+            print(f"❌ 夏令时结束时剩余秒数错误: {autumn.seconds_until()}")
+            return False
+        clock[0] = datetime(2026, 11, 1, 1, 46, tzinfo=tz, fold=1)  # 第二次经过01:46
+        autumn.advance()
+        if autumn.next_slot.date() != datetime(2026, 11, 2).date() or autumn.seconds_until() <= 0:
+            print(f"❌ 重复的一小时内不应再次触发: {autumn.next_slot}")
+            return False
+        
+        # 截止时间任务：触发后至少间隔 MIN_DEADLINE_GAP，外部截止时间没推后也不会忙循环
+        deadline = _DeadlineJob('lanes', lambda: 0.0)
+        if deadline.seconds_until() > 0:
+            print("❌ 截止时间已到时应立即到期")
+            return False
+        deadline.advance()
+        if not MIN_DEADLINE_GAP - 0.1 <= deadline.seconds_until() <= MIN_DEADLINE_GAP:
+            print(f"❌ 触发后的最小间隔错误: {deadline.seconds_until()}")
+            return False
+        scheduler = UpdateScheduler(max_sleep=5)
+        scheduler.add_deadline('lanes', lambda: 0.0)
+        start = time.monotonic()
+        fired = [scheduler.wait() for _ in range(2)]
+        elapsed = time.monotonic() - start
+        if fired != [['lanes'], ['lanes']] or elapsed < MIN_DEADLINE_GAP * 0.9:
+            print(f"❌ 截止时间任务应按最小间隔限速: {fired}, {elapsed:.2f}s")
+            return False
+        
+        # 间隔解析
+        cases = {'30s': 30, '10m': 600, '2h': 7200, '1d': 86400, 45: 45, '90': 90,
+                 0: None, '0m': None, 'abc': None, '5w': None}
+        parsed = {value: parse_interval(value) for value in cases}
+        if parsed != cases:
+            print(f"❌ 间隔解析错误: {parsed}")
+            return False
+        
+        scheduler.stop()
+        if scheduler.wait() != []:
+            print("❌ 停止后wait()应返回空列表")
+            return False
+        
+        print("✅ 更新调度器正常")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 更新调度器测试失败: {e}")
+        return False
+
+def test_telemetry():
+    """测试系统遥测：历史环回绕、/proc读数解析、netlink通知合并，以及一次性状态查询不启动采样器"""
+    print("\n🌡️ 测试系统遥测...")
+    
+    import socket
+    import tempfile
+    import threading
+    import time
+    
+    try:
+        import daily_word_telemetry as telemetry
+        from daily_word_telemetry import NETLINK_DEBOUNCE, TelemetryRing, TelemetrySampler, _SourceFile
+        
+        # 1. 历史环：写满后覆盖最旧的记录，按时间顺序读出，缺失值保持为None
+        ring = TelemetryRing(3)
+        for index in range(5):
+            ring.append({'timestamp': 1000 + index, 'cpu_temperature': 40.25 + index,
+                         'memory_available': (index + 1) * 1024 * 1024,
+                         'disk_free': None if index == 4 else (index + 1) * 1024 ** 3})
+        records = ring.records()
+        if len(ring) != 3 or [record['timestamp'] for record in records] != [1002, 1003, 1004]:
+            print(f"❌ 历史环回绕错误: {records}")
+            return False
+        if records[0] != {'timestamp': 1002, 'cpu_temperature': 42.25,
+                          'memory_available': 3 * 1024 * 1024, 'disk_free': 3 * 1024 ** 3} \
+                or records[-1]['disk_free'] is not None:
+            print(f"❌ 历史环记录打包错误: {records[0]}, {records[-1]}")
+            return False
+        print(f"✅ 历史环 {ring.slots} 槽写入 5 条后保留最新 {len(ring)} 条")
+        
+        # 2. 温度和内存读数解析（保持打开的文件，每次从头读取）
+        with tempfile.TemporaryDirectory() as temp_dir:
+            thermal = Path(temp_dir) / 'temp'
+            meminfo = Path(temp_dir) / 'meminfo'
+            thermal.write_text('48312\n')
+            meminfo.write_text('MemTotal:        3884400 kB\nMemFree:          120000 kB\n'
+                               'MemAvailable:    2000000 kB\nBuffers:           50000 kB\n')
+            sampler = TelemetrySampler(disk_path=temp_dir)
+            sampler._thermal, sampler._meminfo = _SourceFile(str(thermal)), _SourceFile(str(meminfo))
+            try:
+                sample = sampler.sample()
+                thermal.write_text('bogus\n')
+                broken = sampler._read_temperature()
+            finally:
+                sampler.stop()
+        if (sample['cpu_temperature'] != 48.312 or sample['memory_total'] != 3884400 * 1024
+                or sample['memory_available'] != 2000000 * 1024 or not sample['disk_free']):
+            print(f"❌ 读数解析错误: {sample}")
+            return False
+        if broken is not None:
+            print("❌ 无效的温度读数应返回None")
+            return False
+        
+        # 3. netlink通知：一串连续通知只重新解析一次IP；套接字关闭后退回轮询
+        sampler = TelemetrySampler()
+        refreshed = []
+        sampler.refresh_ip = lambda: refreshed.append(time.monotonic())
+        listener, sender = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sampler._netlink = listener
+        thread = threading.Thread(target=sampler._run_netlink, daemon=True)
+        thread.start()
+        try:
+            for _ in range(5):
+                sender.send(b'RTM_NEWADDR')
+            time.sleep(NETLINK_DEBOUNCE + 0.3)
+            burst = len(refreshed)
+            sender.send(b'RTM_NEWROUTE')
+            time.sleep(NETLINK_DEBOUNCE + 0.3)
+            listener.shutdown(socket.SHUT_RDWR)
+            thread.join(2)
+        finally:
+            sender.close()
+            listener.close()
+        if burst != 1 or len(refreshed) != 2:
+            print(f"❌ netlink通知合并错误: 第一批 {burst} 次，共 {len(refreshed)} 次")
+            return False
+        if thread.is_alive() or sampler._netlink is not None:
+            print("❌ netlink套接字关闭后应退出监听并改为轮询")
+            return False
+        print(f"✅ 5 条连续通知合并为 {burst} 次IP解析，套接字关闭后改为轮询")
+        
+        # 4. 一次性状态查询只同步读取一次，不创建共享采样器和后台线程
+        from daily_word_main import DailyWordSystem
+        saved = telemetry._sampler
+        telemetry._sampler = None
+        try:
+            threads_before = {thread.name for thread in threading.enumerate()}
+            status = DailyWordSystem().get_system_status()
+            started = {thread.name for thread in threading.enumerate()} - threads_before
+            created = telemetry._sampler
+        finally:
+            telemetry._sampler = saved
+        if created is not None or any(name.startswith('daily-word-') for name in started):
+            print(f"❌ 状态查询启动了采样器: {sorted(started)}")
+            return False
+        if not status['system'].get('ip_address') or status.get('telemetry') is not None:
+            print(f"❌ 一次性状态查询读数错误: {status['system']}")
+            return False
+        print(f"✅ 状态查询未启动采样器，IP {status['system']['ip_address']}")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ 系统遥测测试失败: {e}")
+        return False
+
+def test_poem_repository():
+    """测试诗词仓库：WAL模式、内容哈希去重、检索、每日诗词，以及旧表迁移"""
+    print("\n📜 测试诗词仓库...")
+    
+    import sqlite3
+    import tempfile
+    
+    try:
+        from class_poem_repository import PoemRepository
+        
+        poems = [
+            {'title': '登鹳雀楼', 'dynasty': '唐代', 'author': '王之涣',
+             'content': '欲穷千里目', 'full_content': '白日依山尽\n欲穷千里目'},
+            {'title': '登鹳雀楼', 'dynasty': '唐代', 'author': '王之涣',
+             'content': '白日依山尽', 'full_content': '白日依山尽 \n 欲穷千里目'},
+            {'title': '春晓', 'dynasty': '唐代', 'author': '孟浩然',
+             'content': '春眠不觉晓', 'full_content': '春眠不觉晓\n处处闻啼鸟'},
+        ]
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # 1. 批量写入按内容哈希去重（忽略空白差异），重复保存返回已有id
+            with PoemRepository(str(Path(temp_dir) / 'poems.db')) as repository:
+                inserted = repository.save_poems(poems, batch_size=2)
+                mode = repository._conn.execute('PRAGMA journal_mode').fetchone()[0]
+                first_id = repository.search('登鹳雀楼')[0]
+                again = repository.save_poem(poems[1])
+                hits = repository.find_ids_by_content('欲穷千里目')
+                short_hits = repository.search('春')
+                days = {repository.daily_poem(f'2026-05-{day:02d}')[0] for day in range(1, 15)}
+                same_day = repository.daily_poem('2026-05-01') == repository.daily_poem('2026-05-01')
+                repository.update_content(first_id, '白日依山尽')
+                moved = repository.find_ids_by_content('白日依山尽')
+                repository.delete_poem(first_id)
+                remaining = repository.count()
+                fts = repository.fts_enabled
+            if inserted != 2 or mode != 'wal' or again != first_id:
+                print(f"❌ 去重错误: 新增 {inserted}, 模式 {mode}, 重复保存 {again}/{first_id}")
+                return False
+            if hits != [first_id] or len(short_hits) != 1 or moved != [first_id]:
+                print(f"❌ 检索错误: {hits}, {short_hits}, {moved}")
+                return False
+            
+            # 2. 每日诗词按日期确定，空库返回None
+            if not same_day or len(days) != 2 or remaining != 1:
+                print(f"❌ 每日诗词或删除错误: {days}, {same_day}, {remaining}")
+                return False
+            with PoemRepository(':memory:') as empty:
+                if empty.random_poem() is not None:
+                    print("❌ 空库随机抽取应返回None")
+                    return False
+            print(f"✅ 仓库查询正常（WAL，全文索引{'启用' if fts else '未启用，退化为LIKE'}）")
+            
+            # 3. 旧表迁移：补齐内容哈希并删除重复记录
+            legacy_path = str(Path(temp_dir) / 'legacy.db')
+            conn = sqlite3.connect(legacy_path)
+            conn.execute('CREATE TABLE poems (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, '
+                         'dynasty TEXT, author TEXT, content TEXT NOT NULL, full_content TEXT NOT NULL, '
+                         'saved_at DATETIME DEFAULT CURRENT_TIMESTAMP)')
+            rows = [('春晓', '唐代', '孟浩然', '春眠不觉晓', '春眠不觉晓\n处处闻啼鸟'),
+                    ('春晓', '唐代', '孟浩然', '处处闻啼鸟', '春眠不觉晓 处处闻啼鸟'),
+                    ('静夜思', '唐代', '李白', '床前明月光', '床前明月光\n疑是地上霜')]
+            conn.executemany('INSERT INTO poems (title, dynasty, author, content, full_content) '
+                             'VALUES (?, ?, ?, ?, ?)', rows)
+            conn.commit()
+            conn.close()
+            with PoemRepository(legacy_path) as repository:
+                ids = [row[0] for row in repository._conn.execute('SELECT id FROM poems ORDER BY id')]
+                unhashed = repository._conn.execute(
+                    'SELECT COUNT(*) FROM poems WHERE content_hash IS NULL').fetchone()[0]
+            if ids != [1, 3] or unhashed:
+                print(f"❌ 旧表迁移错误: 保留 {ids}，未补齐哈希 {unhashed} 条")
+                return False
+            print("✅ 旧表迁移保留最早的记录并删除重复")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ 诗词仓库测试失败: {e}")
+        return False
+
+def test_poem_corpus():
+    """测试离线诗词语料导入：流式数组解析（含跨读取边界的数字）、格式规范化和去重导入"""
+    print("\n📚 测试诗词语料导入...")
+    
+    import io
+    import json
+    import tempfile
+    
+    try:
+        from class_poem_repository import content_hash
+        from process_poem_corpus import _iter_json_array, iter_corpus_file, load_corpus, normalize_record
+        
+        # 1. 流式数组解析：任意读取块大小都与一次性解析结果一致
+        text = '[{"title": "静夜思", "n": [1, 2]}, 12345, -0.5e3, "床前", true, null, 6789]'
+        expected = json.loads(text)
+        broken = [size for size in range(1, len(text) + 2)
+                  if list(_iter_json_array(io.StringIO(text), size)) != expected]
+        if broken:
+            print(f"❌ 块大小 {broken[:5]} 时解析结果错误")
+            return False
+        try:
+            list(_iter_json_array(io.StringIO('{"title": "x"}'), 4))
+            print("❌ 非数组JSON应被拒绝")
+            return False
+        except ValueError:
+            pass
+        print(f"✅ 块大小 1..{len(text) + 1} 的流式解析均正确")
+        
+        # 2. 三种语料格式规范化为同一首诗
+        formats = [
+            {'title': '登鹳雀楼', 'dynasty': '唐代', 'author': '王之涣',
+             'content': '欲穷千里目', 'full_content': '白日依山尽\n欲穷千里目'},
+            {'title': '登鹳雀楼', 'author': '王之涣', 'paragraphs': ['白日依山尽', '欲穷千里目']},
+            {'data': {'content': '欲穷千里目', 'origin': {'title': '登鹳雀楼', 'dynasty': '唐代', 'author': '王之涣',
+                                                        'content': ['白日依山尽', '欲穷千里目']}}},
+        ]
+        normalized = [normalize_record(record, '唐代') for record in formats]
+        if len({content_hash(poem) for poem in normalized}) != 1 or normalized[1]['content'] != '白日依山尽':
+            print(f"❌ 语料格式规范化错误: {normalized}")
+            return False
+        if normalize_record({'author': '无名'}) is not None:
+            print("❌ 缺少标题和正文的记录应被丢弃")
+            return False
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            corpus = Path(temp_dir) / 'corpus'
+            corpus.mkdir()
+            (corpus / 'tang.json').write_text(json.dumps(formats[:2], ensure_ascii=False), encoding='utf-8')
+            (corpus / 'extra.jsonl').write_text(
+                json.dumps({'title': '春晓', 'author': '孟浩然', 'paragraphs': ['春眠不觉晓', '处处闻啼鸟']},
+                           ensure_ascii=False) + '\nnot json\n\n' +
+                json.dumps({'title': '春晓', 'author': '孟浩然', 'full_content': '春眠不觉晓 \n处处闻啼鸟'},
+                           ensure_ascii=False) + '\n', encoding='utf-8')
+            (corpus / 'api.json').write_text(json.dumps(formats[2], ensure_ascii=False), encoding='utf-8')
+            if len(list(iter_corpus_file(corpus / 'extra.jsonl'))) != 2:
+                print("❌ JSONL中无法解析的行应被跳过")
+                return False
+            
+            # 3. 目录导入：跨文件按内容哈希去重
+            stats = load_corpus([corpus], str(Path(temp_dir) / 'poems.db'), batch_size=2,
+                                default_dynasty='唐代')
+            if (stats['read'], stats['inserted'], stats['duplicates'], stats['total']) != (5, 2, 3, 2):
+                print(f"❌ 语料导入统计错误: {stats}")
+                return False
+            print(f"✅ 导入 {stats['read']} 条，新增 {stats['inserted']} 条，重复 {stats['duplicates']} 条")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ 诗词语料导入测试失败: {e}")
+        return False
+
+def test_metrics_ring():
+    """测试指标环形文件：写满后回绕覆盖、重启后续写序号，以及超过槽位大小的快照"""
+    print("\n📈 测试指标环形文件...")
+    
+    import tempfile
+    
+    try:
+        from daily_word_metrics import MetricsRegistry, MetricsService, RingFile
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / 'metrics.ring'
+            
+            # 1. 回绕：3个槽位写入5条，只保留最新3条，文件大小固定
+            ring = RingFile(path, slots=3, slot_size=128)
+            for index in range(5):
+                ring.append({'value': index})
+            records = ring.read_all()
+            if [record['seq'] for record in records] != [3, 4, 5] or path.stat().st_size != 3 * 128:
+                print(f"❌ 回绕错误: {[record['seq'] for record in records]}, {path.stat().st_size} 字节")
+                return False
+            
+            # 2. 重启后从最大序号续写，覆盖最旧的槽位
+            ring = RingFile(path, slots=3, slot_size=128)
+            ring.append({'value': 5})
+            if ring.seq != 6 or [record['value'] for record in ring.read_all()] != [3, 4, 5]:
+                print(f"❌ 重启后续写错误: seq={ring.seq}, {ring.read_all()}")
+                return False
+            print("✅ 3 个槽位写入 6 条后保留最新 3 条，重启后续写序号")
+            
+            # 3. 超过槽位大小：单条记录拒绝写入，不破坏相邻槽位
+            before = path.read_bytes()
+            if ring.fits({'value': 'x' * 200}) or ring.append({'value': 'x' * 200}):
+                print("❌ 超过槽位大小的记录应被拒绝")
+                return False
+            if path.read_bytes() != before or ring.seq != 6:
+                print("❌ 被拒绝的记录不应修改文件")
+                return False
+            
+            # 4. 指标快照超过槽位：去掉占用最大的指标并记录，其余指标照常写入
+            registry = MetricsRegistry()
+            registry.inc('small_total')
+            for endpoint in range(40):
+                registry.observe('big_seconds', 0.1, endpoint=f'endpoint-{endpoint}')
+            service = MetricsService({'metrics_file': Path(temp_dir) / 'service.ring',
+                                      'metrics_ring_slots': 4, 'metrics_slot_size': 512}, registry)
+            record = service._ring_record(registry.snapshot())
+            if record.get('truncated') != ['big_seconds'] or 'small_total' not in record['metrics']:
+                print(f"❌ 快照裁剪错误: {record.get('truncated')}, {list(record['metrics'])}")
+                return False
+            if not service.ring.append(record):
+                print("❌ 裁剪后的快照应能写入槽位")
+                return False
+            if 'truncated' in service._ring_record({'small_total': registry.snapshot()['small_total']}):
+                print("❌ 未超出槽位的快照不应裁剪")
+                return False
+            print(f"✅ 超出 {service.ring.slot_size} 字节槽位的快照去掉了 {record['truncated']}")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ 指标环形文件测试失败: {e}")
+        return False
+
+def test_weather_service():
+    """测试天气服务：TTL缓存、最小请求间隔、条件请求、磁盘缓存，以及天气图标缓存"""
+    print("\n🌤️ 测试天气服务...")
+    
+    import io
+    import tempfile
+    import types
+    
+    try:
+        import daily_word_weather as weather
+        from daily_word_weather import IconCache, WeatherService
+        from PIL import Image
+        
+        clock = [1000.0]
+        real_time = weather.time
+        weather.time = types.SimpleNamespace(time=lambda: clock[0])
+        try:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                config = {'api_url': 'http://example.invalid/current.json', 'ttl': 60,
+                          'min_poll_interval': 300, 'timeout': 1,
+                          'cache_file': Path(temp_dir) / 'weather.json',
+                          'icon_cache_dir': Path(temp_dir) / 'icons'}
+                service = WeatherService('key', config)
+                responses = []
+                etags = []
+                
+                def fake_request(city, etag):
+                    etags.append(etag)
+                    return responses.pop(0)
+                
+                service._request = fake_request
+                
+                # 1. 首次请求，TTL内直接返回缓存
+                responses.append({'data': {'temp_c': 20}, 'etag': 'v1'})
+                first = service.get_current('Beijing')
+                clock[0] += 30
+                cached = service.get_current('Beijing')
+                if first != {'temp_c': 20} or cached != first or len(etags) != 1:
+                    print(f"❌ TTL缓存错误: {first}, {cached}, 请求 {len(etags)} 次")
+                    return False
+                
+                # 2. TTL已过但未到最小请求间隔（force也一样）：不请求，返回旧数据
+                clock[0] += 100
+                if service.get_current('Beijing') != first or service.get_current('Beijing', force=True) != first \
+                        or len(etags) != 1:
+                    print(f"❌ 最小请求间隔内不应请求: {len(etags)} 次")
+                    return False
+                
+                # 3. 到达最小间隔：带ETag条件请求，304时保留数据并刷新获取时间
+                clock[0] += 200
+                responses.append('not-modified')
+                if service.get_current('Beijing') != first or etags[-1] != 'v1':
+                    print(f"❌ 条件请求错误: ETag {etags}")
+                    return False
+                if service._entries['Beijing']['fetched_at'] != clock[0]:
+                    print("❌ 304后应刷新获取时间")
+                    return False
+                
+                # 4. 请求失败：保留旧数据，最小间隔后再重试
+                clock[0] += 300
+                responses.append(None)
+                failed = service.get_current('Beijing')
+                clock[0] += 100
+                retried = service.get_current('Beijing')
+                if failed != first or retried != first or len(etags) != 3:
+                    print(f"❌ 请求失败后应保留旧数据并按间隔重试: {len(etags)} 次")
+                    return False
+                print(f"✅ 7 次查询只请求 {len(etags)} 次（TTL {config['ttl']}s，最小间隔 {config['min_poll_interval']}s）")
+                
+                # 5. 磁盘缓存：新实例直接使用未过期的数据；未配置密钥时不请求
+                clock[0] += 10
+                restarted = WeatherService(None, config)
+                if restarted.get_current('Beijing', force=False) != first or restarted.requests:
+                    print("❌ 重启后应使用磁盘缓存")
+                    return False
+                if restarted.get_current('Shanghai') is not None or restarted.requests:
+                    print("❌ 未配置密钥时不应请求")
+                    return False
+                
+                # 6. 图标：转换为目标尺寸的1位图像；磁盘上已有转换结果时不下载
+                source = Image.new('RGBA', (64, 64), (0, 0, 0, 0))
+                source.paste((0, 0, 0, 255), (16, 16, 48, 48))
+                data = io.BytesIO()
+                source.save(data, format='PNG')
+                icon = IconCache.convert(data.getvalue(), (32, 32))
+                if icon.mode != '1' or icon.size != (32, 32) or icon.getpixel((0, 0)) == 0 \
+                        or icon.getpixel((16, 16)) != 0:
+                    print(f"❌ 图标转换错误: {icon.mode} {icon.size}")
+                    return False
+                icons = IconCache(config['icon_cache_dir'])
+                url = '//cdn.weatherapi.com/weather/64x64/day/113.png'
+                path = icons.path_for(url, (32, 32))
+                if path != icons.path_for('https:' + url, (32, 32)):
+                    print("❌ 协议相对地址应与https地址使用同一缓存文件")
+                    return False
+                path.parent.mkdir(parents=True)
+                icon.save(path)
+                loaded = icons.get(url, (32, 32))
+                again = icons.get(url, [32, 32])
+                if loaded is None or again is not loaded or (icons.hits, icons.misses) != (2, 0):
+                    print(f"❌ 图标缓存未命中: 命中 {icons.hits}，未命中 {icons.misses}")
+                    return False
+                print("✅ 图标从磁盘缓存加载，内存缓存复用同一图像")
+        finally:
+            weather.time = real_time
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ 天气服务测试失败: {e}")
+        return False
+
+def test_import_time():
+    """测试主程序导入耗时（python -X importtime），一次性命令不应导入requests/PIL/驱动"""
+    print("\n🔍 测试主程序导入耗时...")
+    
+    import re
+    import subprocess
+    
+    # 预算按Pi Zero 2计算；其他机器可通过参数调整
+    budget_ms = float(sys.argv[sys.argv.index('--import-budget') + 1]) if '--import-budget' in sys.argv else 300
+    heavy_modules = ('requests', 'PIL', 'spidev', 'gpiozero', 'asyncio', 'http.server')
+    
+    try:
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import daily_word_main'],
+            cwd=str(Path(__file__).parent), capture_output=True, text=True, timeout=60
+        )
+        if result.returncode != 0:
+            print(f"❌ 主程序导入失败: {result.stderr.strip().splitlines()[-1]}")
+            return False
+        
+        # 每行格式: import time: self [us] | cumulative | imported package
+        imported = {}
+        for line in result.stderr.splitlines():
+            match = re.match(r'import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)', line)
+            if match:
+                imported[match.group(4)] = int(match.group(2))
+        
+        total_ms = imported.get('daily_word_main', 0) / 1000
+        print(f"   daily_word_main 累计导入耗时: {total_ms:.1f} ms (预算 {budget_ms:.0f} ms)")
+        for name, cumulative in sorted(imported.items(), key=lambda item: -item[1])[:5]:
+            print(f"   {name}: {cumulative / 1000:.1f} ms")
+        
+        loaded_heavy = [name for name in heavy_modules if name in imported]
+        if loaded_heavy:
+            print(f"❌ 导入主程序时加载了较重的模块: {', '.join(loaded_heavy)}")
+            return False
+        if total_ms > budget_ms:
+            print("❌ 导入耗时超出预算")
+            return False
+        
+        print("✅ 导入耗时在预算内")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 导入耗时测试失败: {e}")
+        return False
+
+def test_driver_registry():
+    """测试驱动注册表与驱动源码一致：分辨率、刷新模式方法存在（只解析源码，不导入驱动）"""
+    print("\n🔍 测试墨水屏驱动注册表...")
+    
+    import ast
+    
+    try:
+        from daily_word_drivers import DRIVER_REGISTRY, pick_refresh_mode
+        
+        if any(name.startswith('waveshare_epd.') for name in sys.modules):
+            print("❌ 导入注册表时加载了驱动模块")
+            return False
+        
+        driver_dir = Path(__file__).parent / 'waveshare_epd'
+        failed = 0
+        for model, info in DRIVER_REGISTRY.items():
+            tree = ast.parse((driver_dir / f'{model}.py').read_text(encoding='utf-8'))
+            constants = {node.targets[0].id: node.value.value for node in tree.body
+                         if isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name)
+                         and isinstance(node.value, ast.Constant)}
+            methods = {node.name for cls in tree.body if isinstance(cls, ast.ClassDef)
+                       for node in cls.body if isinstance(node, ast.FunctionDef)}
+            if (constants.get('EPD_WIDTH'), constants.get('EPD_HEIGHT')) != (info['width'], info['height']):
+                print(f"❌ {model} 分辨率与驱动不一致")
+                failed += 1
+            for mode in info['modes']:
+                init, display = info['methods'].get(mode, ('init', 'display'))
+                init = init[0] if isinstance(init, tuple) else init
+                lut = info['luts'].get(mode)
+                missing = [name for name in (init, display, lut) if name and name not in methods]
+                if missing:
+                    print(f"❌ {model} 的 {mode} 刷新缺少方法: {', '.join(missing)}")
+                    failed += 1
+            if info['base'] and info['base'] not in methods:
+                print(f"❌ {model} 缺少基准画面方法: {info['base']}")
+                failed += 1
+        if failed:
+            return False
+        
+        # epdconfig已按其他后端导入时，configure_gpio不能静默无效
+        import logging
+        from unittest import mock
+        from daily_word_drivers import configure_gpio
+        
+        recorder = SpiRecorder()
+        recorder.gpio_backend = 'gpiozero'
+        warnings = []
+        handler = logging.Handler(logging.WARNING)
+        handler.emit = warnings.append
+        logging.getLogger('daily_word_drivers').addHandler(handler)
+        try:
+            with recorded_drivers(recorder), mock.patch.dict('os.environ', clear=True):
+                configure_gpio({'backend': 'gpiozero'})
+                same = len(warnings)
+            with recorded_drivers(recorder), mock.patch.dict('os.environ', clear=True):
+                configure_gpio({'backend': 'gpiod'})
+        finally:
+            logging.getLogger('daily_word_drivers').removeHandler(handler)
+        if same != 0 or len(warnings) != 1:
+            print("❌ epdconfig已导入后切换GPIO后端没有警告")
+            return False
+        
+        print(f"   已注册 {len(DRIVER_REGISTRY)} 个型号")
+        print(f"   epd2in13_V4 最快刷新: {pick_refresh_mode('epd2in13_V4')}")
+        print(f"   epd7in5b_V2 最快刷新: {pick_refresh_mode('epd7in5b_V2')}")
+        print("✅ 驱动注册表与驱动源码一致")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 驱动注册表测试失败: {e}")
+        return False
+
+def test_refresh_policy():
+    """测试刷新模式策略：首帧完整刷新、残影预算用完后完整刷新、清洁时间后完整刷新"""
+    print("\n🔍 测试刷新模式策略...")
+    
+    from datetime import datetime
+    
+    try:
+        from daily_word_refresh import RefreshPolicy
+        
+        now = datetime(2026, 1, 2, 12, 0)
+        policy = RefreshPolicy('epd2in13_V4', {'full_update_interval': 3, 'clean_time': '03:00'})
+        clock, word = (0, 30, 122, 52), (0, 52, 122, 182)
+        
+        decisions = []
+        for regions in ([clock, word], [clock], [clock], [clock], [clock], [word]):
+            mode, reason = policy.choose(regions, partial_ready=True, now=now)
+            policy.record(mode, regions, 0.3, now=now)
+            decisions.append(mode)
+        print(f"   连续更新的刷新模式: {', '.join(decisions)}")
+        if decisions != ['full', 'partial', 'partial', 'partial', 'full', 'partial']:
+            print("❌ 残影预算未按区域生效")
+            return False
+        
+        if policy.choose([clock], partial_ready=False, now=now)[0] != 'fast':
+            print("❌ 面板RAM无参照画面时应改用快速刷新")
+            return False
+        
+        policy.last_full = datetime(2026, 1, 2, 2, 0)
+        if policy.choose([clock], partial_ready=True, now=now) != ('full', 'clean'):
+            print("❌ 清洁时间后未强制完整刷新")
+            return False
+        
+        tri_colour = RefreshPolicy('epd7in5b_V2')
+        tri_colour.record('full', None, 16.0, now=now)
+        if tri_colour.choose([clock], partial_ready=True, now=now)[0] != 'full':
+            print("❌ 只支持完整刷新的型号选择了其他模式")
+            return False
+        
+        print("✅ 刷新模式策略正常")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 刷新模式策略测试失败: {e}")
+        return False
+
+def test_panel_lut_reload():
+    """测试面板会话每次刷新都下载波形：epd3in52的GC/DU在EVEN/ODD两套波形间交替（不需要硬件）"""
+    print("\n🔍 测试波形LUT加载...")
+    
+    class FakeEPD:
+        def __init__(self):
+            self.Flag = 0
+            self.tables = []
+        
+        def init(self):
+            return 0
+        
+        def display(self, buf):
+            pass
+        
+        def refresh(self):
+            pass
+        
+        def lut_GC(self):
+            self.tables.append(('GC', 'ODD' if self.Flag else 'EVEN'))
+            self.Flag ^= 1
+        
+        def lut_DU(self):
+            self.tables.append(('DU', 'ODD' if self.Flag else 'EVEN'))
+            self.Flag ^= 1
+    
+    try:
+        from daily_word_drivers import get_driver_info
+        from daily_word_panel import PanelSession
+        
+        epd = FakeEPD()
+        session = PanelSession(epd, 'epd3in52')
+        for mode in ('full', 'full', 'fast', 'fast'):
+            session.write(mode, b'')
+        expected = [('GC', 'EVEN'), ('GC', 'ODD'), ('DU', 'EVEN'), ('DU', 'ODD')]
+        print(f"   下载的波形: {epd.tables}")
+        if epd.tables != expected:
+            print("❌ 重复刷新时跳过了波形下载，EVEN/ODD没有交替")
+            return False
+        if get_driver_info('epd3in52')['lut_cacheable']:
+            print("❌ epd3in52 的波形下载有状态，不能标记为可缓存")
+            return False
+        
+        print("✅ 每次刷新都下载波形")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 波形LUT加载测试失败: {e}")
+        return False
+
+def test_power_manager():
+    """测试面板电源管理：空闲超时后睡眠，空闲窗口内的更新取消睡眠（不需要硬件）"""
+    print("\n🔍 测试面板电源管理...")
+    
+    import time
+    
+    class FakeEPD:
+        def __init__(self):
+            self.calls = []
+        
+        def init(self):
+            self.calls.append('init')
+            return 0
+        
+        def display(self, buf):
+            self.calls.append('display')
+        
+        def sleep(self):
+            self.calls.append('sleep')
+    
+    try:
+        from daily_word_panel import PanelSession
+        from daily_word_power import PowerManager
+        
+        epd = FakeEPD()
+        session = PanelSession(epd)
+        power = PowerManager(session, {'idle_sleep_seconds': 0.2, 'max_awake_seconds': None})
+        
+        session.commit('full', b'')
+        power.touch()
+        time.sleep(0.1)
+        # 空闲窗口内的下一次更新
+        power.cancel()
+        session.commit('full', b'')
+        power.touch()
+        time.sleep(0.1)
+        if not session.awake or 'sleep' in epd.calls:
+            print("❌ 空闲窗口内的更新没有取消排定的睡眠")
+            return False
+        
+        time.sleep(0.3)
+        session.wait()
+        if session.awake or epd.calls != ['init', 'display', 'display', 'sleep']:
+            print(f"❌ 空闲超时后未进入深度睡眠: {epd.calls}")
+            return False
+        print(f"   驱动调用: {', '.join(epd.calls)}")
+        
+        capped = PowerManager(session, {'idle_sleep_seconds': 60, 'max_awake_seconds': 0.1})
+        session.commit('full', b'')
+        time.sleep(0.15)
+        capped.touch()
+        time.sleep(0.1)
+        session.wait()
+        if session.awake:
+            print("❌ 连续唤醒超过上限后未进入深度睡眠")
+            return False
+        
+        print("✅ 面板电源管理正常")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 面板电源管理测试失败: {e}")
+        return False
+
+def test_panel_commit():
+    """测试非阻塞提交：SPI传输后立即返回，最后一次BUSY等待在等待线程中完成（不需要硬件）"""
+    print("\n🔍 测试面板非阻塞提交...")
+    
+    import threading
+    
+    class FakeEPD:
+        def __init__(self):
+            self.calls = []
+            self.released = threading.Event()
+            self.refreshing = False
+        
+        def send_command(self, command):
+            self.calls.append(f'cmd {command:#04x}')
+            self.refreshing = command == 0x20
+        
+        def ReadBusy(self):
+            # 只有刷新命令之后BUSY才保持到released
+            self.calls.append('busy')
+            if self.refreshing and not self.released.wait(5):
+                raise TimeoutError('BUSY未释放')
+            self.refreshing = False
+        
+        def init(self):
+            self.calls.append('init')
+            return 0
+        
+        def display(self, buf):
+            # 写入RAM后等待一次BUSY，之后的刷新命令发出后再等待一次
+            self.send_command(0x24)
+            self.ReadBusy()
+            self.send_command(0x20)
+            self.ReadBusy()
+        
+        def sleep(self):
+            self.send_command(0x10)
+            self.calls.append('sleep')
+    
+    try:
+        from daily_word_panel import PanelSession
+        
+        epd = FakeEPD()
+        session = PanelSession(epd)
+        epd.released.set()
+        session.write('full', b'')
+        epd.calls.clear()
+        epd.released.clear()
+        
+        future = session.commit('full', b'')
+        if future.done() or not session.busy:
+            print("❌ commit应在SPI传输后返回，不等待刷新结束")
+            return False
+        # 刷新命令之前的ReadBusy在写屏线程中同步执行，最后一次留给等待线程
+        if epd.calls[:3] != ['cmd 0x24', 'busy', 'cmd 0x20']:
+            print(f"❌ 刷新命令前的BUSY等待没有同步执行: {epd.calls}")
+            return False
+        epd.released.set()
+        elapsed = future.result(5)
+        if session.busy or elapsed <= 0 or epd.calls != ['cmd 0x24', 'busy', 'cmd 0x20', 'busy']:
+            print(f"❌ 等待线程没有完成最后一次BUSY等待: {epd.calls}")
+            return False
+        print("✅ commit在刷新期间返回Future，BUSY释放后完成")
+        
+        epd.calls.clear()
+        epd.released.clear()
+        session.commit('full', b'', sleep_after=True)
+        released = threading.Timer(0.05, epd.released.set)
+        released.start()
+        # 下一次写屏先等待上一次刷新和排队的睡眠完成
+        session.wait(5)
+        released.join()
+        if session.awake or epd.calls[-2:] != ['cmd 0x10', 'sleep']:
+            print(f"❌ sleep_after没有在刷新结束后进入深度睡眠: {epd.calls}")
+            return False
+        session.write('full', b'')
+        if epd.calls[-5:] != ['init', 'cmd 0x24', 'busy', 'cmd 0x20', 'busy']:
+            print(f"❌ 睡眠后的写屏没有重新初始化: {epd.calls}")
+            return False
+        print("✅ sleep_after在等待线程中进入深度睡眠，之后的写屏重新初始化")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ 面板非阻塞提交测试失败: {e}")
+        return False
+
+def test_epd_sequences():
+    """测试驱动寄存器表回放的SPI字节流与原逐字节发送完全一致（不需要硬件）"""
+    print("\n🔍 测试墨水屏寄存器表字节流...")
+    
+    # 原驱动逐字节发送时录得的字节流摘要；(驱动, BUSY空闲电平, [(调用, 参数属性, 摘要)])
+    expected = [
+        ('epd2in13_V3', 0, [
+            ('init', None, '7125689d20cc2f53'),
+            ('SetLut', 'lut_partial_update', '92c145e85bc944c1'),
+            ('SetLut', 'lut_full_update', '4d1d7d7c5f46bc54'),
+        ]),
+        ('epd4in2', 1, [
+            ('init', None, '638036d69cf85d5d'),
+            ('init_Partial', None, 'abeaded84a0faf89'),
+            ('Init_4Gray', None, 'bed09b6998110bf8'),
+            ('set_lut', None, '0cf065f9e5827052'),
+            ('Partial_SetLut', None, 'd87660d716f47fd8'),
+            ('Gray_SetLut', None, 'bb998b0c358dfbfa'),
+        ]),
+        ('epd3in52', 1, [
+            ('init', None, 'd1086adc1c98e6b2'),
+            ('lut_GC', None, 'da28b229d89c3cb5'),
+            ('lut_GC', None, '0c1141dc78e6bc66'),
+            ('lut_DU', None, 'dab5fc7bcc901357'),
+            ('lut_DU', None, '3bc280dde001b1cf'),
+            ('lut', None, 'b45e00f2e11e233f'),
+        ]),
+        ('epd7in5b_V2', 1, [
+            ('init', None, '1e227b553a840b77'),
+        ]),
+    ]
+    
+    recorder = SpiRecorder()
+    try:
+        with recorded_drivers(recorder):
+            failed = 0
+            for driver, idle, calls in expected:
+                epd = importlib.import_module(f'waveshare_epd.{driver}').EPD()
+                recorder.idle = idle
+                for method, argument, digest in calls:
+                    recorder.clear()
+                    args = (getattr(epd, argument),) if argument else ()
+                    getattr(epd, method)(*args)
+                    label = f"{driver}.{method}({argument or ''})"
+                    if recorder.digest() != digest:
+                        print(f"❌ {label} 字节流与原驱动不一致")
+                        failed += 1
+                    else:
+                        print(f"   {label}: {recorder.writes} 次SPI传输")
+        if failed:
+            return False
+        print("✅ 寄存器表字节流与原驱动一致")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 寄存器表测试失败: {e}")
+        return False
+
+def reference_mono_buffer(image, width, height, style):
+    """
+    原驱动的单色getbuffer算法（未取反，1=白）
+    
+    style为 'loop'：先二值化再逐像素映射（横向图像的x映射到面板的行）；
+    'tobytes'：横向图像先旋转再二值化，直接取原始字节
+    """
+    imwidth, imheight = image.size
+    if style == 'tobytes':
+        if (imwidth, imheight) == (width, height):
+            return image.convert('1').tobytes('raw')
+        return image.rotate(90, expand=True).convert('1').tobytes('raw')
+    
+    buf = [0xFF] * (width // 8 * height)
+    pixels = image.convert('1').load()
+    if (imwidth, imheight) == (width, height):
+        for y in range(imheight):
+            for x in range(imwidth):
+                if pixels[x, y] == 0:
+                    buf[(x + y * width) // 8] &= ~(0x80 >> (x % 8))
+    else:
+        for y in range(imheight):
+            for x in range(imwidth):
+                newx = y
+                newy = height - x - 1
+                if pixels[x, y] == 0:
+                    buf[(newx + newy * width) // 8] &= ~(0x80 >> (y % 8))
+    return bytes(buf)
+
+def test_epd_buffers():
+    """测试迁移到基类的单色驱动：pack_image/getbuffer与原算法逐字节一致，Clear/display字节流不变（不需要硬件）"""
+    print("\n🔍 测试墨水屏帧缓冲...")
+    
+    import random
+    from PIL import Image
+    
+    # (驱动, BUSY空闲电平, 原getbuffer算法, 是否取反, Clear摘要, display摘要)
+    # 摘要由原驱动录得；display的帧数据为 (i*7) & 0xFF，双平面型号的第二平面为 (i*13+5) & 0xFF
+    expected = [
+        ('epd3in52', 1, 'loop', False, '5b55d6e9872e3d43', 'a81d574f4ffeb155'),
+        ('epd2in13_V3', 0, 'tobytes', False, 'aca98b86424420c7', 'a2d5aa6da107456f'),
+        ('epd7in5_V2', 1, 'tobytes', True, 'ac1227abcb9fde27', 'c9838c381e1a5237'),
+        ('epd7in5b_V2', 1, 'tobytes', True, 'ac1227abcb9fde27', 'e3fb39c762ed2959'),
+    ]
+    
+    rng = random.Random(20240501)
+    recorder = SpiRecorder()
+    try:
+        with recorded_drivers(recorder):
+            failed = 0
+            for driver, idle, style, invert, clear_digest, display_digest in expected:
+                epd = importlib.import_module(f'waveshare_epd.{driver}').EPD()
+                recorder.idle = idle
+                width, height = epd.width, epd.height
+                
+                # 灰度图像覆盖二值化抖动，1位图像覆盖纯映射；横竖两个方向
+                for mode in ('L', '1'):
+                    for size in ((width, height), (height, width)):
+                        length = size[0] * size[1] if mode == 'L' else (size[0] + 7) // 8 * size[1]
+                        image = Image.frombytes(mode, size, rng.randbytes(length))
+                        reference = reference_mono_buffer(image, width, height, style)
+                        label = f"{driver} {mode} {size[0]}x{size[1]}"
+                        if bytes(epd.pack_image(image)) != reference:
+                            print(f"❌ {label}: pack_image 与原算法不一致")
+                            failed += 1
+                        if invert:
+                            reference = bytes(b ^ 0xFF for b in reference)
+                        if bytes(epd.getbuffer(image)) != reference:
+                            print(f"❌ {label}: getbuffer 与原算法不一致")
+                            failed += 1
+                
+                recorder.clear()
+                epd.Clear()
+                if recorder.digest() != clear_digest:
+                    print(f"❌ {driver}.Clear 字节流与原驱动不一致")
+                    failed += 1
+                
+                size = epd.buffer_size
+                black = bytearray((i * 7) & 0xFF for i in range(size))
+                planes = (black, bytearray((i * 13 + 5) & 0xFF for i in range(size)))
+                original = bytes(black)
+                recorder.clear()
+                epd.display(*(planes if epd.ACCENT_PLANE else planes[:1]))
+                if recorder.digest() != display_digest:
+                    print(f"❌ {driver}.display 字节流与原驱动不一致")
+                    failed += 1
+                if black != original:
+                    print(f"❌ {driver}.display 修改了调用方的缓冲区")
+                    failed += 1
+                print(f"   {driver}: {width}x{height}, 每平面 {size} 字节")
+        if failed:
+            return False
+        print("✅ 帧缓冲与原驱动一致")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 帧缓冲测试失败: {e}")
+        return False
+
+def reference_color_layers(image, accent, tolerance, threshold):
+    """
+    逐像素把彩色图像拆成原驱动需要的两张黑白图像（黑色层、强调色层，0=有墨）
+    
+    强调色强度：红色 R - max(G, B)，黄色 min(R, G) - B；超过tolerance为强调色，
+    其余亮度低于threshold为黑色
+    """
+    from PIL import Image
+    
+    rgb = image.convert('RGB')
+    data = rgb.tobytes()
+    luminance = rgb.convert('L').tobytes()
+    black, color = bytearray(len(luminance)), bytearray(len(luminance))
+    for i, (r, g, b, light) in enumerate(zip(data[0::3], data[1::3], data[2::3], luminance)):
+        strength = min(r, g) - b if accent == 'yellow' else r - max(g, b)
+        is_accent = strength > tolerance
+        color[i] = 0 if is_accent else 255
+        black[i] = 0 if light < threshold and not is_accent else 255
+    return Image.frombytes('L', image.size, bytes(black)), Image.frombytes('L', image.size, bytes(color))
+
+def test_epd_color_planes():
+    """测试三色驱动：getbuffer与原逐像素循环一致，split_planes与逐像素拆层后各跑一遍原getbuffer的结果一致（不需要硬件）"""
+    print("\n🔍 测试三色屏平面拆分...")
+    
+    import random
+    from PIL import Image
+    
+    # (驱动, Clear摘要, display摘要)；摘要由原驱动录得，display的数据与test_epd_buffers相同
+    expected = [
+        ('epd2in13bc', '137f6983970e61e8', '1963aed67615b56e'),
+        ('epd4in2bc', '630a42ee53cec01e', '0c3f6c5273498863'),
+        ('epd5in83b_V2', 'cc4065529b935df6', '25cb360f73d94971'),
+    ]
+    
+    rng = random.Random(20240502)
+    recorder = SpiRecorder()
+    try:
+        with recorded_drivers(recorder):
+            from waveshare_epd.epdbase import ACCENT_TOLERANCE, BLACK_THRESHOLD
+            
+            failed = 0
+            for driver, clear_digest, display_digest in expected:
+                epd = importlib.import_module(f'waveshare_epd.{driver}').EPD()
+                width, height = epd.width, epd.height
+                
+                for size in ((width, height), (height, width)):
+                    label = f"{driver} {size[0]}x{size[1]}"
+                    gray = Image.frombytes('L', size, rng.randbytes(size[0] * size[1]))
+                    if bytes(epd.getbuffer(gray)) != reference_mono_buffer(gray, width, height, 'loop'):
+                        print(f"❌ {label}: getbuffer 与原逐像素循环不一致")
+                        failed += 1
+                    
+                    # 随机RGB覆盖纯色、接近阈值的颜色和灰度
+                    mixed = Image.frombytes('RGB', size, rng.randbytes(size[0] * size[1] * 3))
+                    for accent in ('red', 'yellow'):
+                        layers = reference_color_layers(mixed, accent, ACCENT_TOLERANCE, BLACK_THRESHOLD)
+                        reference = tuple(reference_mono_buffer(layer, width, height, 'loop') for layer in layers)
+                        planes = epd.split_planes(mixed, accent=accent)
+                        if tuple(bytes(plane) for plane in planes) != reference:
+                            print(f"❌ {label} {accent}: split_planes 与逐像素拆层不一致")
+                            failed += 1
+                        buffers = epd.getbuffer_color(mixed, accent=accent)
+                        if tuple(bytes(buf) for buf in buffers) != reference:
+                            print(f"❌ {label} {accent}: getbuffer_color 与逐像素拆层不一致")
+                            failed += 1
+                
+                recorder.clear()
+                epd.Clear()
+                if recorder.digest() != clear_digest:
+                    print(f"❌ {driver}.Clear 字节流与原驱动不一致")
+                    failed += 1
+                
+                size = epd.buffer_size
+                black = bytearray((i * 7) & 0xFF for i in range(size))
+                red = bytearray((i * 13 + 5) & 0xFF for i in range(size))
+                original = bytes(black) + bytes(red)
+                recorder.clear()
+                epd.display(black, red)
+                if recorder.digest() != display_digest:
+                    print(f"❌ {driver}.display 字节流与原驱动不一致")
+                    failed += 1
+                if bytes(black) + bytes(red) != original:
+                    print(f"❌ {driver}.display 修改了调用方的缓冲区")
+                    failed += 1
+                print(f"   {driver}: {width}x{height}, 红/黄两种强调色、横竖两个方向")
+        if failed:
+            return False
+        print("✅ 三色屏平面与原驱动一致")
+        return True
+        
+    except Exception as e:
+        print(f"❌ 三色屏平面测试失败: {e}")
+        return False
+
+def test_async_runtime():
+    """测试异步运行时：丢弃帧的合并、容量为2的写屏队列、强制更新，以及阶段卡住时停止看门狗通知"""
+    print("\n⚙️ 测试异步运行时...")
+    
+    import asyncio
+    import time
+    
+    class FakeSystem:
+        lanes = None
+        display_controller = object()  # 没有render_lanes，按内容帧写屏
+        
+        def __init__(self):
+            self.calls = []
+            self.written = []
+        
+        def refresh_lanes(self, force_lanes, force_new=False):
+            self.calls.append((list(force_lanes), force_new))
+            return {'values': {'word': 'w', 'quote': 'q', 'clock': 'c'}, 'changed': ['clock']}
+        
+        def lanes_to_content(self, values):
+            return dict(values)
+        
+        def show_content(self, content):
+            self.written.append(content)
+        
+        def _log_update_info(self, content):
+            pass
+    
+    class FakeNotifier:
+        def __init__(self):
+            self.pings = 0
+        
+        def watchdog(self):
+            self.pings += 1
+            return True
+    
+    def image_frame(image, regions, lanes):
+        return ('image', (image, regions), {}, lanes)
+    
+    try:
+        from daily_word_runtime import UPDATE_QUEUED, DailyWordRuntime
+        
+        # 1. 合并丢弃帧：保留新帧画面，重绘区域和通道按顺序去重合并，任一帧整屏时结果为整屏
+        merge = DailyWordRuntime._merge_frames
+        merged = merge(image_frame('old', [(0, 0, 8, 8)], ['word']),
+                       image_frame('new', [(0, 0, 8, 8), (8, 0, 16, 8)], ['clock', 'word']))
+        if merged != image_frame('new', [(0, 0, 8, 8), (8, 0, 16, 8)], ['word', 'clock']):
+            print(f"❌ 区域合并错误: {merged}")
+            return False
+        if merge(image_frame('old', None, ['word']), image_frame('new', [(0, 0, 8, 8)], ['ip']))[1][1] is not None:
+            print("❌ 被丢弃帧为整屏重绘时合并结果应为整屏")
+            return False
+        merged = merge(('content', {'a': 1}, {}, ['word']), ('content', {'a': 2}, {}, ['quote']))
+        if merged != ('content', {'a': 2}, {}, ['word', 'quote']):
+            print(f"❌ 内容帧合并错误: {merged}")
+            return False
+        
+        # 2. 容量为2的队列：第三帧到达时丢弃最旧的帧，并把它的区域并入第三帧
+        async def fill_queue():
+            runtime = DailyWordRuntime(FakeSystem(), queue_size=2)
+            runtime._queue = asyncio.Queue(maxsize=2)
+            try:
+                for index, lane in enumerate(('word', 'quote', 'clock')):
+                    runtime._enqueue(image_frame(f'img{index}', [(index, 0, index + 1, 1)], [lane]))
+                queued = [runtime._queue.get_nowait()[1] for _ in range(runtime._queue.qsize())]
+                return queued, runtime.dropped_frames
+            finally:
+                await runtime.stop()
+        
+        queued, dropped = asyncio.run(fill_queue())
+        expected = [image_frame('img1', [(1, 0, 2, 1)], ['quote']),
+                    image_frame('img2', [(0, 0, 1, 1), (2, 0, 3, 1)], ['word', 'clock'])]
+        if queued != expected or dropped != 1:
+            print(f"❌ 写屏队列丢弃/合并错误: {queued}, 丢弃 {dropped}")
+            return False
+        print(f"✅ 队列满时丢弃 {dropped} 帧，区域并入最新帧")
+        
+        # 3. 强制更新：force_new传给通道刷新，内容未变化的通道也全部重绘
+        async def updates():
+            system = FakeSystem()
+            runtime = DailyWordRuntime(system)
+            try:
+                results = [await runtime.submit_update(),
+                           await runtime.submit_update(False, ['word']),
+                           await runtime.submit_update(True, ['word', 'quote'])]
+                await runtime.drain()
+                return system, results
+            finally:
+                await runtime.stop()
+        
+        system, results = asyncio.run(updates())
+        if system.calls != [([], False), (['word'], False), (['word', 'quote'], True)]:
+            print(f"❌ force_new 没有传给通道刷新: {system.calls}")
+            return False
+        if results[1]['lanes'] != ['clock'] or results[2] != {'result': UPDATE_QUEUED,
+                                                                'lanes': ['word', 'quote', 'clock']}:
+            print(f"❌ 强制更新应重绘全部通道: {results}")
+            return False
+        
+        # 4. 看门狗：阶段卡住超过stall_timeout后停止通知，阶段结束后恢复
+        async def watchdog():
+            notifier = FakeNotifier()
+            runtime = DailyWordRuntime(FakeSystem(), notifier=notifier, stall_timeout=0.05)
+            task = asyncio.create_task(runtime._watchdog(0.01))
+            try:
+                await asyncio.sleep(0.05)
+                healthy = notifier.pings
+                runtime._inflight[0] = ('fetch', time.perf_counter() - 1)
+                stalled = runtime.stalled_stage()
+                await asyncio.sleep(0.02)
+                before = notifier.pings
+                await asyncio.sleep(0.05)
+                during = notifier.pings - before
+                del runtime._inflight[0]
+                await asyncio.sleep(0.05)
+                return healthy, stalled, during, notifier.pings - before - during
+            finally:
+                task.cancel()
+                await runtime.stop()
+        
+        healthy, stalled, during, resumed = asyncio.run(watchdog())
+        if not healthy or stalled != 'fetch' or during or not resumed:
+            print(f"❌ 看门狗通知错误: 正常 {healthy}, 卡住阶段 {stalled}, 卡住期间 {during}, 恢复后 {resumed}")
+            return False
+        print(f"✅ 阶段 {stalled} 卡住时停止看门狗通知，结束后恢复")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ 异步运行时测试失败: {e}")
+        return False
+
+def test_control_socket():
+    """测试本地控制接口：一行JSON协议、各命令的分派，以及客户端对断开/超时/未运行的区分"""
+    print("\n🔌 测试控制接口...")
+    
+    import asyncio
+    import json
+    import socket
+    import tempfile
+    import threading
+    import time
+    
+    class FakeController:
+        def __init__(self):
+            self.cleared_on = None
+        
+        def clear_display(self):
+            self.cleared_on = threading.current_thread().name
+            return True
+    
+    class FakeSystem:
+        def __init__(self):
+            self.lanes = type('Lanes', (), {'lanes': {'word': None, 'quote': None}})()
+            self.changed = [['word', 'quote'], [], ['quote']]
+            self.forced = []
+            self.controller = FakeController()
+            self.controller_threads = []
+        
+        @property
+        def display_controller(self):
+            self.controller_threads.append(threading.current_thread().name)
+            return self.controller
+        
+        def refresh_lanes(self, force_lanes, force_new=False):
+            self.forced.append((list(force_lanes), force_new))
+            return {'values': {'word': {'word': 'w'}, 'quote': {}}, 'changed': self.changed.pop(0)}
+        
+        def lanes_to_content(self, values):
+            return dict(values)
+        
+        def show_content(self, content):
+            pass
+        
+        def _log_update_info(self, content):
+            pass
+        
+        def get_system_status(self):
+            return {'running': True}
+    
+    def serve_raw(path, handle):
+        """只接受一个连接、按handle处理的原始套接字服务（模拟异常的守护进程）"""
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen(1)
+        
+        def run():
+            conn, _ = server.accept()
+            with conn:
+                handle(conn)
+            server.close()
+        
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+    
+    try:
+        from daily_word_control import ControlError, ControlServer, DaemonNotRunning, send_command
+        from daily_word_runtime import DailyWordRuntime
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = str(Path(temp_dir) / 'control.sock')
+            system = FakeSystem()
+            runtime = DailyWordRuntime(system)
+            server = ControlServer(runtime, path)
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, daemon=True)
+            thread.start()
+            try:
+                asyncio.run_coroutine_threadsafe(server.start(), loop).result(5)
+                
+                # 1. 分派：更新返回实际结果，未变化时报告unchanged，强制更新带上全部通道
+                first = send_command(path, 'update', timeout=5, wait=True)
+                skipped = send_command(path, 'update', timeout=5)
+                forced = send_command(path, 'force-update', timeout=5, wait=True)
+                if first != {'result': 'queued', 'lanes': ['word', 'quote']} or skipped['result'] != 'unchanged':
+                    print(f"❌ 更新结果错误: {first}, {skipped}")
+                    return False
+                if forced['result'] != 'queued' or system.forced[-1] != (['word', 'quote'], True):
+                    print(f"❌ 强制更新没有刷新全部通道: {forced}, {system.forced}")
+                    return False
+                if send_command(path, 'status', timeout=5) != {'running': True}:
+                    print("❌ status 命令结果错误")
+                    return False
+                
+                # 2. 清屏在写屏线程中执行，事件循环线程不接触显示控制器
+                system.controller_threads.clear()
+                if send_command(path, 'clear', timeout=5) != {'cleared': True}:
+                    print("❌ clear 命令失败")
+                    return False
+                if any(not name.startswith('daily-word-epd') for name in system.controller_threads):
+                    print(f"❌ 显示控制器在写屏线程之外被访问: {system.controller_threads}")
+                    return False
+                print(f"✅ 命令分派正确，清屏在 {system.controller.cleared_on} 线程执行")
+                
+                # 3. 未知命令和无效请求行都以 ok=false 响应
+                try:
+                    send_command(path, 'reboot', timeout=5)
+                    print("❌ 未知命令没有报错")
+                    return False
+                except ControlError:
+                    pass
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                    sock.settimeout(5)
+                    sock.connect(path)
+                    sock.sendall(b'not json\n')
+                    reply = sock.makefile('rb').readline()
+                if json.loads(reply).get('ok') is not False:
+                    print(f"❌ 无效请求的响应错误: {reply!r}")
+                    return False
+            finally:
+                asyncio.run_coroutine_threadsafe(server.stop(), loop).result(5)
+                asyncio.run_coroutine_threadsafe(runtime.stop(), loop).result(5)
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join(5)
+                loop.close()
+            print("✅ 一行JSON协议正常")
+            
+            # 4. 套接字不存在：守护进程未运行，调用方可以退回独立进程
+            try:
+                send_command(path, 'status', timeout=1)
+                print("❌ 套接字不存在时没有报错")
+                return False
+            except DaemonNotRunning:
+                pass
+            
+            # 5. 已连接但守护进程关闭连接/不响应：ControlError，不能当作未运行
+            failures = []
+            for name, handle in (('关闭连接', lambda conn: conn.recv(1024)),
+                                 ('不响应', lambda conn: (conn.recv(1024), time.sleep(1)))):
+                Path(path).unlink(missing_ok=True)
+                raw = serve_raw(path, handle)
+                try:
+                    send_command(path, 'status', timeout=0.3)
+                    failures.append(f"{name}时没有报错")
+                except ControlError:
+                    pass
+                except Exception as e:
+                    failures.append(f"{name}时抛出 {type(e).__name__}")
+                raw.join(5)
+            if failures:
+                print(f"❌ {'；'.join(failures)}")
+                return False
+            print("✅ 未运行、连接关闭和超时区分正确")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ 控制接口测试失败: {e}")
+        return False
+
+def test_epdconfig_busy():
+    """测试epdconfig的BUSY等待和gpiod后端（从源码取出函数和类，不导入spidev/gpiod）"""
+    print("\n🔍 测试GPIO后端BUSY等待...")
+    
+    import ast
+    import logging
+    import os
+    import time
+    
+    class FakeBackend:
+        BUSY_PIN = 24
+        
+        def __init__(self, levels):
+            self.levels = list(levels)
+            self.delays = []
+        
+        def digital_read(self, pin):
+            return self.levels.pop(0) if len(self.levels) > 1 else self.levels[0]
+        
+        def delay_ms(self, ms):
+            self.delays.append(ms)
+            time.sleep(ms / 1000.0)
+    
+    class FakeRequest:
+        """gpiod的line request：BUSY在收到第release_after次边沿事件时释放"""
+        def __init__(self, release_after=None):
+            self.busy = 'ACTIVE'
+            self.release_after = release_after
+            self.waits = []
+            self.events_read = 0
+            self.writes = []
+        
+        def get_value(self, pin):
+            return self.busy
+        
+        def wait_edge_events(self, timeout):
+            self.waits.append(timeout)
+            if self.release_after is not None and len(self.waits) >= self.release_after:
+                self.busy = 'INACTIVE'
+                return True
+            time.sleep(timeout)
+            return False
+        
+        def read_edge_events(self):
+            self.events_read += 1
+        
+        def set_value(self, pin, value):
+            self.writes.append({pin: value})
+        
+        def set_values(self, values):
+            self.writes.append(dict(values))
+    
+    try:
+        source = (Path(__file__).parent / 'waveshare_epd' / 'epdconfig.py').read_text(encoding='utf-8')
+        tree = ast.parse(source)
+        wanted = ('poll_busy', 'RaspberryPi', 'RaspberryPiGpiod')
+        module = ast.Module(body=[node for node in tree.body
+                                  if isinstance(node, (ast.FunctionDef, ast.ClassDef)) and node.name in wanted],
+                            type_ignores=[])
+        namespace = {'os': os, 'time': time, 'logging': logging,
+                     'logger': logging.getLogger('waveshare_epd.epdconfig')}
+        exec(compile(module, 'epdconfig.py', 'exec'), namespace)
+        poll_busy = namespace['poll_busy']
+        RaspberryPiGpiod = namespace['RaspberryPiGpiod']
+        
+        backend = FakeBackend([1, 1, 1, 0])
+        if not poll_busy(backend, 1, timeout=1, poll_ms=5) or backend.delays != [5, 5, 5]:
+            print(f"❌ BUSY释放后poll_busy应返回True: 等待 {backend.delays}")
+            return False
+        backend = FakeBackend([1])
+        start = time.monotonic()
+        released = poll_busy(backend, 1, timeout=0.05, poll_ms=10)
+        elapsed = time.monotonic() - start
+        if released or not 0.05 <= elapsed < 0.5:
+            print(f"❌ poll_busy超时处理不正确: 返回 {released}，耗时 {elapsed:.3f}s")
+            return False
+        print("✅ poll_busy在BUSY释放时返回，超时后返回False")
+        
+        def gpiod_backend(request):
+            gpio = object.__new__(RaspberryPiGpiod)
+            gpio._request = request
+            gpio._values = ('INACTIVE', 'ACTIVE')
+            gpio._active = 'ACTIVE'
+            gpio._levels = {gpio.RST_PIN: 0, gpio.DC_PIN: 0, gpio.PWR_PIN: 0}
+            return gpio
+        
+        request = FakeRequest(release_after=2)
+        gpio = gpiod_backend(request)
+        if gpio.digital_read(gpio.BUSY_PIN) != 1:
+            print("❌ BUSY为ACTIVE时digital_read应返回1")
+            return False
+        if not gpio.wait_busy(1) or request.waits[0] != 1.0 or request.events_read != 1:
+            print(f"❌ wait_busy应阻塞在边沿事件上直到释放: 等待 {request.waits}，读取事件 {request.events_read} 次")
+            return False
+        
+        request = FakeRequest()
+        gpio = gpiod_backend(request)
+        start = time.monotonic()
+        released = gpio.wait_busy(1, timeout=0.05)
+        elapsed = time.monotonic() - start
+        if released or not request.waits or max(request.waits) > 0.05 or elapsed >= 0.5:
+            print(f"❌ gpiod wait_busy超时处理不正确: 返回 {released}，等待 {request.waits}")
+            return False
+        print("✅ gpiod后端的wait_busy按边沿事件返回，超时后返回False")
+        
+        gpio.digital_write(gpio.DC_PIN, 1)
+        gpio.digital_write(gpio.DC_PIN, 1)
+        gpio.digital_write(gpio.CS_PIN, 1)
+        gpio.digital_write(gpio.DC_PIN, 0)
+        expected = [{gpio.DC_PIN: 'ACTIVE'}, {gpio.DC_PIN: 'INACTIVE'}]
+        if request.writes != expected:
+            print(f"❌ 电平未变化或CS引脚时不应写入: {request.writes}")
+            return False
+        request.writes.clear()
+        gpio.digital_write_many({gpio.RST_PIN: 1, gpio.PWR_PIN: 1, gpio.CS_PIN: 1})
+        if request.writes != [{gpio.RST_PIN: 'ACTIVE', gpio.PWR_PIN: 'ACTIVE'}] \
+                or gpio.digital_read(gpio.PWR_PIN) != 1:
+            print(f"❌ digital_write_many写入不正确: {request.writes}")
+            return False
+        print("✅ gpiod后端跳过未变化的电平，批量写入只发一次")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ GPIO后端BUSY等待测试失败: {e}")
+        return False
+
+def test_profiler():
+    """测试性能分析钩子：未启用时为空操作，启用后写出采样/cProfile/内存分析文件并包装驱动方法"""
+    print("\n🔍 测试性能分析...")
+    
+    import tempfile
+    import time
+    from pathlib import Path
+    
+    class FakeEPD:
+        def init(self):
+            return 0
+        
+        def getbuffer(self, image):
+            return bytes(16)
+        
+        def display(self, buf):
+            time.sleep(0.01)
+    
+    class FakeController:
+        def __init__(self):
+            self.epd = FakeEPD()
+        
+        def render_lanes(self, lanes):
+            return [bytearray(4096) for _ in lanes]
+    
+    try:
+        import daily_word_profiler
+        from daily_word_profiler import Profiler
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_dir = Path(temp_dir) / 'profiles'
+            
+            profiler = Profiler(output_dir)
+            controller = FakeController()
+            with profiler.session('disabled'), profiler.section('step'), profiler.trace_memory('mem'):
+                pass
+            profiler.instrument_controller(controller)
+            controller.epd.display(b'')
+            if output_dir.exists() or profiler.sections or profiler.outputs:
+                print("❌ 未启用时不应记录耗时或写出文件")
+                return False
+            print("✅ 未启用时为空操作")
+            
+            profiler = Profiler(output_dir, enabled=True)
+            controller = FakeController()
+            profiler.instrument_controller(controller)
+            profiler.instrument_controller(controller)
+            with profiler.session('update'):
+                controller.epd.init()
+                controller.render_lanes(['word', 'quote'])
+                controller.epd.display(controller.epd.getbuffer(None))
+                controller.epd.display(b'')
+            
+            counts = {name: len(values) for name, values in profiler.sections.items()}
+            expected = {'epd.init': 1, 'epd.getbuffer': 1, 'epd.display': 2}
+            if counts != expected:
+                print(f"❌ 驱动方法分段计时不正确（重复包装？）: {counts}")
+                return False
+            if controller.epd.__dict__['display'].__name__ != 'display':
+                print("❌ 包装后的方法没有保留原名称")
+                return False
+            suffixes = sorted(path.name.split('-', 4)[-1] for path in profiler.outputs)
+            print(f"   输出文件: {', '.join(suffixes)}")
+            if not all(path.exists() for path in profiler.outputs):
+                print("❌ 记录的输出文件不存在")
+                return False
+            if 'update.folded' not in suffixes or 'render.render_lanes.tracemalloc.txt' not in suffixes:
+                print("❌ 缺少折叠栈或内存分析文件")
+                return False
+            memory = next(path for path in profiler.outputs if path.name.endswith('.tracemalloc.txt'))
+            if '峰值' not in memory.read_text(encoding='utf-8'):
+                print("❌ 内存分析文件缺少峰值")
+                return False
+            print("✅ 会话写出折叠栈/cProfile结果，驱动方法按调用计时")
+            
+            saved_max = daily_word_profiler.MAX_OUTPUT_FILES
+            daily_word_profiler.MAX_OUTPUT_FILES = 3
+            try:
+                for i in range(5):
+                    with profiler.trace_memory(f'prune{i}'):
+                        pass
+                    time.sleep(0.001)
+            finally:
+                daily_word_profiler.MAX_OUTPUT_FILES = saved_max
+            remaining = sorted(path.name for path in output_dir.glob('profile-*'))
+            if len(remaining) != 3 or not remaining[-1].endswith('prune4.tracemalloc.txt'):
+                print(f"❌ 输出文件数没有限制在上限内: {remaining}")
+                return False
+            print("✅ 输出文件超过上限时删除最旧的")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ 性能分析测试失败: {e}")
+        return False
+
+def test_logging_pipeline():
+    """测试日志管道：环形缓冲容量、QueueListener写入、按模块分流、JSON行格式和gzip轮转"""
+    print("\n🔍 测试日志管道...")
+    
+    import gzip
+    import json
+    import logging
+    import tempfile
+    from logging.handlers import QueueHandler
+    from pathlib import Path
+    
+    class ListHandler(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.messages = []
+        
+        def emit(self, record):
+            self.messages.append(record.getMessage())
+    
+    root = logging.getLogger()
+    saved_level = root.level
+    
+    try:
+        import daily_word_logging
+        from daily_word_logging import RingBufferHandler, setup_logging, stop_logging
+        
+        target = ListHandler()
+        ring = RingBufferHandler(3, target)
+        ring.setFormatter(logging.Formatter('%(message)s'))
+        for i in range(5):
+            ring.handle(logging.makeLogRecord({'msg': f'info {i}', 'levelno': logging.INFO}))
+        if target.messages or len(ring.buffer) != 3:
+            print(f"❌ 环形缓冲应只保留3条且不写出: 已写出 {target.messages}，缓冲 {len(ring.buffer)} 条")
+            return False
+        ring.handle(logging.makeLogRecord({'msg': 'error', 'levelno': logging.ERROR}))
+        if target.messages != ['info 3', 'info 4', 'error']:
+            print(f"❌ ERROR触发写出的记录不正确: {target.messages}")
+            return False
+        ring.close()
+        print("✅ 环形缓冲只保留最近的记录，ERROR时写出")
+        
+        # 之前的测试可能已经启动过日志线程，先停掉以使用临时目录
+        stop_logging()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            logs_dir = Path(temp_dir) / 'logs'
+            config = {
+                'log_level': 'INFO',
+                'log_files': {'main': 'main.log', 'api': 'api.log',
+                              'display': 'display.log', 'error': 'error.log'},
+                'log_settings': {
+                    'max_file_size': 2000,
+                    'backup_count': 2,
+                    'log_format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                    'date_format': '%Y-%m-%d %H:%M:%S',
+                    'encoding': 'utf-8',
+                    'structured': True,
+                    'compress_backups': True,
+                },
+            }
+            try:
+                listener = setup_logging(config, logs_dir)
+                if setup_logging(config, logs_dir) is not listener:
+                    print("❌ 重复调用setup_logging应返回同一个写入线程")
+                    return False
+                # 控制台输出与本测试无关，只保留文件日志
+                listener.handlers[0].setLevel(logging.CRITICAL)
+                if not any(isinstance(h, QueueHandler) for h in root.handlers):
+                    print("❌ 根日志记录器上没有QueueHandler")
+                    return False
+                
+                logging.getLogger('daily_word_api_client').info('api 请求')
+                logging.getLogger('daily_word_display_controller').info('display 刷新')
+                logging.getLogger('daily_word_test_other').error('其他模块错误')
+                for i in range(60):
+                    logging.getLogger('daily_word_test_other').info(f'填充记录 {i:03d}')
+            finally:
+                stop_logging()
+                root.setLevel(saved_level)
+            
+            if any(isinstance(h, QueueHandler) for h in root.handlers) or daily_word_logging._listener is not None:
+                print("❌ stop_logging后QueueHandler或写入线程仍然存在")
+                return False
+            
+            def messages(name):
+                path = logs_dir / name
+                return [json.loads(line)['message'] for line in path.read_text(encoding='utf-8').splitlines()] \
+                    if path.exists() else []
+            
+            api, display, error = messages('api.log'), messages('display.log'), messages('error.log')
+            if api != ['api 请求'] or display != ['display 刷新'] or error != ['其他模块错误']:
+                print(f"❌ 日志分流不正确: api={api} display={display} error={error}")
+                return False
+            print("✅ API/显示/错误日志按模块和级别分流，JSON行格式正确")
+            
+            backups = sorted(logs_dir.glob('main.log.*'))
+            if not backups or any(path.suffix != '.gz' for path in backups) or len(backups) > 2:
+                print(f"❌ 轮转备份不正确: {[path.name for path in backups]}")
+                return False
+            with gzip.open(backups[0], 'rt', encoding='utf-8') as f:
+                json.loads(f.readline())
+            main_size = (logs_dir / 'main.log').stat().st_size
+            if main_size > 2000:
+                print(f"❌ 主日志超过轮转大小: {main_size} 字节")
+                return False
+            print(f"✅ 主日志按大小轮转，{len(backups)} 个gzip备份")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ 日志管道测试失败: {e}")
+        return False
+
+def test_systemd_notifier():
+    """测试sd_notify消息格式和看门狗间隔解析（本地套接字模拟NOTIFY_SOCKET）"""
+    print("\n🔍 测试systemd通知...")
+    
+    import os
+    import socket
+    import tempfile
+    
+    keys = ('NOTIFY_SOCKET', 'WATCHDOG_USEC', 'WATCHDOG_PID')
+    saved = {key: os.environ.get(key) for key in keys}
+    
+    def set_env(**values):
+        for key in keys:
+            os.environ.pop(key, None)
+        for key, value in values.items():
+            os.environ[key] = value
+    
+    try:
+        from daily_word_systemd import SystemdNotifier
+        
+        set_env()
+        notifier = SystemdNotifier()
+        if notifier.enabled or notifier.ready() or notifier.watchdog_interval() is not None:
+            print("❌ 没有NOTIFY_SOCKET时应为空操作")
+            return False
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'notify')
+            abstract = f'daily-word-test-{os.getpid()}'
+            for address, bind_to in ((path, path), ('@' + abstract, '\0' + abstract)):
+                receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                receiver.bind(bind_to)
+                receiver.settimeout(1)
+                try:
+                    set_env(NOTIFY_SOCKET=address)
+                    notifier = SystemdNotifier()
+                    sent = [notifier.ready('启动完成'), notifier.watchdog(),
+                            notifier.status('上次更新 成功'), notifier.stopping()]
+                    received = [receiver.recv(4096).decode('utf-8') for _ in sent]
+                    notifier.close()
+                finally:
+                    receiver.close()
+                expected = ['READY=1\nSTATUS=启动完成', 'WATCHDOG=1', 'STATUS=上次更新 成功', 'STOPPING=1']
+                if not all(sent) or received != expected:
+                    print(f"❌ {address} 收到的消息不正确: {received}")
+                    return False
+            print("✅ 文件路径和抽象命名空间套接字的消息格式正确")
+            
+            set_env(NOTIFY_SOCKET=os.path.join(temp_dir, 'missing'))
+            notifier = SystemdNotifier()
+            if notifier.watchdog():
+                print("❌ 套接字不存在时应返回False")
+                return False
+            notifier.close()
+        
+        cases = [
+            ({'WATCHDOG_USEC': '30000000'}, 15.0),
+            ({'WATCHDOG_USEC': '30000000', 'WATCHDOG_PID': str(os.getpid())}, 15.0),
+            ({'WATCHDOG_USEC': '30000000', 'WATCHDOG_PID': str(os.getpid() + 1)}, None),
+            ({'WATCHDOG_USEC': 'abc'}, None),
+            ({}, None),
+        ]
+        for env, expected in cases:
+            set_env(NOTIFY_SOCKET='@unused', **env)
+            interval = SystemdNotifier().watchdog_interval()
+            if interval != expected:
+                print(f"❌ {env} 的看门狗间隔为 {interval}，期望 {expected}")
+                return False
+        print("✅ 看门狗间隔取WatchdogSec的一半，WATCHDOG_PID不符时不启用")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ systemd通知测试失败: {e}")
+        return False
+    finally:
+        set_env(**{key: value for key, value in saved.items() if value is not None})
+
 def main():
     """主测试函数"""
     print("=" * 60)
@@ -144,6 +2432,30 @@ def main():
         ("API客户端", test_api_client),
         ("显示控制器", test_display_controller),
         ("系统集成", test_system_integration),
+        ("持久化恢复", test_persistence_recovery),
+        ("日志存储", test_history_store),
+        ("内容通道", test_content_lanes),
+        ("更新调度器", test_update_scheduler),
+        ("系统遥测", test_telemetry),
+        ("诗词仓库", test_poem_repository),
+        ("诗词语料导入", test_poem_corpus),
+        ("指标环形文件", test_metrics_ring),
+        ("天气服务", test_weather_service),
+        ("导入耗时", test_import_time),
+        ("寄存器表字节流", test_epd_sequences),
+        ("帧缓冲", test_epd_buffers),
+        ("三色屏平面", test_epd_color_planes),
+        ("驱动注册表", test_driver_registry),
+        ("刷新模式策略", test_refresh_policy),
+        ("波形LUT加载", test_panel_lut_reload),
+        ("面板电源管理", test_power_manager),
+        ("面板非阻塞提交", test_panel_commit),
+        ("异步运行时", test_async_runtime),
+        ("控制接口", test_control_socket),
+        ("GPIO后端BUSY等待", test_epdconfig_busy),
+        ("性能分析", test_profiler),
+        ("日志管道", test_logging_pipeline),
+        ("systemd通知", test_systemd_notifier),
     ]
     
     passed = 0
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+每日单词墨水屏显示系统 - 天气服务
+Daily Word E-Paper Display System - Weather Service
+
+- 每个城市的天气数据按TTL缓存（内存+磁盘），同一城市两次请求之间至少间隔min_poll_interval，
+  请求带超时，服务端返回ETag时使用条件请求
+- 天气图标按目标尺寸转换为1位并抖动后缓存到磁盘，命中缓存时刷新天气区域不需要网络和图像处理
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _atomic_write_json(path: Path, data: Dict):
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class IconCache:
+    """天气图标缓存：内存中保存已加载的1位图像，磁盘上按 URL+尺寸 保存转换结果"""
+
+    def __init__(self, directory: Path, timeout: float = 10):
+        self.directory = Path(directory)
+        self.timeout = timeout
+        self._images: Dict[Tuple[str, Tuple[int, int]], object] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize_url(url: str) -> str:
+        # weatherapi返回协议相对地址 //cdn.weatherapi.com/...
+        return url if url.startswith(('http:', 'https:')) else 'https:' + url
+
+    def path_for(self, url: str, size: Tuple[int, int]) -> Path:
+        digest = hashlib.sha1(self._normalize_url(url).encode('utf-8')).hexdigest()[:16]
+        return self.directory / f"{digest}-{size[0]}x{size[1]}.png"
+
+    @staticmethod
+    def convert(data: bytes, size: Tuple[int, int]):
+        """将原始图标转换为目标尺寸的1位图像：透明区域铺白，缩放后Floyd-Steinberg抖动"""
+        from io import BytesIO
+        from PIL import Image
+
+        icon = Image.open(BytesIO(data)).convert('RGBA')
+        background = Image.new('RGBA', icon.size, (255, 255, 255, 255))
+        gray = Image.alpha_composite(background, icon).convert('L')
+        gray = gray.resize(size, Image.Resampling.LANCZOS)
+        return gray.convert('1', dither=Image.Dither.FLOYDSTEINBERG)
+
+    def get(self, url: str, size: Tuple[int, int]):
+        """
+        获取转换好的图标
+
+        参数:
+        - url: 图标地址
+        - size: 目标尺寸 (宽, 高)
+
+        返回:
+        - PIL.Image: 1位图像；下载或转换失败时返回None
+        """
+        size = tuple(size)
+        key = (self._normalize_url(url), size)
+        with self._lock:
+            image = self._images.get(key)
+        if image is not None:
+            self.hits += 1
+            return image
+
+        from PIL import Image
+
+        path = self.path_for(url, size)
+        try:
+            if path.exists():
+                with Image.open(path) as cached:
+                    image = cached.convert('1')
+                self.hits += 1
+            else:
+                import requests
+                self.misses += 1
+                response = requests.get(key[0], timeout=self.timeout)
+                response.raise_for_status()
+                image = self.convert(response.content, size)
+                self.directory.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_suffix('.tmp.png')
+                image.save(tmp_path, format='PNG', optimize=True)
+                os.replace(tmp_path, path)
+                logger.info(f"天气图标已缓存: {path.name}")
+        except Exception as e:
+            logger.warning(f"获取天气图标失败: {e}")
+            return None
+
+        with self._lock:
+            self._images[key] = image
+        return image
+
+
+class WeatherService:
+    """带缓存和请求频率限制的天气服务"""
+
+    def __init__(self, api_key: Optional[str], config: Dict):
+        """
+        初始化天气服务
+
+        参数:
+        - api_key: weatherapi.com的API密钥
+        - config: WEATHER_CONFIG
+        """
+        self.api_key = api_key
+        self.api_url = config['api_url']
+        self.ttl = config.get('ttl', 1800)
+        self.min_poll_interval = config.get('min_poll_interval', 600)
+        self.timeout = config.get('timeout', 10)
+        self.cache_file = Path(config['cache_file'])
+        self.icons = IconCache(config['icon_cache_dir'], self.timeout)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = self._load_cache()
+        self.requests = 0
+        self.cache_hits = 0
+
+    def _load_cache(self) -> Dict[str, Dict]:
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self):
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            _atomic_write_json(self.cache_file, self._entries)
+        except OSError as e:
+            logger.warning(f"保存天气缓存失败: {e}")
+
+    def get_current(self, city: str, force: bool = False) -> Optional[Dict]:
+        """
+        获取城市当前天气
+
+        参数:
+        - city: 城市名称
+        - force: 忽略TTL（仍遵守最小请求间隔）
+
+        返回:
+        - dict: weatherapi的current.json响应；从未成功获取过时返回None
+        """
+        with self._lock:
+            now = time.time()
+            entry = self._entries.get(city, {})
+            data = entry.get('data')
+            if data is not None and not force and now - entry.get('fetched_at', 0) < self.ttl:
+                self.cache_hits += 1
+                return data
+            if now - entry.get('attempted_at', 0) < self.min_poll_interval:
+                logger.debug("天气请求间隔过短，使用缓存: %s", city)
+                self.cache_hits += 1
+                return data
+
+            entry['attempted_at'] = now
+            self._entries[city] = entry
+            fetched = self._request(city, entry.get('etag') if data is not None else None)
+            if fetched == 'not-modified':
+                entry['fetched_at'] = now
+            elif fetched is not None:
+                entry.update(fetched)
+                entry['fetched_at'] = now
+            self._save_cache()
+            return entry.get('data')
+
+    def _request(self, city: str, etag: Optional[str]):
+        """请求天气接口，返回 {'data', 'etag'}、'not-modified' 或 None"""
+        if not self.api_key:
+            logger.warning("未配置天气API密钥")
+            return None
+        import requests
+
+        headers = {'If-None-Match': etag} if etag else {}
+        self.requests += 1
+        try:
+            response = requests.get(self.api_url, params={"key": self.api_key, "q": city, "aqi": "no"},
+                                    headers=headers, timeout=self.timeout)
+            if response.status_code == 304:
+                return 'not-modified'
+            if response.status_code != 200:
+                logger.error(f"获取天气失败: HTTP {response.status_code}")
+                return None
+            return {'data': response.json(), 'etag': response.headers.get('ETag')}
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"获取天气失败: {e}")
+            return None
+
+    def get_icon(self, url: str, size: Tuple[int, int]):
+        """获取转换为1位并抖动的天气图标"""
+        return self.icons.get(url, size)
+
+    def get_stats(self) -> Dict:
+        return {
+            'cities': {city: entry.get('fetched_at') for city, entry in self._entries.items()},
+            'requests': self.requests,
+            'cache_hits': self.cache_hits,
+            'icon_hits': self.icons.hits,
+            'icon_misses': self.icons.misses,
+        }
+
+
+_service: Optional[WeatherService] = None
+_service_lock = threading.Lock()
+
+
+def get_weather_service(api_key: Optional[str] = None) -> WeatherService:
+    """进程内共享的天气服务，密钥默认读取config.ini中的WEATHER_API_KEY"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            from daily_word_config import WEATHER_CONFIG
+            if api_key is None:
+                from get_config import get_config_value
+                api_key = get_config_value('WEATHER_API_KEY')
+            _service = WeatherService(api_key, WEATHER_CONFIG)
+        elif api_key and not _service.api_key:
+            _service.api_key = api_key
+        return _service
@@ -59,17 +59,18 @@ def get_poem_from_url(api_url, token):
         logging.error(f"Error getting daily poem: {e}")
         return None
 
-def get_poem_details_from_db(content,db='poems.db'):
-    id = process_poem_db_sql.find_poem_id_by_context(content)
-    poem = process_poem_db_sql.read_poem_from_db(id)
-    if poem:
-        poem_details = {
-                'content': poem[4],
-                'title': poem[1],
-                'dynasty': poem[2],
-                'author': poem[3],
-                'full_content': '\n'.join(poem[5]),
-            }
+def get_poem_details_from_db(content,db=process_poem_db_sql.DEFAULT_DB_PATH):
+    ids = process_poem_db_sql.find_poem_id_by_context(content, db)
+    poem = process_poem_db_sql.read_poem_from_db(ids[0], db) if ids else None
+    if not poem:
+        return None
+    poem_details = {
+            'content': poem[4],
+            'title': poem[1],
+            'dynasty': poem[2],
+            'author': poem[3],
+            'full_content': poem[5],
+        }
     return poem_details   
 
 def get_token(api_url):
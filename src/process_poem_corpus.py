@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+离线诗词语料批量导入
+Offline Poem Corpus Loader
+
+流式读取本地JSON/JSONL诗词语料，分批事务写入poems表，按内容哈希去重并在同一
+事务中更新全文索引，使每日诗词可以完全离线提供
+"""
+
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from class_poem_repository import DEFAULT_DB_PATH, PoemRepository
+
+logger = logging.getLogger(__name__)
+
+# 流式解析JSON数组时每次读取的字符数
+READ_CHUNK_SIZE = 64 * 1024
+
+# 数组元素之后可能出现的字符（空白、逗号或数组结束符）
+_ELEMENT_DELIMITERS = (' ', '\t', '\r', '\n', ',', ']')
+
+
+def _iter_json_array(file, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Dict]:
+    """逐个解析顶层JSON数组中的元素，不把整个文件读入内存"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+
+    while True:
+        # 跳过空白、数组起始符和元素分隔符
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != '[':
+                    raise ValueError("JSON语料必须是数组或JSONL格式")
+                started = True
+                position += 1
+                continue
+            break
+
+        if position < len(buffer) and buffer[position] == ']':
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                if buffer[position:].strip():
+                    raise
+                return
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+
+        if not eof and buffer[end:end + 1] not in _ELEMENT_DELIMITERS:
+            # 数字没有结束符，被读取边界截断时前缀本身也是合法的值（12345 读成 123、
+            # -0.5 读成 -0）；元素之后还没读到分隔符时读入更多内容后重新解析
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+
+        yield item
+        position = end
+        # 已消费部分过长时收缩缓冲区
+        if position > chunk_size:
+            buffer = buffer[position:]
+            position = 0
+
+
+def iter_corpus_file(path: Path) -> Iterator[Dict]:
+    """按扩展名流式读取语料文件中的原始记录（.jsonl逐行，其余按JSON数组/单对象）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.suffix.lower() == '.jsonl':
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"跳过无法解析的行 {path}:{line_no}: {e}")
+            return
+
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == '{':
+            # 单个对象，例如保存下来的今日诗词API响应
+            yield json.load(f)
+        else:
+            yield from _iter_json_array(f)
+
+
+def normalize_record(record: Dict, default_dynasty: Optional[str] = None) -> Optional[Dict]:
+    """
+    将不同来源的语料记录转换为poems表的字段。
+
+    支持:
+    - 本项目/poems表格式: title, dynasty, author, content, full_content
+    - chinese-poetry格式: title, author, paragraphs(列表)
+    - 今日诗词API格式: content, origin{title, dynasty, author, content(列表)}，可包在data中
+    """
+    if not isinstance(record, dict):
+        return None
+    if isinstance(record.get('data'), dict):
+        record = record['data']
+
+    origin = record.get('origin') if isinstance(record.get('origin'), dict) else {}
+    title = record.get('title') or origin.get('title') or record.get('rhythmic')
+    author = record.get('author') or origin.get('author')
+    dynasty = record.get('dynasty') or origin.get('dynasty') or default_dynasty
+
+    lines = record.get('paragraphs') or origin.get('content')
+    full_content = record.get('full_content')
+    if not full_content and isinstance(lines, list):
+        full_content = '\n'.join(line for line in lines if line)
+    elif not full_content and isinstance(lines, str):
+        full_content = lines
+
+    content = record.get('content') if isinstance(record.get('content'), str) else None
+    if not content and isinstance(lines, list) and lines:
+        content = lines[0]
+    content = content or full_content
+
+    if not title or not full_content:
+        return None
+    return {
+        'title': title,
+        'dynasty': dynasty,
+        'author': author,
+        'content': content,
+        'full_content': full_content,
+    }
+
+
+def iter_corpus(paths: Iterable[Path], default_dynasty: Optional[str] = None) -> Iterator[Dict]:
+    """遍历多个语料文件/目录，产出规范化后的诗词记录"""
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            files = sorted(p for p in path.rglob('*') if p.suffix.lower() in ('.json', '.jsonl'))
+        else:
+            files = [path]
+
+        for file_path in files:
+            logger.info(f"读取语料文件: {file_path}")
+            try:
+                for record in iter_corpus_file(file_path):
+                    poem = normalize_record(record, default_dynasty)
+                    if poem:
+                        yield poem
+            except (OSError, ValueError) as e:
+                logger.error(f"读取语料文件失败 {file_path}: {e}")
+
+
+def load_corpus(paths: List[Path], db_path: str = DEFAULT_DB_PATH, batch_size: int = 1000,
+                default_dynasty: Optional[str] = None) -> Dict:
+    """
+    将语料导入诗词数据库。
+
+    返回:
+    - dict: 读取条数、新增条数和重复条数。
+    """
+    stats = {'read': 0, 'inserted': 0, 'duplicates': 0}
+
+    def counted(poems):
+        for poem in poems:
+            stats['read'] += 1
+            yield poem
+
+    with PoemRepository(db_path) as repository:
+        stats['inserted'] = repository.save_poems(
+            counted(iter_corpus(paths, default_dynasty)), batch_size=batch_size)
+        stats['total'] = repository.count()
+        stats['fts_enabled'] = repository.fts_enabled
+
+    stats['duplicates'] = stats['read'] - stats['inserted']
+    logger.info(f"语料导入完成: 读取 {stats['read']} 条, 新增 {stats['inserted']} 条, "
+                f"重复 {stats['duplicates']} 条, 库中共 {stats['total']} 条")
+    return stats
+
+
+def main():
+    """命令行入口"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='离线诗词语料批量导入')
+    parser.add_argument('paths', nargs='+', type=Path, help='语料文件或目录（.json/.jsonl）')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='数据库路径')
+    parser.add_argument('-b', '--batch-size', type=int, default=1000, help='每个事务的记录数')
+    parser.add_argument('--dynasty', help='语料未标注朝代时使用的默认朝代')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    stats = load_corpus(args.paths, args.db, args.batch_size, args.dynasty)
+    print(f"读取: {stats['read']}  新增: {stats['inserted']}  重复: {stats['duplicates']}  "
+          f"总计: {stats['total']}  全文索引: {'启用' if stats['fts_enabled'] else '未启用'}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,22 +1,11 @@
 import os
-import sqlite3
 
-def init_db(db_path='data/poems.db'):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS poems (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            dynasty TEXT,
-            author TEXT,
-            content TEXT NOT NULL,
-            full_content TEXT NOT NULL,
-            saved_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    conn.commit()
-    conn.close()
+from class_poem_repository import DEFAULT_DB_PATH, get_repository
+
+# 所有函数共用同一个默认路径，并通过共享仓库复用单个数据库连接
+
+def init_db(db_path=DEFAULT_DB_PATH):
+    get_repository(db_path).init_schema()
 
 
 def get_db_path(relative_path):
@@ -24,60 +13,24 @@ def get_db_path(relative_path):
     dir_of_script = os.path.dirname(os.path.abspath(__file__))
     return os.path.join(dir_of_script, '..', relative_path)
 
-def save_poem_to_db(poem_data, db_path='poems.db'):
-    db_path = get_db_path(db_path)  # 将相对路径转换为绝对路径
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''
-        INSERT INTO poems (title, dynasty, author, content, full_content)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (poem_data['title'], poem_data['dynasty'], poem_data['author'], poem_data['content'], poem_data['full_content']))
-    print("writing to db")
-    conn.commit()
-    conn.close()
+def save_poem_to_db(poem_data, db_path=DEFAULT_DB_PATH):
+    return get_repository(db_path).save_poem(poem_data)
+
+def save_poems_to_db(poems, db_path=DEFAULT_DB_PATH, batch_size=500):
+    return get_repository(db_path).save_poems(poems, batch_size=batch_size)
+
+def read_poem_from_db(poem_id, db_path=DEFAULT_DB_PATH):
+    return get_repository(db_path).get_poem(poem_id)
 
-def read_poem_from_db(poem_id, db_path='poems.db'):
-    db_path = get_db_path(db_path)  # 将相对路径转换为绝对路径
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT * FROM poems WHERE id=?
-    ''', (poem_id,))
-    poem = cursor.fetchone()
-    conn.close()
-    return poem
+def read_random_poem_from_db(db_path=DEFAULT_DB_PATH):
+    return get_repository(db_path).random_poem()
 
-def update_poem_in_db(poem_id, new_content, db_path='poems.db'):
-    db_path = get_db_path(db_path)  # 将相对路径转换为绝对路径
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''
-        UPDATE poems
-        SET content=?
-        WHERE id=?
-    ''', (new_content, poem_id))
-    conn.commit()
-    conn.close()
+def update_poem_in_db(poem_id, new_content, db_path=DEFAULT_DB_PATH):
+    get_repository(db_path).update_content(poem_id, new_content)
 
-def delete_poem_from_db(poem_id, db_path='poems.db'):
-    db_path = get_db_path(db_path)  # 将相对路径转换为绝对路径
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''
-        DELETE FROM poems
-        WHERE id=?
-    ''', (poem_id,))
-    conn.commit()
-    conn.close()
+def delete_poem_from_db(poem_id, db_path=DEFAULT_DB_PATH):
+    get_repository(db_path).delete_poem(poem_id)
 
 
-def find_poem_id_by_context(context, db_path='poems.db'):
-    db_path = get_db_path(db_path)  # 将相对路径转换为绝对路径
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''
-        SELECT id FROM poems WHERE content LIKE ?
-    ''', ('%' + context + '%',))
-    poem_ids = cursor.fetchall()
-    conn.close()
-    return [poem_id[0] for poem_id in poem_ids]
+def find_poem_id_by_context(context, db_path=DEFAULT_DB_PATH):
+    return get_repository(db_path).find_ids_by_content(context)
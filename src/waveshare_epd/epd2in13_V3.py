@@ -30,6 +30,7 @@
 
 import logging
 from . import epdconfig
+from .epdbase import EPDBase, blank, sequence
 
 # Display resolution
 EPD_WIDTH       = 122
@@ -37,7 +38,26 @@ EPD_HEIGHT      = 250
 
 logger = logging.getLogger(__name__)
 
-class EPD:
+'''
+function : Split a 159-byte lut into register tables
+parameter:
+    lut : lut data
+return: (waveform table, voltage table); the controller must be idle between them
+'''
+def lut_sequences(lut):
+    waveform = sequence((0x32, lut[:153]))
+    voltages = sequence(
+        (0x3f, lut[153:154]),
+        (0x03, lut[154:155]),   # gate voltage
+        (0x04, lut[155:158]),   # source voltage: VSH, VSH2, VSL
+        (0x2c, lut[158:159]),   # VCOM
+    )
+    return waveform, voltages
+
+class EPD(EPDBase):
+    RESET_TIMING = (20, 2, 20)
+    ROTATE_BEFORE_DITHER = True
+
     def __init__(self):
         self.reset_pin = epdconfig.RST_PIN
         self.dc_pin = epdconfig.DC_PIN
@@ -89,56 +109,28 @@ class EPD:
         0x22,0x22,0x22,0x22,0x22,0x22,0x0,0x0,0x0,
         0x22,0x17,0x41,0x0,0x32,0x36,
     ]
-        
-    '''
-    function :Hardware reset
-    parameter:
-    '''
-    def reset(self):
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(20) 
-        epdconfig.digital_write(self.reset_pin, 0)
-        epdconfig.delay_ms(2)
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(20)   
-
-    '''
-    function :send command
-    parameter:
-     command : Command register
-    '''
-    def send_command(self, command):
-        epdconfig.digital_write(self.dc_pin, 0)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([command])
-        epdconfig.digital_write(self.cs_pin, 1)
 
-    '''
-    function :send data
-    parameter:
-     data : Write data
-    '''
-    def send_data(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([data])
-        epdconfig.digital_write(self.cs_pin, 1)
+    # Frozen register tables, replayed with one SPI transfer per command
+    LUT_PARTIAL_SEQUENCES = lut_sequences(lut_partial_update)
+    LUT_FULL_SEQUENCES = lut_sequences(lut_full_update)
 
-    # send a lot of data   
-    def send_data2(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte2(data)
-        epdconfig.digital_write(self.cs_pin, 1)
-    
+    INIT_SEQUENCE = sequence(
+        (0x01, [0xf9, 0x00, 0x00]), # Driver output control
+        (0x11, [0x03]),             # data entry mode
+    )
+    INIT_UPDATE_SEQUENCE = sequence(
+        (0x3c, [0x05]),
+        (0x21, [0x00, 0x80]),       # Display update control
+        (0x18, [0x80]),
+    )
+        
     '''
     function :Wait until the busy_pin goes LOW
     parameter:
     '''
     def ReadBusy(self):
         logger.debug("e-Paper busy")
-        while(epdconfig.digital_read(self.busy_pin) == 1):      # 0: idle, 1: busy
-            epdconfig.delay_ms(10)  
+        epdconfig.wait_busy(1, poll_ms=10)      # 0: idle, 1: busy
         logger.debug("e-Paper busy release")
 
     '''
@@ -168,8 +160,7 @@ class EPD:
     '''    
     def Lut(self, lut):
         self.send_command(0x32)
-        for i in range(0, 153):
-            self.send_data(lut[i])
+        self.send_data2(bytes(lut[:153]))
         self.ReadBusy()
     
     '''
@@ -178,17 +169,15 @@ class EPD:
         lut : lut data 
     '''
     def SetLut(self, lut):
-        self.Lut(lut)
-        self.send_command(0x3f)
-        self.send_data(lut[153])
-        self.send_command(0x03)     # gate voltage
-        self.send_data(lut[154])
-        self.send_command(0x04)     # source voltage
-        self.send_data(lut[155])    # VSH
-        self.send_data(lut[156])    # VSH2
-        self.send_data(lut[157])    # VSL
-        self.send_command(0x2c)     # VCOM
-        self.send_data(lut[158])
+        if lut is self.lut_full_update:
+            waveform, voltages = self.LUT_FULL_SEQUENCES
+        elif lut is self.lut_partial_update:
+            waveform, voltages = self.LUT_PARTIAL_SEQUENCES
+        else:
+            waveform, voltages = lut_sequences(lut)
+        self.send_sequence(waveform)
+        self.ReadBusy()
+        self.send_sequence(voltages)
     
     '''
     function : Setting the display window
@@ -239,26 +228,12 @@ class EPD:
         self.send_command(0x12)  #SWRESET
         self.ReadBusy() 
 
-        self.send_command(0x01) #Driver output control      
-        self.send_data(0xf9)
-        self.send_data(0x00)
-        self.send_data(0x00)
-    
-        self.send_command(0x11) #data entry mode       
-        self.send_data(0x03)
+        self.send_sequence(self.INIT_SEQUENCE)
 
         self.SetWindow(0, 0, self.width-1, self.height-1)
         self.SetCursor(0, 0)
         
-        self.send_command(0x3c)
-        self.send_data(0x05)
-
-        self.send_command(0x21) #  Display update control
-        self.send_data(0x00)
-        self.send_data(0x80)
-    
-        self.send_command(0x18)
-        self.send_data(0x80)
+        self.send_sequence(self.INIT_UPDATE_SEQUENCE)
         
         self.ReadBusy()
         
@@ -271,19 +246,10 @@ class EPD:
         image : Image data
     '''
     def getbuffer(self, image):
-        img = image
-        imwidth, imheight = img.size
-        if(imwidth == self.width and imheight == self.height):
-            img = img.convert('1')
-        elif(imwidth == self.height and imheight == self.width):
-            # image has correct dimensions, but needs to be rotated
-            img = img.rotate(90, expand=True).convert('1')
-        else:
-            logger.warning("Wrong image dimensions: must be " + str(self.width) + "x" + str(self.height))
+        buf = self.pack_image(image)
+        if buf is None:
             # return a blank buffer
-            return [0x00] * (int(self.width/8) * self.height)
-
-        buf = bytearray(img.tobytes('raw'))
+            return blank(self.buffer_size, 0x00)
         return buf
         
     '''
@@ -292,15 +258,8 @@ class EPD:
         image : Image data
     '''
     def display(self, image):
-        if self.width%8 == 0:
-            linewidth = int(self.width/8)
-        else:
-            linewidth = int(self.width/8) + 1
-
         self.send_command(0x24)
-        for j in range(0, self.height):
-            for i in range(0, linewidth):
-                self.send_data(image[i + j * linewidth])   
+        self.send_data2(self.window(image, self.buffer_size))
         self.TurnOnDisplay()
     
     '''
@@ -362,14 +321,8 @@ class EPD:
     parameter:
     '''
     def Clear(self, color=0xFF):
-        if self.width%8 == 0:
-            linewidth = int(self.width/8)
-        else:
-            linewidth = int(self.width/8) + 1
-        # logger.debug(linewidth)
-        
         self.send_command(0x24)
-        self.send_data2([color] * int(self.height * linewidth))  
+        self.send_data2(blank(self.buffer_size, color))
         self.TurnOnDisplay()
 
     '''
@@ -28,8 +28,8 @@
 #
 
 import logging
-from multiprocessing.reduction import recv_handle
 from . import epdconfig
+from .epdbase import EPDBase, blank, sequence
 
 # Display resolution
 EPD_WIDTH       = 240
@@ -37,7 +37,7 @@ EPD_HEIGHT      = 360
 
 logger = logging.getLogger(__name__)
 
-class EPD:
+class EPD(EPDBase):
     def __init__(self):
         self.reset_pin = epdconfig.RST_PIN
         self.dc_pin = epdconfig.DC_PIN
@@ -193,56 +193,46 @@ class EPD:
         0x00,0x00,0x00,0x00,0x00,0x00,0x00,
         0x00,0x00,0x00,0x00,0x00,0x00,0x00
     ]
-        
-    # Hardware reset
-    def reset(self):
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200) 
-        epdconfig.digital_write(self.reset_pin, 0)
-        epdconfig.delay_ms(2)
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200)   
-
-    def send_command(self, command):
-        epdconfig.digital_write(self.dc_pin, 0)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([command])
-        epdconfig.digital_write(self.cs_pin, 1)
 
-    def send_data(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([data])
-        epdconfig.digital_write(self.cs_pin, 1)
+    # Frozen register tables, replayed with one SPI transfer per command
+    LUT_SEQUENCE = sequence(
+        (0x20, lut_vcom[:42]),      # vcom
+        (0x21, lut_ww[:42]),        # ww --
+        (0x22, lut_bw[:42]),        # bw r
+        (0x23, lut_bb[:42]),        # wb w
+        (0x24, lut_wb[:42]),        # bb b
+    )
+    # GC/DU: vcom, red not use, bb b; bw r / wb w swap on every download
+    LUT_GC_SEQUENCE = sequence((0x20, lut_R20_GC[:56]), (0x21, lut_R21_GC[:42]), (0x24, lut_R24_GC[:42]))
+    LUT_GC_EVEN = sequence((0x22, lut_R22_GC[:56]), (0x23, lut_R23_GC[:42]))
+    LUT_GC_ODD = sequence((0x22, lut_R23_GC[:56]), (0x23, lut_R22_GC[:42]))
+    LUT_DU_SEQUENCE = sequence((0x20, lut_R20_DU[:56]), (0x21, lut_R21_DU[:42]), (0x24, lut_R24_DU[:42]))
+    LUT_DU_EVEN = sequence((0x22, lut_R22_DU[:56]), (0x23, lut_R23_DU[:42]))
+    LUT_DU_ODD = sequence((0x22, lut_R23_DU[:56]), (0x23, lut_R22_DU[:42]))
 
-    # send a lot of data   
-    def send_data2(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte2(data)
-        epdconfig.digital_write(self.cs_pin, 1)
+    INIT_SEQUENCE = sequence(
+        (0x00, [0xFF, 0x01]),       # panel setting PSR: RES1 RES0 REG KW/R UD SHL SHD_N RST_N / x x x VCMZ TS_AUTO TIGE NORG VC_LUTZ
+        (0x01, [0x03,               # POWER SETTING PWR: x x x x x x VDS_EN VDG_EN
+                0x10,               #  x x x VCOM_SLWE VGH[3:0]   VGH=20V, VGL=-20V
+                0x3F,               #  x x VSH[5:0]    VSH = 15V
+                0x3F,               #  x x VSL[5:0]    VSL=-15V
+                0x03]),             #  OPTEN VDHR[6:0]  VHDR=6.4V
+        (0x06, [0x37, 0x3D, 0x3D]), # booster soft start BTST: BT_PHA BT_PHB BT_PHC
+        (0x60, [0x22]),             # TCON setting: S2G[3:0] G2S[3:0] non-overlap = 12
+        (0x82, [0x07]),             # VCOM_DC setting VDCS: VCOM_DC value= -1.9v
+        (0x30, [0x09]),
+        (0xe3, [0x88]),             # power saving PWS: VCOM_W[3:0] SD_W[3:0]
+        (0x61, [0xf0, 0x01, 0x68]), # resoultion setting: HRES[7:3], VRES[8], VRES[7:0]
+        (0x50, [0xB7]),
+    )
         
     def ReadBusy(self):
         logger.debug("e-Paper busy")
-        while(epdconfig.digital_read(self.busy_pin) == 0):      #  0: busy, 1: idle
-            epdconfig.delay_ms(5) 
+        epdconfig.wait_busy(0, poll_ms=5)      #  0: busy, 1: idle
         logger.debug("e-Paper busy release")
 
     def lut(self) :
-        self.send_command(0x20)        # vcom
-        self.send_data2(self.lut_vcom[:42])
-            
-        self.send_command(0x21)        # ww --
-        self.send_data2(self.lut_ww[:42])
-            
-        self.send_command(0x22)        # bw r
-        self.send_data2(self.lut_bw[:42])
-            
-        self.send_command(0x23)        # wb w
-        self.send_data2(self.lut_bb[:42])
-            
-        self.send_command(0x24)        # bb b
-        self.send_data2(self.lut_wb[:42])
+        self.send_sequence(self.LUT_SEQUENCE)
 
     def refresh(self):
         self.send_command(0x17)
@@ -252,59 +242,15 @@ class EPD:
 
     # LUT download
     def lut_GC(self):
-        self.send_command(0x20);        # vcom
-        self.send_data2(self.lut_R20_GC[:56])
-            
-        self.send_command(0x21);        # red not use
-        self.send_data2(self.lut_R21_GC[:42])
-            
-        self.send_command(0x24);        # bb b
-        self.send_data2(self.lut_R24_GC[:42])
-        
-        if(self.Flag == 0) :
-            self.send_command(0x22);    # bw r
-            self.send_data2(self.lut_R22_GC[:56])
-                
-            self.send_command(0x23);    # wb w
-            self.send_data2(self.lut_R23_GC[:42])
-            self.Flag = 1
-
-        else :
-            self.send_command(0x22);    # bw r
-            self.send_data2(self.lut_R23_GC[:56])
-
-            self.send_command(0x23);    # wb w
-            self.send_data2(self.lut_R22_GC[:42])
-            self.Flag = 0
+        self.send_sequence(self.LUT_GC_SEQUENCE)
+        self.send_sequence(self.LUT_GC_ODD if self.Flag else self.LUT_GC_EVEN)
+        self.Flag ^= 1
 
     # LUT download        
     def lut_DU(self):
-        self.send_command(0x20);      # vcom
-        self.send_data2(self.lut_R20_DU[:56])
-            
-        self.send_command(0x21);     # red not use
-        self.send_data2(self.lut_R21_DU[:42])
-            
-        self.send_command(0x24);    # bb b
-        self.send_data2(self.lut_R24_DU[:42])
-        
-        if(self.Flag == 0) :
-            self.send_command(0x22);      # bw r
-            self.send_data2(self.lut_R22_DU[:56])
-                
-            self.send_command(0x23);     # wb w
-            self.send_data2(self.lut_R23_DU[:42])
-                
-            self.Flag = 1
-            
-        else :
-            self.send_command(0x22);    # bw r
-            self.send_data2(self.lut_R23_DU[:56])
-                
-            self.send_command(0x23);   # wb w
-            self.send_data2(self.lut_R22_DU[:42])
-                
-            self.Flag = 0
+        self.send_sequence(self.LUT_DU_SEQUENCE)
+        self.send_sequence(self.LUT_DU_ODD if self.Flag else self.LUT_DU_EVEN)
+        self.Flag ^= 1
         
                 
     def init(self):
@@ -314,65 +260,14 @@ class EPD:
         self.Flag = 0
         self.reset()
 
-        self.send_command(0x00)     # panel setting   PSR
-        self.send_data(0xFF)        # RES1 RES0 REG KW/R     UD    SHL   SHD_N  RST_N    
-        self.send_data(0x01)        # x x x VCMZ TS_AUTO TIGE NORG VC_LUTZ
-
-        self.send_command(0x01)     # POWER SETTING   PWR
-        self.send_data(0x03)        #  x x x x x x VDS_EN VDG_EN    
-        self.send_data(0x10)        #  x x x VCOM_SLWE VGH[3:0]   VGH=20V, VGL=-20V    
-        self.send_data(0x3F)        #  x x VSH[5:0]    VSH = 15V
-        self.send_data(0x3F)        #  x x VSL[5:0]    VSL=-15V
-        self.send_data(0x03)        #  OPTEN VDHR[6:0]  VHDR=6.4V
-                                    # T_VDS_OFF[1:0] 00=1 frame; 01=2 frame; 10=3 frame; 11=4 frame
-        self.send_command(0x06)     # booster soft start   BTST 
-        self.send_data(0x37)        #  BT_PHA[7:0]      
-        self.send_data(0x3D)        #  BT_PHB[7:0]    
-        self.send_data(0x3D)        #  x x BT_PHC[5:0]    
-
-        self.send_command(0x60)     # TCON setting            TCON 
-        self.send_data(0x22)        # S2G[3:0] G2S[3:0]   non-overlap = 12        
-
-        self.send_command(0x82)     # VCOM_DC setting        VDCS 
-        self.send_data(0x07)        # x  VDCS[6:0]    VCOM_DC value= -1.9v    00~3f,0x12=-1.9v
-
-        self.send_command(0x30)             
-        self.send_data(0x09)        
-
-        self.send_command(0xe3)     # power saving            PWS 
-        self.send_data(0x88)        # VCOM_W[3:0] SD_W[3:0]
-
-        self.send_command(0x61)     # resoultion setting 
-        self.send_data(0xf0)        #  HRES[7:3] 0 0 0    
-        self.send_data(0x01)        #  x x x x x x x VRES[8]    
-        self.send_data(0x68)        #  VRES[7:0]
-
-        self.send_command(0x50);            
-        self.send_data(0xB7);    
+        self.send_sequence(self.INIT_SEQUENCE)
         return 0
 
     def getbuffer(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width/8) * self.height)
-        image_monocolor = image.convert('1')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
-        if(imwidth == self.width and imheight == self.height):
-            logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if pixels[x, y] == 0:
-                        buf[int((x + y * self.width) / 8)] &= ~(0x80 >> (x % 8))
-        elif(imwidth == self.height and imheight == self.width):
-            logger.debug("Horizontal")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        buf[int((newx + newy*self.width) / 8)] &= ~(0x80 >> (y % 8))
+        # PIL 1-bit raw data already matches the panel layout (MSB first, 1 = white)
+        buf = self.pack_image(image)
+        if buf is None:
+            return blank(self.buffer_size, 0xFF)
         return buf
 
     def display(self, image):
@@ -445,7 +340,7 @@ class EPD:
         
     def Clear(self):
         self.send_command(0x13);		     # Transfer new data
-        self.send_data2([0xFF] * int(self.width * self.height / 8))
+        self.send_data2(blank(self.buffer_size, 0xFF))
         self.lut_GC()
         self.refresh()
 
@@ -30,8 +30,7 @@
 
 import logging
 from . import epdconfig
-from PIL import Image
-import RPi.GPIO as GPIO
+from .epdbase import EPDBase, sequence
 
 # Display resolution
 EPD_WIDTH  = 400
@@ -45,7 +44,7 @@ GRAY4 = 0x00  # Blackest
 logger = logging.getLogger(__name__)
 
 
-class EPD:
+class EPD(EPDBase):
     def __init__(self):
         self.reset_pin = epdconfig.RST_PIN
         self.dc_pin = epdconfig.DC_PIN
@@ -214,6 +213,57 @@ class EPD:
         0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
     ]
 
+    # Frozen register tables, replayed with one SPI transfer per command
+    LUT_SEQUENCE = sequence(
+        (0x20, lut_vcom0),          # vcom
+        (0x21, lut_ww),             # ww --
+        (0x22, lut_bw),             # bw r
+        (0x23, lut_bb),             # wb w
+        (0x24, lut_wb),             # bb b
+    )
+    PARTIAL_LUT_SEQUENCE = sequence(
+        (0x20, EPD_4IN2_Partial_lut_vcom1),
+        (0x21, EPD_4IN2_Partial_lut_ww1),
+        (0x22, EPD_4IN2_Partial_lut_bw1),
+        (0x23, EPD_4IN2_Partial_lut_wb1),
+        (0x24, EPD_4IN2_Partial_lut_bb1),
+    )
+    GRAY_LUT_SEQUENCE = sequence(
+        (0x20, EPD_4IN2_4Gray_lut_vcom),    # vcom
+        (0x21, EPD_4IN2_4Gray_lut_ww),      # red not use
+        (0x22, EPD_4IN2_4Gray_lut_bw),      # bw r
+        (0x23, EPD_4IN2_4Gray_lut_wb),      # wb w
+        (0x24, EPD_4IN2_4Gray_lut_bb),      # bb b
+        (0x25, EPD_4IN2_4Gray_lut_ww),      # vcom
+    )
+
+    # Init: power setting, then POWER_ON (0x04) + ReadBusy, then panel setting
+    POWER_SEQUENCE = sequence(
+        (0x01, [0x03,               # POWER SETTING: VDS_EN, VDG_EN
+                0x00,               # VCOM_HV, VGHL_LV[1], VGHL_LV[0]
+                0x2b,               # VDH
+                0x2b]),             # VDL
+        (0x06, [0x17, 0x17, 0x17]), # boost soft start
+    )
+    GRAY_POWER_SEQUENCE = sequence(
+        (0x01, [0x03,               # POWER SETTING
+                0x00,               # VGH=20V,VGL=-20V
+                0x2b,               # VDH=15V
+                0x2b,               # VDL=-15V
+                0x13]),
+        (0x06, [0x17, 0x17, 0x17]), # booster soft start: A B C
+    )
+    PANEL_SEQUENCE = sequence(
+        (0x00, [0xbf]),             # panel setting: KW-BF   KWR-AF  BWROTP 0f
+        (0x30, [0x3c]),             # PLL setting: 3A 100HZ   29 150Hz 39 200HZ  31 171HZ
+        (0x61, [0x01, 0x90,         # resolution setting: 400
+                0x01, 0x2c]),       # 300
+        (0x82, [0x12]),             # vcom_DC setting
+        (0x50, [0x97]),             # VCOM AND DATA INTERVAL SETTING: 97white border 77black border  VBDF 17|D7 VBDW 97 VBDB 57  VBDF F7 VBDW 77 VBDB 37  VBDR B7
+    )
+    PARTIAL_PANEL_SEQUENCE = PANEL_SEQUENCE[:-1] + sequence((0x50, [0x07]))
+    GRAY_PANEL_SEQUENCE = sequence((0x00, [0x3f])) + PANEL_SEQUENCE[1:]     # KW-3f   KWR-2F BWROTP 0f BWOTP 1f
+
     # Hardware reset
     def reset(self):
         epdconfig.digital_write(self.reset_pin, 1)
@@ -231,25 +281,6 @@ class EPD:
         epdconfig.digital_write(self.reset_pin, 1)
         epdconfig.delay_ms(10)
 
-    def send_command(self, command):
-        epdconfig.digital_write(self.dc_pin, 0)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([command])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    def send_data(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([data])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    # send a lot of data   
-    def send_data2(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte2(data)
-        epdconfig.digital_write(self.cs_pin, 1)
-
     def ReadBusy(self):
         self.send_command(0x71)
         while epdconfig.digital_read(self.busy_pin) == 0:  # 0: idle, 1: busy
@@ -257,55 +288,13 @@ class EPD:
             epdconfig.delay_ms(100)
 
     def set_lut(self):
-        self.send_command(0x20)  # vcom
-        self.send_data2(self.lut_vcom0)
-
-        self.send_command(0x21)  # ww --
-        self.send_data2(self.lut_ww)
-
-        self.send_command(0x22)  # bw r
-        self.send_data2(self.lut_bw)
-
-        self.send_command(0x23)  # wb w
-        self.send_data2(self.lut_bb)
-
-        self.send_command(0x24)  # bb b
-        self.send_data2(self.lut_wb)
+        self.send_sequence(self.LUT_SEQUENCE)
 
     def Partial_SetLut(self):
-        self.send_command(0x20)
-        self.send_data2(self.EPD_4IN2_Partial_lut_vcom1)
-
-        self.send_command(0x21)
-        self.send_data2(self.EPD_4IN2_Partial_lut_ww1)
-
-        self.send_command(0x22)
-        self.send_data2(self.EPD_4IN2_Partial_lut_bw1)
-
-        self.send_command(0x23)
-        self.send_data2(self.EPD_4IN2_Partial_lut_wb1)
-
-        self.send_command(0x24)
-        self.send_data2(self.EPD_4IN2_Partial_lut_bb1)
+        self.send_sequence(self.PARTIAL_LUT_SEQUENCE)
 
     def Gray_SetLut(self):
-        self.send_command(0x20)  # vcom
-        self.send_data2(self.EPD_4IN2_4Gray_lut_vcom)
-
-        self.send_command(0x21)  # red not use
-        self.send_data2(self.EPD_4IN2_4Gray_lut_ww)
-
-        self.send_command(0x22)  # bw r
-        self.send_data2(self.EPD_4IN2_4Gray_lut_bw)
-
-        self.send_command(0x23)  # wb w
-        self.send_data2(self.EPD_4IN2_4Gray_lut_wb)
-
-        self.send_command(0x24)  # bb b
-        self.send_data2(self.EPD_4IN2_4Gray_lut_bb)
-
-        self.send_command(0x25)  # vcom
-        self.send_data2(self.EPD_4IN2_4Gray_lut_ww)
+        self.send_sequence(self.GRAY_LUT_SEQUENCE)
 
     def init(self):
         if epdconfig.module_init() != 0:
@@ -313,38 +302,12 @@ class EPD:
         # EPD hardware init start
         self.reset()
 
-        self.send_command(0x01)  # POWER SETTING
-        self.send_data(0x03)  # VDS_EN, VDG_EN
-        self.send_data(0x00)  # VCOM_HV, VGHL_LV[1], VGHL_LV[0]
-        self.send_data(0x2b)  # VDH
-        self.send_data(0x2b)  # VDL
-
-        self.send_command(0x06)  # boost soft start
-        self.send_data(0x17)
-        self.send_data(0x17)
-        self.send_data(0x17)
+        self.send_sequence(self.POWER_SEQUENCE)
 
         self.send_command(0x04)  # POWER_ON
         self.ReadBusy()
 
-        self.send_command(0x00)  # panel setting
-        self.send_data(0xbf)  # KW-BF   KWR-AF  BWROTP 0f
-
-        self.send_command(0x30)  # PLL setting
-        self.send_data(0x3c)  # 3A 100HZ   29 150Hz 39 200HZ  31 171HZ
-
-        self.send_command(0x61)  # resolution setting
-        self.send_data(0x01)
-        self.send_data(0x90)  # 128
-        self.send_data(0x01)
-        self.send_data(0x2c)
-
-        self.send_command(0x82)  # vcom_DC setting
-        self.send_data(0x12)
-
-        self.send_command(0X50)  # VCOM AND DATA INTERVAL SETTING
-        self.send_data(
-            0x97)  # 97white border 77black border  VBDF 17|D7 VBDW 97 VBDB 57  VBDF F7 VBDW 77 VBDB 37  VBDR B7
+        self.send_sequence(self.PANEL_SEQUENCE)
 
         self.set_lut()
         # EPD hardware init end
@@ -356,38 +319,12 @@ class EPD:
         # EPD hardware init start
         self.reset()
 
-        self.send_command(0x01)  # POWER SETTING
-        self.send_data(0x03)  # VDS_EN, VDG_EN
-        self.send_data(0x00)  # VCOM_HV, VGHL_LV[1], VGHL_LV[0]
-        self.send_data(0x2b)  # VDH
-        self.send_data(0x2b)  # VDL
-
-        self.send_command(0x06)  # boost soft start
-        self.send_data(0x17)
-        self.send_data(0x17)
-        self.send_data(0x17)
+        self.send_sequence(self.POWER_SEQUENCE)
 
         self.send_command(0x04)  # POWER_ON
         self.ReadBusy()
 
-        self.send_command(0x00)  # panel setting
-        self.send_data(0xbf)  # KW-BF   KWR-AF  BWROTP 0f
-
-        self.send_command(0x30)  # PLL setting
-        self.send_data(0x3c)  # 3A 100HZ   29 150Hz 39 200HZ  31 171HZ
-
-        self.send_command(0x61)  # resolution setting
-        self.send_data(0x01)
-        self.send_data(0x90)  # 128
-        self.send_data(0x01)
-        self.send_data(0x2c)
-
-        self.send_command(0x82)  # vcom_DC setting
-        self.send_data(0x12)
-
-        self.send_command(0X50)  # VCOM AND DATA INTERVAL SETTING
-        self.send_data(
-            0x07)  # 97white border 77black border  VBDF 17|D7 VBDW 97 VBDB 57  VBDF F7 VBDW 77 VBDB 37  VBDR B7
+        self.send_sequence(self.PARTIAL_PANEL_SEQUENCE)
 
         self.Partial_SetLut()
         # EPD hardware init end
@@ -399,38 +336,12 @@ class EPD:
         # EPD hardware init start
         self.reset()
 
-        self.send_command(0x01)  # POWER SETTING
-        self.send_data(0x03)
-        self.send_data(0x00)  # VGH=20V,VGL=-20V
-        self.send_data(0x2b)  # VDH=15V
-        self.send_data(0x2b)  # VDL=-15V
-        self.send_data(0x13)
-
-        self.send_command(0x06)  # booster soft start
-        self.send_data(0x17)  # A
-        self.send_data(0x17)  # B
-        self.send_data(0x17)  # C
+        self.send_sequence(self.GRAY_POWER_SEQUENCE)
 
-        self.send_command(0x04)
+        self.send_command(0x04)  # POWER_ON
         self.ReadBusy()
 
-        self.send_command(0x00)  # panel setting
-        self.send_data(0x3f)  # KW-3f   KWR-2F BWROTP 0f BWOTP 1f
-
-        self.send_command(0x30)  # PLL setting
-        self.send_data(0x3c)  # 100hz
-
-        self.send_command(0x61)  # resolution setting
-        self.send_data(0x01)  # 400
-        self.send_data(0x90)
-        self.send_data(0x01)  # 300
-        self.send_data(0x2c)
-
-        self.send_command(0x82)  # vcom_DC setting
-        self.send_data(0x12)
-
-        self.send_command(0X50)  # VCOM AND DATA INTERVAL SETTING
-        self.send_data(0x97)
+        self.send_sequence(self.GRAY_PANEL_SEQUENCE)
 
     def getbuffer(self, image):
         # logger.debug("bufsiz = ",int(self.width/8) * self.height)
@@ -30,6 +30,7 @@
 
 import logging
 from . import epdconfig
+from .epdbase import EPDBase, INVERT, blank, sequence
 
 # Display resolution
 EPD_WIDTH       = 800
@@ -37,7 +38,12 @@ EPD_HEIGHT      = 480
 
 logger = logging.getLogger(__name__)
 
-class EPD:
+class EPD(EPDBase):
+    RESET_TIMING = (200, 4, 200)
+    ACCENT_PLANE = True
+    BUFFER_INK = 1
+    ROTATE_BEFORE_DITHER = True
+
     def __init__(self):
         self.reset_pin = epdconfig.RST_PIN
         self.dc_pin = epdconfig.DC_PIN
@@ -46,32 +52,21 @@ class EPD:
         self.width = EPD_WIDTH
         self.height = EPD_HEIGHT
 
-    # Hardware reset
-    def reset(self):
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200) 
-        epdconfig.digital_write(self.reset_pin, 0)
-        epdconfig.delay_ms(4)
-        epdconfig.digital_write(self.reset_pin, 1)
-        epdconfig.delay_ms(200)   
-
-    def send_command(self, command):
-        epdconfig.digital_write(self.dc_pin, 0)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([command])
-        epdconfig.digital_write(self.cs_pin, 1)
-
-    def send_data(self, data):
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte([data])
-        epdconfig.digital_write(self.cs_pin, 1)
-    
-    def send_data2(self, data): #faster
-        epdconfig.digital_write(self.dc_pin, 1)
-        epdconfig.digital_write(self.cs_pin, 0)
-        epdconfig.spi_writebyte2(data)
-        epdconfig.digital_write(self.cs_pin, 1)
+    # Frozen register tables, replayed with one SPI transfer per command
+    POWER_SEQUENCE = sequence(
+        (0x01, [0x07, 0x07,         # POWER SETTING: VGH=20V,VGL=-20V
+                0x3f,               # VDH=15V
+                0x3f]),             # VDL=-15V
+    )
+    PANEL_SEQUENCE = sequence(
+        (0x00, [0x0F]),             # PANNEL SETTING: KW-3f KWR-2F BWROTP-0f BWOTP-1f
+        (0x61, [0x03, 0x20,         # tres: source 800
+                0x01, 0xE0]),       # gate 480
+        (0x15, [0x00]),
+        (0x50, [0x11, 0x07]),       # VCOM AND DATA INTERVAL SETTING
+        (0x60, [0x22]),             # TCON SETTING
+        (0x65, [0x00, 0x00, 0x00, 0x00]),
+    )
 
     def ReadBusy(self):
         logger.debug("e-Paper busy")
@@ -95,69 +90,29 @@ class EPD:
         # self.send_data(0x38)      # If an exception is displayed, try using 0x38
         # self.send_data(0x17)
 
-        self.send_command(0x01)     # POWER SETTING
-        self.send_data(0x07)
-        self.send_data(0x07)        # VGH=20V,VGL=-20V
-        self.send_data(0x3f)        # VDH=15V
-        self.send_data(0x3f)        # VDL=-15V
+        self.send_sequence(self.POWER_SEQUENCE)
 
         self.send_command(0x04)     # POWER ON
         epdconfig.delay_ms(100)
         self.ReadBusy()
 
-        self.send_command(0X00)     # PANNEL SETTING
-        self.send_data(0x0F)        # KW-3f KWR-2F BWROTP-0f BWOTP-1f
-
-        self.send_command(0x61)     # tres
-        self.send_data(0x03)        # source 800
-        self.send_data(0x20)
-        self.send_data(0x01)        # gate 480
-        self.send_data(0xE0)
-
-        self.send_command(0X15)
-        self.send_data(0x00)
-
-        self.send_command(0X50)     # VCOM AND DATA INTERVAL SETTING
-        self.send_data(0x11)
-        self.send_data(0x07)
-
-        self.send_command(0X60)     # TCON SETTING
-        self.send_data(0x22)
-
-        self.send_command(0x65)
-        self.send_data(0x00)
-        self.send_data(0x00)
-        self.send_data(0x00)
-        self.send_data(0x00)
+        self.send_sequence(self.PANEL_SEQUENCE)
     
         return 0
 
     def getbuffer(self, image):
-        img = image
-        imwidth, imheight = img.size
-        if(imwidth == self.width and imheight == self.height):
-            img = img.convert('1')
-        elif(imwidth == self.height and imheight == self.width):
-            # image has correct dimensions, but needs to be rotated
-            img = img.rotate(90, expand=True).convert('1')
-        else:
-            logger.warning("Wrong image dimensions: must be " + str(self.width) + "x" + str(self.height))
+        buf = self.pack_image(image)
+        if buf is None:
             # return a blank buffer
-            return [0x00] * (int(self.width/8) * self.height)
-
-        buf = bytearray(img.tobytes('raw'))
+            return blank(self.buffer_size, 0x00)
         # The bytes need to be inverted, because in the PIL world 0=black and 1=white, but
         # in the e-paper world 0=white and 1=black.
-        for i in range(len(buf)):
-            buf[i] ^= 0xFF
-        return buf
+        return buf.translate(INVERT)
 
     def display(self, imageblack, imagered):
         self.send_command(0x10)
         # The black bytes need to be inverted back from what getbuffer did
-        for i in range(len(imageblack)):
-            imageblack[i] ^= 0xFF
-        self.send_data2(imageblack)
+        self.send_data2(self.inverted(imageblack, 'black'))
 
         self.send_command(0x13)
         self.send_data2(imagered)
@@ -167,13 +122,11 @@ class EPD:
         self.ReadBusy()
         
     def Clear(self):
-        buf = [0x00] * (int(self.width/8) * self.height)
-        buf2 = [0xff] * (int(self.width/8) * self.height)
         self.send_command(0x10)
-        self.send_data2(buf2)
+        self.send_data2(blank(self.buffer_size, 0xFF))
             
         self.send_command(0x13)
-        self.send_data2(buf)
+        self.send_data2(blank(self.buffer_size, 0x00))
                 
         self.send_command(0x12)
         epdconfig.delay_ms(100)
@@ -0,0 +1,258 @@
+# /*****************************************************************************
+# * | File        :	  epdbase.py
+# * | Function    :   Common EPD driver base
+# * | Info        :
+# *----------------
+# * | Info        :   驱动公共基类：命令/数据发送、声明式寄存器表回放和帧缓冲
+# ******************************************************************************
+#
+# 初始化序列和波形LUT用 (命令, 数据) 表描述，回放时每条命令只切换一次DC、
+# 数据用一次 spi_writebyte2 整块发送，不再每个寄存器值一次SPI传输。
+# 表在类定义时冻结为 tuple/bytes，多次调用之间复用，不再重复构造列表。
+#
+# 帧数据：每个驱动实例按平面（black/red/gray）预分配一块 bytearray 帧缓冲，
+# 取反用 bytes.translate 整块完成；Clear 用的全白/全黑缓冲按 (长度, 填充值) 缓存共享；
+# 局部刷新窗口用 memoryview 切片发送，刷新过程中不再分配整屏大小的列表。
+#
+# 三色屏（黑/红、黑/黄）：split_planes 对一张RGB/P图像按颜色容差一次分类，
+# 同时得到黑色和强调色两个打包平面，不再需要分别绘制两张图像、各跑一遍 getbuffer。
+#
+# 已迁移到本基类帧缓冲的驱动：epd2in13_V3、epd3in52、epd7in5_V2、epd7in5b_V2，
+# 以及三色的 epd2in13bc、epd4in2bc、epd5in83b_V2；epd4in2 只迁移了寄存器表。
+# 后续工作：其余驱动仍是原厂实现（逐像素getbuffer、逐字节发送寄存器），需要逐个迁移，
+# 每个型号迁移时在 daily_word_test.py 中补充与原驱动的字节流/帧缓冲一致性测试。
+#
+
+import logging
+from functools import lru_cache
+
+from . import epdconfig
+
+logger = logging.getLogger(__name__)
+
+# bytes.translate 用的取反表，等价于逐字节 ^ 0xFF
+INVERT = bytes(0xFF - i for i in range(256))
+
+# 常量空白缓冲区，所有驱动实例共享
+_blanks = {}
+
+# 三色分类默认参数：强调色强度超过容差算作强调色，其余像素亮度低于阈值算作黑色
+ACCENT_TOLERANCE = 64
+BLACK_THRESHOLD = 128
+
+
+def sequence(*steps):
+    """
+    冻结一张寄存器表
+
+    参数:
+    - steps: (命令, 数据) 元组，数据为可迭代的字节值，没有数据时传空序列
+
+    返回:
+    - tuple: ((命令, bytes), ...)
+    """
+    return tuple((command, bytes(data)) for command, data in steps)
+
+
+def blank(size, value):
+    """
+    获取填充值相同的只读缓冲区（按 (长度, 填充值) 缓存）
+
+    参数:
+    - size: 字节数
+    - value: 每个字节的值，如0xFF（白）、0x00
+
+    返回:
+    - bytes
+    """
+    key = (size, value)
+    buf = _blanks.get(key)
+    if buf is None:
+        buf = _blanks[key] = bytes([value]) * size
+    return buf
+
+
+@lru_cache(maxsize=None)
+def _threshold_table(level, inclusive, above):
+    """point() 查找表：超过（或不低于）level 的值映射为 above，其余映射为 255 - above"""
+    below = 255 - above
+    return tuple(above if (v >= level if inclusive else v > level) else below for v in range(256))
+
+
+class EPDBase:
+    """
+    墨水屏驱动基类；子类需在 __init__ 中设置 width/height、reset_pin、dc_pin 和 cs_pin，
+    复位时序不同的型号覆盖 RESET_TIMING
+    """
+
+    # 复位时序(ms)：拉高保持、拉低保持、再次拉高后等待
+    RESET_TIMING = (200, 2, 200)
+
+    # 是否有第二个（红/黄）颜色平面，display 接受 (imageblack, imagered)
+    ACCENT_PLANE = False
+    # getbuffer 输出中表示"有墨"的位值：0 表示与PIL一致（0=黑），1 表示已取反
+    BUFFER_INK = 0
+    # 横向图像是否先旋转再二值化；逐像素映射的原驱动先二值化，tobytes 的原驱动先旋转，
+    # 灰度图像的抖动结果与顺序有关
+    ROTATE_BEFORE_DITHER = False
+
+    # Hardware reset
+    def reset(self):
+        high, low, settle = self.RESET_TIMING
+        epdconfig.digital_write(self.reset_pin, 1)
+        epdconfig.delay_ms(high)
+        epdconfig.digital_write(self.reset_pin, 0)
+        epdconfig.delay_ms(low)
+        epdconfig.digital_write(self.reset_pin, 1)
+        epdconfig.delay_ms(settle)
+
+    def send_command(self, command):
+        epdconfig.digital_write(self.dc_pin, 0)
+        epdconfig.digital_write(self.cs_pin, 0)
+        epdconfig.spi_writebyte([command])
+        epdconfig.digital_write(self.cs_pin, 1)
+
+    def send_data(self, data):
+        epdconfig.digital_write(self.dc_pin, 1)
+        epdconfig.digital_write(self.cs_pin, 0)
+        epdconfig.spi_writebyte([data])
+        epdconfig.digital_write(self.cs_pin, 1)
+
+    # send a lot of data
+    def send_data2(self, data):
+        epdconfig.digital_write(self.dc_pin, 1)
+        epdconfig.digital_write(self.cs_pin, 0)
+        epdconfig.spi_writebyte2(data)
+        epdconfig.digital_write(self.cs_pin, 1)
+
+    def send_sequence(self, table):
+        """回放寄存器表：每条命令后用一次传输发送全部数据"""
+        for command, data in table:
+            self.send_command(command)
+            if data:
+                self.send_data2(data)
+
+    # ---------- 帧缓冲 ----------
+
+    @property
+    def linewidth(self):
+        """每行字节数（宽度不是8的倍数时按字节补齐）"""
+        return (self.width + 7) // 8
+
+    @property
+    def buffer_size(self):
+        """单个平面的字节数"""
+        return self.linewidth * self.height
+
+    def frame(self, plane='black'):
+        """平面对应的预分配帧缓冲，首次使用时创建，之后复用"""
+        frames = self.__dict__.setdefault('_frames', {})
+        buf = frames.get(plane)
+        if buf is None:
+            buf = frames[plane] = bytearray(self.buffer_size)
+        return buf
+
+    def inverted(self, data, plane='black', length=None):
+        """
+        将数据逐字节取反写入平面帧缓冲
+
+        参数:
+        - data: 帧数据（bytes/bytearray，兼容整数列表）
+        - plane: 写入的平面
+        - length: 只取前length字节（局部刷新窗口），默认全部
+
+        返回:
+        - memoryview: 帧缓冲中有效部分的视图，直接交给 send_data2
+        """
+        buf = self.frame(plane)
+        if not isinstance(data, (bytes, bytearray)):
+            data = bytes(data)
+        size = min(len(data) if length is None else length, len(buf))
+        buf[:size] = (data if size == len(data) else data[:size]).translate(INVERT)
+        return memoryview(buf)[:size]
+
+    def window(self, data, length):
+        """前length字节的视图（不复制）；不支持缓冲区协议的列表退化为切片"""
+        try:
+            return memoryview(data)[:length]
+        except TypeError:
+            return data[:length]
+
+    def pack_image(self, image):
+        """
+        将PIL图像转换为面板方向的1位原始字节（MSB在前，1=白）
+
+        横向图像按 ROTATE_BEFORE_DITHER 的顺序旋转90度和二值化，与各型号原驱动的结果一致
+
+        返回:
+        - bytes；尺寸与面板不符时返回None
+        """
+        imwidth, imheight = image.size
+        if imwidth == self.width and imheight == self.height:
+            img = image.convert('1')
+        elif imwidth == self.height and imheight == self.width:
+            # image has correct dimensions, but needs to be rotated
+            if self.ROTATE_BEFORE_DITHER:
+                img = image.rotate(90, expand=True).convert('1')
+            else:
+                img = image.convert('1').rotate(90, expand=True)
+        else:
+            logger.warning("Wrong image dimensions: must be " + str(self.width) + "x" + str(self.height))
+            return None
+        return img.tobytes('raw')
+
+    # ---------- 三色屏 ----------
+
+    def split_planes(self, image, accent='red', tolerance=ACCENT_TOLERANCE, threshold=BLACK_THRESHOLD):
+        """
+        将一张彩色图像分类为黑色和强调色两个打包平面
+
+        强调色强度：红色为 R - max(G, B)，黄色为 min(R, G) - B；超过tolerance的像素归为强调色，
+        其余像素按亮度阈值分为黑/白。全部计算由PIL的通道运算和查找表完成，不逐像素循环。
+
+        参数:
+        - image: PIL图像（RGB、P或L模式均可）
+        - accent: 'red' 或 'yellow'
+        - tolerance: 强调色容差(0-255)，越大越严格
+        - threshold: 黑色亮度阈值(0-255)
+
+        返回:
+        - (black, accent): 两个平面的原始字节（MSB在前，1=无墨）；尺寸不符时返回None
+        """
+        from PIL import ImageChops
+
+        imwidth, imheight = image.size
+        if (imwidth, imheight) not in ((self.width, self.height), (self.height, self.width)):
+            logger.warning("Wrong image dimensions: must be " + str(self.width) + "x" + str(self.height))
+            return None
+
+        rgb = image.convert('RGB')
+        r, g, b = rgb.split()
+        if accent == 'yellow':
+            strength = ImageChops.subtract(ImageChops.darker(r, g), b)
+        else:
+            strength = ImageChops.subtract(r, ImageChops.lighter(g, b))
+        accent_ink = strength.point(_threshold_table(tolerance, False, 255), '1')
+        accent_plane = strength.point(_threshold_table(tolerance, False, 0), '1')
+        light = rgb.convert('L').point(_threshold_table(threshold, True, 255), '1')
+        # 强调色像素不再画黑
+        black_plane = ImageChops.logical_or(light, accent_ink)
+
+        if imwidth != self.width:
+            black_plane = black_plane.rotate(90, expand=True)
+            accent_plane = accent_plane.rotate(90, expand=True)
+        return black_plane.tobytes('raw'), accent_plane.tobytes('raw')
+
+    def getbuffer_color(self, image, accent='red', tolerance=ACCENT_TOLERANCE, threshold=BLACK_THRESHOLD):
+        """一次得到 display(imageblack, imagered) 所需的两个缓冲区，格式与 getbuffer 的输出一致"""
+        planes = self.split_planes(image, accent, tolerance, threshold)
+        if planes is None:
+            white = blank(self.buffer_size, 0x00 if self.BUFFER_INK else 0xFF)
+            return white, white
+        if self.BUFFER_INK:
+            return tuple(plane.translate(INVERT) for plane in planes)
+        return planes
+
+    def display_color(self, image, **options):
+        """直接显示一张彩色图像（三色屏）"""
+        self.display(*self.getbuffer_color(image, **options))
@@ -36,6 +36,27 @@ import subprocess
 logger = logging.getLogger(__name__)
 
 
+def poll_busy(backend, level, timeout=None, poll_ms=10):
+    """
+    轮询BUSY直到电平离开level（驱动忙等待循环的通用实现）
+
+    参数:
+    - backend: GPIO后端
+    - level: 表示忙的电平（0或1，随型号不同）
+    - timeout: 最长等待秒数，None表示一直等待
+    - poll_ms: 轮询间隔(ms)
+
+    返回:
+    - bool: BUSY已释放返回True，超时返回False
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while backend.digital_read(backend.BUSY_PIN) == level:
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        backend.delay_ms(poll_ms)
+    return True
+
+
 class RaspberryPi:
     # Pin definition
     RST_PIN  = 17
@@ -81,17 +102,20 @@ class RaspberryPi:
         if pin == self.BUSY_PIN:
             return self.GPIO_BUSY_PIN.value
         elif pin == self.RST_PIN:
-            return self.RST_PIN.value
+            return self.GPIO_RST_PIN.value
         elif pin == self.DC_PIN:
-            return self.DC_PIN.value
+            return self.GPIO_DC_PIN.value
         # elif pin == self.CS_PIN:
-        #     return self.CS_PIN.value
+        #     return self.GPIO_CS_PIN.value
         elif pin == self.PWR_PIN:
-            return self.PWR_PIN.value
+            return self.GPIO_PWR_PIN.value
 
     def delay_ms(self, delaytime):
         time.sleep(delaytime / 1000.0)
 
+    def wait_busy(self, level, timeout=None, poll_ms=10):
+        return poll_busy(self, level, timeout, poll_ms)
+
     def spi_writebyte(self, data):
         self.SPI.writebytes(data)
 
@@ -128,6 +152,97 @@ class RaspberryPi:
 
 
 
+class RaspberryPiGpiod(RaspberryPi):
+    """
+    libgpiod字符设备后端（gpiod>=2.0 的Python绑定），EPD_GPIO_BACKEND=gpiod 时使用
+
+    - 输出引脚(RST/DC/PWR)和BUSY用一次line request申请，引脚号直接作为line偏移，
+      按 pin -> 当前电平 的查找表写入，电平未变化时不发ioctl（send_data每字节都会重复拉高DC）
+    - CS由SPI控制器的CE0驱动，digital_write(CS_PIN)与gpiozero后端一样不做任何操作
+    - 断电时用一次set_values同时拉低全部输出引脚
+    - BUSY申请双边沿事件：wait_busy阻塞在边沿事件上，BUSY电平变化时立即返回，
+      不再睡满整个轮询间隔；delay_ms始终按时间睡眠
+    """
+
+    def __init__(self, chip=None):
+        import spidev
+        import gpiod
+        from gpiod.line import Bias, Direction, Edge, Value
+
+        self.SPI = spidev.SpiDev()
+        self.chip_path = chip or os.environ.get('EPD_GPIO_CHIP', '/dev/gpiochip0')
+        self._values = (Value.INACTIVE, Value.ACTIVE)
+        self._active = Value.ACTIVE
+
+        outputs = (self.RST_PIN, self.DC_PIN, self.PWR_PIN)
+        self._request = gpiod.request_lines(
+            self.chip_path,
+            consumer='epaper',
+            config={
+                outputs: gpiod.LineSettings(direction=Direction.OUTPUT, output_value=Value.INACTIVE),
+                self.BUSY_PIN: gpiod.LineSettings(direction=Direction.INPUT, bias=Bias.PULL_DOWN,
+                                                  edge_detection=Edge.BOTH),
+            },
+        )
+        # 输出引脚的当前电平，同时作为 pin -> line 的查找表
+        self._levels = {pin: 0 for pin in outputs}
+
+    def digital_write(self, pin, value):
+        level = self._levels.get(pin)
+        if level is None or level == value:
+            return
+        self._request.set_value(pin, self._values[1 if value else 0])
+        self._levels[pin] = 1 if value else 0
+
+    def digital_write_many(self, values):
+        """一次ioctl同时设置多个输出引脚，values为 {pin: 0/1}"""
+        values = {pin: 1 if value else 0 for pin, value in values.items() if pin in self._levels}
+        self._request.set_values({pin: self._values[value] for pin, value in values.items()})
+        self._levels.update(values)
+
+    def digital_read(self, pin):
+        if pin == self.BUSY_PIN:
+            return 1 if self._request.get_value(pin) == self._active else 0
+        return self._levels.get(pin, 0)
+
+    def wait_busy(self, level, timeout=None, poll_ms=10):
+        """
+        等待BUSY电平离开level：阻塞在边沿事件上，不按轮询间隔睡眠
+
+        单次等待最长1秒，没有收到边沿事件时也会重新读取电平；poll_ms 不使用，只为与其他后端签名一致
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.digital_read(self.BUSY_PIN) == level:
+            wait = 1.0
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    return False
+            if self._request.wait_edge_events(wait):
+                # 丢弃已处理的事件，电平以重新读取的值为准
+                self._request.read_edge_events()
+        return True
+
+    def module_init(self):
+        self.digital_write(self.PWR_PIN, 1)
+
+        # SPI device, bus = 0, device = 0
+        self.SPI.open(0, 0)
+        self.SPI.max_speed_hz = 4000000
+        self.SPI.mode = 0b00
+        return 0
+
+    def module_exit(self, cleanup=False):
+        logger.debug("spi end")
+        self.SPI.close()
+
+        self.digital_write_many({self.RST_PIN: 0, self.DC_PIN: 0, self.PWR_PIN: 0})
+        logger.debug("close 5V, Module enters 0 power consumption ...")
+
+        if cleanup:
+            self._request.release()
+
+
 class JetsonNano:
     # Pin definition
     RST_PIN  = 17
@@ -164,6 +279,9 @@ class JetsonNano:
     def delay_ms(self, delaytime):
         time.sleep(delaytime / 1000.0)
 
+    def wait_busy(self, level, timeout=None, poll_ms=10):
+        return poll_busy(self, level, timeout, poll_ms)
+
     def spi_writebyte(self, data):
         self.SPI.SYSFS_software_spi_transfer(data[0])
 
@@ -222,6 +340,9 @@ class SunriseX3:
     def delay_ms(self, delaytime):
         time.sleep(delaytime / 1000.0)
 
+    def wait_busy(self, level, timeout=None, poll_ms=10):
+        return poll_busy(self, level, timeout, poll_ms)
+
     def spi_writebyte(self, data):
         self.SPI.writebytes(data)
 
@@ -331,8 +452,14 @@ def detect_platform():
 # 根据检测结果选择实现
 platform = detect_platform()
 
+# 树莓派GPIO后端：gpiozero（默认）或 gpiod（libgpiod字符设备，EPD_GPIO_CHIP 指定芯片）
+gpio_backend = os.environ.get('EPD_GPIO_BACKEND', 'gpiozero')
+
 try:
-    if platform == "raspberry":
+    if platform == "raspberry" and gpio_backend == "gpiod":
+        implementation = RaspberryPiGpiod()
+        logger.info("使用树莓派libgpiod实现")
+    elif platform == "raspberry":
         implementation = RaspberryPi()
         logger.info("使用树莓派GPIO实现")
     elif platform == "sunrise":
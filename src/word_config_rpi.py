@@ -243,42 +243,12 @@ def check_environment():
 
 # 获取系统信息
 def get_system_info():
-    """获取系统信息"""
-    from get_ipaddress import get_ip_address
-    info = {}
-    
-    try:
-        # CPU温度
-        with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
-            temp = int(f.read()) / 1000.0
-            info['cpu_temperature'] = temp
-    except:
-        info['cpu_temperature'] = None
-    
-    try:
-        # 内存使用
-        with open('/proc/meminfo', 'r') as f:
-            lines = f.readlines()
-            for line in lines:
-                if line.startswith('MemAvailable:'):
-                    info['memory_available'] = int(line.split()[1]) * 1024
-                    break
-    except:
-        info['memory_available'] = None
-    
-    try:
-        # 磁盘空间
-        import shutil
-        total, used, free = shutil.disk_usage('/')
-        info['disk_free'] = free
-    except:
-        info['disk_free'] = None
-    
-    try:
-        # IP地址
-        ip_address = get_ip_address()
-        info['ip_address'] = ip_address
-    except:
-        info['ip_address'] = None
-    
-    return info
\ No newline at end of file
+    """获取系统信息（读取后台遥测采样器的最新值，不直接访问/proc、/sys和网络）"""
+    from daily_word_telemetry import get_sampler
+    latest = get_sampler().latest()
+    return {
+        'cpu_temperature': latest.get('cpu_temperature'),
+        'memory_available': latest.get('memory_available'),
+        'disk_free': latest.get('disk_free'),
+        'ip_address': latest.get('ip_address'),
+    }
\ No newline at end of file
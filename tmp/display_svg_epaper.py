@@ -5,10 +5,15 @@ libdir = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__)
 if os.path.exists(libdir):
     sys.path.append(libdir)
 from PIL import Image, ImageDraw, ImageFont
-from io import BytesIO
 import logging
 from waveshare_epd import epd3in52
 
+srcdir = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), 'src')
+sys.path.append(srcdir)
+from daily_word_weather import IconCache
+
+icon_cache = IconCache(os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), 'data', 'weather_icons'))
+
 
 def get_weather_data():
     url = "http://api.weatherapi.com/v1/current.json?key=28962db3791a4792b4c90923241402&q=Guangzhou&aqi=no"
@@ -20,12 +25,8 @@ def get_weather_data():
 
 
 def download_and_resize_icon(icon_url, size=(64, 64)):
-    if not icon_url.startswith(('http:', 'https:')):
-        icon_url = 'https:' + icon_url  # 确保URL具有协议前缀
-    response = requests.get(icon_url)
-    icon_image = Image.open(BytesIO(response.content))
-    resized_icon = icon_image.resize(size, Image.Resampling.LANCZOS)  # 使用Image.Resampling.LANCZOS替代Image.ANTIALIAS
-    return resized_icon
+    # 已转换为1位并抖动的图标按尺寸缓存在磁盘上，只有第一次需要下载和缩放
+    return icon_cache.get(icon_url, size)
 
 # 这个部分需要根据您实际使用的电子墨水屏库进行调整
 def display_weather_on_epaper():